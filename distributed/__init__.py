@@ -4,7 +4,10 @@
 __version__ = "1.0.0"
 __author__ = "Distributed Crawler Team"
 
-from .task_queue import TaskQueue, TaskMessage, ResultMessage, StatusMessage
+from .task_queue import TaskQueue, TaskMessage, ResultMessage, StatusMessage, create_task_queue
+from .stream_queue import StreamTaskQueue, AsyncStreamTaskQueue
+from .async_task_queue import AsyncTaskQueue, create_async_task_queue
+from .blob_store import BlobStore, LocalBlobStore, create_blob_store
 from .worker_node import WorkerNode
 from .task_scheduler import TaskScheduler
 from .result_collector import ResultCollector
@@ -16,6 +19,14 @@ __all__ = [
     "TaskMessage", 
     "ResultMessage",
     "StatusMessage",
+    "StreamTaskQueue",
+    "AsyncStreamTaskQueue",
+    "create_task_queue",
+    "AsyncTaskQueue",
+    "create_async_task_queue",
+    "BlobStore",
+    "LocalBlobStore",
+    "create_blob_store",
     "WorkerNode",
     "TaskScheduler",
     "ResultCollector",
@@ -2,16 +2,37 @@
 人性化访问控制器
 
 提供智能延迟机制，模拟真实用户浏览行为，避免对目标服务器造成过大压力。
+
+同一域名的请求间隔由限速器（见 rate_limiter.py）预约：每个请求预约该域名的下一个
+可用时刻，只等待到该时刻为止。多个工作节点共享 RedisRateLimiter 时，间隔对整个
+集群生效。
+
+域名状态保存在容量为 max_tracked_domains 的LRU中，近期请求数为按 stats_window
+指数衰减的计数，大范围爬取时内存占用保持不变。
 """
 
 import asyncio
+import math
 import random
 import time
+from collections import OrderedDict
+from contextvars import ContextVar
 from typing import Optional, Dict, Any
 from dataclasses import dataclass
 from urllib.parse import urlparse
 import logging
 
+from .rate_limiter import LocalRateLimiter
+
+# 当前任务中请求时刻已经预约过的URL（由工作节点的域名前沿设置），对它的第一次请求不再等待
+_reserved_url: ContextVar[Optional[str]] = ContextVar("reserved_url", default=None)
+
+
+def mark_reserved(url: str):
+    """声明当前任务对该URL的请求时刻已经预约（在任务协程内调用）"""
+    _reserved_url.set(url)
+
+
 @dataclass
 class AccessConfig:
     """访问配置"""
@@ -21,15 +42,59 @@ class AccessConfig:
     adaptive_delay: bool = True  # 是否启用自适应延迟
     respect_crawl_delay: bool = True  # 是否尊重robots.txt的爬取延迟
     burst_protection: bool = True  # 突发保护
+    burst_size: int = 1  # 域名空闲后允许连续发送的请求数
+    max_tracked_domains: int = 100000  # 保留状态的域名数上限（LRU淘汰）
+    stats_window: float = 3600.0  # 近期请求数的衰减时间常数(秒)
+
+
+class DomainState:
+    """单个域名的访问状态"""
+    
+    __slots__ = ("total_requests", "recent_requests", "avg_response_time", "last_access")
+    
+    def __init__(self):
+        self.total_requests = 0
+        self.recent_requests = 0.0  # 截至 last_access 的衰减计数
+        self.avg_response_time = 0.0
+        self.last_access = 0.0
+    
+    def recent(self, now: float, window: float) -> float:
+        """衰减到当前时刻的近期请求数（约等于最近 window 秒内的请求数）"""
+        if not self.total_requests:
+            return 0.0
+        return self.recent_requests * math.exp(-(now - self.last_access) / window)
+    
+    def record(self, now: float, window: float, response_time: float):
+        """计入一次请求"""
+        self.recent_requests = self.recent(now, window) + 1
+        self.total_requests += 1
+        self.avg_response_time += (response_time - self.avg_response_time) / self.total_requests
+        self.last_access = now
+    
+    def to_dict(self, now: float, window: float) -> Dict[str, Any]:
+        return {
+            "total_requests": self.total_requests,
+            "recent_requests": self.recent(now, window),
+            "avg_response_time": self.avg_response_time,
+            "last_access": self.last_access
+        }
+
 
 class AccessController:
     """人性化访问控制器"""
     
-    def __init__(self, config: Optional[AccessConfig] = None):
+    def __init__(self, config: Optional[AccessConfig] = None, rate_limiter=None):
+        """
+        Args:
+            config: 访问配置
+            rate_limiter: 按域名预约请求时刻的限速器，默认为进程内限速
+        """
         self.config = config or AccessConfig()
+        self.rate_limiter = rate_limiter or LocalRateLimiter(
+            self.config.burst_size, max_domains=self.config.max_tracked_domains
+        )
         self.logger = logging.getLogger(__name__)
-        self.domain_stats: Dict[str, Dict[str, Any]] = {}
-        self.last_access: Dict[str, float] = {}
+        self.domain_stats: "OrderedDict[str, DomainState]" = OrderedDict()
         
     def _get_domain_key(self, url: str) -> str:
         """获取域名键"""
@@ -54,16 +119,16 @@ class AccessController:
         delay = random.uniform(self.config.min_delay, self.config.max_delay)
         
         # 自适应延迟：根据历史访问频率调整
-        if self.config.adaptive_delay and domain in self.domain_stats:
-            stats = self.domain_stats[domain]
-            recent_requests = stats.get('recent_requests', 0)
+        state = self.domain_stats.get(domain) if self.config.adaptive_delay else None
+        if state is not None:
+            recent_requests = state.recent(time.time(), self.config.stats_window)
             
             # 如果请求频率高，增加延迟
             if recent_requests > 10:
                 delay *= min(2.0, 1.0 + (recent_requests / 20))
             
-            # 如果是首次访问，使用较短延迟
-            elif recent_requests == 0:
+            # 如果近期没有访问，使用较短延迟
+            elif recent_requests < 1:
                 delay *= 0.8
         
         # 添加轻微随机性，避免模式化
@@ -72,46 +137,36 @@ class AccessController:
         return max(self.config.min_delay, min(self.config.max_delay, delay))
     
     def _update_domain_stats(self, domain: str, response_time: float):
-        """更新域名统计信息"""
-        if domain not in self.domain_stats:
-            self.domain_stats[domain] = {
-                'total_requests': 0,
-                'recent_requests': 0,
-                'avg_response_time': 0.0,
-                'last_reset': time.time()
-            }
-        
-        stats = self.domain_stats[domain]
-        stats['total_requests'] += 1
-        stats['recent_requests'] += 1
-        
-        # 更新平均响应时间
-        old_avg = stats['avg_response_time']
-        stats['avg_response_time'] = (old_avg * (stats['total_requests'] - 1) + response_time) / stats['total_requests']
-        
-        # 每小时重置recent_requests
-        if time.time() - stats['last_reset'] > 3600:
-            stats['recent_requests'] = 0
-            stats['last_reset'] = time.time()
-    
-    def _respect_rate_limit(self, domain: str) -> float:
-        """检查并尊重速率限制"""
-        if domain not in self.last_access:
-            return 0.0
-        
-        last_time = self.last_access[domain]
-        elapsed = time.time() - last_time
+        """更新域名统计信息（最久未访问的域名超出容量时被淘汰）"""
+        state = self.domain_stats.get(domain)
+        if state is None:
+            state = self.domain_stats[domain] = DomainState()
+            if len(self.domain_stats) > self.config.max_tracked_domains:
+                self.domain_stats.popitem(last=False)
+        else:
+            self.domain_stats.move_to_end(domain)
+        state.record(time.time(), self.config.stats_window, response_time)
+    
+    async def reserve(self, url: str, max_wait: Optional[float] = None) -> Optional[float]:
+        """
+        预约URL所在域名的下一个请求时刻（不等待）
         
-        # 确保最小间隔
-        min_interval = 0.3  # 300ms最小间隔
-        if elapsed < min_interval:
-            return min_interval - elapsed
+        人性化延迟作为与该域名上一个请求的间隔，而不是每个请求固定睡眠的时间。
         
-        return 0.0
+        Args:
+            url: 目标URL
+            max_wait: 最长预约等待(秒)，为空时不限制
+            
+        Returns:
+            距预约时刻的秒数；超过 max_wait 时不预约，返回None
+        """
+        domain = self._get_domain_key(url)
+        interval = self._calculate_delay(domain, url)
+        return await self.rate_limiter.reserve(domain, interval, max_wait)
     
     async def wait_before_request(self, url: str, context: Optional[Dict[str, Any]] = None) -> float:
         """
-        在发送请求前等待合适的时间
+        在发送请求前等待到预约的请求时刻
         
         Args:
             url: 目标URL
@@ -120,16 +175,12 @@ class AccessController:
         Returns:
             实际等待的时间(秒)
         """
-        domain = self._get_domain_key(url)
-        
-        # 检查速率限制
-        rate_limit_delay = self._respect_rate_limit(domain)
-        
-        # 计算人性化延迟
-        human_delay = self._calculate_delay(domain, url)
+        if _reserved_url.get() == url:
+            _reserved_url.set(None)
+            return 0.0
         
-        # 总延迟
-        total_delay = max(rate_limit_delay, human_delay)
+        domain = self._get_domain_key(url)
+        total_delay = await self.reserve(url)
         
         if total_delay > 0:
             self.logger.info(f"等待 {total_delay:.2f} 秒后访问 {domain}")
@@ -140,23 +191,24 @@ class AccessController:
     def record_access(self, url: str, response_time: float = 0.0):
         """记录访问信息"""
         domain = self._get_domain_key(url)
-        self.last_access[domain] = time.time()
         self._update_domain_stats(domain, response_time)
     
     def get_domain_stats(self, domain: Optional[str] = None) -> Dict[str, Any]:
         """获取域名统计信息"""
+        now, window = time.time(), self.config.stats_window
         if domain:
-            return self.domain_stats.get(domain, {})
-        return self.domain_stats.copy()
+            state = self.domain_stats.get(domain)
+            return state.to_dict(now, window) if state else {}
+        return {key: state.to_dict(now, window) for key, state in self.domain_stats.items()}
     
     def reset_domain_stats(self, domain: Optional[str] = None):
         """重置域名统计"""
         if domain:
             self.domain_stats.pop(domain, None)
-            self.last_access.pop(domain, None)
         else:
             self.domain_stats.clear()
-            self.last_access.clear()
+        if isinstance(self.rate_limiter, LocalRateLimiter):
+            self.rate_limiter.reset(domain)
 
 class GentleCrawlerMixin:
     """温和爬虫混入类"""
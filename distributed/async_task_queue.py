@@ -0,0 +1,709 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步任务队列
+Async Task Queue
+
+基于 redis.asyncio 的任务队列实现，与 TaskQueue（列表后端）使用相同的键名、
+Lua脚本和消息编码，二者可以混合部署：调度器用同步队列入队，工作节点在事件循环中
+用异步队列出队，队列I/O不会阻塞事件循环，一个进程可以同时运行多个任务槽。
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Union
+
+import redis.asyncio as redis
+from redis.exceptions import ConnectionError, TimeoutError
+
+from utils.metrics import ENQUEUE_SECONDS, DEQUEUE_SECONDS, observe_queue_wait
+
+from .codec import get_codec, decode_payload, DEFAULT_COMPRESS_THRESHOLD
+from .blob_store import BlobStore, create_blob_store
+from .task_queue import (
+    TaskMessage, ResultMessage, StatusMessage, TaskStatus, Priority, RetryPolicy,
+    DEFAULT_RETRY_POLICIES, NON_RETRYABLE_ERRORS, PROMOTE_DELAYED_SCRIPT, POP_TASKS_SCRIPT, LEASE_TASKS_SCRIPT,
+    RECORD_LEASE_SCRIPT, ACK_LEASE_SCRIPT, EXTEND_LEASES_SCRIPT, REAP_LEASES_SCRIPT,
+    route_queue_names, route_retry_queue, dequeue_order
+)
+
+
+class AsyncTaskQueue:
+    """异步分布式任务队列管理器（列表后端）"""
+
+    def __init__(self,
+                 redis_host: str = "localhost",
+                 redis_port: int = 6379,
+                 redis_db: int = 0,
+                 redis_password: str = None,
+                 queue_prefix: str = "crawler",
+                 retry_policies: Dict[str, RetryPolicy] = None,
+                 promote_batch_size: int = 100,
+                 reliable: bool = False,
+                 visibility_timeout: float = 300,
+                 reaper_interval: float = 30,
+                 status_maxlen: int = 10000,
+                 codec: str = "json",
+                 compress_threshold: int = DEFAULT_COMPRESS_THRESHOLD,
+                 blob_store: BlobStore = None,
+                 blob_threshold: int = 64 * 1024,
+                 routes: List[str] = None,
+                 max_connections: int = 50):
+        """
+        初始化异步任务队列（连接在 initialize() 中建立）
+
+        Args:
+            redis_host: Redis主机地址
+            redis_port: Redis端口
+            redis_db: Redis数据库编号
+            redis_password: Redis密码
+            queue_prefix: 队列名称前缀
+            retry_policies: 按错误类别覆盖的重试策略
+            promote_batch_size: 每次迁移到期延迟任务的最大数量
+            reliable: 是否启用可靠出队（租约 + 可见性超时）
+            visibility_timeout: 租约时长（秒）
+            reaper_interval: get_task 顺带回收过期租约的最小间隔（秒）
+            status_maxlen: 状态队列保留的最大消息数
+            codec: 消息编码 json / msgpack / orjson
+            compress_threshold: 超过该字节数的消息会被压缩，0表示不压缩
+            blob_store: 大结果内容的Blob存储
+            blob_threshold: 结果内容超过该字符数时转存到Blob存储
+            routes: 出队时除共享队列外还要拉取的路由（通常为工作节点的节点类型）
+            max_connections: 连接池大小，阻塞出队会占用连接，应不小于并发任务槽数
+        """
+        self.redis_host = redis_host
+        self.redis_port = redis_port
+        self.redis_db = redis_db
+        self.redis_password = redis_password
+        self.queue_prefix = queue_prefix
+        self.retry_policies = dict(DEFAULT_RETRY_POLICIES)
+        if retry_policies:
+            self.retry_policies.update(retry_policies)
+        self.promote_batch_size = promote_batch_size
+        self.reliable = reliable
+        self.visibility_timeout = visibility_timeout
+        self.reaper_interval = reaper_interval
+        self._last_reap = 0.0
+        self.status_maxlen = status_maxlen
+        self.codec = get_codec(codec, compress_threshold=compress_threshold)
+        self.blob_store = blob_store
+        self.blob_threshold = blob_threshold
+        self.max_connections = max_connections
+        self.routes = list(routes or [])
+
+        # 队列名称（与 TaskQueue 保持一致）
+        self.task_queues = route_queue_names(queue_prefix)
+        self.retry_queue = route_retry_queue(queue_prefix)
+        self.delayed_queue = f"{queue_prefix}:tasks:delayed"
+        self.retry_routes = f"{queue_prefix}:tasks:retry_routes"
+        self.lease_zset = f"{queue_prefix}:tasks:leases"
+        self.lease_sources = f"{queue_prefix}:tasks:lease_sources"
+        self.lease_owners = f"{queue_prefix}:tasks:lease_owners"
+        self.worker_lease_prefix = f"{queue_prefix}:tasks:leases:"
+        self.lease_deliveries = f"{queue_prefix}:tasks:lease_deliveries"
+        self.lease_limits = f"{queue_prefix}:tasks:lease_limits"
+        self.dead_letter_queue = f"{queue_prefix}:tasks:dead"
+        self.result_queue = f"{queue_prefix}:results"
+        self.status_queue = f"{queue_prefix}:status"
+
+        # 存储键名
+        self.task_hash_set = f"{queue_prefix}:hashes"
+        self.task_storage = f"{queue_prefix}:storage"
+        self.task_status_key = f"{queue_prefix}:task_status"
+        self.worker_registry = f"{queue_prefix}:workers"
+        self.stats_key = f"{queue_prefix}:stats"
+
+        self.redis_client = None
+        self.payload_client = None
+
+        # 工作节点的状态上报器，设置后状态增量随队列流水线一起发送
+        self.status_reporter = None
+
+    def worker_status_key(self, worker_id: str) -> str:
+        """工作节点状态哈希键"""
+        return f"{self.queue_prefix}:worker:{worker_id}"
+
+    @property
+    def _dequeue_order(self) -> List[str]:
+        """按优先级排序的出队队列（本节点路由的队列优先于同优先级的共享队列）"""
+        return dequeue_order(self.queue_prefix, self.routes)
+
+    def _route_queue(self, task: TaskMessage) -> str:
+        """任务所属路由的优先级队列"""
+        queues = route_queue_names(self.queue_prefix, task.route)
+        return queues.get(task.priority, queues[Priority.NORMAL.value])
+
+    async def initialize(self):
+        """建立连接池并注册Lua脚本"""
+        pool_kwargs = dict(
+            host=self.redis_host,
+            port=self.redis_port,
+            db=self.redis_db,
+            password=self.redis_password,
+            max_connections=self.max_connections,
+            socket_connect_timeout=5
+        )
+        try:
+            # 连接耗尽时等待空闲连接而不是报错
+            self.redis_client = redis.Redis(
+                connection_pool=redis.BlockingConnectionPool(decode_responses=True, **pool_kwargs)
+            )
+            # 消息负载可能是二进制编码，读写负载使用不解码响应的客户端
+            self.payload_client = redis.Redis(
+                connection_pool=redis.BlockingConnectionPool(decode_responses=False, **pool_kwargs)
+            )
+            await self.redis_client.ping()
+            self._promote_script = self.redis_client.register_script(PROMOTE_DELAYED_SCRIPT)
+            self._pop_batch_script = self.redis_client.register_script(POP_TASKS_SCRIPT)
+            self._lease_batch_script = self.redis_client.register_script(LEASE_TASKS_SCRIPT)
+            self._record_lease_script = self.redis_client.register_script(RECORD_LEASE_SCRIPT)
+            self._ack_script = self.redis_client.register_script(ACK_LEASE_SCRIPT)
+            self._extend_script = self.redis_client.register_script(EXTEND_LEASES_SCRIPT)
+            self._reap_script = self.redis_client.register_script(REAP_LEASES_SCRIPT)
+            print(f"✅ 成功连接到Redis: {self.redis_host}:{self.redis_port}")
+        except (ConnectionError, TimeoutError) as e:
+            print(f"❌ Redis连接失败: {e}")
+            raise
+
+    def _encode(self, message) -> Union[str, bytes]:
+        """按队列配置的编码序列化消息"""
+        return self.codec.encode(message.to_dict())
+
+    @staticmethod
+    def _decode(message_class, payload: Union[str, bytes]):
+        """反序列化任意编码的消息"""
+        return message_class.from_dict(decode_payload(payload))
+
+    @staticmethod
+    def _task_status(status: str, worker_id: str = None) -> str:
+        """任务状态记录"""
+        status_info = {
+            "status": status,
+            "updated_at": datetime.now().isoformat()
+        }
+        if worker_id:
+            status_info["worker_id"] = worker_id
+        return json.dumps(status_info)
+
+    async def add_task(self, task: TaskMessage, check_duplicate: bool = True) -> bool:
+        """
+        添加任务到队列
+
+        Args:
+            task: 任务消息
+            check_duplicate: 是否检查重复任务
+
+        Returns:
+            bool: 是否成功添加
+        """
+        started = time.perf_counter()
+        try:
+            if check_duplicate:
+                task_hash = task.get_hash()
+                # SADD 返回0表示已存在，检查和登记一次往返完成
+                added = await self.redis_client.sadd(self.task_hash_set, task_hash)
+                if not added:
+                    print(f"⚠️ 任务已存在，跳过: {task.url}")
+                    return False
+                await self.redis_client.expire(self.task_hash_set, 86400)
+
+            if not task.task_id:
+                task.task_id = str(uuid.uuid4())
+
+            pipe = self.payload_client.pipeline(transaction=False)
+            pipe.hset(self.task_storage, task.task_id, self._encode(task))
+            self._push_task_id(pipe, task)
+            pipe.hincrby(self.stats_key, "tasks_added", 1)
+            await pipe.execute()
+            ENQUEUE_SECONDS.observe(time.perf_counter() - started)
+
+            print(f"✅ 任务已添加到队列: {task.task_id} -> {task.url}")
+            return True
+
+        except Exception as e:
+            print(f"❌ 添加任务失败: {e}")
+            return False
+
+    def _push_task_id(self, pipe, task: TaskMessage):
+        """在流水线中将任务ID推入路由的对应优先级队列"""
+        pipe.lpush(self._route_queue(task), task.task_id)
+
+    def _publish_result(self, pipe, result: ResultMessage):
+        """在流水线中发布结果消息"""
+        pipe.lpush(self.result_queue, self._encode(result))
+
+    def _publish_status(self, pipe, status_msg: StatusMessage):
+        """在流水线中发布状态消息（保留最近 status_maxlen 条）"""
+        pipe.lpush(self.status_queue, self._encode(status_msg))
+        pipe.ltrim(self.status_queue, 0, self.status_maxlen - 1)
+
+    def _retry_target(self, route: str) -> str:
+        """路由任务延迟重试到期后进入的重试队列"""
+        return route_retry_queue(self.queue_prefix, route)
+
+    async def get_task(self, worker_id: str, timeout: float = 10) -> Optional[TaskMessage]:
+        """
+        从队列获取任务（按优先级顺序）
+
+        Args:
+            worker_id: 工作节点ID
+            timeout: 阻塞超时时间（秒）
+
+        Returns:
+            TaskMessage: 任务消息，如果没有任务则返回None
+        """
+        tasks = await self.get_tasks(worker_id, 1, timeout)
+        return tasks[0] if tasks else None
+
+    async def get_tasks(self, worker_id: str, count: int, timeout: float = 10) -> List[TaskMessage]:
+        """
+        批量获取任务：一次脚本调用弹出最多 count 个任务ID，再用一次 HMGET 读取任务内容
+
+        队列为空时阻塞等待第一个任务，有任务时立即返回已弹出的全部任务。
+
+        Args:
+            worker_id: 工作节点ID
+            count: 最多获取的任务数
+            timeout: 阻塞超时时间（秒）
+
+        Returns:
+            List[TaskMessage]: 任务列表，按优先级排序，超时返回空列表
+        """
+        try:
+            popped = await self._pop_task_ids(worker_id, max(1, count), timeout)
+            if not popped:
+                return []
+
+            started = time.perf_counter()
+            task_ids = [task_id for _, task_id in popped]
+            payloads = await self.payload_client.hmget(self.task_storage, task_ids)
+
+            tasks = []
+            for task_id, task_payload in zip(task_ids, payloads):
+                if not task_payload:
+                    print(f"⚠️ 任务数据不存在: {task_id}")
+                    if self.reliable:
+                        await self.ack_task(task_id, worker_id, finished=True)
+                    continue
+                task = self._decode(TaskMessage, task_payload)
+                task.worker_id = worker_id
+                tasks.append(task)
+
+            if tasks:
+                running = self._task_status(TaskStatus.RUNNING.value, worker_id)
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.hset(self.task_status_key, mapping={task.task_id: running for task in tasks})
+                if self.reliable:
+                    # 登记任务的重新投递上限，供回收过期租约时判断
+                    pipe.hset(self.lease_limits, mapping={task.task_id: task.max_retries for task in tasks})
+                pipe.hincrby(self.stats_key, "tasks_consumed", len(tasks))
+                await self._execute_with_status(pipe)
+
+            now = time.time()
+            DEQUEUE_SECONDS.observe(time.perf_counter() - started)
+            for task in tasks:
+                observe_queue_wait(task.created_at, now)
+                print(f"📤 任务已分配给工作节点: {task.task_id} -> {worker_id}")
+            return tasks
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ 获取任务失败: {e}")
+            return []
+
+    async def _pop_task_ids(self, worker_id: str, count: int, timeout: float) -> List[tuple]:
+        """
+        按优先级弹出最多 count 个任务ID
+
+        Returns:
+            List[tuple]: [(来源队列名, 任务ID), ...]，超时返回空列表
+        """
+        queue_names = self._dequeue_order
+
+        if self.reliable and time.time() - self._last_reap >= self.reaper_interval:
+            await self.reap_expired_leases()
+
+        deadline = time.time() + timeout
+
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return []
+
+            next_due = await self.promote_due_tasks()
+            if next_due is not None:
+                remaining = min(remaining, max(0.1, next_due - time.time()))
+
+            popped = await self._pop_batch(worker_id, queue_names, count)
+            if popped:
+                return popped
+
+            # 阻塞等待第一个任务（可靠模式下取到后立即登记租约），随后顺带取走已到达的其余任务
+            first = await self.redis_client.brpop(queue_names, timeout=remaining)
+            if first:
+                if self.reliable:
+                    await self._record_lease_script(
+                        keys=self._lease_keys(worker_id),
+                        args=[time.time() + self.visibility_timeout, worker_id, *first]
+                    )
+                rest = await self._pop_batch(worker_id, queue_names, count - 1) if count > 1 else []
+                return [tuple(first)] + rest
+
+    async def _pop_batch(self, worker_id: str, queue_names: List[str], count: int) -> List[tuple]:
+        """非阻塞地按优先级弹出最多 count 个任务ID（可靠模式下同时登记租约）"""
+        if self.reliable:
+            flat = await self._lease_batch_script(
+                keys=self._lease_keys(worker_id) + queue_names,
+                args=[time.time() + self.visibility_timeout, worker_id, count]
+            )
+        else:
+            flat = await self._pop_batch_script(keys=queue_names, args=[count])
+        return list(zip(flat[::2], flat[1::2]))
+
+    async def requeue_tasks(self, tasks: List[TaskMessage]):
+        """
+        将已取出但未执行的任务放回队列出队端（关闭时归还预取的任务）
+
+        可靠模式下只归还租约仍属于 task.worker_id 的任务，租约已过期的任务
+        已由回收器放回队列。
+
+        Args:
+            tasks: 任务列表，按希望的出队顺序排列
+        """
+        if not tasks:
+            return
+        try:
+            if self.reliable:
+                tasks = [task for task in tasks if await self.ack_task(task.task_id, task.worker_id)]
+                if not tasks:
+                    return
+
+            pending = self._task_status(TaskStatus.PENDING.value)
+            pipe = self.redis_client.pipeline(transaction=False)
+            # RPUSH 到出队端，逆序推入以保持原有顺序
+            for task in reversed(tasks):
+                pipe.rpush(self._route_queue(task), task.task_id)
+                pipe.hset(self.task_status_key, task.task_id, pending)
+            await pipe.execute()
+
+            print(f"↩️ 已归还 {len(tasks)} 个未执行的任务")
+
+        except Exception as e:
+            print(f"❌ 归还任务失败: {e}")
+
+    async def complete_task(self, task_id: str, result: ResultMessage):
+        """
+        标记任务完成（租约已不属于 result.worker_id 时丢弃该结果）
+
+        Args:
+            task_id: 任务ID
+            result: 结果消息
+        """
+        try:
+            if self.reliable and not await self.ack_task(task_id, result.worker_id, finished=True):
+                return
+
+            await self._offload_result_content(result)
+
+            stats_field = "tasks_completed" if result.status == TaskStatus.SUCCESS.value else "tasks_failed"
+            pipe = self.payload_client.pipeline(transaction=False)
+            pipe.hset(self.task_status_key, task_id, self._task_status(result.status))
+            self._publish_result(pipe, result)
+            pipe.hincrby(self.stats_key, stats_field, 1)
+            await self._execute_with_status(pipe)
+
+            print(f"✅ 任务完成: {task_id} -> {result.status}")
+
+        except Exception as e:
+            print(f"❌ 标记任务完成失败: {e}")
+
+    async def retry_task(self, task_id: str, delay_seconds: float = None, error_class: str = "default",
+                         worker_id: str = None):
+        """
+        重试任务（进入延迟队列，到期后迁移到重试队列）
+
+        Args:
+            task_id: 任务ID
+            delay_seconds: 延迟重试时间（秒），为空时按错误类别的退避策略计算
+            error_class: 错误类别，见 classify_error
+            worker_id: 执行任务的工作节点ID（可靠模式下必须是租约持有者，否则不做任何修改）
+        """
+        try:
+            if self.reliable and not await self.ack_task(task_id, worker_id):
+                return
+
+            task_payload = await self.payload_client.hget(self.task_storage, task_id)
+            if not task_payload:
+                print(f"⚠️ 任务数据不存在: {task_id}")
+                return
+
+            task = self._decode(TaskMessage, task_payload)
+
+            if task.retry_count >= task.max_retries or error_class in NON_RETRYABLE_ERRORS:
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.lpush(self.dead_letter_queue, task_id)
+                if self.reliable:
+                    pipe.hdel(self.lease_deliveries, task_id)
+                    pipe.hdel(self.lease_limits, task_id)
+                pipe.hset(self.task_status_key, task_id, self._task_status(TaskStatus.FAILED.value))
+                pipe.hincrby(self.stats_key, "tasks_dead", 1)
+                await self._execute_with_status(pipe)
+                reason = "错误不可重试" if error_class in NON_RETRYABLE_ERRORS else "超过最大重试次数"
+                print(f"💀 任务{reason}，移入死信队列: {task_id}")
+                return
+
+            if delay_seconds is None:
+                policy = self.retry_policies.get(error_class, self.retry_policies["default"])
+                delay_seconds = policy.compute_delay(task.retry_count)
+
+            task.retry_count += 1
+            due_at = time.time() + delay_seconds
+            task.scheduled_at = datetime.fromtimestamp(due_at).isoformat()
+
+            pipe = self.payload_client.pipeline(transaction=False)
+            pipe.hset(self.task_storage, task_id, self._encode(task))
+            pipe.zadd(self.delayed_queue, {task_id: due_at})
+            if task.route:
+                # 到期后回到原路由的重试队列
+                pipe.hset(self.retry_routes, task_id, self._retry_target(task.route))
+            pipe.hset(self.task_status_key, task_id, self._task_status(TaskStatus.RETRY.value))
+            pipe.hincrby(self.stats_key, "tasks_retried", 1)
+            await self._execute_with_status(pipe)
+
+            print(f"🔄 任务已加入延迟重试队列: {task_id} (第{task.retry_count}次重试, {delay_seconds:.1f}秒后)")
+
+        except Exception as e:
+            print(f"❌ 重试任务失败: {e}")
+
+    async def promote_due_tasks(self) -> Optional[float]:
+        """
+        将到期的延迟任务迁移到重试队列
+
+        Returns:
+            float: 下一个延迟任务的到期时间戳，没有延迟任务时返回None
+        """
+        moved, next_due = await self._promote_script(
+            keys=[self.delayed_queue, self.retry_queue, self.retry_routes],
+            args=[time.time(), self.promote_batch_size]
+        )
+        if int(moved):
+            await self._update_stats("tasks_promoted", int(moved))
+        next_due = float(next_due)
+        return next_due if next_due >= 0 else None
+
+    def _lease_keys(self, worker_id: str = None) -> List[str]:
+        """租约相关键名（顺序与Lua脚本约定一致）"""
+        keys = [self.lease_zset, self.lease_sources, self.lease_owners]
+        if worker_id is not None:
+            keys.append(f"{self.worker_lease_prefix}{worker_id}")
+        return keys
+
+    async def ack_task(self, task_id: str, worker_id: str, finished: bool = False) -> bool:
+        """
+        确认任务，释放其租约（租约已不属于该工作节点时不做修改并返回False）
+
+        任务已结束（finished）时同时清除其投递计数。
+        """
+        keys = self._lease_keys(worker_id)
+        if finished:
+            keys += [self.lease_deliveries, self.lease_limits]
+        acked = bool(await self._ack_script(keys=keys, args=[task_id, worker_id]))
+        if not acked:
+            await self._update_stats("stale_acks", 1)
+            print(f"⚠️ 租约已不属于工作节点 {worker_id}，忽略确认: {task_id}")
+        return acked
+
+    async def extend_leases(self, worker_id: str, visibility_timeout: float = None) -> int:
+        """延长工作节点持有的所有租约（随心跳调用）"""
+        timeout = visibility_timeout or self.visibility_timeout
+        return int(await self._extend_script(
+            keys=[self.lease_zset, self.lease_owners, f"{self.worker_lease_prefix}{worker_id}"],
+            args=[time.time() + timeout, worker_id]
+        ))
+
+    async def reap_expired_leases(self, limit: int = 100) -> List[str]:
+        """回收过期租约，将任务重新放回原队列（超过最大重新投递次数的移入死信队列）"""
+        self._last_reap = time.time()
+        try:
+            requeued, dead = await self._reap_script(
+                keys=self._lease_keys() + [self.lease_deliveries, self.lease_limits, self.dead_letter_queue],
+                args=[time.time(), limit, self.retry_queue, self.worker_lease_prefix, TaskMessage.max_retries]
+            )
+        except Exception as e:
+            print(f"❌ 回收过期租约失败: {e}")
+            return []
+
+        if requeued:
+            await self._update_stats("tasks_redelivered", len(requeued))
+            print(f"♻️ 已重新投递 {len(requeued)} 个租约过期的任务")
+        if dead:
+            failed = self._task_status(TaskStatus.FAILED.value)
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hset(self.task_status_key, mapping={task_id: failed for task_id in dead})
+            pipe.hincrby(self.stats_key, "tasks_dead", len(dead))
+            await pipe.execute()
+            print(f"💀 {len(dead)} 个任务超过最大重新投递次数，移入死信队列")
+        return list(requeued)
+
+    async def register_worker(self, worker_id: str, node_type: str = "general"):
+        """注册工作节点"""
+        try:
+            worker_info = {
+                "worker_id": worker_id,
+                "node_type": node_type,
+                "registered_at": datetime.now().isoformat(),
+                "status": "online"
+            }
+            await self.redis_client.hset(self.worker_registry, worker_id, json.dumps(worker_info))
+            print(f"📝 工作节点已注册: {worker_id} ({node_type})")
+        except Exception as e:
+            print(f"❌ 注册工作节点失败: {e}")
+
+    async def update_worker_status(self, status_msg: StatusMessage):
+        """
+        发布工作节点状态并写入节点状态哈希，可靠模式下同时延长租约
+
+        挂有状态上报器时由上报器写入节点哈希（计数器为增量），否则直接写入消息中的仪表字段。
+        """
+        status_batch = None
+        try:
+            pipe = self.payload_client.pipeline(transaction=False)
+            self._publish_status(pipe, status_msg)
+            if self.status_reporter is not None:
+                status_batch = self.status_reporter.drain(pipe)
+            else:
+                pipe.hset(self.worker_status_key(status_msg.worker_id), mapping={
+                    "status": status_msg.status,
+                    "active_tasks": status_msg.active_tasks,
+                    "cpu_usage": status_msg.cpu_usage,
+                    "memory_usage": status_msg.memory_usage,
+                    "last_heartbeat": status_msg.last_heartbeat
+                })
+            await pipe.execute()
+
+            if self.reliable:
+                await self.extend_leases(status_msg.worker_id)
+
+        except Exception as e:
+            if self.status_reporter is not None:
+                self.status_reporter.restore(status_batch)
+            print(f"❌ 更新工作节点状态失败: {e}")
+
+    async def _execute_with_status(self, pipe) -> List[Any]:
+        """执行流水线，到期的节点状态增量顺带一起发送（不额外往返）"""
+        status_batch = None
+        if self.status_reporter is not None and self.status_reporter.due():
+            status_batch = self.status_reporter.drain(pipe)
+        try:
+            return await pipe.execute()
+        except Exception:
+            if status_batch is not None:
+                self.status_reporter.restore(status_batch)
+            raise
+
+    async def _offload_result_content(self, result: ResultMessage):
+        """大内容转存到Blob存储（文件/网络I/O放到线程中执行）"""
+        if self.blob_store is None:
+            return
+        try:
+            if await asyncio.to_thread(result.offload_content, self.blob_store, self.blob_threshold):
+                await self._update_stats("results_offloaded", 1)
+        except Exception as e:
+            print(f"⚠️ 结果内容转存失败，随消息发送: {e}")
+
+    async def get_queue_stats(self) -> Dict[str, Any]:
+        """
+        获取队列统计信息（一次流水线往返）
+
+        Returns:
+            Dict: 统计信息，字段与 TaskQueue.get_queue_stats 一致
+        """
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for queue_name in self.task_queues.values():
+                pipe.llen(queue_name)
+            pipe.llen(self.retry_queue)
+            pipe.zcard(self.delayed_queue)
+            pipe.zcard(self.lease_zset)
+            pipe.llen(self.dead_letter_queue)
+            pipe.llen(self.result_queue)
+            pipe.hlen(self.worker_registry)
+            pipe.hgetall(self.stats_key)
+            values = await pipe.execute()
+
+            stats = {}
+            for priority, length in zip(self.task_queues, values):
+                stats[f"queue_{priority}_length"] = length
+            (stats["retry_queue_length"], stats["delayed_queue_length"], stats["leased_tasks"],
+             stats["dead_letter_queue_length"], stats["result_queue_length"],
+             stats["active_workers"], task_stats) = values[len(self.task_queues):]
+            stats.update({k: int(v) for k, v in task_stats.items()})
+            return stats
+
+        except Exception as e:
+            print(f"❌ 获取统计信息失败: {e}")
+            return {}
+
+    async def _update_stats(self, key: str, increment: int = 1):
+        """更新统计信息"""
+        await self.redis_client.hincrby(self.stats_key, key, increment)
+
+    async def close(self):
+        """关闭连接池"""
+        for client in (self.payload_client, self.redis_client):
+            if client is not None:
+                await client.aclose()
+                await client.connection_pool.disconnect()
+        print("🔌 Redis连接已关闭")
+
+
+def create_async_task_queue(config=None, **overrides) -> AsyncTaskQueue:
+    """
+    根据分布式配置创建异步任务队列（按 queue.backend 选择列表或Stream后端）
+
+    Args:
+        config: DistributedConfig，为空时加载当前环境配置
+        overrides: 覆盖传给队列构造函数的参数
+
+    Returns:
+        AsyncTaskQueue: 异步任务队列实例（需 await initialize()）
+    """
+    if config is None:
+        from .config import get_config
+        config = get_config()
+
+    queue_config = config.queue
+    kwargs = dict(
+        redis_host=config.redis.host,
+        redis_port=config.redis.port,
+        redis_db=config.redis.db,
+        redis_password=config.redis.password,
+        queue_prefix=queue_config.prefix,
+        reliable=queue_config.reliable,
+        visibility_timeout=queue_config.visibility_timeout,
+        status_maxlen=queue_config.status_maxlen,
+        codec=queue_config.codec,
+        compress_threshold=queue_config.compress_threshold,
+        blob_store=create_blob_store(queue_config.blob_store),
+        blob_threshold=queue_config.blob_threshold,
+        max_connections=config.redis.max_connections
+    )
+
+    if queue_config.backend == "stream":
+        from .stream_queue import AsyncStreamTaskQueue
+        kwargs.update(
+            result_maxlen=queue_config.result_maxlen,
+            claim_idle_ms=queue_config.claim_idle_ms
+        )
+        kwargs.update(overrides)
+        return AsyncStreamTaskQueue(**kwargs)
+
+    if queue_config.backend != "list":
+        raise ValueError(f"不支持的队列后端: {queue_config.backend}")
+
+    kwargs.update(overrides)
+    return AsyncTaskQueue(**kwargs)
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分布式系统性能基准
+Distributed System Benchmarks
+
+用法:
+    python -m distributed.benchmarks codec [--pages a.html b.html] [--redis-host localhost]
+    python -m distributed.benchmarks worker-slots [--slots 1 4 16] [--tasks 200] [--latency 0.05]
+    python -m distributed.benchmarks scheduler [--workers 1000] [--tasks 100000]
+    python -m distributed.benchmarks access-controller [--domains 1000000] [--max-domains 100000]
+    python -m distributed.benchmarks metrics [--rate 10000] [--duration 5] [--series 10]
+    python -m distributed.benchmarks sampler [--sockets 5000] [--repeat 20]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import random
+import socket
+import statistics
+import threading
+import time
+import tracemalloc
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Callable
+from urllib.parse import urlparse
+
+# 仓库根目录下保存的真实搜索结果页，作为默认的测试页面
+DEFAULT_PAGES = ["baidu_response.html", "bing_response.html", "google_response.html"]
+
+
+def _timeit(func: Callable, repeat: int) -> float:
+    """返回单次调用的中位耗时（秒）"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def _load_pages(paths: List[str]) -> Dict[str, str]:
+    """读取测试页面"""
+    root = Path(__file__).resolve().parent.parent
+    pages = {}
+    for path in paths:
+        file_path = Path(path)
+        if not file_path.is_absolute() and not file_path.exists():
+            file_path = root / path
+        if file_path.exists():
+            pages[file_path.name] = file_path.read_text(encoding="utf-8", errors="ignore")
+    return pages
+
+
+def bench_codec(args):
+    """消息编解码基准：编码/解码耗时、负载大小和Redis内存占用"""
+    from .codec import get_codec, decode_payload, CODECS
+    from .task_queue import ResultMessage
+
+    pages = _load_pages(args.pages)
+    if not pages:
+        print("❌ 没有可用的测试页面")
+        return
+
+    codecs = []
+    for name in CODECS:
+        try:
+            codecs.append(get_codec(name, compress_threshold=args.compress_threshold))
+        except ImportError as e:
+            print(f"⚠️ 跳过 {name}: {e}")
+
+    redis_client = None
+    if args.redis_host:
+        import redis
+        redis_client = redis.Redis(host=args.redis_host, port=args.redis_port, db=args.redis_db)
+
+    print(f"{'page':<24}{'codec':<10}{'size(B)':>10}{'ratio':>8}{'encode(ms)':>12}{'decode(ms)':>12}{'redis(B)':>10}")
+    for page_name, html in pages.items():
+        message = ResultMessage(
+            task_id=str(uuid.uuid4()),
+            worker_id="bench-worker",
+            status="success",
+            status_code=200,
+            content=html,
+            headers={"content-type": "text/html; charset=utf-8"},
+            response_time=0.42
+        ).to_dict()
+        raw_size = len(html.encode("utf-8"))
+
+        for codec in codecs:
+            payload = codec.encode(message)
+            size = len(payload.encode("utf-8") if isinstance(payload, str) else payload)
+            encode_ms = _timeit(lambda: codec.encode(message), args.repeat) * 1000
+            decode_ms = _timeit(lambda: decode_payload(payload), args.repeat) * 1000
+
+            memory = "-"
+            if redis_client is not None:
+                key = f"bench:codec:{codec.name}:{page_name}"
+                redis_client.set(key, payload)
+                memory = redis_client.memory_usage(key)
+                redis_client.delete(key)
+
+            print(f"{page_name:<24}{codec.name:<10}{size:>10}{size / raw_size:>8.2f}"
+                  f"{encode_ms:>12.3f}{decode_ms:>12.3f}{memory:>10}")
+
+
+def _start_stub_server(latency: float) -> ThreadingHTTPServer:
+    """启动本地桩HTTP服务，每个请求固定延迟后返回一个小页面"""
+    body = b"<html><body>" + b"x" * 2048 + b"</body></html>"
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def _run_worker_slots(slots: int, urls: List[str], args) -> float:
+    """用指定槽位数运行一个工作节点直到处理完所有任务，返回耗时（秒）"""
+    from .task_queue import TaskQueue, TaskMessage
+    from .worker_node import WorkerNode, WorkerConfig, BaseCrawler
+
+    class StubHttpCrawler(BaseCrawler):
+        async def crawl(self, task):
+            parsed = urlparse(task["url"])
+            reader, writer = await asyncio.open_connection(parsed.hostname, parsed.port)
+            writer.write(f"GET {parsed.path} HTTP/1.0\r\nHost: {parsed.netloc}\r\n\r\n".encode())
+            response = await reader.read()
+            writer.close()
+            status_line, _, content = response.partition(b"\r\n")
+            return {"url": task["url"], "status_code": int(status_line.split()[1]),
+                    "content": content.decode("utf-8", errors="ignore")}
+
+    queue = TaskQueue(redis_host=args.redis_host, redis_port=args.redis_port, redis_db=args.redis_db)
+    queue.clear_queues()
+    for url in urls:
+        queue.add_task(TaskMessage(task_id=str(uuid.uuid4()), url=url), check_duplicate=False)
+
+    worker = WorkerNode(WorkerConfig(
+        node_id=f"bench-worker-{slots}",
+        max_concurrent_tasks=slots,
+        redis_host=args.redis_host,
+        redis_port=args.redis_port,
+        redis_db=args.redis_db,
+        shared_rate_limit=False
+    ))
+    # 所有任务都指向同一个桩服务，去掉域名访问间隔，只测量槽位并发
+    worker.access_controller.config.min_delay = worker.access_controller.config.max_delay = 0.0
+    worker.crawlers["default"] = StubHttpCrawler
+    await worker.initialize()
+    worker.running = True
+
+    start = time.perf_counter()
+    loop_task = asyncio.create_task(worker.task_worker_loop())
+    while queue.redis_client.llen(queue.result_queue) < len(urls):
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+
+    worker.running = False
+    loop_task.cancel()
+    await asyncio.gather(loop_task, return_exceptions=True)
+    await worker.cleanup()
+    queue.clear_queues()
+    queue.close()
+    return elapsed
+
+
+def bench_worker_slots(args):
+    """工作节点并发槽位基准：吞吐量随槽位数的变化"""
+    server = _start_stub_server(args.latency)
+    host, port = server.server_address
+    urls = [f"http://{host}:{port}/page/{i}" for i in range(args.tasks)]
+    logging.getLogger().setLevel(logging.WARNING)
+
+    print(f"stub latency {args.latency * 1000:.0f}ms, {args.tasks} tasks")
+    print(f"{'slots':>6}{'seconds':>10}{'tasks/s':>10}{'speedup':>10}")
+    baseline = None
+    try:
+        for slots in args.slots:
+            # 队列和工作节点的逐任务日志会淹没结果，运行期间屏蔽
+            with contextlib.redirect_stdout(io.StringIO()):
+                elapsed = asyncio.run(_run_worker_slots(slots, urls, args))
+            rate = args.tasks / elapsed
+            baseline = baseline or rate
+            print(f"{slots:>6}{elapsed:>10.2f}{rate:>10.1f}{rate / baseline:>10.1f}x")
+    finally:
+        server.shutdown()
+
+
+def _build_scheduler(workers: int, node_types: List[str]):
+    """创建带有随机负载节点的调度器（不连接Redis）"""
+    from .task_queue import StatusMessage
+    from .task_scheduler import TaskScheduler
+
+    scheduler = TaskScheduler(task_queue=None)
+    rng = random.Random(42)
+    for i in range(workers):
+        scheduler.update_worker_status(StatusMessage(
+            worker_id=f"bench-worker-{i}",
+            node_type=node_types[i % len(node_types)],
+            status="ready",
+            cpu_usage=rng.uniform(5, 95),
+            memory_usage=rng.uniform(5, 95),
+            active_tasks=rng.randint(0, 20),
+            completed_tasks=0,
+            failed_tasks=rng.randint(0, 20),
+            last_heartbeat=""
+        ))
+    return scheduler
+
+
+def _linear_select(scheduler, task) -> str:
+    """逐个扫描健康节点的选择方式，作为索引选择的对照"""
+    plan = scheduler._selection_plan(task)
+    candidates = scheduler.get_healthy_workers(plan.node_type)
+    best = min(candidates, key=lambda worker: (-plan.worker_filter.grade(worker), worker.load_score))
+    best.active_tasks += 1
+    return best.worker_id
+
+
+def bench_scheduler(args):
+    """调度器节点选择基准：索引选择与线性扫描的单任务耗时"""
+    from .task_queue import TaskMessage, Priority
+
+    node_types = ["general", "browser", "gpu"]
+    rng = random.Random(7)
+    tasks = [
+        TaskMessage(
+            task_id=str(i),
+            url=f"https://example.com/{i}",
+            priority=rng.choice([p.value for p in Priority]),
+            node_type=rng.choice([None, None, "browser"])
+        )
+        for i in range(args.tasks)
+    ]
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("TaskScheduler").setLevel(logging.ERROR)
+
+    print(f"{args.workers} workers, {args.tasks} tasks")
+    print(f"{'method':<10}{'tasks':>10}{'seconds':>10}{'us/task':>10}")
+    for method, count in (("index", args.tasks), ("linear", min(args.tasks, args.linear_tasks))):
+        scheduler = _build_scheduler(args.workers, node_types)
+        select = scheduler.select_worker if method == "index" else (
+            lambda task: _linear_select(scheduler, task))
+        start = time.perf_counter()
+        for task in tasks[:count]:
+            select(task)
+        elapsed = time.perf_counter() - start
+        print(f"{method:<10}{count:>10}{elapsed:>10.2f}{elapsed / count * 1e6:>10.1f}")
+
+
+async def _visit_domains(controller, domains: int, checkpoints: int):
+    """依次访问 domains 个不同域名（预约 + 记录），按检查点输出内存占用"""
+    step = max(1, domains // checkpoints)
+    start = time.perf_counter()
+    for i in range(domains):
+        url = f"https://site-{i}.example.com/page"
+        await controller.reserve(url)
+        controller.record_access(url, 0.1)
+        if (i + 1) % step == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            elapsed = time.perf_counter() - start
+            print(f"{i + 1:>12}{len(controller.domain_stats):>12}{current / 1024 / 1024:>14.1f}"
+                  f"{elapsed / (i + 1) * 1e6:>10.1f}")
+
+
+def bench_access_controller(args):
+    """访问控制器内存基准：大范围爬取（每个域名只访问一次）时域名状态的内存占用"""
+    from .access_controller import AccessController, AccessConfig
+
+    for label, max_domains in (("bounded", args.max_domains), ("unbounded", args.domains)):
+        print(f"{label}: max_tracked_domains={max_domains}")
+        print(f"{'domains':>12}{'tracked':>12}{'memory(MB)':>14}{'us/op':>10}")
+        controller = AccessController(AccessConfig(max_tracked_domains=max_domains))
+        tracemalloc.start()
+        try:
+            asyncio.run(_visit_domains(controller, args.domains, args.checkpoints))
+        finally:
+            tracemalloc.stop()
+        del controller
+
+
+class _ListMetricsCollector:
+    """逐点过滤列表的指标记录方式（环形缓冲区之前的实现），作为对照"""
+
+    def __init__(self, window: float = 3600):
+        self.window = window
+        self.points: Dict[str, list] = {}
+
+    def record_metric(self, name: str, value: float, labels: Dict[str, str] = None):
+        now = time.time()
+        points = self.points.setdefault(name, [])
+        points.append((now, value, labels or {}))
+        cutoff = now - self.window
+        self.points[name] = [point for point in points if point[0] > cutoff]
+
+
+def bench_metrics(args):
+    """指标收集器基准：记录吞吐、按速率写入时的CPU占用和窗口聚合耗时"""
+    from .monitoring import MetricsCollector, numpy
+
+    labels = [{"domain": f"site-{i}.example.com", "status": "success"} for i in range(args.series)]
+    values = [random.Random(1).lognormvariate(-1, 1) for _ in range(4096)]
+
+    print(f"vectorized aggregates: {'numpy' if numpy is not None else 'pure python'}")
+    print(f"{'collector':<12}{'points':>10}{'seconds':>10}{'us/point':>10}")
+    for label, collector, count in (
+        ("ring", MetricsCollector(capacity=args.capacity), args.points),
+        ("list", _ListMetricsCollector(), min(args.points, args.list_points)),
+    ):
+        start = time.perf_counter()
+        for i in range(count):
+            collector.record_metric("task_duration", values[i % 4096], labels=labels[i % args.series])
+        elapsed = time.perf_counter() - start
+        print(f"{label:<12}{count:>10}{elapsed:>10.2f}{elapsed / count * 1e6:>10.2f}")
+
+    # 按固定速率写入，测量记录线程的CPU占用
+    collector = MetricsCollector(capacity=args.capacity)
+    batch = max(1, args.rate // 100)
+    total = int(args.rate * args.duration)
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for i in range(total):
+        collector.record_metric("task_duration", values[i % 4096], labels=labels[i % args.series])
+        if (i + 1) % batch == 0:
+            delay = wall_start + (i + 1) / args.rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    print(f"\npaced: {total} points in {wall:.2f}s ({total / wall:.0f}/s), "
+          f"cpu {cpu / wall * 100:.1f}% of one core")
+
+    collector.aggregate("task_duration", 5)  # 预热
+    print(f"{'aggregate':<28}{'points':>10}{'ms':>10}")
+    for label, kwargs in (
+        ("all series, 5 min", {}),
+        ("one label set, 5 min", {"labels": labels[0]}),
+        ("by series, 5 min", {"by_series": True}),
+    ):
+        start = time.perf_counter()
+        result = collector.aggregate("task_duration", 5, **kwargs)
+        elapsed = time.perf_counter() - start
+        points = sum(item["count"] for item in result) if isinstance(result, list) else result["count"]
+        print(f"{label:<28}{points:>10}{elapsed * 1000:>10.2f}")
+
+
+def bench_sampler(args):
+    """资源采样基准：打开大量套接字模拟高连接数节点，对比整机连接扫描和共享采样器的耗时"""
+    import psutil
+
+    from .resource_sampler import ResourceSampler
+
+    # 本机回环TCP连接，每个连接两端各占一个套接字
+    listener = socket.create_server(("127.0.0.1", 0), backlog=1024)
+    sockets = [listener]
+    try:
+        for _ in range(args.sockets // 2):
+            client = socket.create_connection(listener.getsockname())
+            sockets.append(client)
+            sockets.append(listener.accept()[0])
+    except OSError as e:
+        print(f"只打开了 {len(sockets)} 个套接字: {e}")
+
+    process = psutil.Process()
+    sampler = ResourceSampler(min_interval=args.interval, connections_interval=0)
+    cases = [
+        ("psutil.net_connections()", lambda: psutil.net_connections()),
+        ("process connections", lambda: getattr(process, "net_connections", process.connections)()),
+        ("sampler (uncached)", sampler._take),
+        ("sampler.sample() (cached)", sampler.sample),
+    ]
+    print(f"open sockets: {len(sockets)}, cpu_percent(interval=1) blocks 1000ms per call")
+    print(f"{'read':<28}{'ms':>10}")
+    try:
+        sampler.sample()
+        for label, func in cases:
+            print(f"{label:<28}{_timeit(func, args.repeat) * 1000:>10.3f}")
+    finally:
+        for sock in sockets:
+            sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分布式系统性能基准")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    codec_parser = subparsers.add_parser("codec", help="消息编解码基准")
+    codec_parser.add_argument("--pages", nargs="+", default=DEFAULT_PAGES, help="测试页面HTML文件")
+    codec_parser.add_argument("--repeat", type=int, default=50, help="每项重复次数")
+    codec_parser.add_argument("--compress-threshold", type=int, default=16 * 1024, help="压缩阈值(字节)")
+    codec_parser.add_argument("--redis-host", default=None, help="指定后测量Redis内存占用")
+    codec_parser.add_argument("--redis-port", type=int, default=6379, help="Redis端口")
+    codec_parser.add_argument("--redis-db", type=int, default=15, help="Redis数据库编号")
+    codec_parser.set_defaults(func=bench_codec)
+
+    slots_parser = subparsers.add_parser("worker-slots", help="工作节点并发槽位基准")
+    slots_parser.add_argument("--slots", type=int, nargs="+", default=[1, 4, 16, 64], help="槽位数")
+    slots_parser.add_argument("--tasks", type=int, default=200, help="任务数")
+    slots_parser.add_argument("--latency", type=float, default=0.05, help="桩服务响应延迟(秒)")
+    slots_parser.add_argument("--redis-host", default="localhost", help="Redis主机")
+    slots_parser.add_argument("--redis-port", type=int, default=6379, help="Redis端口")
+    slots_parser.add_argument("--redis-db", type=int, default=15, help="Redis数据库编号")
+    slots_parser.set_defaults(func=bench_worker_slots)
+
+    scheduler_parser = subparsers.add_parser("scheduler", help="调度器节点选择基准")
+    scheduler_parser.add_argument("--workers", type=int, default=1000, help="工作节点数")
+    scheduler_parser.add_argument("--tasks", type=int, default=100000, help="任务数")
+    scheduler_parser.add_argument("--linear-tasks", type=int, default=5000, help="线性扫描对照的任务数")
+    scheduler_parser.set_defaults(func=bench_scheduler)
+
+    access_parser = subparsers.add_parser("access-controller", help="访问控制器域名状态内存基准")
+    access_parser.add_argument("--domains", type=int, default=1000000, help="访问的不同域名数")
+    access_parser.add_argument("--max-domains", type=int, default=100000, help="保留状态的域名数上限")
+    access_parser.add_argument("--checkpoints", type=int, default=5, help="输出内存占用的次数")
+    access_parser.set_defaults(func=bench_access_controller)
+
+    metrics_parser = subparsers.add_parser("metrics", help="指标收集器基准")
+    metrics_parser.add_argument("--rate", type=int, default=10000, help="按速率写入时每秒的点数")
+    metrics_parser.add_argument("--duration", type=float, default=5, help="按速率写入的秒数")
+    metrics_parser.add_argument("--series", type=int, default=10, help="标签集合数")
+    metrics_parser.add_argument("--capacity", type=int, default=8192, help="每个序列的环形缓冲区容量")
+    metrics_parser.add_argument("--points", type=int, default=200000, help="吞吐测试的点数")
+    metrics_parser.add_argument("--list-points", type=int, default=20000, help="列表实现对照的点数")
+    metrics_parser.set_defaults(func=bench_metrics)
+
+    sampler_parser = subparsers.add_parser("sampler", help="资源采样基准")
+    sampler_parser.add_argument("--sockets", type=int, default=5000, help="打开的套接字数")
+    sampler_parser.add_argument("--repeat", type=int, default=20, help="每种读取方式的重复次数")
+    sampler_parser.add_argument("--interval", type=float, default=5.0, help="采样器的最小间隔（秒）")
+    sampler_parser.set_defaults(func=bench_sampler)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
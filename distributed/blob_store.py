@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容寻址的大对象存储
+Content-Addressed Blob Store
+
+实现结果消息的 claim-check 模式：工作节点将较大的页面内容写入Blob存储，
+消息中只携带引用（sha256:<hex>），结果收集器在需要时再按引用读取。
+相同内容只存储一份，不同节点爬取到的相同页面自动去重。
+
+支持的后端:
+- 本地目录（可以是多台机器共享挂载的目录）: /data/blobs 或 file:///data/blobs
+- S3/MinIO 兼容对象存储: s3://bucket/prefix（需要 boto3，endpoint 通过
+  环境变量 BLOB_S3_ENDPOINT 指定）
+
+保留策略: 内容按最后写入时间清理（remove_older_than，由结果收集器按保留期调用）。
+再次写入已存在的内容会刷新其写入时间，仍被新结果引用的内容不会被清理。
+"""
+
+import os
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
+
+REF_PREFIX = "sha256:"
+
+
+def content_ref(data: bytes) -> str:
+    """计算内容引用"""
+    return REF_PREFIX + hashlib.sha256(data).hexdigest()
+
+
+def _digest(ref: str) -> str:
+    """从引用中取出摘要"""
+    if not ref.startswith(REF_PREFIX):
+        raise ValueError(f"无效的内容引用: {ref}")
+    return ref[len(REF_PREFIX):]
+
+
+class BlobStore:
+    """Blob存储基类"""
+
+    def put(self, data: bytes) -> str:
+        """写入内容（已存在时跳过），返回内容引用"""
+        raise NotImplementedError
+
+    def get(self, ref: str) -> Optional[bytes]:
+        """按引用读取内容，不存在时返回None"""
+        raise NotImplementedError
+
+    def exists(self, ref: str) -> bool:
+        """检查内容是否存在"""
+        raise NotImplementedError
+
+    def delete(self, ref: str):
+        """删除内容"""
+        raise NotImplementedError
+
+    def remove_older_than(self, cutoff: float) -> int:
+        """删除最后写入时间早于 cutoff（时间戳）的内容，返回删除数"""
+        raise NotImplementedError
+
+
+class LocalBlobStore(BlobStore):
+    """本地目录Blob存储，按摘要前缀分两级目录"""
+
+    def __init__(self, base_dir: str = "./data/blobs"):
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, ref: str) -> Path:
+        digest = _digest(ref)
+        return self.base_dir / digest[:2] / digest[2:4] / digest
+
+    def put(self, data: bytes) -> str:
+        ref = content_ref(data)
+        path = self._path(ref)
+        if path.exists():
+            try:
+                # 刷新写入时间，按时间清理时保留仍被引用的内容
+                os.utime(path)
+                return ref
+            except FileNotFoundError:
+                # 刚被清理，重新写入
+                pass
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再原子替换，避免并发写入时读到不完整内容
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return ref
+
+    def get(self, ref: str) -> Optional[bytes]:
+        try:
+            return self._path(ref).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, ref: str) -> bool:
+        return self._path(ref).exists()
+
+    def delete(self, ref: str):
+        try:
+            self._path(ref).unlink()
+        except FileNotFoundError:
+            pass
+
+    def remove_older_than(self, cutoff: float) -> int:
+        removed = 0
+        for path in self.base_dir.glob("*/*/*"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+class S3BlobStore(BlobStore):
+    """S3/MinIO兼容对象存储"""
+
+    def __init__(self, bucket: str, prefix: str = "blobs", endpoint_url: str = None, **client_kwargs):
+        try:
+            import boto3
+        except ImportError:
+            raise ImportError("S3 Blob存储需要 boto3，请执行 pip install boto3")
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, **client_kwargs)
+
+    def _key(self, ref: str) -> str:
+        digest = _digest(ref)
+        return f"{self.prefix}/{digest[:2]}/{digest}" if self.prefix else f"{digest[:2]}/{digest}"
+
+    def put(self, data: bytes) -> str:
+        ref = content_ref(data)
+        key = self._key(ref)
+        if self.exists(ref):
+            # 原地复制刷新 LastModified，按时间清理时保留仍被引用的内容
+            self.client.copy_object(
+                Bucket=self.bucket, Key=key, CopySource={"Bucket": self.bucket, "Key": key},
+                MetadataDirective="REPLACE"
+            )
+        else:
+            self.client.put_object(Bucket=self.bucket, Key=key, Body=data)
+        return ref
+
+    def get(self, ref: str) -> Optional[bytes]:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(ref))
+            return response["Body"].read()
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+    def exists(self, ref: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(ref))
+            return True
+        except Exception:
+            return False
+
+    def delete(self, ref: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(ref))
+
+    def remove_older_than(self, cutoff: float) -> int:
+        prefix = f"{self.prefix}/" if self.prefix else ""
+        paginator = self.client.get_paginator("list_objects_v2")
+        removed = 0
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            expired = [
+                {"Key": item["Key"]} for item in page.get("Contents", [])
+                if item["LastModified"].timestamp() < cutoff
+            ]
+            # DeleteObjects 单次最多1000个键，与分页大小一致
+            if expired:
+                self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": expired, "Quiet": True})
+                removed += len(expired)
+        return removed
+
+
+def create_blob_store(location: str) -> Optional[BlobStore]:
+    """
+    按位置字符串创建Blob存储
+
+    Args:
+        location: 本地路径、file:// 或 s3://bucket/prefix，为空时返回None
+
+    Returns:
+        BlobStore: Blob存储实例
+    """
+    if not location:
+        return None
+
+    parsed = urlparse(location)
+    if parsed.scheme == "s3":
+        return S3BlobStore(
+            bucket=parsed.netloc,
+            prefix=parsed.path.lstrip("/") or "blobs",
+            endpoint_url=os.getenv("BLOB_S3_ENDPOINT")
+        )
+    if parsed.scheme == "file":
+        return LocalBlobStore(parsed.path)
+    if not parsed.scheme or len(parsed.scheme) == 1:
+        # 普通路径（含Windows盘符）
+        return LocalBlobStore(location)
+
+    raise ValueError(f"不支持的Blob存储位置: {location}")
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+消息编解码层
+Message Codec Layer
+
+TaskMessage / ResultMessage / StatusMessage 在Redis中的序列化格式：
+- json:    未超过压缩阈值时与旧版本完全一致的JSON文本，无头部
+- msgpack: 二进制 msgpack
+- orjson:  orjson 序列化的JSON字节
+
+二进制格式带4字节头部 [MAGIC, VERSION, CODEC_ID, FLAGS]，超过阈值的负载会被
+zstd（未安装时退化为zlib）压缩，json 编码超过阈值时同样压缩并带头部。解码端根据
+首字节自动识别格式，因此新旧节点、不同编码的队列可以混合部署；滚动升级期间保持
+json 编码并将压缩阈值设为0，全部升级后再切换。
+"""
+
+import json
+import zlib
+from typing import Dict, Any, Union
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+MAGIC = 0xCE
+FORMAT_VERSION = 1
+
+FLAG_ZSTD = 0x01
+FLAG_ZLIB = 0x02
+
+DEFAULT_COMPRESS_THRESHOLD = 16 * 1024
+
+
+class CodecError(ValueError):
+    """消息编解码错误"""
+
+
+class MessageCodec:
+    """消息编解码器基类"""
+
+    name = ""
+    codec_id = 0
+
+    def __init__(self, compress_threshold: int = DEFAULT_COMPRESS_THRESHOLD, compression: str = "zstd"):
+        """
+        Args:
+            compress_threshold: 序列化后超过该字节数时压缩，0表示不压缩
+            compression: 压缩算法 zstd / zlib
+        """
+        self.compress_threshold = compress_threshold
+        self.compression = compression if (compression != "zstd" or zstandard) else "zlib"
+        self._zstd_compressor = zstandard.ZstdCompressor(level=3) if zstandard else None
+
+    def dumps(self, data: Dict[str, Any]) -> bytes:
+        """序列化字典（子类实现）"""
+        raise NotImplementedError
+
+    def loads(self, body: bytes) -> Dict[str, Any]:
+        """反序列化字典（子类实现）"""
+        raise NotImplementedError
+
+    def encode(self, data: Dict[str, Any]) -> Union[str, bytes]:
+        """编码为带头部的二进制负载"""
+        return self._frame(self.dumps(data))
+
+    def _frame(self, body: bytes) -> bytes:
+        """超过阈值时压缩，并加上格式头部"""
+        flags = 0
+
+        if self.compress_threshold and len(body) > self.compress_threshold:
+            if self.compression == "zstd":
+                body = self._zstd_compressor.compress(body)
+                flags |= FLAG_ZSTD
+            else:
+                body = zlib.compress(body, 6)
+                flags |= FLAG_ZLIB
+
+        return bytes((MAGIC, FORMAT_VERSION, self.codec_id, flags)) + body
+
+    def decode(self, payload: Union[str, bytes]) -> Dict[str, Any]:
+        """解码任意格式的负载"""
+        return decode_payload(payload)
+
+
+class JsonCodec(MessageCodec):
+    """JSON文本编码（未超过压缩阈值时为旧版本格式，不带头部）"""
+
+    name = "json"
+    codec_id = 0
+
+    def dumps(self, data: Dict[str, Any]) -> bytes:
+        return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+    def loads(self, body: bytes) -> Dict[str, Any]:
+        return json.loads(body)
+
+    def encode(self, data: Dict[str, Any]) -> Union[str, bytes]:
+        text = json.dumps(data, ensure_ascii=False)
+        if not self.compress_threshold:
+            return text
+        body = text.encode("utf-8")
+        if len(body) <= self.compress_threshold:
+            return text
+        return self._frame(body)
+
+
+class MsgpackCodec(MessageCodec):
+    """msgpack 二进制编码"""
+
+    name = "msgpack"
+    codec_id = 1
+
+    def __init__(self, *args, **kwargs):
+        if msgpack is None:
+            raise ImportError("msgpack 未安装，请执行 pip install msgpack")
+        super().__init__(*args, **kwargs)
+
+    def dumps(self, data: Dict[str, Any]) -> bytes:
+        return msgpack.packb(data, use_bin_type=True)
+
+    def loads(self, body: bytes) -> Dict[str, Any]:
+        return msgpack.unpackb(body, raw=False)
+
+
+class OrjsonCodec(MessageCodec):
+    """orjson 编码"""
+
+    name = "orjson"
+    codec_id = 2
+
+    def __init__(self, *args, **kwargs):
+        if orjson is None:
+            raise ImportError("orjson 未安装，请执行 pip install orjson")
+        super().__init__(*args, **kwargs)
+
+    def dumps(self, data: Dict[str, Any]) -> bytes:
+        return orjson.dumps(data)
+
+    def loads(self, body: bytes) -> Dict[str, Any]:
+        return orjson.loads(body)
+
+
+CODECS = {
+    JsonCodec.name: JsonCodec,
+    MsgpackCodec.name: MsgpackCodec,
+    OrjsonCodec.name: OrjsonCodec,
+}
+
+_CODECS_BY_ID = {codec.codec_id: codec for codec in CODECS.values()}
+_decoders: Dict[int, MessageCodec] = {}
+
+
+def get_codec(name: str = "json", **kwargs) -> MessageCodec:
+    """
+    按名称创建编解码器
+
+    Args:
+        name: json / msgpack / orjson
+        kwargs: compress_threshold, compression
+
+    Returns:
+        MessageCodec: 编解码器实例
+    """
+    codec_class = CODECS.get(name)
+    if codec_class is None:
+        raise ValueError(f"不支持的消息编码: {name}")
+    return codec_class(**kwargs)
+
+
+def decode_payload(payload: Union[str, bytes]) -> Dict[str, Any]:
+    """
+    解码Redis中读取的消息负载，自动识别旧版JSON文本和带头部的二进制格式
+
+    Args:
+        payload: 字符串或字节
+
+    Returns:
+        Dict: 消息字典
+    """
+    if isinstance(payload, str):
+        return json.loads(payload)
+
+    if not payload or payload[0] != MAGIC:
+        return json.loads(payload)
+
+    if len(payload) < 4:
+        raise CodecError("消息头部不完整")
+
+    version, codec_id, flags = payload[1], payload[2], payload[3]
+    if version > FORMAT_VERSION:
+        raise CodecError(f"不支持的消息格式版本: {version}")
+
+    body = payload[4:]
+    if flags & FLAG_ZSTD:
+        if zstandard is None:
+            raise CodecError("消息使用zstd压缩，但 zstandard 未安装")
+        body = zstandard.ZstdDecompressor().decompress(body)
+    elif flags & FLAG_ZLIB:
+        body = zlib.decompress(body)
+
+    decoder = _decoders.get(codec_id)
+    if decoder is None:
+        codec_class = _CODECS_BY_ID.get(codec_id)
+        if codec_class is None:
+            raise CodecError(f"未知的消息编码ID: {codec_id}")
+        decoder = _decoders[codec_id] = codec_class(compress_threshold=0)
+
+    return decoder.loads(body)
@@ -71,6 +71,22 @@ class RedisConfig:
     health_check_interval: int = 30
 
 
+@dataclass
+class QueueConfig:
+    """任务队列配置"""
+    backend: str = "list"  # list, stream
+    prefix: str = "crawler"
+    reliable: bool = False
+    visibility_timeout: int = 300
+    status_maxlen: int = 10000
+    codec: str = "json"  # json, msgpack, orjson
+    compress_threshold: int = 16384  # 超过该字节数的消息压缩，0表示不压缩（滚动升级期间使用0）
+    blob_store: Optional[str] = None  # 大结果内容的Blob存储位置（目录或 s3://bucket/prefix）
+    blob_threshold: int = 65536  # 结果内容超过该字符数时转存到Blob存储
+    result_maxlen: int = 100000  # 仅stream后端
+    claim_idle_ms: int = 60000   # 仅stream后端
+
+
 @dataclass
 class DatabaseConfig:
     """数据库配置"""
@@ -170,6 +186,7 @@ class DistributedConfig:
     """分布式系统完整配置"""
     environment: Environment = Environment.DEVELOPMENT
     redis: RedisConfig = None
+    queue: QueueConfig = None
     database: DatabaseConfig = None
     logging: LoggingConfig = None
     crawler: CrawlerConfig = None
@@ -181,6 +198,8 @@ class DistributedConfig:
     def __post_init__(self):
         if self.redis is None:
             self.redis = RedisConfig()
+        if self.queue is None:
+            self.queue = QueueConfig()
         if self.database is None:
             self.database = DatabaseConfig()
         if self.logging is None:
@@ -213,6 +232,16 @@ class ConfigValidator:
         if config.redis.max_connections <= 0:
             errors.append("Redis最大连接数必须大于0")
         
+        # 队列配置验证
+        if config.queue.backend not in ("list", "stream"):
+            errors.append("队列后端必须是 list 或 stream")
+        if config.queue.visibility_timeout <= 0:
+            errors.append("任务可见性超时必须大于0")
+        if config.queue.codec not in ("json", "msgpack", "orjson"):
+            errors.append("消息编码必须是 json、msgpack 或 orjson")
+        if config.queue.compress_threshold < 0:
+            errors.append("消息压缩阈值不能小于0")
+        
         # 数据库配置验证
         if not config.database.host:
             errors.append("数据库主机不能为空")
@@ -529,7 +558,7 @@ class ConfigManager:
         
         # 处理嵌套配置
         for key, value in data.items():
-            if key in ["redis", "database", "logging", "crawler", 
+            if key in ["redis", "queue", "database", "logging", "crawler", 
                       "worker", "scheduler", "monitoring", "security"]:
                 if isinstance(value, dict):
                     config_class = globals()[f"{key.capitalize()}Config"]
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+工作节点的域名前沿
+Per-Worker Domain Frontier
+
+工作节点取到的任务先进入前沿，按域名排成FIFO队列。每个有任务的域名在最小堆中
+恰有一个条目，键为该域名队首任务预约到的请求时刻（AccessController.reserve）。
+工作节点总是执行最早可执行的任务，等待某个域名的访问间隔时，任务槽可以执行
+其他域名的任务，访问间隔不再占用任务槽。
+
+新加入的域名和队首任务刚出队的域名在下一次取任务时预约，每个域名同时只有
+一个未使用的预约。
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from urllib.parse import urlparse
+
+from .task_queue import TaskMessage
+
+
+class DomainFrontier:
+    """按域名可执行时刻排序的任务前沿"""
+
+    def __init__(self, access_controller):
+        """
+        Args:
+            access_controller: 用于预约域名请求时刻的访问控制器
+        """
+        self.access_controller = access_controller
+        self._queues: Dict[str, Deque[TaskMessage]] = {}
+        self._heap: List[tuple] = []
+        self._unscheduled: Deque[str] = deque()
+        self._counter = itertools.count()
+        self._size = 0
+        self._closed = False
+        self._changed = asyncio.Event()
+        self._space = asyncio.Event()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def domains(self) -> int:
+        """前沿中的域名数"""
+        return len(self._queues)
+
+    def add(self, task: TaskMessage):
+        """加入任务"""
+        domain = urlparse(task.url).netloc.lower()
+        self._size += 1
+        queue = self._queues.get(domain)
+        if queue is not None:
+            queue.append(task)
+            return
+        self._queues[domain] = deque([task])
+        self._unscheduled.append(domain)
+        self._changed.set()
+
+    async def pop(self) -> Optional[TaskMessage]:
+        """
+        等待并取出最早可执行的任务（请求时刻已预约，执行时无需再等待）
+
+        Returns:
+            TaskMessage: 任务，前沿关闭后返回None
+        """
+        while True:
+            if self._closed:
+                return None
+            while self._unscheduled:
+                domain = self._unscheduled.popleft()
+                await self._schedule(domain, self._queues[domain][0])
+            delay = self._heap[0][0] - time.monotonic() if self._heap else None
+            if delay is not None and delay <= 0:
+                break
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+        _, _, domain = heapq.heappop(self._heap)
+        queue = self._queues[domain]
+        task = queue.popleft()
+        self._size -= 1
+        self._space.set()
+        if queue:
+            # 下一个任务在下一次取任务时预约，本次返回前不再等待
+            self._unscheduled.append(domain)
+        else:
+            del self._queues[domain]
+        return task
+
+    async def wait_for_space(self, limit: int):
+        """等待前沿中的任务数低于 limit（前沿关闭后立即返回）"""
+        while self._size >= limit and not self._closed:
+            self._space.clear()
+            await self._space.wait()
+
+    def close(self):
+        """关闭前沿，唤醒等待中的 pop 和 wait_for_space"""
+        self._closed = True
+        self._changed.set()
+        self._space.set()
+
+    def drain(self) -> List[TaskMessage]:
+        """取出全部任务（按可执行顺序），用于关闭时归还队列"""
+        order = {domain: rank for rank, (_, _, domain) in enumerate(sorted(self._heap))}
+        tasks = []
+        for domain in sorted(self._queues, key=lambda domain: order.get(domain, len(order))):
+            tasks.extend(self._queues[domain])
+        self._queues.clear()
+        self._heap.clear()
+        self._unscheduled.clear()
+        self._size = 0
+        self._space.set()
+        return tasks
+
+    async def _schedule(self, domain: str, task: TaskMessage):
+        """为域名的队首任务预约请求时刻并加入堆"""
+        wait = await self.access_controller.reserve(task.url)
+        heapq.heappush(self._heap, (time.monotonic() + wait, next(self._counter), domain))
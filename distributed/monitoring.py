@@ -22,9 +22,19 @@ import requests
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from collections import defaultdict, deque
-import psutil
+from array import array
+from bisect import bisect_right
 
-from .task_queue import TaskQueue
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from utils.metrics import QUEUE_DEPTH, REDIS_RTT_SECONDS, render_metrics
+
+from .task_queue import TaskQueue, create_task_queue
+from .config import get_config
+from .resource_sampler import get_resource_sampler
 
 
 class AlertLevel(Enum):
@@ -81,63 +91,245 @@ class HealthCheck:
     response_time: float
 
 
+LabelKey = tuple
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    """标签集合的规范化键"""
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def queue_depths(queue_stats: Dict[str, Any]) -> Dict[str, int]:
+    """
+    由 get_queue_stats 的结果计算各类队列长度
+
+    Returns:
+        Dict: pending（各优先级队列、重试队列和延迟队列）/ leased / dead / results
+    """
+    pending = sum(
+        value for key, value in queue_stats.items()
+        if key.startswith("queue_") and key.endswith("_length")
+    )
+    pending += queue_stats.get("retry_queue_length", 0) + queue_stats.get("delayed_queue_length", 0)
+    return {
+        "pending": pending,
+        "leased": queue_stats.get("leased_tasks", 0),
+        "dead": queue_stats.get("dead_letter_queue_length", 0),
+        "results": queue_stats.get("result_queue_length", 0),
+    }
+
+
+class MetricSeries:
+    """
+    一个指标在一组标签下的时间序列
+
+    时间戳和值保存在两个定长的 array('d') 环形缓冲区中，追加为常数时间；
+    超出容量时覆盖最旧的点，超出时间窗口的点在追加时从队首逐个丢弃（均摊常数时间）。
+    """
+    
+    __slots__ = ("name", "labels", "metric_type", "capacity", "window",
+                 "_timestamps", "_values", "_head", "_count")
+    
+    def __init__(self, name: str, labels: Dict[str, str], metric_type: MetricType,
+                 capacity: int, window: float):
+        self.name = name
+        self.labels = labels
+        self.metric_type = metric_type
+        self.capacity = capacity
+        self.window = window
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._values = array("d", bytes(8 * capacity))
+        self._head = 0  # 下一个写入位置
+        self._count = 0
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def append(self, timestamp: float, value: float):
+        """追加一个点"""
+        head = self._head
+        self._timestamps[head] = timestamp
+        self._values[head] = value
+        self._head = (head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+        
+        # 丢弃窗口外的旧点
+        cutoff = timestamp - self.window
+        tail = (self._head - self._count) % self.capacity
+        while self._count and self._timestamps[tail] <= cutoff:
+            tail = (tail + 1) % self.capacity
+            self._count -= 1
+    
+    def _chunks(self) -> List[tuple]:
+        """按时间顺序的连续区间 [(start, end), ...]（最多两段）"""
+        if not self._count:
+            return []
+        tail = (self._head - self._count) % self.capacity
+        if tail < self._head:
+            return [(tail, self._head)]
+        return [(tail, self.capacity), (0, self._head)]
+    
+    def window_arrays(self, since: float) -> tuple:
+        """时间戳晚于 since 的点（时间戳数组, 值数组）"""
+        timestamps, values = array("d"), array("d")
+        for start, end in self._chunks():
+            index = bisect_right(self._timestamps, since, start, end)
+            timestamps.extend(self._timestamps[index:end])
+            values.extend(self._values[index:end])
+        return timestamps, values
+    
+    def latest(self) -> Optional[tuple]:
+        """最新的点（时间戳, 值）"""
+        if not self._count:
+            return None
+        index = (self._head - 1) % self.capacity
+        return self._timestamps[index], self._values[index]
+
+
+def summarize(values, percentiles=(50, 95, 99)) -> Dict[str, float]:
+    """
+    一组数值的计数、均值、最小值、最大值和分位数（线性插值）
+
+    安装了 numpy 时直接在 array 缓冲区上向量化计算
+    """
+    count = len(values)
+    summary = {"count": count}
+    if not count:
+        summary.update({"mean": 0.0, "min": 0.0, "max": 0.0})
+        summary.update({f"p{p:g}": 0.0 for p in percentiles})
+        return summary
+    
+    if numpy is not None:
+        data = numpy.frombuffer(values, dtype=numpy.float64) if isinstance(values, array) else numpy.asarray(values)
+        summary.update({"mean": float(data.mean()), "min": float(data.min()), "max": float(data.max())})
+        if percentiles:
+            for p, value in zip(percentiles, numpy.percentile(data, percentiles)):
+                summary[f"p{p:g}"] = float(value)
+        return summary
+    
+    summary.update({"mean": sum(values) / count, "min": min(values), "max": max(values)})
+    ordered = sorted(values)
+    for p in percentiles:
+        position = (count - 1) * p / 100
+        lower = int(position)
+        upper = min(lower + 1, count - 1)
+        summary[f"p{p:g}"] = ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+    return summary
+
+
 class MetricsCollector:
-    """指标收集器"""
+    """指标收集器（每个 指标名 + 标签集合 一个定长环形缓冲区）"""
     
-    def __init__(self):
-        self.metrics: Dict[str, List[MetricData]] = defaultdict(list)
-        self.metrics_window = 3600  # 1小时窗口
+    def __init__(self, capacity: int = 8192, metrics_window: int = 3600):
+        """
+        Args:
+            capacity: 每个序列保留的点数上限，写入速率很高的序列实际窗口会短于 metrics_window
+            metrics_window: 保留的时间窗口（秒）
+        """
+        self.capacity = capacity
+        self.metrics_window = metrics_window
+        self.series: Dict[str, Dict[LabelKey, MetricSeries]] = defaultdict(dict)
         self.lock = threading.Lock()
-        
+    
     def record_metric(self, 
                      name: str, 
                      value: float, 
                      metric_type: MetricType = MetricType.GAUGE,
                      labels: Dict[str, str] = None):
-        """记录指标"""
+        """记录指标（常数时间）"""
+        key = _label_key(labels)
+        timestamp = time.time()
         with self.lock:
-            metric = MetricData(
-                name=name,
-                value=value,
-                labels=labels or {},
-                timestamp=datetime.now(),
-                metric_type=metric_type
-            )
-            
-            self.metrics[name].append(metric)
-            
-            # 清理旧数据
-            cutoff_time = datetime.now() - timedelta(seconds=self.metrics_window)
-            self.metrics[name] = [
-                m for m in self.metrics[name]
-                if m.timestamp > cutoff_time
-            ]
+            series = self.series[name].get(key)
+            if series is None:
+                series = self.series[name][key] = MetricSeries(
+                    name, dict(labels or {}), metric_type, self.capacity, self.metrics_window
+                )
+            series.append(timestamp, value)
+    
+    def _matching_series(self, name: str, labels: Dict[str, str] = None) -> List[MetricSeries]:
+        """标签包含 labels 的全部序列（调用方持有锁）"""
+        series = self.series.get(name)
+        if not series:
+            return []
+        if not labels:
+            return list(series.values())
+        wanted = labels.items()
+        return [item for item in series.values() if wanted <= item.labels.items()]
+    
+    def get_series(self, name: str) -> List[Dict[str, str]]:
+        """指标的全部标签集合"""
+        with self.lock:
+            return [dict(series.labels) for series in self.series.get(name, {}).values()]
+    
+    def get_metric(self, name: str, duration_minutes: int = 5, labels: Dict[str, str] = None) -> List[MetricData]:
+        """获取指标数据（按时间排序）"""
+        since = time.time() - duration_minutes * 60
+        points = []
+        with self.lock:
+            for series in self._matching_series(name, labels):
+                timestamps, values = series.window_arrays(since)
+                points.extend(
+                    MetricData(
+                        name=name,
+                        value=value,
+                        labels=dict(series.labels),
+                        timestamp=datetime.fromtimestamp(timestamp),
+                        metric_type=series.metric_type
+                    )
+                    for timestamp, value in zip(timestamps, values)
+                )
+        points.sort(key=lambda metric: metric.timestamp)
+        return points
     
-    def get_metric(self, name: str, duration_minutes: int = 5) -> List[MetricData]:
-        """获取指标数据"""
-        cutoff_time = datetime.now() - timedelta(minutes=duration_minutes)
+    def get_window(self, name: str, duration_minutes: float = 5, labels: Dict[str, str] = None) -> array:
+        """窗口内的全部值（array('d')，多个序列的值合并）"""
+        since = time.time() - duration_minutes * 60
+        merged = array("d")
+        with self.lock:
+            for series in self._matching_series(name, labels):
+                merged.extend(series.window_arrays(since)[1])
+        return merged
+    
+    def aggregate(self,
+                  name: str,
+                  duration_minutes: float = 5,
+                  labels: Dict[str, str] = None,
+                  percentiles=(50, 95, 99),
+                  by_series: bool = False) -> Any:
+        """
+        窗口聚合：count / mean / min / max / 分位数
         
+        Args:
+            name: 指标名
+            duration_minutes: 窗口长度（分钟）
+            labels: 只聚合标签包含这些键值的序列
+            percentiles: 需要的分位数
+            by_series: 为True时按标签集合分别聚合，返回 [{"labels": ..., **summary}]
+        """
+        if not by_series:
+            return summarize(self.get_window(name, duration_minutes, labels), percentiles)
+        
+        since = time.time() - duration_minutes * 60
         with self.lock:
-            return [
-                m for m in self.metrics.get(name, [])
-                if m.timestamp > cutoff_time
-            ]
+            windows = [(dict(series.labels), series.window_arrays(since)[1])
+                       for series in self._matching_series(name, labels)]
+        return [{"labels": series_labels, **summarize(values, percentiles)} for series_labels, values in windows]
     
-    def get_average(self, name: str, duration_minutes: int = 5) -> float:
+    def get_average(self, name: str, duration_minutes: int = 5, labels: Dict[str, str] = None) -> float:
         """获取平均值"""
-        metrics = self.get_metric(name, duration_minutes)
-        if not metrics:
-            return 0.0
-        
-        return sum(m.value for m in metrics) / len(metrics)
+        return summarize(self.get_window(name, duration_minutes, labels), ())["mean"]
     
-    def get_current(self, name: str) -> Optional[float]:
-        """获取当前值"""
-        metrics = self.get_metric(name, 1)
-        if not metrics:
+    def get_current(self, name: str, labels: Dict[str, str] = None) -> Optional[float]:
+        """获取当前值（最近1分钟内最新的点）"""
+        cutoff = time.time() - 60
+        with self.lock:
+            latest = [series.latest() for series in self._matching_series(name, labels)]
+        latest = [point for point in latest if point and point[0] > cutoff]
+        if not latest:
             return None
-        
-        return metrics[-1].value
+        return max(latest)[1]
 
 
 class AlertManager:
@@ -322,8 +514,11 @@ class HealthChecker:
     def _check_redis(self) -> tuple:
         """检查Redis连接"""
         try:
+            started = time.perf_counter()
             self.task_queue.redis_client.ping()
-            return "healthy", {"connected": True}
+            rtt = time.perf_counter() - started
+            REDIS_RTT_SECONDS.labels(component="monitoring").observe(rtt)
+            return "healthy", {"connected": True, "rtt_ms": round(rtt * 1000, 3)}
         except Exception as e:
             return "unhealthy", {"connected": False, "error": str(e)}
     
@@ -360,6 +555,7 @@ class MonitoringSystem:
         self.metrics_collector = MetricsCollector()
         self.alert_manager = AlertManager()
         self.health_checker = HealthChecker(task_queue)
+        self.resource_sampler = get_resource_sampler()
         
         self.is_running = False
         self.monitoring_thread = None
@@ -421,29 +617,22 @@ class MonitoringSystem:
         """收集系统指标"""
         while self.is_running:
             try:
-                # CPU使用率
-                cpu_usage = psutil.cpu_percent(interval=1)
-                self.metrics_collector.record_metric("cpu_usage", cpu_usage)
-                
-                # 内存使用率
-                memory = psutil.virtual_memory()
-                self.metrics_collector.record_metric("memory_usage", memory.percent)
-                
-                # 磁盘使用率
-                disk = psutil.disk_usage('/')
-                disk_usage = (disk.used / disk.total) * 100
-                self.metrics_collector.record_metric("disk_usage", disk_usage)
-                
-                # 网络连接数
-                connections = len(psutil.net_connections())
-                self.metrics_collector.record_metric("network_connections", connections)
+                # CPU、内存、磁盘使用率和本进程连接数（共享采样器的缓存读数，不阻塞）
+                snapshot = self.resource_sampler.sample()
+                self.metrics_collector.record_metric("cpu_usage", snapshot.cpu_usage)
+                self.metrics_collector.record_metric("memory_usage", snapshot.memory_usage)
+                self.metrics_collector.record_metric("disk_usage", snapshot.disk_usage)
+                self.metrics_collector.record_metric("network_connections", snapshot.connections)
                 
                 # 任务队列指标
                 try:
                     queue_stats = self.task_queue.get_queue_stats()
-                    self.metrics_collector.record_metric("pending_tasks", queue_stats.get("pending", 0))
-                    self.metrics_collector.record_metric("processing_tasks", queue_stats.get("processing", 0))
-                    self.metrics_collector.record_metric("completed_tasks", queue_stats.get("completed", 0))
+                    depths = queue_depths(queue_stats)
+                    for name, depth in depths.items():
+                        QUEUE_DEPTH.labels(queue=name).set(depth)
+                    self.metrics_collector.record_metric("pending_tasks", depths["pending"])
+                    self.metrics_collector.record_metric("processing_tasks", depths["leased"])
+                    self.metrics_collector.record_metric("completed_tasks", queue_stats.get("tasks_completed", 0))
                 except Exception as e:
                     self.logger.error(f"获取队列统计失败: {e}")
                 
@@ -509,7 +698,7 @@ class MonitoringSystem:
     def _run_web_interface(self):
         """运行Web界面"""
         try:
-            from flask import Flask, jsonify, render_template_string
+            from flask import Flask, Response, jsonify, render_template_string
             
             app = Flask(__name__)
             
@@ -518,9 +707,16 @@ class MonitoringSystem:
                 return self._get_dashboard_html()
             
             @app.route('/metrics')
+            @app.route('/api/metrics')
             def metrics():
                 return jsonify(self.get_metrics())
             
+            @app.route('/metrics/openmetrics')
+            def openmetrics():
+                # OpenMetrics文本，供Prometheus抓取
+                body, content_type = render_metrics()
+                return Response(body, content_type=content_type)
+            
             @app.route('/health')
             def health():
                 return jsonify(self.get_health_status())
@@ -563,7 +759,7 @@ class MonitoringSystem:
             
             <script>
                 function updateData() {
-                    fetch('/metrics').then(r => r.json()).then(data => {
+                    fetch('/api/metrics').then(r => r.json()).then(data => {
                         document.getElementById('metrics').innerHTML = 
                             '<h2>系统指标</h2>' + 
                             Object.entries(data).map(([k, v]) => 
@@ -690,7 +886,8 @@ if __name__ == "__main__":
     args = parser.parse_args()
     
     # 创建任务队列
-    task_queue = TaskQueue(
+    task_queue = create_task_queue(
+        get_config(),
         redis_host=args.redis_host,
         redis_port=args.redis_port
     )
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按域名的请求限速（GCRA）
+Per-Domain Rate Limiter
+
+使用通用信元速率算法（GCRA）为每个域名维护一个理论到达时间（TAT）。请求不再
+先睡眠再发送，而是预约该域名的下一个可用时刻：预约成功后 TAT 后移一个请求间隔，
+调用方得到需要等待的时间，可以在等待期间处理其他域名的任务。
+
+- LocalRateLimiter: 进程内状态，单个工作节点使用
+- RedisRateLimiter: 状态保存在Redis中，预约在一次Lua调用中完成，
+  所有工作节点对同一域名共享一个速率
+
+键: {prefix}:ratelimit:{domain}  值为 TAT（毫秒时间戳），空闲后自动过期
+"""
+
+import time
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+# 预约域名的下一个请求时刻
+# KEYS[1]: 域名的TAT（毫秒）
+# ARGV[1]: 当前时间（毫秒）  ARGV[2]: 请求间隔（毫秒）  ARGV[3]: 允许的突发请求数
+# ARGV[4]: 最长预约等待（毫秒），超过时不预约
+# 返回 {是否预约成功, 需要等待的毫秒数}
+RESERVE_SLOT_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local tolerance = interval * (tonumber(ARGV[3]) - 1)
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local wait = tat - tolerance - now
+if wait < 0 then
+    wait = 0
+end
+if wait > tonumber(ARGV[4]) then
+    return {0, wait}
+end
+local new_tat = tat + interval
+redis.call('SET', KEYS[1], string.format('%d', new_tat), 'PX', new_tat - now + 1000)
+return {1, wait}
+"""
+
+
+class LocalRateLimiter:
+    """进程内的按域名GCRA限速（最近预约的 max_domains 个域名保留状态）"""
+
+    def __init__(self, burst: int = 1, max_domains: int = 100000):
+        """
+        Args:
+            burst: 空闲后允许连续发送的请求数
+            max_domains: 保留TAT的域名数上限，淘汰最久未预约的域名
+                （其TAT通常早已过去，淘汰与过期等价）
+        """
+        self.burst = max(1, burst)
+        self.max_domains = max_domains
+        self._tat: "OrderedDict[str, float]" = OrderedDict()
+
+    async def reserve(self, domain: str, interval: float, max_wait: float = None) -> Optional[float]:
+        """
+        预约域名的下一个请求时刻
+
+        Args:
+            domain: 域名
+            interval: 与该域名上一个请求的最小间隔（秒）
+            max_wait: 最长预约等待（秒），为空时不限制
+
+        Returns:
+            float: 距预约时刻的秒数；超过 max_wait 时不预约，返回None
+        """
+        now = time.time()
+        tat = max(self._tat.get(domain, now), now)
+        wait = max(0.0, tat - interval * (self.burst - 1) - now)
+        if max_wait is not None and wait > max_wait:
+            return None
+        self._tat[domain] = tat + interval
+        self._tat.move_to_end(domain)
+        if len(self._tat) > self.max_domains:
+            self._tat.popitem(last=False)
+        return wait
+
+    def reset(self, domain: str = None):
+        """清除域名（或全部域名）的预约"""
+        if domain:
+            self._tat.pop(domain, None)
+        else:
+            self._tat.clear()
+
+
+class RedisRateLimiter:
+    """
+    Redis共享的按域名GCRA限速
+
+    时间以各节点的本地时钟传入脚本（与任务队列的租约一致），节点间时钟偏差会
+    直接体现为请求间隔的误差，部署时应开启NTP同步。Redis不可用时退回进程内限速。
+    """
+
+    # 不限制预约等待时传给脚本的毫秒数
+    UNLIMITED_WAIT_MS = 2 ** 50
+
+    def __init__(self, redis_client, key_prefix: str = "crawler:ratelimit", burst: int = 1):
+        """
+        Args:
+            redis_client: redis.asyncio 客户端
+            key_prefix: 键名前缀
+            burst: 空闲后允许连续发送的请求数
+        """
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self.burst = max(1, burst)
+        self.fallback = LocalRateLimiter(burst)
+        self.logger = logging.getLogger(__name__)
+        self._script = redis_client.register_script(RESERVE_SLOT_SCRIPT)
+
+    async def reserve(self, domain: str, interval: float, max_wait: float = None) -> Optional[float]:
+        """预约域名的下一个请求时刻，参数和返回值同 LocalRateLimiter.reserve"""
+        max_wait_ms = self.UNLIMITED_WAIT_MS if max_wait is None else int(max_wait * 1000)
+        try:
+            reserved, wait_ms = await self._script(
+                keys=[f"{self.key_prefix}:{domain}"],
+                args=[int(time.time() * 1000), max(1, int(interval * 1000)), self.burst, max_wait_ms]
+            )
+        except Exception as e:
+            self.logger.warning(f"共享限速不可用，使用本地限速: {e}")
+            return await self.fallback.reserve(domain, interval, max_wait)
+        return float(wait_ms) / 1000 if int(reserved) else None
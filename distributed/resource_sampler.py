@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享资源采样器
+Shared Resource Sampler
+
+监控系统和工作节点状态上报共用一个进程级采样器，按最小间隔采样并缓存结果，
+间隔内的读取直接返回缓存的快照，多个调用方不会重复读取 /proc。
+
+- CPU使用率由两次采样之间的 cpu_times 差值计算，不阻塞调用线程
+  （不再使用 cpu_percent(interval=1)，也不与其他调用方共享 psutil 的全局基准）
+- 连接数只统计本进程打开的套接字：Linux下遍历 /proc/self/fd，代价与本进程的
+  文件描述符数成正比，不再像 psutil.net_connections() 那样扫描整机的全部套接字；
+  按更长的 connections_interval 统计，其余采样沿用上次的连接数
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional
+
+import psutil
+
+_PROC_FD = "/proc/self/fd"
+
+# 计算CPU使用率所需的最小CPU时间差（秒，所有核合计）
+MIN_CPU_DELTA = 0.1
+
+
+@dataclass
+class ResourceSnapshot:
+    """一次资源采样"""
+    timestamp: float = 0.0
+    cpu_usage: float = 0.0  # 整机CPU使用率（%）
+    process_cpu_usage: float = 0.0  # 本进程CPU使用率（%，多核时可超过100）
+    memory_usage: float = 0.0  # 整机内存使用率（%）
+    process_memory: int = 0  # 本进程常驻内存（字节）
+    disk_usage: float = 0.0  # disk_path 所在分区使用率（%）
+    connections: int = 0  # 本进程打开的套接字数
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _busy_and_total(times) -> tuple:
+    """cpu_times 中的忙碌时间和总时间（idle 和 iowait 算作空闲，guest 已计入 user/nice）"""
+    total = sum(times) - getattr(times, "guest", 0.0) - getattr(times, "guest_nice", 0.0)
+    idle = times.idle + getattr(times, "iowait", 0.0)
+    return total - idle, total
+
+
+class ResourceSampler:
+    """限频、带缓存的资源采样器（线程安全）"""
+
+    def __init__(self, min_interval: float = 5.0, disk_path: str = "/", connections_interval: float = 30.0):
+        """
+        Args:
+            min_interval: 两次实际采样的最小间隔（秒），间隔内返回缓存的快照
+            disk_path: 统计磁盘使用率的路径
+            connections_interval: 两次统计连接数的最小间隔（秒）
+        """
+        self.min_interval = min_interval
+        self.disk_path = disk_path
+        self.connections_interval = connections_interval
+        self._last_connections = float("-inf")
+        self._lock = threading.Lock()
+        self._process = psutil.Process()
+        self._snapshot = ResourceSnapshot()
+        self._last_sample = 0.0
+        self.samples = 0
+
+        # 建立CPU基准，第一次采样即可得到有效的差值
+        self._cpu_base = _busy_and_total(psutil.cpu_times())
+        self._process.cpu_percent(interval=None)
+
+    @property
+    def snapshot(self) -> ResourceSnapshot:
+        """最近一次采样（不触发采样）"""
+        return self._snapshot
+
+    def sample(self, max_age: float = None) -> ResourceSnapshot:
+        """
+        返回不早于 max_age 秒的快照，缓存过期时重新采样
+
+        其他线程正在采样时不等待，直接返回上一次的快照。
+
+        Args:
+            max_age: 可接受的快照最大年龄（秒），默认为 min_interval，不小于 min_interval
+        """
+        max_age = self.min_interval if max_age is None else max(max_age, self.min_interval)
+        if time.monotonic() - self._last_sample < max_age:
+            return self._snapshot
+        if not self._lock.acquire(blocking=False):
+            return self._snapshot
+        try:
+            if time.monotonic() - self._last_sample >= max_age:
+                self._snapshot = self._take()
+                self._last_sample = time.monotonic()
+                self.samples += 1
+            return self._snapshot
+        finally:
+            self._lock.release()
+
+    def _take(self) -> ResourceSnapshot:
+        busy, total = _busy_and_total(psutil.cpu_times())
+        base_busy, base_total = self._cpu_base
+        if total - base_total >= MIN_CPU_DELTA:
+            cpu_usage = min(100.0, max(0.0, (busy - base_busy) / (total - base_total) * 100))
+            self._cpu_base = (busy, total)
+        else:
+            # 距基准太近，差值没有意义，沿用上次的读数
+            cpu_usage = self._snapshot.cpu_usage
+
+        with self._process.oneshot():
+            process_cpu = self._process.cpu_percent(interval=None)
+            process_memory = self._process.memory_info().rss
+
+        try:
+            disk_usage = psutil.disk_usage(self.disk_path).percent
+        except OSError:
+            disk_usage = 0.0
+
+        connections = self._snapshot.connections
+        if time.monotonic() - self._last_connections >= self.connections_interval:
+            connections = self._count_sockets()
+            self._last_connections = time.monotonic()
+
+        return ResourceSnapshot(
+            timestamp=time.time(),
+            cpu_usage=round(cpu_usage, 1),
+            process_cpu_usage=process_cpu,
+            memory_usage=psutil.virtual_memory().percent,
+            process_memory=process_memory,
+            disk_usage=disk_usage,
+            connections=connections,
+        )
+
+    def _count_sockets(self) -> int:
+        """本进程打开的套接字数"""
+        try:
+            names = os.listdir(_PROC_FD)
+        except OSError:
+            # 非Linux平台（psutil 6.0 之前为 connections）
+            connections = getattr(self._process, "net_connections", None) or self._process.connections
+            try:
+                return len(connections(kind="all"))
+            except (psutil.Error, OSError):
+                return 0
+
+        count = 0
+        for name in names:
+            try:
+                if os.readlink(f"{_PROC_FD}/{name}").startswith("socket:"):
+                    count += 1
+            except OSError:
+                # 遍历期间关闭的描述符
+                pass
+        return count
+
+
+_shared_sampler: Optional[ResourceSampler] = None
+_shared_lock = threading.Lock()
+
+
+def get_resource_sampler() -> ResourceSampler:
+    """进程内共享的资源采样器"""
+    global _shared_sampler
+    if _shared_sampler is None:
+        with _shared_lock:
+            if _shared_sampler is None:
+                _shared_sampler = ResourceSampler()
+    return _shared_sampler
@@ -9,20 +9,32 @@ Distributed Result Collector
 
 import asyncio
 import json
+import math
 import time
 import uuid
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, Iterator, List, Optional, Any, Union
 from dataclasses import dataclass, asdict
 from enum import Enum
 import logging
 import threading
+import queue
 import os
 import gzip
-import csv
 from pathlib import Path
+from collections import deque
 
-from .task_queue import TaskQueue, ResultMessage, TaskStatus
+from utils.storage_manifest import StorageManifest
+from utils.metrics import (
+    COLLECTOR_BACKPRESSURE_SECONDS, COLLECTOR_FLUSH_SECONDS, COLLECTOR_PENDING_BATCHES,
+    COLLECTOR_RESULTS_FAILED, COLLECTOR_RESULTS_STORED, start_metrics_server
+)
+
+from .task_queue import TaskQueue, ResultMessage, TaskStatus, create_task_queue
+from .config import get_config
+from .segment_store import SegmentStore
+from .result_export import export_records
+from .result_index import ResultIndex
 
 
 class StorageType(Enum):
@@ -37,21 +49,31 @@ class StorageType(Enum):
 class ExportFormat(Enum):
     """导出格式"""
     JSON = "json"
+    JSONL = "jsonl"
     CSV = "csv"
     XML = "xml"
     PARQUET = "parquet"
+    ARROW = "arrow"
 
 
 @dataclass
 class StorageConfig:
     """存储配置"""
-    storage_type: StorageType
+    storage_type: StorageType = StorageType.FILE
     base_path: str = "./data/results"
-    max_file_size: int = 100 * 1024 * 1024  # 100MB
+    max_file_size: int = 100 * 1024 * 1024  # 100MB，结果分段的滚动大小
     compression: bool = True
+    segment_format: str = "jsonl"  # 结果分段格式 jsonl / msgpack
+    index_results: bool = True  # 在 index.db 中维护结果元数据索引
+    include_content: bool = False  # 在结果分段中保存页面内容（转存到Blob存储的内容在写入时读取）
     retention_days: int = 30
+    blob_retention_days: Optional[int] = None  # Blob内容保留天数，默认比 retention_days 多一天
+    cleanup_interval: int = 3600  # 按保留期清理旧数据的间隔（秒），0 表示不自动清理
     batch_size: int = 1000
     flush_interval: int = 60
+    max_pending_batches: int = 4  # 等待写入的批次上限，超过时收集线程等待（背压）
+    write_retries: int = 3  # 批次写入失败后的重试次数，仍失败时结果放回结果队列
+    write_retry_delay: float = 1.0  # 第一次重试前的等待（秒），之后每次加倍
 
 
 @dataclass
@@ -73,7 +95,7 @@ class ResultStatistics:
     def add_result(self, result: ResultMessage):
         """添加结果到统计"""
         self.total_tasks += 1
-        self.data_size_bytes += len(str(result.content)) if result.content else 0
+        self.data_size_bytes += result.content_length or 0
         self.total_response_time += result.response_time
         
         if result.status == TaskStatus.SUCCESS.value:
@@ -102,6 +124,148 @@ class ResultStatistics:
         return ((self.failed_tasks + self.timeout_tasks) / self.total_tasks) * 100
 
 
+class LatencyHistogram:
+    """
+    对数分桶的响应时间直方图
+
+    桶边界按 GROWTH 倍递增（1ms 起），分位数的相对误差不超过约5%，
+    记录和合并都是常数时间。
+    """
+    
+    MIN_VALUE = 0.001
+    GROWTH = 1.1
+    BUCKETS = 160  # 覆盖到约1小时
+    _LOG_GROWTH = math.log(GROWTH)
+    
+    __slots__ = ("counts", "count", "max_value")
+    
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.max_value = 0.0
+    
+    def record(self, value: float):
+        """记录一个响应时间（秒）"""
+        if value <= self.MIN_VALUE:
+            index = 0
+        else:
+            index = min(self.BUCKETS - 1, int(math.log(value / self.MIN_VALUE) / self._LOG_GROWTH) + 1)
+        self.counts[index] += 1
+        self.count += 1
+        if value > self.max_value:
+            self.max_value = value
+    
+    def merge(self, other: "LatencyHistogram"):
+        """合并另一个直方图"""
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.max_value = max(self.max_value, other.max_value)
+    
+    def percentile(self, p: float) -> float:
+        """分位数（所在桶的几何中点，不超过最大值）"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(p / 100 * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if index == self.BUCKETS - 1:
+                    # 最后一个桶没有上界
+                    return self.max_value
+                # 桶的几何中点
+                value = self.MIN_VALUE * self.GROWTH ** max(0.0, index - 0.5)
+                return min(value, self.max_value)
+        return self.max_value
+    
+    def summary(self) -> Dict[str, float]:
+        return {
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max_value,
+        }
+
+
+class HourlyBucket:
+    """一个小时的实时统计"""
+    
+    __slots__ = ("hour", "tasks", "success", "failed", "total_response_time", "latency")
+    
+    def __init__(self, hour: int = -1):
+        self.reset(hour)
+    
+    def reset(self, hour: int):
+        self.hour = hour
+        self.tasks = 0
+        self.success = 0
+        self.failed = 0
+        self.total_response_time = 0.0
+        self.latency = LatencyHistogram()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "tasks": self.tasks,
+            "success": self.success,
+            "failed": self.failed,
+            "avg_response_time": self.total_response_time / self.tasks if self.tasks else 0,
+            "total_response_time": self.total_response_time,
+            **{f"{name}_response_time": value for name, value in self.latency.summary().items()},
+        }
+
+
+class RealtimeStats:
+    """
+    最近24小时的按小时统计
+
+    固定的24个槽组成环形缓冲区，按 纪元小时 % 24 定位，槽中的小时与当前小时
+    不同时就地重置，不需要扫描和删除过期的键。
+    """
+    
+    def __init__(self, hours: int = 24):
+        self.hours = hours
+        self._slots = [HourlyBucket() for _ in range(hours)]
+    
+    def add(self, result: ResultMessage, now: float = None):
+        """记录一个结果"""
+        hour = int((now if now is not None else time.time()) // 3600)
+        bucket = self._slots[hour % self.hours]
+        if bucket.hour != hour:
+            bucket.reset(hour)
+        
+        bucket.tasks += 1
+        if result.status == TaskStatus.SUCCESS.value:
+            bucket.success += 1
+        else:
+            bucket.failed += 1
+        if result.response_time is not None:
+            bucket.total_response_time += result.response_time
+            bucket.latency.record(result.response_time)
+    
+    def _live_buckets(self, now: float = None) -> List[HourlyBucket]:
+        current = int((now if now is not None else time.time()) // 3600)
+        return sorted(
+            (bucket for bucket in self._slots if current - self.hours < bucket.hour <= current),
+            key=lambda bucket: bucket.hour
+        )
+    
+    def snapshot(self, now: float = None) -> Dict[str, Dict[str, Any]]:
+        """按小时（YYYYmmddHH）的统计"""
+        return {
+            datetime.fromtimestamp(bucket.hour * 3600).strftime("%Y%m%d%H"): bucket.to_dict()
+            for bucket in self._live_buckets(now)
+        }
+    
+    def latency_summary(self, now: float = None) -> Dict[str, float]:
+        """最近24小时的响应时间分位数"""
+        merged = LatencyHistogram()
+        for bucket in self._live_buckets(now):
+            merged.merge(bucket.latency)
+        return merged.summary()
+
+
 class ResultCollector:
     """分布式结果收集器"""
     
@@ -115,12 +279,36 @@ class ResultCollector:
         """
         self.task_queue = task_queue
         self.config = config or StorageConfig()
+        # 与工作节点共用队列配置中的Blob存储，按 content_ref 读取和清理转存的内容
+        self.blob_store = getattr(task_queue, "blob_store", None)
+        self._last_cleanup = 0.0
         self.is_running = False
         self.collection_thread = None
         self.flush_thread = None
+        self.writer_thread = None
         self.statistics = ResultStatistics()
+        # 双缓冲：收集线程只在短锁内追加或换出缓冲区，写盘在写入线程完成
         self.result_buffer: List[ResultMessage] = []
         self.buffer_lock = threading.Lock()
+        self._write_queue: "queue.Queue[Optional[List[ResultMessage]]]" = queue.Queue(
+            maxsize=max(1, self.config.max_pending_batches)
+        )
+        self._stop_event = threading.Event()
+        self._write_lock = threading.Lock()
+        
+        # 写入流水线指标
+        self.pipeline_stats: Dict[str, Any] = {
+            "batches_written": 0,
+            "results_written": 0,
+            "failed_batches": 0,
+            "write_retries": 0,
+            "backpressure_waits": 0,
+            "backpressure_seconds": 0.0,
+            "last_flush_seconds": 0.0,
+            "max_flush_seconds": 0.0,
+        }
+        self._flush_latencies = deque(maxlen=256)
+        COLLECTOR_PENDING_BATCHES.set_function(self._write_queue.qsize)
         
         # 设置日志
         self._setup_logging()
@@ -129,7 +317,7 @@ class ResultCollector:
         self._init_storage()
         
         # 实时统计
-        self.realtime_stats: Dict[str, Any] = {}
+        self.realtime_stats = RealtimeStats()
         
         self.logger.info("结果收集器初始化完成")
     
@@ -155,6 +343,26 @@ class ResultCollector:
         (storage_path / "processed").mkdir(exist_ok=True)
         (storage_path / "exports").mkdir(exist_ok=True)
         (storage_path / "temp").mkdir(exist_ok=True)
+        
+        # 存储清单：写入和删除时登记文件大小，统计存储信息时不再遍历目录
+        self.storage_manifest = StorageManifest(storage_path / "manifest.db")
+        
+        # 原始结果按日期追加写入分段，多个收集器以消费者名称区分各自的分段
+        self.segment_store = SegmentStore(
+            storage_path / "raw",
+            max_segment_size=self.config.max_file_size,
+            compression=self.config.compression,
+            format=self.config.segment_format,
+            writer_id=getattr(self.task_queue, "consumer_name", None),
+            accounting=self.storage_manifest
+        )
+        
+        # 结果元数据索引（按状态码、域名、工作节点和时间查询）
+        self.result_index = ResultIndex(storage_path / "index.db") if self.config.index_results else None
+        
+        if self.storage_manifest.created:
+            # 首次使用清单时登记已有文件
+            self.reconcile_storage()
     
     def _get_storage_filename(self, result: ResultMessage) -> str:
         """获取存储文件名"""
@@ -177,13 +385,15 @@ class ResultCollector:
     def store_result(self, result: ResultMessage):
         """存储单个结果"""
         try:
-            # 添加到缓冲区
+            # 添加到缓冲区，满了则换出交给写入线程
+            batch = None
             with self.buffer_lock:
                 self.result_buffer.append(result)
-                
-                # 如果缓冲区满了，立即刷新
                 if len(self.result_buffer) >= self.config.batch_size:
-                    self._flush_buffer()
+                    batch = self._swap_buffer()
+            
+            if batch:
+                self._submit_batch(batch)
             
             # 更新统计
             self.statistics.add_result(result)
@@ -211,23 +421,118 @@ class ResultCollector:
             self.logger.error(f"收集结果失败: {e}")
             return False
     
+    def _swap_buffer(self) -> List[ResultMessage]:
+        """换出当前缓冲区（调用方持有 buffer_lock）"""
+        batch = self.result_buffer
+        self.result_buffer = []
+        return batch
+    
     def _flush_buffer(self):
-        """刷新缓冲区"""
-        if not self.result_buffer:
+        """刷新缓冲区：换出当前缓冲区并交给写入线程"""
+        with self.buffer_lock:
+            if not self.result_buffer:
+                return
+            batch = self._swap_buffer()
+        self._submit_batch(batch)
+    
+    def _submit_batch(self, batch: List[ResultMessage]):
+        """提交一个批次到写入队列，写入线程落后时阻塞（背压）"""
+        if not (self.writer_thread and self.writer_thread.is_alive()):
+            # 未启动写入线程（或已停止）时在调用线程中写入
+            self._write_batch(batch)
             return
         
         try:
-            with self.buffer_lock:
-                results_to_store = self.result_buffer[:]
-                self.result_buffer.clear()
-            
-            # 批量存储
-            self._batch_store(results_to_store)
-            
-            self.logger.info(f"刷新缓冲区: {len(results_to_store)} 个结果")
-            
+            self._write_queue.put_nowait(batch)
+        except queue.Full:
+            started = time.perf_counter()
+            self._write_queue.put(batch)
+            waited = time.perf_counter() - started
+            self.pipeline_stats["backpressure_waits"] += 1
+            self.pipeline_stats["backpressure_seconds"] += waited
+            COLLECTOR_BACKPRESSURE_SECONDS.inc(waited)
+    
+    def _writer_loop(self):
+        """写入线程：按提交顺序写入批次，收到None时退出"""
+        while True:
+            batch = self._write_queue.get()
+            try:
+                if batch is None:
+                    return
+                self._write_batch(batch)
+            finally:
+                self._write_queue.task_done()
+    
+    def _write_batch(self, results_to_store: List[ResultMessage]):
+        """写入一个批次并记录刷新耗时，失败时按指数退避重试"""
+        started = time.perf_counter()
+        stored = False
+        for attempt in range(self.config.write_retries + 1):
+            try:
+                with self._write_lock:
+                    # 批量存储，持久化后再确认（Stream后端据此释放消息）；只是确认失败时不重复写入
+                    if not stored:
+                        self._batch_store(results_to_store)
+                        stored = True
+                    self.task_queue.ack_results(results_to_store)
+                break
+                
+            except Exception as e:
+                if attempt == self.config.write_retries:
+                    self._fail_batch(results_to_store, stored, e)
+                    return
+                delay = self.config.write_retry_delay * 2 ** attempt
+                self.pipeline_stats["write_retries"] += 1
+                self.logger.warning(
+                    f"刷新缓冲区失败，{delay:.1f}秒后重试 ({attempt + 1}/{self.config.write_retries}): {e}"
+                )
+                time.sleep(delay)
+        
+        elapsed = time.perf_counter() - started
+        stats = self.pipeline_stats
+        stats["batches_written"] += 1
+        stats["results_written"] += len(results_to_store)
+        stats["last_flush_seconds"] = elapsed
+        stats["max_flush_seconds"] = max(stats["max_flush_seconds"], elapsed)
+        self._flush_latencies.append(elapsed)
+        COLLECTOR_RESULTS_STORED.inc(len(results_to_store))
+        COLLECTOR_FLUSH_SECONDS.observe(elapsed)
+        
+        self.logger.info(f"刷新缓冲区: {len(results_to_store)} 个结果，耗时 {elapsed * 1000:.1f}ms")
+    
+    def _fail_batch(self, results: List[ResultMessage], stored: bool, error: Exception):
+        """重试用尽：计入失败，未写入的结果放回结果队列"""
+        self.pipeline_stats["failed_batches"] += 1
+        COLLECTOR_RESULTS_FAILED.inc(len(results))
+        self.logger.error(f"刷新缓冲区失败，已重试 {self.config.write_retries} 次: {error}")
+        if stored:
+            return
+        
+        try:
+            self.task_queue.return_results(results)
+            self.logger.warning(f"{len(results)} 个结果已放回结果队列")
         except Exception as e:
-            self.logger.error(f"刷新缓冲区失败: {e}")
+            self.logger.error(f"放回结果队列失败，丢弃 {len(results)} 个结果: {e}")
+    
+    def get_pipeline_stats(self) -> Dict[str, Any]:
+        """写入流水线指标（刷新耗时分位数为最近256个批次）"""
+        latencies = sorted(self._flush_latencies)
+        
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+        
+        with self.buffer_lock:
+            buffered = len(self.result_buffer)
+        
+        return {
+            **self.pipeline_stats,
+            "buffered_results": buffered,
+            "pending_batches": self._write_queue.qsize(),
+            "flush_p50_seconds": percentile(50),
+            "flush_p95_seconds": percentile(95),
+        }
     
     def _batch_store(self, results: List[ResultMessage]):
         """批量存储结果"""
@@ -247,88 +552,44 @@ class ResultCollector:
             self._store_group(date_str, group_results)
     
     def _store_group(self, date_str: str, results: List[ResultMessage]):
-        """存储结果分组"""
-        try:
-            # 构建存储路径
-            storage_path = Path(self.config.base_path) / "raw" / f"{date_str}.json"
-            
-            # 读取现有数据
-            existing_data = []
-            if storage_path.exists():
-                with open(storage_path, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
-            
-            # 添加新结果
-            for result in results:
-                result_dict = {
-                    "task_id": result.task_id,
-                    "worker_id": result.worker_id,
-                    "status": result.status,
-                    "status_code": result.status_code,
-                    "url": getattr(result, 'url', ''),
-                    "response_time": result.response_time,
-                    "content_length": len(result.content) if result.content else 0,
-                    "timestamp": datetime.now().isoformat(),
-                    "error_message": result.error_message
-                }
-                
-                # 可选：存储完整内容（根据配置决定）
-                if hasattr(result, 'include_content') and result.include_content:
-                    result_dict["content"] = result.content
-                
-                existing_data.append(result_dict)
-            
-            # 写入文件
-            with open(storage_path, 'w', encoding='utf-8') as f:
-                json.dump(existing_data, f, ensure_ascii=False, indent=2)
+        """存储结果分组（追加到当天的活动分段）"""
+        records = []
+        for result in results:
+            result_dict = {
+                "task_id": result.task_id,
+                "worker_id": result.worker_id,
+                "status": result.status,
+                "status_code": result.status_code,
+                "url": getattr(result, 'url', ''),
+                "response_time": result.response_time,
+                "content_length": result.content_length or 0,
+                "content_ref": result.content_ref,
+                "completed_at": result.completed_at,
+                "timestamp": datetime.now().isoformat(),
+                "error_message": result.error_message
+            }
             
-            # 压缩文件（如果启用）
-            if self.config.compression:
-                compressed_path = storage_path.with_suffix('.json.gz')
-                with open(storage_path, 'rb') as f_in:
-                    with gzip.open(compressed_path, 'wb') as f_out:
-                        f_out.writelines(f_in)
-                storage_path.unlink()  # 删除原始文件
+            # 可选：存储完整内容，转存在Blob存储的内容在此读取
+            if self.config.include_content:
+                result_dict["content"] = result.load_content(self.blob_store)
+                if result_dict["content"] is None and result.content_ref:
+                    self.logger.warning(f"Blob内容不存在: {result.task_id} -> {result.content_ref}")
             
-        except Exception as e:
-            self.logger.error(f"存储分组失败: {e}")
+            records.append(result_dict)
+        
+        # 写入失败时抛出，结果不会被确认
+        self.segment_store.append(date_str, records)
+        
+        if self.result_index is not None:
+            try:
+                self.result_index.add_records(records)
+            except Exception as e:
+                # 索引可以从分段重建，不影响结果确认
+                self.logger.warning(f"更新结果索引失败: {e}")
     
     def _update_realtime_stats(self, result: ResultMessage):
         """更新实时统计"""
-        current_time = datetime.now()
-        
-        # 按小时统计
-        hour_key = current_time.strftime("%Y%m%d%H")
-        if hour_key not in self.realtime_stats:
-            self.realtime_stats[hour_key] = {
-                "tasks": 0,
-                "success": 0,
-                "failed": 0,
-                "avg_response_time": 0,
-                "total_response_time": 0
-            }
-        
-        stats = self.realtime_stats[hour_key]
-        stats["tasks"] += 1
-        stats["total_response_time"] += result.response_time
-        
-        if result.status == TaskStatus.SUCCESS.value:
-            stats["success"] += 1
-        else:
-            stats["failed"] += 1
-        
-        if stats["tasks"] > 0:
-            stats["avg_response_time"] = stats["total_response_time"] / stats["tasks"]
-        
-        # 清理过期统计（保留最近24小时）
-        cutoff_time = current_time - timedelta(hours=24)
-        expired_keys = [
-            key for key in self.realtime_stats.keys()
-            if datetime.strptime(key, "%Y%m%d%H") < cutoff_time
-        ]
-        
-        for key in expired_keys:
-            del self.realtime_stats[key]
+        self.realtime_stats.add(result)
     
     def _collect_results(self):
         """收集结果"""
@@ -346,53 +607,58 @@ class ResultCollector:
                 time.sleep(1)
     
     def _periodic_flush(self):
-        """定期刷新缓冲区"""
-        while self.is_running:
+        """定期刷新缓冲区，并按 cleanup_interval 清理超过保留期的数据"""
+        while not self._stop_event.wait(self.config.flush_interval):
             try:
-                time.sleep(self.config.flush_interval)
                 self._flush_buffer()
                 
             except Exception as e:
                 self.logger.error(f"定期刷新失败: {e}")
+            
+            if self.config.cleanup_interval and time.time() - self._last_cleanup >= self.config.cleanup_interval:
+                self._last_cleanup = time.time()
+                self.cleanup_old_data()
     
     def export_data(self, 
                    start_date: datetime, 
                    end_date: datetime, 
                    format: ExportFormat = ExportFormat.JSON,
                    output_path: str = None) -> str:
-        """导出数据"""
+        """导出数据（逐条读取分段并写出，内存占用与日期范围无关）"""
         try:
             # 构建导出路径
             if not output_path:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 output_path = f"{self.config.base_path}/exports/export_{timestamp}.{format.value}"
             
-            # 收集指定日期范围的数据
-            results = self._collect_data_in_range(start_date, end_date)
+            count = export_records(self.iter_data_in_range(start_date, end_date), output_path, format.value)
+            self.storage_manifest.upsert_file(output_path)
             
-            # 按格式导出
-            if format == ExportFormat.JSON:
-                self._export_json(results, output_path)
-            elif format == ExportFormat.CSV:
-                self._export_csv(results, output_path)
-            
-            self.logger.info(f"数据导出完成: {output_path}")
+            self.logger.info(f"数据导出完成: {output_path} ({count} 条)")
             return output_path
             
         except Exception as e:
             self.logger.error(f"数据导出失败: {e}")
             raise
     
-    def _collect_data_in_range(self, start_date: datetime, end_date: datetime) -> List[Dict]:
-        """收集指定日期范围的数据"""
-        results = []
+    def iter_data_in_range(self, start_date: datetime, end_date: datetime) -> Iterator[Dict]:
+        """逐条读取指定日期范围的数据（按目录名和文件名筛选日期，不解码范围外的数据）"""
+        for date_str in self.segment_store.days():
+            if not start_date <= datetime.strptime(date_str, "%Y%m%d") <= end_date:
+                continue
+            for segment in self.segment_store.segments(date_str):
+                try:
+                    yield from self.segment_store.read_segment(segment)
+                except Exception as e:
+                    self.logger.warning(f"读取分段失败: {segment['path']} - {e}")
         
+        # 旧版本的整日JSON文件（整个文件一次读入）
         storage_path = Path(self.config.base_path) / "raw"
         
-        for file_path in storage_path.glob("*.json*"):
+        for file_path in sorted(storage_path.glob("*.json*")):
             try:
                 # 从文件名提取日期
-                date_str = file_path.stem
+                date_str = file_path.name.split(".")[0]
                 file_date = datetime.strptime(date_str, "%Y%m%d")
                 
                 if start_date <= file_date <= end_date:
@@ -404,34 +670,14 @@ class ResultCollector:
                         with open(file_path, 'r', encoding='utf-8') as f:
                             file_data = json.load(f)
                     
-                    results.extend(file_data)
+                    yield from file_data
                     
             except Exception as e:
                 self.logger.warning(f"读取文件失败: {file_path} - {e}")
-        
-        return results
-    
-    def _export_json(self, results: List[Dict], output_path: str):
-        """导出JSON格式"""
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
     
-    def _export_csv(self, results: List[Dict], output_path: str):
-        """导出CSV格式"""
-        if not results:
-            return
-        
-        # 获取所有可能的字段
-        all_fields = set()
-        for result in results:
-            all_fields.update(result.keys())
-        
-        fields = sorted(all_fields)
-        
-        with open(output_path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fields)
-            writer.writeheader()
-            writer.writerows(results)
+    def _collect_data_in_range(self, start_date: datetime, end_date: datetime) -> List[Dict]:
+        """收集指定日期范围的数据"""
+        return list(self.iter_data_in_range(start_date, end_date))
     
     def get_statistics(self) -> Dict[str, Any]:
         """获取统计信息"""
@@ -439,27 +685,33 @@ class ResultCollector:
             "overall": asdict(self.statistics),
             "success_rate": self.statistics.get_success_rate(),
             "failure_rate": self.statistics.get_failure_rate(),
-            "realtime_stats": self.realtime_stats,
+            "realtime_stats": self.realtime_stats.snapshot(),
+            "latency": self.realtime_stats.latency_summary(),
+            "pipeline": self.get_pipeline_stats(),
             "storage_info": self._get_storage_info()
         }
     
     def _get_storage_info(self) -> Dict[str, Any]:
-        """获取存储信息"""
+        """获取存储信息（来自存储清单，数据库文件直接读取大小）"""
         try:
             storage_path = Path(self.config.base_path)
+            areas = self.storage_manifest.totals()
             
-            total_size = 0
-            file_count = 0
+            total_size = sum(area["bytes"] for area in areas.values())
+            file_count = sum(area["files"] for area in areas.values())
             
-            for file_path in storage_path.rglob("*"):
-                if file_path.is_file():
+            for file_path in _database_files(storage_path):
+                try:
                     total_size += file_path.stat().st_size
                     file_count += 1
+                except FileNotFoundError:
+                    pass
             
             return {
                 "total_size_bytes": total_size,
                 "total_size_mb": round(total_size / (1024 * 1024), 2),
                 "file_count": file_count,
+                "areas": areas,
                 "base_path": str(storage_path)
             }
             
@@ -467,8 +719,19 @@ class ResultCollector:
             self.logger.error(f"获取存储信息失败: {e}")
             return {}
     
+    def reconcile_storage(self) -> Dict[str, int]:
+        """遍历存储目录校正存储清单（清单与磁盘不一致时使用）"""
+        changes = reconcile_storage(self.config.base_path, self.storage_manifest)
+        self.logger.info(f"存储清单校正完成: {changes}")
+        return changes
+    
     def cleanup_old_data(self, days: int = None):
-        """清理旧数据"""
+        """
+        清理超过保留期的结果分段、索引记录和Blob内容
+        
+        Blob内容按最后写入时间清理，默认比结果多保留一天，覆盖结果在队列中等待的时间，
+        保证仍保留的结果记录引用的内容存在。
+        """
         if days is None:
             days = self.config.retention_days
         
@@ -478,14 +741,22 @@ class ResultCollector:
             
             removed_count = 0
             
+            for date_str in self.segment_store.days():
+                if datetime.strptime(date_str, "%Y%m%d") < cutoff_date:
+                    removed_count += self.segment_store.remove_day(date_str)
+            
+            if self.result_index is not None:
+                self.result_index.remove_before(cutoff_date.replace(hour=0, minute=0, second=0, microsecond=0))
+            
             for file_path in storage_path.glob("*.json*"):
                 try:
                     # 从文件名提取日期
-                    date_str = file_path.stem
+                    date_str = file_path.name.split(".")[0]
                     file_date = datetime.strptime(date_str, "%Y%m%d")
                     
                     if file_date < cutoff_date:
                         file_path.unlink()
+                        self.storage_manifest.remove_file(file_path)
                         removed_count += 1
                         
                 except Exception as e:
@@ -493,6 +764,11 @@ class ResultCollector:
             
             self.logger.info(f"清理旧数据完成: 删除 {removed_count} 个文件")
             
+            if self.blob_store is not None:
+                blob_days = self.config.blob_retention_days or days + 1
+                removed_blobs = self.blob_store.remove_older_than(time.time() - blob_days * 86400)
+                self.logger.info(f"清理Blob内容完成: 删除 {removed_blobs} 个")
+            
         except Exception as e:
             self.logger.error(f"清理旧数据失败: {e}")
     
@@ -501,6 +777,11 @@ class ResultCollector:
         self.logger.info("启动结果收集器...")
         
         self.is_running = True
+        self._stop_event.clear()
+        
+        # 启动写入线程
+        self.writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self.writer_thread.start()
         
         # 启动收集线程
         self.collection_thread = threading.Thread(target=self._collect_results, daemon=True)
@@ -517,9 +798,7 @@ class ResultCollector:
         self.logger.info("停止结果收集器...")
         
         self.is_running = False
-        
-        # 刷新剩余数据
-        self._flush_buffer()
+        self._stop_event.set()
         
         if self.collection_thread:
             self.collection_thread.join(timeout=5)
@@ -527,9 +806,34 @@ class ResultCollector:
         if self.flush_thread:
             self.flush_thread.join(timeout=5)
         
+        # 刷新剩余数据，等待写入线程写完已提交的批次
+        self._flush_buffer()
+        if self.writer_thread and self.writer_thread.is_alive():
+            self._write_queue.put(None)
+            self.writer_thread.join()
+        
         self.logger.info("结果收集器已停止")
 
 
+def _database_files(storage_path: Path) -> List[Path]:
+    """存储目录中的数据库文件（大小随时变化，不登记在存储清单中）"""
+    return [storage_path / f"{name}{suffix}"
+            for name in ("manifest.db", "index.db")
+            for suffix in ("", "-wal", "-shm")]
+
+
+def reconcile_storage(base_path: str, manifest: StorageManifest = None) -> Dict[str, int]:
+    """
+    遍历结果存储目录，按实际文件校正存储清单
+    
+    Returns:
+        Dict: added / updated / removed 数量
+    """
+    storage_path = Path(base_path)
+    manifest = manifest or StorageManifest(storage_path / "manifest.db")
+    return manifest.reconcile_files(exclude=_database_files(storage_path))
+
+
 if __name__ == "__main__":
     import argparse
     
@@ -537,14 +841,22 @@ if __name__ == "__main__":
     parser.add_argument("--redis-host", default="localhost", help="Redis主机")
     parser.add_argument("--redis-port", type=int, default=6379, help="Redis端口")
     parser.add_argument("--base-path", default="./data/results", help="存储路径")
+    parser.add_argument("--reconcile-storage", action="store_true", help="校正存储清单后退出")
+    parser.add_argument("--include-content", action="store_true", help="在结果分段中保存页面内容")
+    parser.add_argument("--metrics-port", type=int, help="指标HTTP服务端口（OpenMetrics）")
     
     args = parser.parse_args()
     
+    if args.reconcile_storage:
+        print(f"存储清单校正完成: {reconcile_storage(args.base_path)}")
+        raise SystemExit(0)
+    
     # 创建配置
-    config = StorageConfig(base_path=args.base_path)
+    config = StorageConfig(base_path=args.base_path, include_content=args.include_content)
     
     # 创建任务队列
-    task_queue = TaskQueue(
+    task_queue = create_task_queue(
+        get_config(),
         redis_host=args.redis_host,
         redis_port=args.redis_port
     )
@@ -552,6 +864,9 @@ if __name__ == "__main__":
     # 创建结果收集器
     collector = ResultCollector(task_queue, config)
     
+    if args.metrics_port and start_metrics_server(args.metrics_port):
+        print(f"指标服务: http://0.0.0.0:{args.metrics_port}/metrics")
+    
     try:
         collector.start()
         
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结果流式导出
+Streaming Result Export
+
+逐条读取结果分段并写出，导出期间只在内存中保留一个批次，内存占用与导出的
+日期范围无关。所有格式使用同一个固定字段表（RESULT_FIELDS），CSV不再为了
+确定表头预先扫描全部记录。
+
+支持的格式:
+- json:    JSON数组（与旧版本输出一致）
+- jsonl:   每行一条记录
+- csv:     固定表头
+- parquet / arrow: 需要 pyarrow，列类型固定，按批写入
+"""
+
+import csv
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Tuple
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# 结果记录的固定字段表: (字段名, 类型)
+RESULT_FIELDS: List[Tuple[str, str]] = [
+    ("task_id", "string"),
+    ("worker_id", "string"),
+    ("status", "string"),
+    ("status_code", "int32"),
+    ("url", "string"),
+    ("response_time", "float64"),
+    ("content_length", "int64"),
+    ("content_ref", "string"),
+    ("completed_at", "timestamp"),
+    ("timestamp", "timestamp"),
+    ("error_message", "string"),
+    ("content", "string"),
+]
+
+FIELD_NAMES = [name for name, _ in RESULT_FIELDS]
+
+EXPORT_FORMATS = ("json", "jsonl", "csv", "parquet", "arrow")
+
+DEFAULT_BATCH_SIZE = 10000
+
+# 整数列的取值范围 [-bound, bound)
+_INT_BOUNDS = {"int32": 2 ** 31, "int64": 2 ** 63}
+
+
+def arrow_schema():
+    """结果记录的Arrow schema"""
+    _require_pyarrow()
+    types = {
+        "string": pyarrow.string(),
+        "int32": pyarrow.int32(),
+        "int64": pyarrow.int64(),
+        "float64": pyarrow.float64(),
+        "timestamp": pyarrow.timestamp("us"),
+    }
+    return pyarrow.schema([(name, types[kind]) for name, kind in RESULT_FIELDS])
+
+
+def _require_pyarrow():
+    if pyarrow is None:
+        raise ImportError("Parquet/Arrow 导出需要 pyarrow，请执行 pip install pyarrow")
+
+
+def _coerce(value: Any, kind: str) -> Any:
+    """把记录中的值转换为字段类型，无法转换或超出整数列范围时为空"""
+    if value is None or value == "":
+        return None
+    try:
+        if kind == "string":
+            return value if isinstance(value, str) else str(value)
+        if kind in _INT_BOUNDS:
+            number = int(value)
+            return number if -_INT_BOUNDS[kind] <= number < _INT_BOUNDS[kind] else None
+        if kind == "float64":
+            return float(value)
+        if kind == "timestamp":
+            return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return value
+
+
+def export_records(records: Iterable[Dict[str, Any]],
+                   output_path: str,
+                   format: str = "json",
+                   batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    流式导出记录
+
+    Args:
+        records: 记录迭代器（按需读取）
+        output_path: 输出文件路径
+        format: json / jsonl / csv / parquet / arrow
+        batch_size: Parquet/Arrow 每个批次的记录数
+
+    Returns:
+        int: 导出的记录数
+    """
+    if format == "json":
+        return _write_json(records, output_path)
+    if format == "jsonl":
+        return _write_jsonl(records, output_path)
+    if format == "csv":
+        return _write_csv(records, output_path)
+    if format in ("parquet", "arrow"):
+        return _write_arrow(records, output_path, format, batch_size)
+    raise ValueError(f"不支持的导出格式: {format}")
+
+
+def _write_json(records: Iterable[Dict[str, Any]], output_path: str) -> int:
+    count = 0
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for record in records:
+            f.write(",\n" if count else "\n")
+            f.write(json.dumps(record, ensure_ascii=False, default=str))
+            count += 1
+        f.write("\n]\n" if count else "]\n")
+    return count
+
+
+def _write_jsonl(records: Iterable[Dict[str, Any]], output_path: str) -> int:
+    count = 0
+    with open(output_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, default=str))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def _write_csv(records: Iterable[Dict[str, Any]], output_path: str) -> int:
+    count = 0
+    with open(output_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELD_NAMES, extrasaction="ignore")
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            count += 1
+    return count
+
+
+def _write_arrow(records: Iterable[Dict[str, Any]], output_path: str, format: str, batch_size: int) -> int:
+    _require_pyarrow()
+    schema = arrow_schema()
+    if format == "parquet":
+        writer = pyarrow.parquet.ParquetWriter(output_path, schema, compression="zstd")
+    else:
+        writer = pyarrow.ipc.new_file(output_path, schema)
+
+    count = 0
+    columns: Dict[str, List[Any]] = {name: [] for name in FIELD_NAMES}
+
+    def flush():
+        batch = pyarrow.record_batch([columns[name] for name in FIELD_NAMES], schema=schema)
+        writer.write_batch(batch)
+        for values in columns.values():
+            values.clear()
+
+    try:
+        for record in records:
+            for name, kind in RESULT_FIELDS:
+                columns[name].append(_coerce(record.get(name), kind))
+            count += 1
+            if count % batch_size == 0:
+                flush()
+        if count % batch_size or not count:
+            flush()
+    finally:
+        writer.close()
+    return count
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结果二级索引
+Result Secondary Index
+
+结果收集器每次刷新时把本批结果的元数据批量写入内嵌的SQLite表，按状态码、域名、
+工作节点和时间的查询走B树索引，不再需要导出并解码全部结果分段。索引只是分段的
+派生数据，损坏或缺失时可以用 reindex 从分段重建。
+
+命令行:
+    python -m distributed.result_index query --status-code 429 --since 1d
+    python -m distributed.result_index percentiles --group-by domain --since 1d
+    python -m distributed.result_index counts --by status_code
+    python -m distributed.result_index reindex
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+from urllib.parse import urlparse
+
+TimeArg = Union[datetime, str, float, None]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    task_id TEXT PRIMARY KEY,
+    url TEXT,
+    domain TEXT,
+    status TEXT,
+    status_code INTEGER,
+    worker_id TEXT,
+    response_time REAL,
+    content_length INTEGER,
+    error_message TEXT,
+    completed_at REAL,
+    stored_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_results_stored_at ON results (stored_at);
+CREATE INDEX IF NOT EXISTS idx_results_status_code ON results (status_code, stored_at);
+CREATE INDEX IF NOT EXISTS idx_results_status ON results (status, stored_at);
+CREATE INDEX IF NOT EXISTS idx_results_domain ON results (domain, stored_at);
+CREATE INDEX IF NOT EXISTS idx_results_worker ON results (worker_id, stored_at);
+"""
+
+COLUMNS = (
+    "task_id", "url", "domain", "status", "status_code", "worker_id",
+    "response_time", "content_length", "error_message", "completed_at", "stored_at",
+)
+
+# 可用于分组统计的列
+GROUP_COLUMNS = ("domain", "worker_id", "status", "status_code")
+
+
+def _epoch(value: TimeArg) -> Optional[float]:
+    """
+    时间参数转换为时间戳
+
+    支持 datetime、时间戳、ISO时间字符串，以及相对当前时间的 30m / 12h / 7d
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    units = {"m": "minutes", "h": "hours", "d": "days"}
+    if value[-1:] in units and value[:-1].isdigit():
+        return (datetime.now() - timedelta(**{units[value[-1]]: int(value[:-1])})).timestamp()
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _row(record: Dict[str, Any]) -> tuple:
+    """结果记录转换为表中的一行"""
+    url = record.get("url") or ""
+    return (
+        record.get("task_id"),
+        url,
+        urlparse(url).netloc.lower(),
+        record.get("status"),
+        record.get("status_code"),
+        record.get("worker_id"),
+        record.get("response_time"),
+        record.get("content_length"),
+        record.get("error_message"),
+        _epoch(record.get("completed_at")),
+        _epoch(record.get("timestamp")),
+    )
+
+
+class ResultIndex:
+    """结果元数据的SQLite索引"""
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: 数据库文件路径，":memory:" 表示内存数据库
+        """
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if self.db_path != ":memory:":
+            # WAL模式下查询不阻塞写入
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def add_records(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        批量写入结果记录（同一任务的新结果覆盖旧结果）
+
+        Returns:
+            int: 写入的记录数
+        """
+        rows = [_row(record) for record in records if record.get("task_id")]
+        if not rows:
+            return 0
+        placeholders = ", ".join("?" * len(COLUMNS))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO results ({', '.join(COLUMNS)}) VALUES ({placeholders})", rows
+            )
+        return len(rows)
+
+    def remove_before(self, before: TimeArg) -> int:
+        """删除 stored_at 早于指定时间的记录，返回删除数"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM results WHERE stored_at < ?", (_epoch(before),))
+        return cursor.rowcount
+
+    def _where(self, filters: Dict[str, Any], since: TimeArg, until: TimeArg) -> tuple:
+        clauses, params = [], []
+        for column, value in filters.items():
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value.lower() if column == "domain" else value)
+        if since is not None:
+            clauses.append("stored_at >= ?")
+            params.append(_epoch(since))
+        if until is not None:
+            clauses.append("stored_at < ?")
+            params.append(_epoch(until))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def query(self,
+              status: str = None,
+              status_code: int = None,
+              domain: str = None,
+              worker_id: str = None,
+              since: TimeArg = None,
+              until: TimeArg = None,
+              limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        按条件查询结果（按写入时间倒序）
+
+        Args:
+            status: 任务状态
+            status_code: HTTP状态码
+            domain: 域名
+            worker_id: 工作节点ID
+            since, until: 写入时间范围 [since, until)
+            limit: 最多返回的记录数
+
+        Returns:
+            List[Dict]: 结果记录
+        """
+        where, params = self._where(
+            {"status": status, "status_code": status_code, "domain": domain, "worker_id": worker_id},
+            since, until
+        )
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM results{where} ORDER BY stored_at DESC LIMIT ?", params + [limit]
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """按任务ID查询"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM results WHERE task_id = ?", (task_id,)).fetchone()
+        return dict(row) if row else None
+
+    def count_by(self, column: str, since: TimeArg = None, until: TimeArg = None) -> Dict[Any, int]:
+        """按列分组计数"""
+        if column not in GROUP_COLUMNS:
+            raise ValueError(f"不支持的分组列: {column}")
+        where, params = self._where({}, since, until)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {column}, COUNT(*) FROM results{where} GROUP BY {column} ORDER BY COUNT(*) DESC",
+                params
+            ).fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def response_time_percentiles(self,
+                                  group_by: str = "domain",
+                                  percentiles: Sequence[float] = (50, 95, 99),
+                                  since: TimeArg = None,
+                                  until: TimeArg = None,
+                                  limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        分组响应时间分位数（最近邻秩）
+
+        Returns:
+            List[Dict]: 每组 {group_by: 值, "count": n, "p50": ..., ...}，按请求数倒序
+        """
+        if group_by not in GROUP_COLUMNS:
+            raise ValueError(f"不支持的分组列: {group_by}")
+        where, params = self._where({}, since, until)
+        where = (where + " AND" if where else " WHERE") + " response_time IS NOT NULL"
+        selects = ", ".join(
+            f"MIN(CASE WHEN rn >= {p / 100.0} * total THEN response_time END) AS \"p{p:g}\""
+            for p in percentiles
+        )
+        sql = f"""
+            SELECT grp AS {group_by}, total AS count, {selects}
+            FROM (
+                SELECT {group_by} AS grp, response_time,
+                       ROW_NUMBER() OVER (PARTITION BY {group_by} ORDER BY response_time) AS rn,
+                       COUNT(*) OVER (PARTITION BY {group_by}) AS total
+                FROM results{where}
+            )
+            GROUP BY grp ORDER BY total DESC LIMIT ?
+        """
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit]).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self) -> int:
+        """索引中的记录数"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def rebuild(self, segment_store, batch_size: int = 10000) -> int:
+        """
+        清空索引并从结果分段重建
+
+        Returns:
+            int: 写入的记录数
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM results")
+
+        total = 0
+        batch = []
+        for date_str in segment_store.days():
+            for record in segment_store.read_day(date_str):
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    total += self.add_records(batch)
+                    batch.clear()
+        total += self.add_records(batch)
+        return total
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def main():
+    import argparse
+    from pathlib import Path
+
+    from .segment_store import SegmentStore
+
+    parser = argparse.ArgumentParser(description="结果索引查询")
+    parser.add_argument("--base-path", default="./data/results", help="结果存储路径")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    time_args = argparse.ArgumentParser(add_help=False)
+    time_args.add_argument("--since", help="开始时间（ISO时间或 30m / 12h / 7d）")
+    time_args.add_argument("--until", help="结束时间（ISO时间或 30m / 12h / 7d）")
+
+    query_parser = subparsers.add_parser("query", parents=[time_args], help="按条件查询结果")
+    query_parser.add_argument("--status", help="任务状态")
+    query_parser.add_argument("--status-code", type=int, help="HTTP状态码")
+    query_parser.add_argument("--domain", help="域名")
+    query_parser.add_argument("--worker", help="工作节点ID")
+    query_parser.add_argument("--limit", type=int, default=100, help="最多返回的记录数")
+
+    percentile_parser = subparsers.add_parser("percentiles", parents=[time_args], help="分组响应时间分位数")
+    percentile_parser.add_argument("--group-by", choices=GROUP_COLUMNS, default="domain")
+    percentile_parser.add_argument("--limit", type=int, default=20, help="最多返回的分组数")
+
+    count_parser = subparsers.add_parser("counts", parents=[time_args], help="分组计数")
+    count_parser.add_argument("--by", choices=GROUP_COLUMNS, default="status_code")
+
+    subparsers.add_parser("reindex", help="从结果分段重建索引")
+
+    args = parser.parse_args()
+    base_path = Path(args.base_path)
+    index = ResultIndex(base_path / "index.db")
+
+    if args.command == "query":
+        rows = index.query(status=args.status, status_code=args.status_code, domain=args.domain,
+                           worker_id=args.worker, since=args.since, until=args.until, limit=args.limit)
+        for row in rows:
+            print(json.dumps(row, ensure_ascii=False))
+    elif args.command == "percentiles":
+        for row in index.response_time_percentiles(args.group_by, since=args.since,
+                                                   until=args.until, limit=args.limit):
+            print(json.dumps(row, ensure_ascii=False))
+    elif args.command == "counts":
+        print(json.dumps(index.count_by(args.by, since=args.since, until=args.until),
+                         ensure_ascii=False, indent=2))
+    elif args.command == "reindex":
+        store = SegmentStore(base_path / "raw", writer_id="reindex")
+        print(f"重建索引完成: {index.rebuild(store)} 条")
+
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
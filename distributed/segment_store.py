@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+追加写入的分段结果存储
+Append-Only Segmented Result Storage
+
+结果按日期分目录，每个收集器进程（写入者）向自己的活动分段追加记录，分段超过
+大小上限后滚动到新分段。每次刷新只追加本批记录并更新一个很小的清单文件，
+代价与批大小成正比，与当天已写入的数据量无关。
+
+目录结构:
+    raw/{YYYYMMDD}/{writer}-{seq:05d}.jsonl.gz   分段（jsonl 或 msgpack，可选gzip）
+    raw/{YYYYMMDD}/{writer}.manifest.json        该写入者当天的分段清单
+
+启用压缩时每批记录写成一个独立的gzip成员追加到分段末尾（多成员gzip文件可以
+直接顺序解压），分段始终处于压缩状态，不需要事后重写。清单记录每个分段已提交
+的字节数和记录数，读取时只读到该位置，进程崩溃留下的不完整尾部会被忽略并在
+同一写入者下一次追加前截断。
+"""
+
+import gzip
+import io
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_SUFFIX = ".manifest.json"
+SEGMENT_FORMATS = ("jsonl", "msgpack")
+
+
+def _write_json_atomic(path: Path, data: Dict[str, Any]):
+    """先写临时文件再原子替换，避免读到不完整的清单"""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class _BoundedReader(io.RawIOBase):
+    """只读取文件前 limit 个字节"""
+
+    def __init__(self, f, limit: int):
+        self._f = f
+        self._remaining = limit
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        data = self._f.read(size)
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+
+class SegmentStore:
+    """按日期分目录、按大小滚动的追加写入分段存储"""
+
+    def __init__(self,
+                 base_dir: str,
+                 max_segment_size: int = 100 * 1024 * 1024,
+                 compression: bool = True,
+                 format: str = "jsonl",
+                 writer_id: str = None,
+                 accounting=None):
+        """
+        Args:
+            base_dir: 存储目录（其下按日期分目录）
+            max_segment_size: 分段大小上限（字节），超过后滚动到新分段
+            compression: 是否以gzip成员压缩每批记录
+            format: 分段格式 jsonl / msgpack
+            writer_id: 写入者名称，多个收集器共享目录时必须不同，默认 主机名-进程号
+            accounting: 存储清单（utils.storage_manifest.StorageManifest），
+                写入和删除分段时同步登记文件大小
+        """
+        if format not in SEGMENT_FORMATS:
+            raise ValueError(f"不支持的分段格式: {format}")
+        if format == "msgpack" and msgpack is None:
+            raise ImportError("msgpack 未安装，请执行 pip install msgpack")
+
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.max_segment_size = max_segment_size
+        self.compression = compression
+        self.format = format
+        self.writer_id = writer_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.accounting = accounting
+        self._lock = threading.Lock()
+        # 本写入者各日期的清单缓存
+        self._manifests: Dict[str, Dict[str, Any]] = {}
+
+    # ---- 写入 ----
+
+    def append(self, date_str: str, records: List[Dict[str, Any]]) -> int:
+        """
+        追加一批记录到该日期的活动分段
+
+        Args:
+            date_str: 日期（YYYYMMDD）
+            records: 记录列表
+
+        Returns:
+            int: 写入的字节数
+        """
+        if not records:
+            return 0
+
+        data = self._encode(records)
+        with self._lock:
+            manifest = self._load_own_manifest(date_str)
+            segment = manifest["segments"][-1] if manifest["segments"] else None
+            if segment is None or segment["bytes"] >= self.max_segment_size:
+                segment = self._new_segment(manifest)
+
+            path = self.base_dir / date_str / segment["name"]
+            with open(path, "ab") as f:
+                if f.tell() != segment["bytes"]:
+                    # 上次写入后未提交到清单的尾部（进程崩溃），丢弃
+                    f.truncate(segment["bytes"])
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+            now = datetime.now().isoformat()
+            segment["bytes"] += len(data)
+            segment["records"] += len(records)
+            segment["updated"] = now
+            self._save_manifest(date_str, manifest)
+
+        if self.accounting is not None:
+            try:
+                self.accounting.upsert_file(path)
+                self.accounting.upsert_file(self.base_dir / date_str / f"{self.writer_id}{MANIFEST_SUFFIX}")
+            except Exception as e:
+                # 存储清单可以校正，不影响分段写入
+                logger.warning(f"更新存储清单失败: {e}")
+        return len(data)
+
+    def _encode(self, records: List[Dict[str, Any]]) -> bytes:
+        """编码一批记录"""
+        if self.format == "msgpack":
+            data = b"".join(msgpack.packb(record, use_bin_type=True, default=str) for record in records)
+        else:
+            data = "".join(
+                json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records
+            ).encode("utf-8")
+        if self.compression:
+            data = gzip.compress(data, compresslevel=6)
+        return data
+
+    def _new_segment(self, manifest: Dict[str, Any]) -> Dict[str, Any]:
+        """在清单中登记一个新分段"""
+        seq = len(manifest["segments"]) + 1
+        suffix = ".jsonl" if self.format == "jsonl" else ".msgpack"
+        if self.compression:
+            suffix += ".gz"
+        now = datetime.now().isoformat()
+        segment = {
+            "name": f"{self.writer_id}-{seq:05d}{suffix}",
+            "format": self.format,
+            "compression": "gzip" if self.compression else None,
+            "bytes": 0,
+            "records": 0,
+            "created": now,
+            "updated": now,
+        }
+        manifest["segments"].append(segment)
+        return segment
+
+    def _load_own_manifest(self, date_str: str) -> Dict[str, Any]:
+        """读取本写入者的清单（缓存）"""
+        manifest = self._manifests.get(date_str)
+        if manifest is None:
+            day_dir = self.base_dir / date_str
+            day_dir.mkdir(parents=True, exist_ok=True)
+            path = day_dir / f"{self.writer_id}{MANIFEST_SUFFIX}"
+            if path.exists():
+                with open(path, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+            else:
+                manifest = {"date": date_str, "writer": self.writer_id, "segments": []}
+            # 只缓存当前日期附近的清单
+            if len(self._manifests) >= 4:
+                self._manifests.pop(min(self._manifests))
+            self._manifests[date_str] = manifest
+        return manifest
+
+    def _save_manifest(self, date_str: str, manifest: Dict[str, Any]):
+        path = self.base_dir / date_str / f"{self.writer_id}{MANIFEST_SUFFIX}"
+        _write_json_atomic(path, manifest)
+
+    # ---- 读取 ----
+
+    def days(self) -> List[str]:
+        """有分段的日期（升序）"""
+        return sorted(
+            path.name for path in self.base_dir.iterdir()
+            if path.is_dir() and len(path.name) == 8 and path.name.isdigit()
+        )
+
+    def segments(self, date_str: str) -> List[Dict[str, Any]]:
+        """
+        该日期所有写入者的已提交分段（按创建时间排序）
+
+        Returns:
+            List[Dict]: 清单条目，附加 path 字段
+        """
+        day_dir = self.base_dir / date_str
+        if not day_dir.is_dir():
+            return []
+
+        with self._lock:
+            own = self._manifests.get(date_str)
+            own = json.loads(json.dumps(own)) if own else None
+
+        segments = []
+        for manifest_path in day_dir.glob(f"*{MANIFEST_SUFFIX}"):
+            if own is not None and manifest_path.name == f"{self.writer_id}{MANIFEST_SUFFIX}":
+                manifest = own
+            else:
+                try:
+                    with open(manifest_path, "r", encoding="utf-8") as f:
+                        manifest = json.load(f)
+                except (OSError, ValueError):
+                    continue
+            for segment in manifest.get("segments", []):
+                segment = dict(segment)
+                segment["date"] = date_str
+                segment["path"] = str(day_dir / segment["name"])
+                segments.append(segment)
+
+        segments.sort(key=lambda segment: (segment["created"], segment["name"]))
+        return segments
+
+    def read_segment(self, segment: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """逐条读取一个分段中已提交的记录"""
+        if not segment["bytes"]:
+            return
+        with open(segment["path"], "rb") as raw:
+            stream = io.BufferedReader(_BoundedReader(raw, segment["bytes"]))
+            if segment.get("compression") == "gzip":
+                stream = gzip.GzipFile(fileobj=stream, mode="rb")
+
+            if segment.get("format", "jsonl") == "msgpack":
+                if msgpack is None:
+                    raise ImportError("msgpack 未安装，请执行 pip install msgpack")
+                yield from msgpack.Unpacker(stream, raw=False)
+            else:
+                for line in stream:
+                    if line.strip():
+                        yield json.loads(line)
+
+    def read_day(self, date_str: str) -> Iterator[Dict[str, Any]]:
+        """逐条读取某一天的记录"""
+        for segment in self.segments(date_str):
+            yield from self.read_segment(segment)
+
+    def day_info(self, date_str: str) -> Dict[str, Any]:
+        """某一天的分段数、记录数和字节数（只读清单）"""
+        segments = self.segments(date_str)
+        return {
+            "date": date_str,
+            "segments": len(segments),
+            "records": sum(segment["records"] for segment in segments),
+            "bytes": sum(segment["bytes"] for segment in segments),
+        }
+
+    # ---- 清理 ----
+
+    def remove_day(self, date_str: str) -> int:
+        """
+        删除某一天的全部分段和清单
+
+        Returns:
+            int: 删除的文件数
+        """
+        day_dir = self.base_dir / date_str
+        removed = 0
+        with self._lock:
+            self._manifests.pop(date_str, None)
+            if not day_dir.is_dir():
+                return 0
+            for path in day_dir.iterdir():
+                try:
+                    path.unlink()
+                    removed += 1
+                except OSError:
+                    pass
+            try:
+                day_dir.rmdir()
+            except OSError:
+                pass
+        if self.accounting is not None:
+            try:
+                self.accounting.remove_prefix(day_dir)
+            except Exception as e:
+                logger.warning(f"更新存储清单失败: {e}")
+        return removed
@@ -0,0 +1,844 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于Redis Streams的任务队列后端
+Redis Streams Task Queue Backend
+
+任务、结果和状态消息分别写入Stream，并按角色使用消费者组：
+- workers:     工作节点消费任务，完成后 XACK + XDEL
+- collectors:  结果收集器消费结果，持久化后 XACK，可水平扩展多个收集器
+- monitoring:  监控系统读取状态消息（NOACK）
+
+任务Stream与列表后端的路由队列一一对应（键名前缀多一级 stream），工作节点按
+路由拉取。卡住的任务由 XAUTOCLAIM 回收并重新投递，超过任务的 max_retries 后
+移入死信队列；结果和状态Stream按 MAXLEN 近似裁剪。
+
+StreamTaskQueue 供调度器、结果收集器和监控系统使用，AsyncStreamTaskQueue
+供工作节点在事件循环中使用。
+"""
+
+import os
+import time
+import socket
+from collections import deque
+from operator import itemgetter
+from typing import Dict, List, Optional, Any, Deque, Callable
+
+from redis.exceptions import ResponseError
+
+from .task_queue import (
+    TaskQueue, TaskMessage, ResultMessage, StatusMessage, TaskStatus, Priority,
+    route_queue_names, route_retry_queue, dequeue_order
+)
+from .async_task_queue import AsyncTaskQueue
+
+
+# 将到期的延迟任务原子地追加到重试Stream（路由任务回到原路由的重试Stream），
+# 并返回下一个任务的到期时间
+# KEYS[1]: 延迟队列(ZSET)  KEYS[2]: 共享重试Stream  KEYS[3]: 路由任务的目标重试Stream(HASH)
+# ARGV[1]: 当前时间戳      ARGV[2]: 单次最多迁移的任务数
+PROMOTE_DELAYED_TO_STREAM_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, task_id in ipairs(due) do
+    local target = redis.call('HGET', KEYS[3], task_id)
+    if target then
+        redis.call('HDEL', KEYS[3], task_id)
+    else
+        target = KEYS[2]
+    end
+    redis.call('XADD', target, '*', 'task_id', task_id)
+end
+if #due > 0 then
+    redis.call('ZREM', KEYS[1], unpack(due))
+end
+local next_due = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+if next_due[2] then
+    return {#due, next_due[2]}
+end
+return {#due, '-1'}
+"""
+
+# 确认任务条目并从Stream删除，条目已被回收（不在待处理列表中）时不做修改
+# KEYS[1]: 任务Stream  KEYS[2..]: 任务结束时一并清除的投递计数(HASH)
+# ARGV[1]: 消费者组  ARGV[2]: 条目ID  ARGV[3]: 任务ID
+ACK_STREAM_ENTRY_SCRIPT = """
+if redis.call('XACK', KEYS[1], ARGV[1], ARGV[2]) == 0 then
+    return 0
+end
+redis.call('XDEL', KEYS[1], ARGV[2])
+for i = 2, #KEYS do
+    redis.call('HDEL', KEYS[i], ARGV[3])
+end
+return 1
+"""
+
+# 归还已读取但未执行的任务：确认原条目并作为新条目追加到同一Stream
+# KEYS[1]: 任务Stream
+# ARGV[1]: 消费者组  ARGV[2]: 条目ID  ARGV[3]: 任务ID
+REQUEUE_STREAM_ENTRY_SCRIPT = """
+if redis.call('XACK', KEYS[1], ARGV[1], ARGV[2]) == 0 then
+    return 0
+end
+redis.call('XDEL', KEYS[1], ARGV[2])
+redis.call('XADD', KEYS[1], '*', 'task_id', ARGV[3])
+return 1
+"""
+
+# 回收超时未确认的任务条目：XAUTOCLAIM 认领后确认并删除原条目，投递次数加一，
+# 未超过上限（任务的 max_retries）时作为新条目追加到同一Stream，超过时移入死信队列
+# KEYS[1]: 任务Stream  KEYS[2]: 投递次数(HASH)  KEYS[3]: 投递次数上限(HASH)  KEYS[4]: 死信队列
+# ARGV[1]: 消费者组  ARGV[2]: 最小空闲时间（毫秒）  ARGV[3]: 单次最多回收数
+# ARGV[4]: 未登记上限的任务使用的默认上限
+# 返回 {重新投递的任务ID, 移入死信队列的任务ID}
+REAP_STREAM_SCRIPT = """
+local claimed = redis.call('XAUTOCLAIM', KEYS[1], ARGV[1], 'reaper', ARGV[2], '0-0', 'COUNT', ARGV[3])
+local requeued = {}
+local dead = {}
+for _, entry in ipairs(claimed[2]) do
+    local entry_id, fields = entry[1], entry[2]
+    local task_id = nil
+    if fields then
+        for i = 1, #fields, 2 do
+            if fields[i] == 'task_id' then
+                task_id = fields[i + 1]
+            end
+        end
+    end
+    if task_id then
+        local deliveries = redis.call('HINCRBY', KEYS[2], task_id, 1)
+        local limit = tonumber(redis.call('HGET', KEYS[3], task_id) or ARGV[4])
+        if deliveries > limit then
+            redis.call('LPUSH', KEYS[4], task_id)
+            redis.call('HDEL', KEYS[2], task_id)
+            redis.call('HDEL', KEYS[3], task_id)
+            table.insert(dead, task_id)
+        else
+            redis.call('XADD', KEYS[1], '*', 'task_id', task_id)
+            table.insert(requeued, task_id)
+        end
+    end
+    redis.call('XACK', KEYS[1], ARGV[1], entry_id)
+    redis.call('XDEL', KEYS[1], entry_id)
+end
+return {requeued, dead}
+"""
+
+# 路由迁移：将尚未投递的条目移到新路由的Stream并写入新的任务数据
+# 条目已被删除或已投递给工作节点（在待处理列表中）时跳过，由租约回收后的下一次迁移处理
+# KEYS[1]: 原Stream  KEYS[2]: 任务存储(HASH)
+# ARGV[1]: 消费者组，之后每个任务依次为 条目ID、任务ID、目标Stream、任务数据
+MOVE_STREAM_ENTRIES_SCRIPT = """
+local moved = 0
+for i = 2, #ARGV, 4 do
+    local entry_id = ARGV[i]
+    if #redis.call('XRANGE', KEYS[1], entry_id, entry_id) > 0
+            and #redis.call('XPENDING', KEYS[1], ARGV[1], entry_id, entry_id, 1) == 0 then
+        redis.call('XDEL', KEYS[1], entry_id)
+        redis.call('HSET', KEYS[2], ARGV[i + 1], ARGV[i + 3])
+        redis.call('XADD', ARGV[i + 2], '*', 'task_id', ARGV[i + 1])
+        moved = moved + 1
+    end
+end
+return moved
+"""
+
+
+def _iter_stream_response(response) -> List[tuple]:
+    """统一 XREADGROUP 在 RESP2/RESP3 下的返回格式为 [(stream, entries)]"""
+    if not response:
+        return []
+    if isinstance(response, dict):
+        return list(response.items())
+    return list(response)
+
+
+class _StreamBackend:
+    """同步和异步Stream队列共用的键名和本地缓冲"""
+
+    WORKER_GROUP = "workers"
+    COLLECTOR_GROUP = "collectors"
+    MONITOR_GROUP = "monitoring"
+
+    def _init_streams(self):
+        """Stream键名（路由和优先级的组织方式与列表后端相同）"""
+        self.stream_prefix = f"{self.queue_prefix}:stream"
+        self.task_streams = route_queue_names(self.stream_prefix)
+        self.retry_stream = route_retry_queue(self.stream_prefix)
+        self.result_stream = f"{self.stream_prefix}:results"
+        self.status_stream = f"{self.stream_prefix}:status"
+
+        # 本节点按出队顺序拉取的任务Stream，下标即优先级排名
+        self._stream_order = dequeue_order(self.stream_prefix, self.routes)
+        self._stream_rank = {name: rank for rank, name in enumerate(self._stream_order)}
+
+        # 本地状态：已交付未确认的任务 task_id -> (stream, 条目ID)，已读取未交付的任务
+        self._inflight: Dict[str, tuple] = {}
+        self._buffered: List[tuple] = []
+
+    def _task_stream(self, priority: int, route: str = None) -> str:
+        """路由的对应优先级任务Stream"""
+        streams = route_queue_names(self.stream_prefix, route)
+        return streams.get(priority, streams[Priority.NORMAL.value])
+
+    def _retry_target(self, route: str) -> str:
+        """路由任务延迟重试到期后进入的重试Stream"""
+        return route_retry_queue(self.stream_prefix, route)
+
+    def _task_stream_pattern(self) -> str:
+        """所有任务Stream（共享和各路由）的匹配模式"""
+        return f"{self.stream_prefix}:tasks:*"
+
+    def _reap_stream_call(self, stream: str, limit: int) -> dict:
+        """回收脚本的键名和参数"""
+        return dict(
+            keys=[stream, self.lease_deliveries, self.lease_limits, self.dead_letter_queue],
+            args=[self.WORKER_GROUP, int(self.visibility_timeout * 1000), limit, TaskMessage.max_retries]
+        )
+
+    def _buffer_tasks(self, response):
+        """暂存 XREADGROUP 读取的任务条目，它们已在该消费者的待处理列表中"""
+        for stream, entries in _iter_stream_response(response):
+            for entry_id, fields in entries:
+                self._buffered.append((self._stream_rank[stream], stream, entry_id, fields["task_id"]))
+
+    def _take_buffered(self, count: int) -> List[tuple]:
+        """按优先级取出最多 count 个暂存的任务并记为已交付（同一Stream内保持读取顺序）"""
+        self._buffered.sort(key=itemgetter(0))
+        taken, self._buffered = self._buffered[:count], self._buffered[count:]
+        for _, stream, entry_id, task_id in taken:
+            self._inflight[task_id] = (stream, entry_id)
+        return [(stream, task_id) for _, stream, _, task_id in taken]
+
+    def _held_entries(self) -> Dict[str, List[str]]:
+        """本进程持有的任务条目（已交付和暂存），按Stream分组"""
+        by_stream: Dict[str, List[str]] = {}
+        for stream, entry_id in self._inflight.values():
+            by_stream.setdefault(stream, []).append(entry_id)
+        for _, stream, entry_id, _ in self._buffered:
+            by_stream.setdefault(stream, []).append(entry_id)
+        return by_stream
+
+    def _ack_keys(self, stream: str, finished: bool) -> List[str]:
+        """确认脚本的键名（任务结束时一并清除投递计数）"""
+        keys = [stream]
+        if finished:
+            keys += [self.lease_deliveries, self.lease_limits]
+        return keys
+
+
+class StreamTaskQueue(_StreamBackend, TaskQueue):
+    """基于Redis Streams和消费者组的任务队列（调度器、结果收集器和监控系统使用）"""
+
+    def __init__(self,
+                 *args,
+                 consumer_name: str = None,
+                 result_maxlen: int = 100000,
+                 claim_idle_ms: int = 60000,
+                 result_batch_size: int = 100,
+                 **kwargs):
+        """
+        初始化Stream任务队列
+
+        Args:
+            consumer_name: 本进程在结果/状态消费者组中的名称，默认 主机名-进程号
+            result_maxlen: 结果Stream保留的最大消息数（近似裁剪）
+            claim_idle_ms: 结果消息空闲多久后可被其他收集器认领（毫秒）
+            result_batch_size: 结果收集器单次读取的消息数
+            其余参数同 TaskQueue；可靠投递始终开启，visibility_timeout 即任务认领超时
+        """
+        self.consumer_name = consumer_name or f"{socket.gethostname()}-{os.getpid()}"
+        self.result_maxlen = result_maxlen
+        self.claim_idle_ms = claim_idle_ms
+        self.result_batch_size = result_batch_size
+
+        # 已读取未交付的结果
+        self._buffered_results: Deque[ResultMessage] = deque()
+        self._last_result_claim = 0.0
+
+        kwargs["reliable"] = True
+        super().__init__(*args, **kwargs)
+        self._init_streams()
+
+        self._promote_stream_script = self.redis_client.register_script(PROMOTE_DELAYED_TO_STREAM_SCRIPT)
+        self._ack_entry_script = self.redis_client.register_script(ACK_STREAM_ENTRY_SCRIPT)
+        self._reap_stream_script = self.redis_client.register_script(REAP_STREAM_SCRIPT)
+        self._move_entries_script = self.payload_client.register_script(MOVE_STREAM_ENTRIES_SCRIPT)
+        self._ensure_groups()
+
+    def _ensure_groups(self):
+        """创建消费者组（已存在时忽略）"""
+        groups = [(stream, self.WORKER_GROUP) for stream in self._stream_order]
+        groups.append((self.result_stream, self.COLLECTOR_GROUP))
+        groups.append((self.status_stream, self.MONITOR_GROUP))
+
+        for stream, group in groups:
+            self._create_group(stream, group)
+
+    def _create_group(self, stream: str, group: str):
+        """创建消费者组，从Stream开头读取（已存在时忽略）"""
+        try:
+            self.redis_client.xgroup_create(stream, group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def _push_task_id(self, priority: int, task_id: str, route: str = None):
+        """将任务ID追加到路由的对应优先级Stream"""
+        self.redis_client.xadd(self._task_stream(priority, route), {"task_id": task_id})
+
+    def promote_due_tasks(self) -> Optional[float]:
+        """将到期的延迟任务迁移到重试Stream"""
+        moved, next_due = self._promote_stream_script(
+            keys=[self.delayed_queue, self.retry_stream, self.retry_routes],
+            args=[time.time(), self.promote_batch_size]
+        )
+        if int(moved):
+            self._update_stats("tasks_promoted", int(moved))
+        next_due = float(next_due)
+        return next_due if next_due >= 0 else None
+
+    def _pop_task_id(self, worker_id: str, timeout: float) -> Optional[tuple]:
+        """
+        通过 XREADGROUP 读取任务
+
+        一次读取可能从多个Stream各返回一条，多出的条目暂存在本地，
+        下次按优先级优先交付；它们已在该消费者的PEL中，崩溃后会被回收
+        """
+        if time.time() - self._last_reap >= self.reaper_interval:
+            self.reap_expired_leases()
+
+        deadline = time.time() + timeout
+        while not self._buffered:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+
+            next_due = self.promote_due_tasks()
+            if next_due is not None:
+                remaining = min(remaining, max(0.1, next_due - time.time()))
+
+            self._buffer_tasks(self.redis_client.xreadgroup(
+                self.WORKER_GROUP,
+                worker_id,
+                {stream: ">" for stream in self._stream_order},
+                count=1,
+                block=max(1, int(remaining * 1000))
+            ))
+
+        return self._take_buffered(1)[0]
+
+    def ack_task(self, task_id: str, worker_id: str, finished: bool = False) -> bool:
+        """
+        确认任务并从Stream删除对应条目
+
+        条目已被 XAUTOCLAIM 回收并重新投递时不做修改，不影响新条目的持有者
+        """
+        entry = self._inflight.pop(task_id, None)
+        acked = False
+        if entry:
+            stream, entry_id = entry
+            acked = bool(self._ack_entry_script(
+                keys=self._ack_keys(stream, finished), args=[self.WORKER_GROUP, entry_id, task_id]
+            ))
+        if not acked:
+            self._update_stats("stale_acks", 1)
+            print(f"⚠️ 租约已不属于工作节点 {worker_id}，忽略确认: {task_id}")
+        return acked
+
+    def extend_leases(self, worker_id: str, visibility_timeout: float = None) -> int:
+        """重新认领本进程持有的任务条目，重置其空闲时间"""
+        extended = 0
+        for stream, entry_ids in self._held_entries().items():
+            claimed = self.redis_client.xclaim(
+                stream, self.WORKER_GROUP, worker_id,
+                min_idle_time=0, message_ids=entry_ids, justid=True
+            )
+            extended += len(claimed)
+        return extended
+
+    def reap_expired_leases(self, limit: int = 100) -> List[str]:
+        """
+        通过 XAUTOCLAIM 回收所有任务Stream中超时未确认的任务
+
+        每次回收计为一次重新投递，任务作为新条目追加到原Stream的末尾；
+        超过任务的 max_retries 后移入死信队列并标记为失败。
+
+        Args:
+            limit: 每个Stream单次最多回收的任务数
+
+        Returns:
+            List[str]: 被重新投递的任务ID
+        """
+        self._last_reap = time.time()
+        requeued, dead = [], []
+
+        for stream in self.redis_client.scan_iter(match=self._task_stream_pattern()):
+            try:
+                stream_requeued, stream_dead = self._reap_stream_script(**self._reap_stream_call(stream, limit))
+            except ResponseError as e:
+                # 还没有工作节点拉取的路由Stream没有消费者组，也就没有待回收的条目
+                if "NOGROUP" not in str(e):
+                    print(f"❌ 回收超时任务失败: {stream}: {e}")
+                continue
+            requeued.extend(stream_requeued)
+            dead.extend(stream_dead)
+
+        if requeued:
+            self._update_stats("tasks_redelivered", len(requeued))
+            print(f"♻️ 已重新投递 {len(requeued)} 个超时未确认的任务")
+        for task_id in dead:
+            self._update_task_status(task_id, TaskStatus.FAILED.value)
+        if dead:
+            self._update_stats("tasks_dead", len(dead))
+            print(f"💀 {len(dead)} 个任务超过最大重新投递次数，移入死信队列")
+        return requeued
+
+    def reroute_tasks(self, route: str, resolve: Callable[[TaskMessage], Optional[str]],
+                      batch_size: int = 500) -> int:
+        """
+        将某个路由Stream中尚未投递的任务重新分配路由
+
+        按条目顺序逐批读取调用时已有的条目，改变路由的任务在Lua脚本中移到新路由的
+        Stream并更新存储中的 route；路由不变的任务留在原位，顺序不变。已投递给
+        工作节点的条目不受影响，其超时回收后由下一次调用继续迁移。
+
+        Args:
+            route: 原路由
+            resolve: 返回任务新路由的函数，None 表示共享Stream
+            batch_size: 每批读取的条目数
+
+        Returns:
+            int: 迁移的任务数
+        """
+        streams = list(route_queue_names(self.stream_prefix, route).values())
+        retry_stream = route_retry_queue(self.stream_prefix, route)
+        streams.append(retry_stream)
+        moved = 0
+
+        for stream in streams:
+            last = self.redis_client.xrevrange(stream, count=1)
+            if not last:
+                continue
+            # 脚本通过消费者组的待处理列表判断条目是否已投递
+            self._create_group(stream, self.WORKER_GROUP)
+
+            start, end = "-", last[0][0]
+            while True:
+                entries = self.redis_client.xrange(stream, min=start, max=end, count=batch_size)
+                if not entries:
+                    break
+                start = f"({entries[-1][0]}"
+
+                task_ids = [fields.get("task_id") for _, fields in entries]
+                payloads = self.payload_client.hmget(self.task_storage, task_ids)
+                args = [self.WORKER_GROUP]
+                for (entry_id, _), task_id, payload in zip(entries, task_ids, payloads):
+                    if not payload:
+                        continue
+                    task = self._decode(TaskMessage, payload)
+                    new_route = resolve(task)
+                    if new_route == route:
+                        continue
+                    task.route = new_route
+                    if stream == retry_stream:
+                        target = self._retry_target(new_route)
+                    else:
+                        target = self._task_stream(task.priority, new_route)
+                    args.extend([entry_id, task_id, target, self._encode(task)])
+
+                if len(args) > 1:
+                    moved += int(self._move_entries_script(keys=[stream, self.task_storage], args=args))
+                if len(entries) < batch_size:
+                    break
+
+        if moved:
+            self._update_stats("tasks_rerouted", moved)
+            print(f"🔀 已将路由 {route} 的 {moved} 个任务重新分配")
+        return moved
+
+    def list_routes(self) -> List[str]:
+        """列出当前有等待任务的路由"""
+        base = f"{self.stream_prefix}:tasks:route:"
+        routes = set()
+        for stream in self.redis_client.scan_iter(match=f"{base}*"):
+            # 确认后的条目会被删除，空Stream不代表有等待的任务
+            if self.redis_client.xlen(stream):
+                routes.add(stream[len(base):].rsplit(":", 1)[0])
+        return sorted(routes)
+
+    def _publish_result(self, result: ResultMessage):
+        """发布结果到结果Stream"""
+        self._offload_result_content(result)
+        self.payload_client.xadd(
+            self.result_stream, {"payload": self._encode(result)},
+            maxlen=self.result_maxlen, approximate=True
+        )
+
+    def _publish_status(self, status_msg: StatusMessage):
+        """发布状态到状态Stream"""
+        self.payload_client.xadd(
+            self.status_stream, {"payload": self._encode(status_msg)},
+            maxlen=self.status_maxlen, approximate=True
+        )
+
+    def read_status_updates(self, consumer: str = None, count: int = 100) -> List[StatusMessage]:
+        """以 monitoring 消费者组读取状态消息（无需确认）"""
+        try:
+            response = self.payload_client.xreadgroup(
+                self.MONITOR_GROUP,
+                consumer or self.consumer_name,
+                {self.status_stream: ">"},
+                count=count,
+                noack=True
+            )
+            return [
+                self._decode(StatusMessage, fields[b"payload"])
+                for _, entries in _iter_stream_response(response)
+                for _, fields in entries
+            ]
+        except Exception as e:
+            print(f"❌ 读取状态消息失败: {e}")
+            return []
+
+    def _claim_stale_results(self):
+        """认领其他收集器长时间未确认的结果"""
+        self._last_result_claim = time.time()
+        claimed = self.payload_client.xautoclaim(
+            self.result_stream, self.COLLECTOR_GROUP, self.consumer_name,
+            min_idle_time=self.claim_idle_ms, start_id="0-0", count=self.result_batch_size
+        )
+        entries = claimed[1] if claimed else []
+        self._buffer_results(entries)
+        if entries:
+            print(f"♻️ 认领了 {len(entries)} 条未确认的结果")
+
+    def _buffer_results(self, entries: List[tuple]):
+        """解析结果条目（二进制字段）并暂存，记录条目ID以便持久化后确认"""
+        for entry_id, fields in entries:
+            if not fields or b"payload" not in fields:
+                continue
+            result = self._decode(ResultMessage, fields[b"payload"])
+            result._stream_entry_id = entry_id
+            self._buffered_results.append(result)
+
+    def get_result(self, timeout: int = 1) -> Optional[ResultMessage]:
+        """以 collectors 消费者组读取结果，结果需在持久化后通过 ack_results 确认"""
+        try:
+            if not self._buffered_results and \
+                    time.time() - self._last_result_claim >= self.claim_idle_ms / 1000:
+                self._claim_stale_results()
+
+            if not self._buffered_results:
+                response = self.payload_client.xreadgroup(
+                    self.COLLECTOR_GROUP,
+                    self.consumer_name,
+                    {self.result_stream: ">"},
+                    count=self.result_batch_size,
+                    block=max(1, int(timeout * 1000))
+                )
+                for _, entries in _iter_stream_response(response):
+                    self._buffer_results(entries)
+
+            return self._buffered_results.popleft() if self._buffered_results else None
+
+        except Exception as e:
+            print(f"❌ 获取结果失败: {e}")
+            return None
+
+    def ack_results(self, results: List[ResultMessage]):
+        """确认结果已持久化"""
+        entry_ids = [
+            result._stream_entry_id for result in results
+            if getattr(result, "_stream_entry_id", None)
+        ]
+        if entry_ids:
+            self.redis_client.xack(self.result_stream, self.COLLECTOR_GROUP, *entry_ids)
+
+    def return_results(self, results: List[ResultMessage]):
+        """
+        将未能持久化的结果放回本地缓冲区的出队端，由本收集器优先重新读取
+
+        条目仍在本消费者的待处理列表中，进程退出后由其他收集器在空闲超时后认领。
+        已转存到Blob存储的内容只保留引用。
+        """
+        for result in reversed(results):
+            if result.content_ref:
+                result.content = None
+            self._buffered_results.appendleft(result)
+
+    def get_queue_stats(self) -> Dict[str, Any]:
+        """获取队列统计信息（队列长度为共享Stream，待处理数为本节点拉取的Stream）"""
+        try:
+            shared = list(self.task_streams.values()) + [self.retry_stream]
+            pipe = self.redis_client.pipeline()
+            for stream in shared:
+                pipe.xlen(stream)
+            for stream in self._stream_order:
+                pipe.xpending(stream, self.WORKER_GROUP)
+            pipe.xlen(self.result_stream)
+            pipe.xpending(self.result_stream, self.COLLECTOR_GROUP)
+            pipe.zcard(self.delayed_queue)
+            pipe.llen(self.dead_letter_queue)
+            pipe.hlen(self.worker_registry)
+            pipe.hgetall(self.stats_key)
+            replies = pipe.execute()
+
+            n, m = len(shared), len(self._stream_order)
+            lengths, pendings = replies[:n], replies[n:n + m]
+            result_length, result_pending, delayed, dead, workers, task_stats = replies[n + m:]
+
+            stats = {}
+            for priority, length in zip(self.task_streams, lengths):
+                stats[f"queue_{priority}_length"] = length
+            stats["retry_queue_length"] = lengths[-1]
+            stats["delayed_queue_length"] = delayed
+            stats["leased_tasks"] = sum(p["pending"] for p in pendings)
+            stats["dead_letter_queue_length"] = dead
+            stats["result_queue_length"] = result_length
+            stats["result_pending"] = result_pending["pending"]
+            stats["active_workers"] = workers
+            stats.update({k: int(v) for k, v in task_stats.items()})
+
+            return stats
+
+        except Exception as e:
+            print(f"❌ 获取统计信息失败: {e}")
+            return {}
+
+    def clear_queues(self):
+        """清空所有队列和Stream（仅用于测试）"""
+        super().clear_queues()
+        streams = list(self.redis_client.scan_iter(match=f"{self.stream_prefix}:*"))
+        if streams:
+            self.redis_client.delete(*streams)
+        self._inflight.clear()
+        self._buffered.clear()
+        self._buffered_results.clear()
+        self._ensure_groups()
+
+
+class AsyncStreamTaskQueue(_StreamBackend, AsyncTaskQueue):
+    """基于Redis Streams的异步任务队列（工作节点使用），与 StreamTaskQueue 使用相同的Stream"""
+
+    def __init__(self,
+                 *args,
+                 result_maxlen: int = 100000,
+                 claim_idle_ms: int = 60000,
+                 **kwargs):
+        """
+        初始化异步Stream任务队列（连接在 initialize() 中建立）
+
+        Args:
+            result_maxlen: 结果Stream保留的最大消息数（近似裁剪）
+            claim_idle_ms: 结果消息的认领超时（毫秒），工作节点不读取结果，仅与配置保持一致
+            其余参数同 AsyncTaskQueue；可靠投递始终开启，visibility_timeout 即任务认领超时
+        """
+        self.result_maxlen = result_maxlen
+        self.claim_idle_ms = claim_idle_ms
+        kwargs["reliable"] = True
+        super().__init__(*args, **kwargs)
+        self._init_streams()
+
+    async def initialize(self):
+        """建立连接池、注册Lua脚本并创建本节点拉取的任务Stream的消费者组"""
+        await super().initialize()
+        self._promote_stream_script = self.redis_client.register_script(PROMOTE_DELAYED_TO_STREAM_SCRIPT)
+        self._ack_entry_script = self.redis_client.register_script(ACK_STREAM_ENTRY_SCRIPT)
+        self._requeue_entry_script = self.redis_client.register_script(REQUEUE_STREAM_ENTRY_SCRIPT)
+        self._reap_stream_script = self.redis_client.register_script(REAP_STREAM_SCRIPT)
+        for stream in self._stream_order:
+            try:
+                await self.redis_client.xgroup_create(stream, self.WORKER_GROUP, id="0", mkstream=True)
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+    def _push_task_id(self, pipe, task: TaskMessage):
+        """在流水线中将任务ID追加到路由的对应优先级Stream"""
+        pipe.xadd(self._task_stream(task.priority, task.route), {"task_id": task.task_id})
+
+    def _publish_result(self, pipe, result: ResultMessage):
+        """在流水线中发布结果到结果Stream"""
+        pipe.xadd(
+            self.result_stream, {"payload": self._encode(result)},
+            maxlen=self.result_maxlen, approximate=True
+        )
+
+    def _publish_status(self, pipe, status_msg: StatusMessage):
+        """在流水线中发布状态到状态Stream"""
+        pipe.xadd(
+            self.status_stream, {"payload": self._encode(status_msg)},
+            maxlen=self.status_maxlen, approximate=True
+        )
+
+    async def _pop_task_ids(self, worker_id: str, count: int, timeout: float) -> List[tuple]:
+        """
+        通过 XREADGROUP 按优先级读取最多 count 个任务
+
+        所有Stream为空时在Redis端阻塞等待；一次读取可能从多个Stream各返回
+        count 条，多出的条目暂存在本地，下次优先交付，心跳时随已交付的条目一起续期
+
+        Returns:
+            List[tuple]: [(来源Stream, 任务ID), ...]，超时返回空列表
+        """
+        if time.time() - self._last_reap >= self.reaper_interval:
+            await self.reap_expired_leases()
+
+        deadline = time.time() + timeout
+        while not self._buffered:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return []
+
+            next_due = await self.promote_due_tasks()
+            if next_due is not None:
+                remaining = min(remaining, max(0.1, next_due - time.time()))
+
+            self._buffer_tasks(await self.redis_client.xreadgroup(
+                self.WORKER_GROUP,
+                worker_id,
+                {stream: ">" for stream in self._stream_order},
+                count=count,
+                block=max(1, int(remaining * 1000))
+            ))
+
+        return self._take_buffered(count)
+
+    async def requeue_tasks(self, tasks: List[TaskMessage]):
+        """
+        将已取出但未执行的任务作为新条目追加回原Stream（关闭时归还预取的任务）
+
+        Stream只能在末尾追加，归还的任务排在已等待的任务之后；条目已被回收的任务跳过。
+
+        Args:
+            tasks: 任务列表，按希望的出队顺序排列
+        """
+        if not tasks:
+            return
+        try:
+            returned = []
+            for task in tasks:
+                entry = self._inflight.pop(task.task_id, None)
+                if entry and await self._requeue_entry_script(
+                        keys=[entry[0]], args=[self.WORKER_GROUP, entry[1], task.task_id]):
+                    returned.append(task.task_id)
+            if not returned:
+                return
+
+            pending = self._task_status(TaskStatus.PENDING.value)
+            await self.redis_client.hset(self.task_status_key, mapping={task_id: pending for task_id in returned})
+            print(f"↩️ 已归还 {len(returned)} 个未执行的任务")
+
+        except Exception as e:
+            print(f"❌ 归还任务失败: {e}")
+
+    async def _release_buffered(self):
+        """将已读取但未交付的任务条目追加回原Stream"""
+        buffered, self._buffered = self._buffered, []
+        for _, stream, entry_id, task_id in buffered:
+            await self._requeue_entry_script(keys=[stream], args=[self.WORKER_GROUP, entry_id, task_id])
+
+    async def promote_due_tasks(self) -> Optional[float]:
+        """将到期的延迟任务迁移到重试Stream"""
+        moved, next_due = await self._promote_stream_script(
+            keys=[self.delayed_queue, self.retry_stream, self.retry_routes],
+            args=[time.time(), self.promote_batch_size]
+        )
+        if int(moved):
+            await self._update_stats("tasks_promoted", int(moved))
+        next_due = float(next_due)
+        return next_due if next_due >= 0 else None
+
+    async def ack_task(self, task_id: str, worker_id: str, finished: bool = False) -> bool:
+        """确认任务并从Stream删除对应条目（条目已被回收时不做修改并返回False）"""
+        entry = self._inflight.pop(task_id, None)
+        acked = False
+        if entry:
+            stream, entry_id = entry
+            acked = bool(await self._ack_entry_script(
+                keys=self._ack_keys(stream, finished), args=[self.WORKER_GROUP, entry_id, task_id]
+            ))
+        if not acked:
+            await self._update_stats("stale_acks", 1)
+            print(f"⚠️ 租约已不属于工作节点 {worker_id}，忽略确认: {task_id}")
+        return acked
+
+    async def extend_leases(self, worker_id: str, visibility_timeout: float = None) -> int:
+        """重新认领本进程持有的任务条目，重置其空闲时间（随心跳调用）"""
+        extended = 0
+        for stream, entry_ids in self._held_entries().items():
+            claimed = await self.redis_client.xclaim(
+                stream, self.WORKER_GROUP, worker_id,
+                min_idle_time=0, message_ids=entry_ids, justid=True
+            )
+            extended += len(claimed)
+        return extended
+
+    async def reap_expired_leases(self, limit: int = 100) -> List[str]:
+        """回收所有任务Stream中超时未确认的任务（超过最大重新投递次数的移入死信队列）"""
+        self._last_reap = time.time()
+        requeued, dead = [], []
+
+        async for stream in self.redis_client.scan_iter(match=self._task_stream_pattern()):
+            try:
+                stream_requeued, stream_dead = await self._reap_stream_script(
+                    **self._reap_stream_call(stream, limit)
+                )
+            except ResponseError as e:
+                if "NOGROUP" not in str(e):
+                    print(f"❌ 回收超时任务失败: {stream}: {e}")
+                continue
+            requeued.extend(stream_requeued)
+            dead.extend(stream_dead)
+
+        if requeued:
+            await self._update_stats("tasks_redelivered", len(requeued))
+            print(f"♻️ 已重新投递 {len(requeued)} 个超时未确认的任务")
+        if dead:
+            failed = self._task_status(TaskStatus.FAILED.value)
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hset(self.task_status_key, mapping={task_id: failed for task_id in dead})
+            pipe.hincrby(self.stats_key, "tasks_dead", len(dead))
+            await pipe.execute()
+            print(f"💀 {len(dead)} 个任务超过最大重新投递次数，移入死信队列")
+        return requeued
+
+    async def get_queue_stats(self) -> Dict[str, Any]:
+        """获取队列统计信息（字段与 StreamTaskQueue.get_queue_stats 一致）"""
+        try:
+            shared = list(self.task_streams.values()) + [self.retry_stream]
+            pipe = self.redis_client.pipeline(transaction=False)
+            for stream in shared:
+                pipe.xlen(stream)
+            for stream in self._stream_order:
+                pipe.xpending(stream, self.WORKER_GROUP)
+            pipe.zcard(self.delayed_queue)
+            pipe.llen(self.dead_letter_queue)
+            pipe.xlen(self.result_stream)
+            pipe.hlen(self.worker_registry)
+            pipe.hgetall(self.stats_key)
+            values = await pipe.execute()
+
+            n, m = len(shared), len(self._stream_order)
+            stats = {}
+            for priority, length in zip(self.task_streams, values):
+                stats[f"queue_{priority}_length"] = length
+            stats["retry_queue_length"] = values[n - 1]
+            stats["leased_tasks"] = sum(p["pending"] for p in values[n:n + m])
+            (stats["delayed_queue_length"], stats["dead_letter_queue_length"],
+             stats["result_queue_length"], stats["active_workers"], task_stats) = values[n + m:]
+            stats.update({k: int(v) for k, v in task_stats.items()})
+            return stats
+
+        except Exception as e:
+            print(f"❌ 获取统计信息失败: {e}")
+            return {}
+
+    async def close(self):
+        """归还暂存的任务后关闭连接池"""
+        if self.redis_client is not None:
+            try:
+                await self._release_buffered()
+            except Exception as e:
+                print(f"⚠️ 归还暂存任务失败，超时后将被回收: {e}")
+        await super().close()
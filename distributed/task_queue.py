@@ -10,15 +10,21 @@ Distributed Task Queue System
 import json
 import time
 import uuid
+import random
 import hashlib
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Union
-from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Any, Union, Callable
+from dataclasses import dataclass, asdict, fields
 from enum import Enum
 
 import redis
 from redis.exceptions import ConnectionError, TimeoutError
 
+from utils.metrics import ENQUEUE_SECONDS, DEQUEUE_SECONDS, observe_queue_wait
+
+from .codec import get_codec, decode_payload, DEFAULT_COMPRESS_THRESHOLD
+from .blob_store import BlobStore, create_blob_store
+
 
 class TaskStatus(Enum):
     """任务状态枚举"""
@@ -39,6 +45,342 @@ class Priority(Enum):
     URGENT = 4
 
 
+@dataclass
+class RetryPolicy:
+    """重试退避策略（指数退避 + 抖动）"""
+    base_delay: float = 10.0
+    max_delay: float = 600.0
+    multiplier: float = 2.0
+    jitter: float = 0.5  # 抖动比例(0-1)，实际延迟在 [delay*(1-jitter), delay] 之间
+    
+    def compute_delay(self, retry_count: int) -> float:
+        """根据已重试次数计算下一次重试延迟（秒）"""
+        delay = min(self.max_delay, self.base_delay * (self.multiplier ** max(0, retry_count)))
+        if self.jitter > 0:
+            delay *= 1 - random.uniform(0, min(1.0, self.jitter))
+        return delay
+
+
+# 按错误类别区分的默认重试策略
+DEFAULT_RETRY_POLICIES: Dict[str, RetryPolicy] = {
+    "default": RetryPolicy(),
+    "network": RetryPolicy(base_delay=5.0, max_delay=300.0),
+    "timeout": RetryPolicy(base_delay=15.0, max_delay=900.0),
+    "server_error": RetryPolicy(base_delay=30.0, max_delay=1800.0),
+    "rate_limited": RetryPolicy(base_delay=60.0, max_delay=3600.0, multiplier=3.0),
+    "blocked": RetryPolicy(base_delay=300.0, max_delay=7200.0, multiplier=3.0),
+}
+
+# 重试不会改变结果的错误类别，直接按失败处理
+NON_RETRYABLE_ERRORS = frozenset({"client_error"})
+
+
+def classify_error(status_code: int = None, error_message: str = None) -> str:
+    """
+    根据状态码和错误信息归类错误，用于选择重试策略
+    
+    Returns:
+        str: 错误类别（与 DEFAULT_RETRY_POLICIES 的键对应，client_error 不重试）
+    """
+    if status_code == 429:
+        return "rate_limited"
+    if status_code in (401, 403):
+        return "blocked"
+    if status_code == 408:
+        return "timeout"
+    if status_code is not None and 400 <= status_code < 500:
+        return "client_error"
+    if status_code is not None and status_code >= 500:
+        return "server_error"
+    
+    message = (error_message or "").lower()
+    if "timeout" in message or "超时" in message:
+        return "timeout"
+    if any(word in message for word in ("connect", "reset", "refused", "dns", "network")):
+        return "network"
+    return "default"
+
+
+# 将到期的延迟任务原子地迁移到重试队列，并返回下一个任务的到期时间
+# KEYS[1]: 延迟队列(ZSET)  KEYS[2]: 重试队列(LIST)  KEYS[3]: 路由任务的目标重试队列(HASH)
+# ARGV[1]: 当前时间戳      ARGV[2]: 单次最多迁移的任务数
+PROMOTE_DELAYED_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, task_id in ipairs(due) do
+    local target = redis.call('HGET', KEYS[3], task_id)
+    if target then
+        redis.call('HDEL', KEYS[3], task_id)
+    else
+        target = KEYS[2]
+    end
+    redis.call('LPUSH', target, task_id)
+end
+if #due > 0 then
+    redis.call('ZREM', KEYS[1], unpack(due))
+end
+local next_due = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+if next_due[2] then
+    return {#due, next_due[2]}
+end
+return {#due, '-1'}
+"""
+
+# 可靠出队：按优先级弹出第一个任务并原子地登记租约
+# KEYS[1]: 租约(ZSET, 分数为租约到期时间)  KEYS[2]: 租约来源队列(HASH)
+# KEYS[3]: 租约持有者(HASH)                KEYS[4]: 该工作节点持有的租约(SET)
+# KEYS[5..]: 按优先级排序的任务队列
+# ARGV[1]: 租约到期时间戳  ARGV[2]: 工作节点ID
+LEASE_TASK_SCRIPT = """
+for i = 5, #KEYS do
+    local task_id = redis.call('RPOP', KEYS[i])
+    if task_id then
+        redis.call('ZADD', KEYS[1], ARGV[1], task_id)
+        redis.call('HSET', KEYS[2], task_id, KEYS[i])
+        redis.call('HSET', KEYS[3], task_id, ARGV[2])
+        redis.call('SADD', KEYS[4], task_id)
+        return {KEYS[i], task_id}
+    end
+end
+return false
+"""
+
+# 批量出队：按优先级最多弹出 ARGV[1] 个任务ID
+# KEYS[1..]: 按优先级排序的任务队列
+# 返回 [队列名, 任务ID, 队列名, 任务ID, ...]
+POP_TASKS_SCRIPT = """
+local count = tonumber(ARGV[1])
+local result = {}
+for i = 1, #KEYS do
+    while #result < count * 2 do
+        local task_id = redis.call('RPOP', KEYS[i])
+        if not task_id then
+            break
+        end
+        table.insert(result, KEYS[i])
+        table.insert(result, task_id)
+    end
+end
+return result
+"""
+
+# 批量可靠出队：同 LEASE_TASK_SCRIPT，最多弹出 ARGV[3] 个任务并登记租约
+# 返回 [队列名, 任务ID, 队列名, 任务ID, ...]
+LEASE_TASKS_SCRIPT = """
+local count = tonumber(ARGV[3])
+local result = {}
+for i = 5, #KEYS do
+    while #result < count * 2 do
+        local task_id = redis.call('RPOP', KEYS[i])
+        if not task_id then
+            break
+        end
+        redis.call('ZADD', KEYS[1], ARGV[1], task_id)
+        redis.call('HSET', KEYS[2], task_id, KEYS[i])
+        redis.call('HSET', KEYS[3], task_id, ARGV[2])
+        redis.call('SADD', KEYS[4], task_id)
+        table.insert(result, KEYS[i])
+        table.insert(result, task_id)
+    end
+end
+return result
+"""
+
+# 登记阻塞出队(BRPOP)取得的任务的租约
+# KEYS[1..4]: 同 LEASE_TASK_SCRIPT
+# ARGV[1]: 租约到期时间戳  ARGV[2]: 工作节点ID  ARGV[3]: 来源队列  ARGV[4]: 任务ID
+RECORD_LEASE_SCRIPT = """
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[4])
+redis.call('HSET', KEYS[2], ARGV[4], ARGV[3])
+redis.call('HSET', KEYS[3], ARGV[4], ARGV[2])
+redis.call('SADD', KEYS[4], ARGV[4])
+return 1
+"""
+
+# 确认(释放)任务租约，仅当租约仍属于该工作节点时生效
+# （租约过期被回收并重新分配后，原节点迟到的确认不能释放新持有者的租约）
+# KEYS[1..4]: 同 LEASE_TASK_SCRIPT  KEYS[5..]: 任务结束时一并清除的投递计数(HASH)
+# ARGV[1]: 任务ID  ARGV[2]: 工作节点ID
+ACK_LEASE_SCRIPT = """
+if redis.call('HGET', KEYS[3], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[3], ARGV[1])
+redis.call('SREM', KEYS[4], ARGV[1])
+for i = 5, #KEYS do
+    redis.call('HDEL', KEYS[i], ARGV[1])
+end
+return 1
+"""
+
+# 延长某个工作节点持有的全部租约（随心跳调用），已不属于该节点的租约从其集合中移除
+# KEYS[1]: 租约ZSET  KEYS[2]: 租约持有者(HASH)  KEYS[3]: 该工作节点持有的租约(SET)
+# ARGV[1]: 新的到期时间戳  ARGV[2]: 工作节点ID
+EXTEND_LEASES_SCRIPT = """
+local extended = 0
+for _, task_id in ipairs(redis.call('SMEMBERS', KEYS[3])) do
+    if redis.call('HGET', KEYS[2], task_id) == ARGV[2] then
+        redis.call('ZADD', KEYS[1], 'XX', ARGV[1], task_id)
+        extended = extended + 1
+    else
+        redis.call('SREM', KEYS[3], task_id)
+    end
+end
+return extended
+"""
+
+# 回收过期租约：任务的投递次数加一，未超过上限（任务的 max_retries）时放回原队列的出队端
+# 以便优先重新投递，超过上限时移入死信队列，每次都使节点崩溃的任务不会被无限重新投递
+# KEYS[1..3]: 同 LEASE_TASK_SCRIPT  KEYS[4]: 投递次数(HASH)  KEYS[5]: 投递次数上限(HASH)
+# KEYS[6]: 死信队列
+# ARGV[1]: 当前时间戳  ARGV[2]: 单次最多回收数  ARGV[3]: 来源缺失时的兜底队列
+# ARGV[4]: 工作节点租约集合前缀  ARGV[5]: 未登记上限的任务使用的默认上限
+# 返回 {重新投递的任务ID, 移入死信队列的任务ID}
+REAP_LEASES_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+local requeued = {}
+local dead = {}
+for _, task_id in ipairs(expired) do
+    local source = redis.call('HGET', KEYS[2], task_id) or ARGV[3]
+    local owner = redis.call('HGET', KEYS[3], task_id)
+    local deliveries = redis.call('HINCRBY', KEYS[4], task_id, 1)
+    local limit = tonumber(redis.call('HGET', KEYS[5], task_id) or ARGV[5])
+    if deliveries > limit then
+        redis.call('LPUSH', KEYS[6], task_id)
+        redis.call('HDEL', KEYS[4], task_id)
+        redis.call('HDEL', KEYS[5], task_id)
+        table.insert(dead, task_id)
+    else
+        redis.call('RPUSH', source, task_id)
+        table.insert(requeued, task_id)
+    end
+    redis.call('HDEL', KEYS[2], task_id)
+    redis.call('HDEL', KEYS[3], task_id)
+    if owner then
+        redis.call('SREM', ARGV[4] .. owner, task_id)
+    end
+end
+if #expired > 0 then
+    redis.call('ZREM', KEYS[1], unpack(expired))
+end
+return {requeued, dead}
+"""
+
+# 路由迁移第一步：从队列出队端最多取出 ARGV[1] 个任务ID，移入暂存列表的入队端
+# （暂存列表与原队列同序，中断时整体放回原队列，任务ID不会丢失）
+# KEYS[1]: 原队列  KEYS[2]: 暂存列表
+STAGE_REROUTE_SCRIPT = """
+local task_ids = {}
+for i = 1, tonumber(ARGV[1]) do
+    local task_id = redis.call('RPOP', KEYS[1])
+    if not task_id then
+        break
+    end
+    redis.call('LPUSH', KEYS[2], task_id)
+    table.insert(task_ids, task_id)
+end
+return task_ids
+"""
+
+# 路由迁移第二步：取出暂存列表入队端的本批任务，改变路由的任务写入新的任务数据并推入
+# 新队列，路由不变的任务按原顺序留在暂存列表中
+# KEYS[1]: 暂存列表  KEYS[2]: 任务存储(HASH)
+# ARGV[1]: 本批任务数，之后每个任务依次为 任务ID、目标队列（空字符串表示路由不变）、任务数据
+COMMIT_REROUTE_SCRIPT = """
+local count = tonumber(ARGV[1])
+for i = 1, count do
+    redis.call('LPOP', KEYS[1])
+end
+local moved = 0
+for i = 0, count - 1 do
+    local task_id = ARGV[2 + i * 3]
+    local target = ARGV[3 + i * 3]
+    if target == '' then
+        redis.call('LPUSH', KEYS[1], task_id)
+    else
+        redis.call('HSET', KEYS[2], task_id, ARGV[4 + i * 3])
+        redis.call('LPUSH', target, task_id)
+        moved = moved + 1
+    end
+end
+return moved
+"""
+
+# 路由迁移结束（或中断后恢复）：将暂存列表中的任务按原顺序放回原队列的出队端
+# KEYS[1]: 暂存列表  KEYS[2]: 原队列
+RESTORE_REROUTE_SCRIPT = """
+local restored = 0
+while true do
+    local task_id = redis.call('LPOP', KEYS[1])
+    if not task_id then
+        break
+    end
+    redis.call('RPUSH', KEYS[2], task_id)
+    restored = restored + 1
+end
+return restored
+"""
+
+
+# 优先级队列名后缀
+PRIORITY_QUEUE_SUFFIXES = {
+    Priority.URGENT.value: "urgent",
+    Priority.HIGH.value: "high",
+    Priority.NORMAL.value: "normal",
+    Priority.LOW.value: "low"
+}
+
+
+def route_queue_names(queue_prefix: str, route: str = None) -> Dict[int, str]:
+    """
+    路由的优先级队列名
+
+    Args:
+        queue_prefix: 队列名称前缀
+        route: 路由（节点类型），为空时返回所有节点共享的队列
+
+    Returns:
+        Dict[int, str]: 优先级 -> 队列名
+    """
+    base = f"{queue_prefix}:tasks:route:{route}" if route else f"{queue_prefix}:tasks"
+    return {priority: f"{base}:{suffix}" for priority, suffix in PRIORITY_QUEUE_SUFFIXES.items()}
+
+
+def route_retry_queue(queue_prefix: str, route: str = None) -> str:
+    """路由的重试队列名"""
+    return f"{queue_prefix}:tasks:route:{route}:retry" if route else f"{queue_prefix}:tasks:retry"
+
+
+def shard_route(worker_id: str) -> str:
+    """工作节点独占的分片路由（按域名亲和路由时使用）"""
+    return f"shard:{worker_id}"
+
+
+def dequeue_order(queue_prefix: str, routes: List[str] = None) -> List[str]:
+    """
+    工作节点的出队顺序：同一优先级先取本节点路由的队列，再取共享队列，重试队列最后
+
+    Args:
+        queue_prefix: 队列名称前缀
+        routes: 工作节点拉取的路由
+
+    Returns:
+        List[str]: 按出队顺序排列的队列名
+    """
+    routes = [route for route in (routes or []) if route] + [None]
+    queues = [route_queue_names(queue_prefix, route) for route in routes]
+    order = [names[priority] for priority in sorted(PRIORITY_QUEUE_SUFFIXES, reverse=True) for names in queues]
+    order.extend(route_retry_queue(queue_prefix, route) for route in routes)
+    return order
+
+
+def _known_fields(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+    """过滤掉数据类中不存在的字段"""
+    names = {f.name for f in fields(cls)}
+    return {k: v for k, v in data.items() if k in names}
+
+
 @dataclass
 class TaskMessage:
     """任务消息数据结构"""
@@ -57,6 +399,9 @@ class TaskMessage:
     created_at: str = None
     scheduled_at: str = None
     worker_id: str = None
+    crawler_type: str = "default"  # http / stealth / browser，见 WorkerNode.crawlers
+    node_type: str = None  # 要求的节点类型，为空时任意节点都可执行
+    route: str = None  # 入队路由（节点类型队列），由调度器在入队时确定，为空时进入共享队列
     
     def __post_init__(self):
         if self.headers is None:
@@ -84,8 +429,8 @@ class TaskMessage:
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'TaskMessage':
-        """从字典创建实例"""
-        return cls(**data)
+        """从字典创建实例（忽略未知字段，兼容新版本节点）"""
+        return cls(**_known_fields(cls, data))
     
     @classmethod
     def from_json(cls, json_str: str) -> 'TaskMessage':
@@ -112,6 +457,9 @@ class ResultMessage:
     response_time: float = None
     error_message: str = None
     completed_at: str = None
+    content_ref: str = None  # 内容存放在Blob存储时的引用
+    content_length: int = None
+    url: str = None
     
     def __post_init__(self):
         if self.headers is None:
@@ -120,6 +468,30 @@ class ResultMessage:
             self.cookies = {}
         if self.completed_at is None:
             self.completed_at = datetime.now().isoformat()
+        if self.content_length is None and self.content is not None:
+            self.content_length = len(self.content)
+    
+    def offload_content(self, blob_store, threshold: int = 0) -> bool:
+        """
+        将超过阈值的内容写入Blob存储，消息中只保留引用
+        
+        Returns:
+            bool: 是否发生了转存
+        """
+        if self.content is None or len(self.content) < threshold:
+            return False
+        self.content_length = len(self.content)
+        self.content_ref = blob_store.put(self.content.encode("utf-8"))
+        self.content = None
+        return True
+    
+    def load_content(self, blob_store) -> Optional[str]:
+        """获取内容，必要时按引用从Blob存储读取（结果会缓存在消息上）"""
+        if self.content is None and self.content_ref and blob_store is not None:
+            data = blob_store.get(self.content_ref)
+            if data is not None:
+                self.content = data.decode("utf-8")
+        return self.content
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典"""
@@ -131,8 +503,8 @@ class ResultMessage:
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'ResultMessage':
-        """从字典创建实例"""
-        return cls(**data)
+        """从字典创建实例（忽略未知字段，兼容新版本节点）"""
+        return cls(**_known_fields(cls, data))
     
     @classmethod
     def from_json(cls, json_str: str) -> 'ResultMessage':
@@ -168,8 +540,8 @@ class StatusMessage:
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'StatusMessage':
-        """从字典创建实例"""
-        return cls(**data)
+        """从字典创建实例（忽略未知字段，兼容新版本节点）"""
+        return cls(**_known_fields(cls, data))
     
     @classmethod
     def from_json(cls, json_str: str) -> 'StatusMessage':
@@ -186,7 +558,18 @@ class TaskQueue:
                  redis_port: int = 6379,
                  redis_db: int = 0,
                  redis_password: str = None,
-                 queue_prefix: str = "crawler"):
+                 queue_prefix: str = "crawler",
+                 retry_policies: Dict[str, RetryPolicy] = None,
+                 promote_batch_size: int = 100,
+                 reliable: bool = False,
+                 visibility_timeout: float = 300,
+                 reaper_interval: float = 30,
+                 status_maxlen: int = 10000,
+                 codec: str = "json",
+                 compress_threshold: int = DEFAULT_COMPRESS_THRESHOLD,
+                 blob_store: BlobStore = None,
+                 blob_threshold: int = 64 * 1024,
+                 routes: List[str] = None):
         """
         初始化任务队列
         
@@ -196,21 +579,49 @@ class TaskQueue:
             redis_db: Redis数据库编号
             redis_password: Redis密码
             queue_prefix: 队列名称前缀
+            retry_policies: 按错误类别覆盖的重试策略
+            promote_batch_size: 每次迁移到期延迟任务的最大数量
+            reliable: 是否启用可靠出队（租约 + 可见性超时，保证至少一次投递）
+            visibility_timeout: 租约时长（秒），超时未确认的任务会被重新投递
+            reaper_interval: get_task 顺带回收过期租约的最小间隔（秒）
+            status_maxlen: 状态队列保留的最大消息数
+            codec: 消息编码 json / msgpack / orjson（读取时自动识别任意编码）
+            compress_threshold: 超过该字节数的消息会被压缩，0表示不压缩
+            blob_store: 大结果内容的Blob存储，为空时内容随消息传输
+            blob_threshold: 结果内容超过该字符数时转存到Blob存储
+            routes: 出队时除共享队列外还要拉取的路由（通常为工作节点的节点类型）
         """
         self.redis_host = redis_host
         self.redis_port = redis_port
         self.redis_db = redis_db
         self.redis_password = redis_password
         self.queue_prefix = queue_prefix
+        self.retry_policies = dict(DEFAULT_RETRY_POLICIES)
+        if retry_policies:
+            self.retry_policies.update(retry_policies)
+        self.promote_batch_size = promote_batch_size
+        self.reliable = reliable
+        self.visibility_timeout = visibility_timeout
+        self.reaper_interval = reaper_interval
+        self._last_reap = 0.0
+        self.status_maxlen = status_maxlen
+        self.codec = get_codec(codec, compress_threshold=compress_threshold)
+        self.blob_store = blob_store
+        self.blob_threshold = blob_threshold
+        self.routes = list(routes or [])
         
-        # 队列名称
-        self.task_queues = {
-            Priority.URGENT.value: f"{queue_prefix}:tasks:urgent",
-            Priority.HIGH.value: f"{queue_prefix}:tasks:high",
-            Priority.NORMAL.value: f"{queue_prefix}:tasks:normal",
-            Priority.LOW.value: f"{queue_prefix}:tasks:low"
-        }
-        self.retry_queue = f"{queue_prefix}:tasks:retry"
+        # 队列名称（共享队列，路由队列见 route_queue_names）
+        self.task_queues = route_queue_names(queue_prefix)
+        self.retry_queue = route_retry_queue(queue_prefix)
+        self.delayed_queue = f"{queue_prefix}:tasks:delayed"
+        self.retry_routes = f"{queue_prefix}:tasks:retry_routes"
+        self.lease_zset = f"{queue_prefix}:tasks:leases"
+        self.lease_sources = f"{queue_prefix}:tasks:lease_sources"
+        self.lease_owners = f"{queue_prefix}:tasks:lease_owners"
+        self.worker_lease_prefix = f"{queue_prefix}:tasks:leases:"
+        self.lease_deliveries = f"{queue_prefix}:tasks:lease_deliveries"
+        self.lease_limits = f"{queue_prefix}:tasks:lease_limits"
+        self.rerouting_prefix = f"{queue_prefix}:tasks:rerouting:"
         self.dead_letter_queue = f"{queue_prefix}:tasks:dead"
         self.result_queue = f"{queue_prefix}:results"
         self.status_queue = f"{queue_prefix}:status"
@@ -236,8 +647,27 @@ class TaskQueue:
                 socket_connect_timeout=5,
                 socket_timeout=5
             )
+            # 消息负载可能是二进制编码，读写负载使用不解码响应的客户端
+            self.payload_client = redis.Redis(
+                host=self.redis_host,
+                port=self.redis_port,
+                db=self.redis_db,
+                password=self.redis_password,
+                decode_responses=False,
+                socket_connect_timeout=5,
+                socket_timeout=5
+            )
             # 测试连接
             self.redis_client.ping()
+            self._promote_script = self.redis_client.register_script(PROMOTE_DELAYED_SCRIPT)
+            self._lease_script = self.redis_client.register_script(LEASE_TASK_SCRIPT)
+            self._record_lease_script = self.redis_client.register_script(RECORD_LEASE_SCRIPT)
+            self._ack_script = self.redis_client.register_script(ACK_LEASE_SCRIPT)
+            self._extend_script = self.redis_client.register_script(EXTEND_LEASES_SCRIPT)
+            self._reap_script = self.redis_client.register_script(REAP_LEASES_SCRIPT)
+            self._stage_reroute_script = self.redis_client.register_script(STAGE_REROUTE_SCRIPT)
+            self._commit_reroute_script = self.payload_client.register_script(COMMIT_REROUTE_SCRIPT)
+            self._restore_reroute_script = self.redis_client.register_script(RESTORE_REROUTE_SCRIPT)
             print(f"✅ 成功连接到Redis: {self.redis_host}:{self.redis_port}")
         except (ConnectionError, TimeoutError) as e:
             print(f"❌ Redis连接失败: {e}")
@@ -254,6 +684,7 @@ class TaskQueue:
         Returns:
             bool: 是否成功添加
         """
+        started = time.perf_counter()
         try:
             # 检查重复任务
             if check_duplicate:
@@ -272,18 +703,18 @@ class TaskQueue:
                 task.task_id = str(uuid.uuid4())
             
             # 存储完整任务信息
-            self.redis_client.hset(
+            self.payload_client.hset(
                 self.task_storage, 
                 task.task_id, 
-                task.to_json()
+                self._encode(task)
             )
             
-            # 添加到对应优先级队列
-            queue_name = self.task_queues.get(task.priority, self.task_queues[Priority.NORMAL.value])
-            self.redis_client.lpush(queue_name, task.task_id)
+            # 添加到路由的对应优先级队列
+            self._push_task_id(task.priority, task.task_id, task.route)
             
             # 更新统计信息
             self._update_stats("tasks_added", 1)
+            ENQUEUE_SECONDS.observe(time.perf_counter() - started)
             
             print(f"✅ 任务已添加到队列: {task.task_id} -> {task.url}")
             return True
@@ -292,6 +723,25 @@ class TaskQueue:
             print(f"❌ 添加任务失败: {e}")
             return False
     
+    def _encode(self, message) -> Union[str, bytes]:
+        """按队列配置的编码序列化消息"""
+        return self.codec.encode(message.to_dict())
+    
+    @staticmethod
+    def _decode(message_class, payload: Union[str, bytes]):
+        """反序列化任意编码的消息"""
+        return message_class.from_dict(decode_payload(payload))
+    
+    def _push_task_id(self, priority: int, task_id: str, route: str = None):
+        """将任务ID推入路由的对应优先级队列"""
+        queues = route_queue_names(self.queue_prefix, route)
+        queue_name = queues.get(priority, queues[Priority.NORMAL.value])
+        self.redis_client.lpush(queue_name, task_id)
+    
+    def _retry_target(self, route: str) -> str:
+        """路由任务延迟重试到期后进入的重试队列"""
+        return route_retry_queue(self.queue_prefix, route)
+    
     def get_task(self, worker_id: str, timeout: int = 10) -> Optional[TaskMessage]:
         """
         从队列获取任务（按优先级顺序）
@@ -304,37 +754,35 @@ class TaskQueue:
             TaskMessage: 任务消息，如果没有任务则返回None
         """
         try:
-            # 按优先级顺序检查队列
-            queue_names = [
-                self.task_queues[Priority.URGENT.value],
-                self.task_queues[Priority.HIGH.value],
-                self.task_queues[Priority.NORMAL.value],
-                self.task_queues[Priority.LOW.value],
-                self.retry_queue
-            ]
-            
-            # 使用BRPOP阻塞式获取任务
-            result = self.redis_client.brpop(queue_names, timeout=timeout)
-            
+            result = self._pop_task_id(worker_id, timeout)
             if not result:
                 return None
             
             queue_name, task_id = result
+            started = time.perf_counter()
             
             # 获取完整任务信息
-            task_json = self.redis_client.hget(self.task_storage, task_id)
-            if not task_json:
+            task_payload = self.payload_client.hget(self.task_storage, task_id)
+            if not task_payload:
                 print(f"⚠️ 任务数据不存在: {task_id}")
+                if self.reliable:
+                    self.ack_task(task_id, worker_id, finished=True)
                 return None
             
-            task = TaskMessage.from_json(task_json)
+            task = self._decode(TaskMessage, task_payload)
             task.worker_id = worker_id
             
+            # 登记任务的重新投递上限，供回收过期租约时判断
+            if self.reliable:
+                self.redis_client.hset(self.lease_limits, task_id, task.max_retries)
+            
             # 更新任务状态
             self._update_task_status(task_id, TaskStatus.RUNNING.value, worker_id)
             
             # 更新统计信息
             self._update_stats("tasks_consumed", 1)
+            DEQUEUE_SECONDS.observe(time.perf_counter() - started)
+            observe_queue_wait(task.created_at)
             
             print(f"📤 任务已分配给工作节点: {task_id} -> {worker_id}")
             return task
@@ -343,20 +791,67 @@ class TaskQueue:
             print(f"❌ 获取任务失败: {e}")
             return None
     
+    def _pop_task_id(self, worker_id: str, timeout: float) -> Optional[tuple]:
+        """
+        按优先级弹出一个任务ID
+        
+        Returns:
+            tuple: (来源队列名, 任务ID)，超时返回None
+        """
+        # 按优先级顺序检查本节点路由的队列和共享队列
+        queue_names = dequeue_order(self.queue_prefix, self.routes)
+        
+        if self.reliable and time.time() - self._last_reap >= self.reaper_interval:
+            self.reap_expired_leases()
+        
+        # 使用BRPOP阻塞式获取任务；每轮先迁移到期的延迟任务，
+        # 阻塞时间不超过下一个延迟任务的到期时间
+        deadline = time.time() + timeout
+        result = None
+        
+        while not result:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            
+            next_due = self.promote_due_tasks()
+            if next_due is not None:
+                remaining = min(remaining, max(0.1, next_due - time.time()))
+            
+            if self.reliable:
+                # 先在Lua脚本中弹出并登记租约；队列为空时改用BRPOP阻塞等待，
+                # 取到任务后立即登记租约
+                result = self._lease_next_task(worker_id, queue_names)
+                if result:
+                    break
+            
+            result = self.redis_client.brpop(queue_names, timeout=remaining)
+            if result and self.reliable:
+                self._record_lease(worker_id, *result)
+        
+        return tuple(result)
+    
     def complete_task(self, task_id: str, result: ResultMessage):
         """
         标记任务完成
         
+        可靠模式下先确认租约，租约已不属于 result.worker_id 时（过期后被重新分配）
+        丢弃该结果，任务由新的持有者完成。
+        
         Args:
             task_id: 任务ID
             result: 结果消息
         """
         try:
+            # 确认租约
+            if self.reliable and not self.ack_task(task_id, result.worker_id, finished=True):
+                return
+            
             # 更新任务状态
             self._update_task_status(task_id, result.status)
             
             # 发送结果到结果队列
-            self.redis_client.lpush(self.result_queue, result.to_json())
+            self._publish_result(result)
             
             # 更新统计信息
             if result.status == TaskStatus.SUCCESS.value:
@@ -369,41 +864,63 @@ class TaskQueue:
         except Exception as e:
             print(f"❌ 标记任务完成失败: {e}")
     
-    def retry_task(self, task_id: str, delay_seconds: int = 60):
+    def retry_task(self, task_id: str, delay_seconds: float = None, error_class: str = "default",
+                   worker_id: str = None):
         """
         重试任务
         
+        任务进入延迟队列(ZSET，分数为到期时间)，到期后才会被迁移到重试队列
+        
         Args:
             task_id: 任务ID
-            delay_seconds: 延迟重试时间（秒）
+            delay_seconds: 延迟重试时间（秒），为空时按错误类别的退避策略计算
+            error_class: 错误类别，见 classify_error
+            worker_id: 执行任务的工作节点ID（可靠模式下必须是租约持有者，否则不做任何修改）
         """
         try:
+            # 释放当前租约，由延迟队列接管
+            if self.reliable and not self.ack_task(task_id, worker_id):
+                return
+            
             # 获取任务信息
-            task_json = self.redis_client.hget(self.task_storage, task_id)
-            if not task_json:
+            task_payload = self.payload_client.hget(self.task_storage, task_id)
+            if not task_payload:
                 print(f"⚠️ 任务数据不存在: {task_id}")
                 return
             
-            task = TaskMessage.from_json(task_json)
+            task = self._decode(TaskMessage, task_payload)
             
-            # 检查重试次数
-            if task.retry_count >= task.max_retries:
+            # 检查重试次数，不可重试的错误直接移入死信队列
+            if task.retry_count >= task.max_retries or error_class in NON_RETRYABLE_ERRORS:
                 # 移动到死信队列
                 self.redis_client.lpush(self.dead_letter_queue, task_id)
+                if self.reliable:
+                    self.redis_client.hdel(self.lease_deliveries, task_id)
+                    self.redis_client.hdel(self.lease_limits, task_id)
                 self._update_task_status(task_id, TaskStatus.FAILED.value)
                 self._update_stats("tasks_dead", 1)
-                print(f"💀 任务超过最大重试次数，移入死信队列: {task_id}")
+                reason = "错误不可重试" if error_class in NON_RETRYABLE_ERRORS else "超过最大重试次数"
+                print(f"💀 任务{reason}，移入死信队列: {task_id}")
                 return
             
+            # 计算退避延迟
+            if delay_seconds is None:
+                policy = self.retry_policies.get(error_class, self.retry_policies["default"])
+                delay_seconds = policy.compute_delay(task.retry_count)
+            
             # 增加重试次数
             task.retry_count += 1
-            task.scheduled_at = (datetime.now() + timedelta(seconds=delay_seconds)).isoformat()
+            due_at = time.time() + delay_seconds
+            task.scheduled_at = datetime.fromtimestamp(due_at).isoformat()
             
-            # 更新任务信息
-            self.redis_client.hset(self.task_storage, task_id, task.to_json())
-            
-            # 添加到重试队列（延迟执行）
-            self.redis_client.lpush(self.retry_queue, task_id)
+            # 更新任务信息并加入延迟队列
+            pipe = self.payload_client.pipeline()
+            pipe.hset(self.task_storage, task_id, self._encode(task))
+            pipe.zadd(self.delayed_queue, {task_id: due_at})
+            if task.route:
+                # 到期后回到原路由的重试队列
+                pipe.hset(self.retry_routes, task_id, self._retry_target(task.route))
+            pipe.execute()
             
             # 更新任务状态
             self._update_task_status(task_id, TaskStatus.RETRY.value)
@@ -411,11 +928,221 @@ class TaskQueue:
             # 更新统计信息
             self._update_stats("tasks_retried", 1)
             
-            print(f"🔄 任务已加入重试队列: {task_id} (第{task.retry_count}次重试)")
+            print(f"🔄 任务已加入延迟重试队列: {task_id} (第{task.retry_count}次重试, {delay_seconds:.1f}秒后)")
             
         except Exception as e:
             print(f"❌ 重试任务失败: {e}")
     
+    def promote_due_tasks(self) -> Optional[float]:
+        """
+        将到期的延迟任务迁移到重试队列
+        
+        Returns:
+            float: 下一个延迟任务的到期时间戳，没有延迟任务时返回None
+        """
+        moved, next_due = self._promote_script(
+            keys=[self.delayed_queue, self.retry_queue, self.retry_routes],
+            args=[time.time(), self.promote_batch_size]
+        )
+        if int(moved):
+            self._update_stats("tasks_promoted", int(moved))
+        next_due = float(next_due)
+        return next_due if next_due >= 0 else None
+    
+    def _lease_keys(self, worker_id: str = None) -> List[str]:
+        """租约相关键名（顺序与Lua脚本约定一致）"""
+        keys = [self.lease_zset, self.lease_sources, self.lease_owners]
+        if worker_id is not None:
+            keys.append(f"{self.worker_lease_prefix}{worker_id}")
+        return keys
+    
+    def _lease_next_task(self, worker_id: str, queue_names: List[str]) -> Optional[tuple]:
+        """按优先级弹出一个任务并登记租约，返回 (队列名, 任务ID)"""
+        result = self._lease_script(
+            keys=self._lease_keys(worker_id) + queue_names,
+            args=[time.time() + self.visibility_timeout, worker_id]
+        )
+        return tuple(result) if result else None
+    
+    def _record_lease(self, worker_id: str, queue_name: str, task_id: str):
+        """登记阻塞出队取得的任务的租约"""
+        self._record_lease_script(
+            keys=self._lease_keys(worker_id),
+            args=[time.time() + self.visibility_timeout, worker_id, queue_name, task_id]
+        )
+    
+    def ack_task(self, task_id: str, worker_id: str, finished: bool = False) -> bool:
+        """
+        确认任务，释放其租约
+        
+        只有租约持有者能释放租约：租约过期被回收、又分配给其他节点后，
+        原节点迟到的确认不会影响新持有者。
+        
+        Args:
+            task_id: 任务ID
+            worker_id: 工作节点ID
+            finished: 任务是否已结束（同时清除其投递计数）
+            
+        Returns:
+            bool: 是否释放了本节点的租约（已被回收或属于其他节点时返回False）
+        """
+        keys = self._lease_keys(worker_id)
+        if finished:
+            keys += [self.lease_deliveries, self.lease_limits]
+        acked = bool(self._ack_script(keys=keys, args=[task_id, worker_id]))
+        if not acked:
+            self._update_stats("stale_acks", 1)
+            print(f"⚠️ 租约已不属于工作节点 {worker_id}，忽略确认: {task_id}")
+        return acked
+    
+    def extend_leases(self, worker_id: str, visibility_timeout: float = None) -> int:
+        """
+        延长工作节点持有的所有租约（随心跳调用）
+        
+        Args:
+            worker_id: 工作节点ID
+            visibility_timeout: 新的租约时长（秒），默认使用队列配置
+            
+        Returns:
+            int: 被延长的租约数量
+        """
+        timeout = visibility_timeout or self.visibility_timeout
+        return int(self._extend_script(
+            keys=[self.lease_zset, self.lease_owners, f"{self.worker_lease_prefix}{worker_id}"],
+            args=[time.time() + timeout, worker_id]
+        ))
+    
+    def reap_expired_leases(self, limit: int = 100) -> List[str]:
+        """
+        回收过期租约，将任务重新放回原队列
+        
+        每次回收计为一次重新投递，超过任务的 max_retries 后移入死信队列并标记为失败。
+        
+        Args:
+            limit: 单次最多回收的任务数
+            
+        Returns:
+            List[str]: 被重新投递的任务ID
+        """
+        self._last_reap = time.time()
+        try:
+            requeued, dead = self._reap_script(
+                keys=self._reap_keys(),
+                args=[time.time(), limit, self.retry_queue, self.worker_lease_prefix, TaskMessage.max_retries]
+            )
+        except Exception as e:
+            print(f"❌ 回收过期租约失败: {e}")
+            return []
+        
+        if requeued:
+            self._update_stats("tasks_redelivered", len(requeued))
+            print(f"♻️ 已重新投递 {len(requeued)} 个租约过期的任务")
+        for task_id in dead:
+            self._update_task_status(task_id, TaskStatus.FAILED.value)
+        if dead:
+            self._update_stats("tasks_dead", len(dead))
+            print(f"💀 {len(dead)} 个任务超过最大重新投递次数，移入死信队列")
+        return list(requeued)
+    
+    def _reap_keys(self) -> List[str]:
+        """回收租约脚本的键名"""
+        return self._lease_keys() + [self.lease_deliveries, self.lease_limits, self.dead_letter_queue]
+
+    def reroute_tasks(self, route: str, resolve: Callable[[TaskMessage], Optional[str]],
+                      batch_size: int = 500) -> int:
+        """
+        将某个路由队列中等待的任务重新分配路由（分片节点下线或节点类型没有在线节点时由调度器调用）
+
+        任务从出队端逐批移入暂存列表，按原顺序推入新路由的队列并更新存储中的 route，
+        之后的重试也回到新路由。移动和写入都在Lua脚本中完成，中途出错或进程退出时
+        任务ID留在暂存列表中，由 finally 或下次 restore_rerouting 放回原队列。
+        新路由不变的任务最后按原顺序放回原队列的出队端。每个队列只处理调用时已有的任务。
+        执行中的任务不受影响，其租约过期后会回到原队列，由下一次调用继续迁移。
+
+        Args:
+            route: 原路由
+            resolve: 返回任务新路由的函数，None 表示共享队列
+            batch_size: 每批迁移的任务数
+
+        Returns:
+            int: 迁移的任务数
+        """
+        queue_names = list(route_queue_names(self.queue_prefix, route).values())
+        retry_queue = route_retry_queue(self.queue_prefix, route)
+        queue_names.append(retry_queue)
+        moved = 0
+
+        for queue_name in queue_names:
+            staging = self._rerouting_list(queue_name)
+            remaining = self.redis_client.llen(queue_name)
+            try:
+                while remaining > 0:
+                    task_ids = self._stage_reroute_script(
+                        keys=[queue_name, staging], args=[min(batch_size, remaining)]
+                    )
+                    if not task_ids:
+                        break
+                    remaining -= len(task_ids)
+
+                    payloads = self.payload_client.hmget(self.task_storage, task_ids)
+                    args = [len(task_ids)]
+                    for task_id, payload in zip(task_ids, payloads):
+                        target = ""
+                        if payload:
+                            task = self._decode(TaskMessage, payload)
+                            new_route = resolve(task)
+                            if new_route != route:
+                                task.route = new_route
+                                if queue_name == retry_queue:
+                                    target = route_retry_queue(self.queue_prefix, new_route)
+                                else:
+                                    queues = route_queue_names(self.queue_prefix, new_route)
+                                    target = queues.get(task.priority, queues[Priority.NORMAL.value])
+                                payload = self._encode(task)
+                        args.extend([task_id, target, payload or b""])
+                    moved += int(self._commit_reroute_script(
+                        keys=[staging, self.task_storage], args=args
+                    ))
+            finally:
+                self._restore_reroute_script(keys=[staging, queue_name])
+
+        if moved:
+            self._update_stats("tasks_rerouted", moved)
+            print(f"🔀 已将路由 {route} 的 {moved} 个任务重新分配")
+        return moved
+
+    def restore_rerouting(self) -> int:
+        """
+        将上次路由迁移中断后留在暂存列表中的任务放回原队列（调度器启动时调用）
+
+        Returns:
+            int: 放回的任务数
+        """
+        restored = 0
+        for staging in self.redis_client.scan_iter(match=f"{self.rerouting_prefix}*"):
+            queue_name = staging[len(self.rerouting_prefix):]
+            restored += int(self._restore_reroute_script(keys=[staging, queue_name]))
+        if restored:
+            print(f"♻️ 已放回 {restored} 个路由迁移中断的任务")
+        return restored
+
+    def _rerouting_list(self, queue_name: str) -> str:
+        """路由迁移时队列对应的暂存列表"""
+        return f"{self.rerouting_prefix}{queue_name}"
+
+    def list_routes(self) -> List[str]:
+        """列出当前有等待任务的路由"""
+        base = f"{self.queue_prefix}:tasks:route:"
+        routes = {
+            key[len(base):].rsplit(":", 1)[0]
+            for key in self.redis_client.scan_iter(match=f"{base}*")
+        }
+        return sorted(routes)
+
+    def worker_status_key(self, worker_id: str) -> str:
+        """工作节点状态哈希键"""
+        return f"{self.queue_prefix}:worker:{worker_id}"
+    
     def register_worker(self, worker_id: str, node_type: str = "general"):
         """
         注册工作节点
@@ -452,26 +1179,101 @@ class TaskQueue:
         """
         try:
             # 发送状态到状态队列
-            self.redis_client.lpush(self.status_queue, status_msg.to_json())
-            
-            # 更新工作节点注册信息
-            worker_info = self.redis_client.hget(self.worker_registry, status_msg.worker_id)
-            if worker_info:
-                info = json.loads(worker_info)
-                info.update({
-                    "status": status_msg.status,
-                    "last_heartbeat": status_msg.last_heartbeat,
-                    "active_tasks": status_msg.active_tasks
-                })
-                self.redis_client.hset(
-                    self.worker_registry,
-                    status_msg.worker_id,
-                    json.dumps(info)
-                )
+            self._publish_status(status_msg)
+            
+            # 心跳同时延长该节点持有的租约
+            if self.reliable:
+                self.extend_leases(status_msg.worker_id)
+            
+            # 仪表字段直接写入节点状态哈希（注册信息只在注册时写入，不再读-改-写）
+            self.redis_client.hset(self.worker_status_key(status_msg.worker_id), mapping={
+                "status": status_msg.status,
+                "active_tasks": status_msg.active_tasks,
+                "cpu_usage": status_msg.cpu_usage,
+                "memory_usage": status_msg.memory_usage,
+                "last_heartbeat": status_msg.last_heartbeat
+            })
             
         except Exception as e:
             print(f"❌ 更新工作节点状态失败: {e}")
     
+    def _publish_result(self, result: ResultMessage):
+        """发布结果消息"""
+        self._offload_result_content(result)
+        self.payload_client.lpush(self.result_queue, self._encode(result))
+    
+    def _offload_result_content(self, result: ResultMessage):
+        """大内容转存到Blob存储，消息只携带引用"""
+        if self.blob_store is None:
+            return
+        try:
+            if result.offload_content(self.blob_store, self.blob_threshold):
+                self._update_stats("results_offloaded", 1)
+        except Exception as e:
+            # 转存失败时内容仍随消息发送
+            print(f"⚠️ 结果内容转存失败，随消息发送: {e}")
+    
+    def _publish_status(self, status_msg: StatusMessage):
+        """发布状态消息（保留最近 status_maxlen 条）"""
+        pipe = self.payload_client.pipeline()
+        pipe.lpush(self.status_queue, self._encode(status_msg))
+        pipe.ltrim(self.status_queue, 0, self.status_maxlen - 1)
+        pipe.execute()
+    
+    def read_status_updates(self, consumer: str = None, count: int = 100) -> List[StatusMessage]:
+        """
+        读取状态消息（监控系统使用）
+        
+        Args:
+            consumer: 消费者名称（列表后端忽略）
+            count: 最多读取条数
+            
+        Returns:
+            List[StatusMessage]: 状态消息列表，从旧到新
+        """
+        try:
+            items = self.payload_client.rpop(self.status_queue, count) or []
+            return [self._decode(StatusMessage, item) for item in items]
+        except Exception as e:
+            print(f"❌ 读取状态消息失败: {e}")
+            return []
+    
+    def get_result(self, timeout: int = 1) -> Optional[ResultMessage]:
+        """
+        从结果队列获取一个结果（结果收集器使用）
+        
+        Args:
+            timeout: 阻塞超时时间（秒）
+            
+        Returns:
+            ResultMessage: 结果消息，如果没有结果则返回None
+        """
+        try:
+            item = self.payload_client.brpop([self.result_queue], timeout=timeout)
+            if not item:
+                return None
+            return self._decode(ResultMessage, item[1])
+        except Exception as e:
+            print(f"❌ 获取结果失败: {e}")
+            return None
+    
+    def ack_results(self, results: List[ResultMessage]):
+        """确认结果已持久化（列表后端出队即删除，无需确认）"""
+        pass
+    
+    def return_results(self, results: List[ResultMessage]):
+        """
+        将未能持久化的结果放回结果队列的出队端，由结果收集器重新读取
+        
+        已转存到Blob存储的内容只放回引用。
+        """
+        pipe = self.payload_client.pipeline(transaction=False)
+        for result in reversed(results):
+            if result.content_ref:
+                result.content = None
+            pipe.rpush(self.result_queue, self._encode(result))
+        pipe.execute()
+    
     def get_queue_stats(self) -> Dict[str, Any]:
         """
         获取队列统计信息
@@ -487,6 +1289,8 @@ class TaskQueue:
                 stats[f"queue_{priority}_length"] = self.redis_client.llen(queue_name)
             
             stats["retry_queue_length"] = self.redis_client.llen(self.retry_queue)
+            stats["delayed_queue_length"] = self.redis_client.zcard(self.delayed_queue)
+            stats["leased_tasks"] = self.redis_client.zcard(self.lease_zset)
             stats["dead_letter_queue_length"] = self.redis_client.llen(self.dead_letter_queue)
             stats["result_queue_length"] = self.redis_client.llen(self.result_queue)
             
@@ -526,8 +1330,12 @@ class TaskQueue:
         """清空所有队列（仅用于测试）"""
         try:
             # 清空所有队列
-            all_queues = list(self.task_queues.values()) + [
+            route_queues = list(self.redis_client.scan_iter(match=f"{self.queue_prefix}:tasks:route:*"))
+            route_queues += list(self.redis_client.scan_iter(match=f"{self.rerouting_prefix}*"))
+            all_queues = list(self.task_queues.values()) + route_queues + [
                 self.retry_queue,
+                self.delayed_queue,
+                self.retry_routes,
                 self.dead_letter_queue,
                 self.result_queue,
                 self.status_queue
@@ -536,6 +1344,11 @@ class TaskQueue:
             for queue in all_queues:
                 self.redis_client.delete(queue)
             
+            # 清空租约
+            worker_lease_sets = list(self.redis_client.scan_iter(match=f"{self.worker_lease_prefix}*"))
+            self.redis_client.delete(self.lease_zset, self.lease_sources, self.lease_owners,
+                                     self.lease_deliveries, self.lease_limits, *worker_lease_sets)
+            
             # 清空存储
             self.redis_client.delete(
                 self.task_hash_set,
@@ -552,11 +1365,60 @@ class TaskQueue:
     
     def close(self):
         """关闭连接"""
+        if hasattr(self, 'payload_client'):
+            self.payload_client.close()
         if hasattr(self, 'redis_client'):
             self.redis_client.close()
             print("🔌 Redis连接已关闭")
 
 
+def create_task_queue(config=None, **overrides) -> TaskQueue:
+    """
+    根据分布式配置创建任务队列（按 queue.backend 选择列表或Stream后端）
+    
+    Args:
+        config: DistributedConfig，为空时加载当前环境配置
+        overrides: 覆盖传给队列构造函数的参数
+        
+    Returns:
+        TaskQueue: 任务队列实例
+    """
+    if config is None:
+        from .config import get_config
+        config = get_config()
+    
+    queue_config = config.queue
+    kwargs = dict(
+        redis_host=config.redis.host,
+        redis_port=config.redis.port,
+        redis_db=config.redis.db,
+        redis_password=config.redis.password,
+        queue_prefix=queue_config.prefix,
+        reliable=queue_config.reliable,
+        visibility_timeout=queue_config.visibility_timeout,
+        status_maxlen=queue_config.status_maxlen,
+        codec=queue_config.codec,
+        compress_threshold=queue_config.compress_threshold,
+        blob_store=create_blob_store(queue_config.blob_store),
+        blob_threshold=queue_config.blob_threshold
+    )
+    
+    if queue_config.backend == "stream":
+        from .stream_queue import StreamTaskQueue
+        kwargs.update(
+            result_maxlen=queue_config.result_maxlen,
+            claim_idle_ms=queue_config.claim_idle_ms
+        )
+        kwargs.update(overrides)
+        return StreamTaskQueue(**kwargs)
+    
+    if queue_config.backend != "list":
+        raise ValueError(f"不支持的队列后端: {queue_config.backend}")
+    
+    kwargs.update(overrides)
+    return TaskQueue(**kwargs)
+
+
 if __name__ == "__main__":
     # 测试代码
     queue = TaskQueue()
@@ -4,22 +4,34 @@
 分布式任务调度器
 Distributed Task Scheduler
 
-负责任务分发、负载均衡、节点监控和动态扩缩容
+负责任务路由、节点监控和动态扩缩容
+
+工作节点从队列拉取任务：每个节点拉取共享队列、本节点类型的路由队列和本节点的分片队列。
+调度器在入队时按任务要求的节点类型和路由规则决定任务进入哪个队列，
+开启域名亲和时再按域名一致性哈希到具体节点的分片，不再轮询待调度任务。
 """
 
 import asyncio
+import bisect
+import hashlib
+import heapq
+import itertools
 import json
+import operator
+import os
 import time
 import uuid
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Set
+from typing import Dict, List, Optional, Any, Set, Callable
 from dataclasses import dataclass, asdict
 from enum import Enum
 import logging
 import threading
 import random
+from urllib.parse import urlparse
 
-from .task_queue import TaskQueue, TaskMessage, StatusMessage, Priority
+from .task_queue import TaskQueue, TaskMessage, StatusMessage, Priority, shard_route, create_task_queue
+from .config import get_config
 
 
 class SchedulingStrategy(Enum):
@@ -31,6 +43,10 @@ class SchedulingStrategy(Enum):
     RESOURCE_AWARE = "resource_aware"
 
 
+# 视为在线的节点状态
+ALIVE_STATUSES = ("online", "ready", "busy")
+
+
 @dataclass
 class WorkerInfo:
     """工作节点信息"""
@@ -55,14 +71,17 @@ class WorkerInfo:
         return (self.cpu_usage + self.memory_usage) / 2 + self.active_tasks * 10
     
     @property
-    def is_healthy(self) -> bool:
-        """检查节点是否健康"""
+    def is_alive(self) -> bool:
+        """节点是否在线（不考虑负载）"""
         return (
-            self.status == "online" and
-            self.last_heartbeat > datetime.now() - timedelta(seconds=60) and
-            self.cpu_usage < 90 and
-            self.memory_usage < 90
+            self.status in ALIVE_STATUSES and
+            self.last_heartbeat > datetime.now() - timedelta(seconds=60)
         )
+    
+    @property
+    def is_healthy(self) -> bool:
+        """检查节点是否健康"""
+        return self.is_alive and self.cpu_usage < 90 and self.memory_usage < 90
 
 
 @dataclass
@@ -75,23 +94,479 @@ class SchedulingRule:
     enabled: bool = True
 
 
+# 规则条件中按任务字段比较的键，其余键按工作节点字段比较
+TASK_CONDITION_FIELDS = {
+    "priority": operator.attrgetter("priority"),
+    "crawler_type": operator.attrgetter("crawler_type")
+}
+
+# 条件运算符（两字符的在前，避免 ">= 8" 被识别为 ">"）
+CONDITION_OPERATORS = (
+    (">= ", operator.ge),
+    ("<= ", operator.le),
+    ("== ", operator.eq),
+    ("> ", operator.gt),
+    ("< ", operator.lt)
+)
+
+# 节点评级：可选 / 降级（仅在没有可选节点时使用）/ 被规则排除
+GRADE_OK, GRADE_DEMOTED, GRADE_REJECTED = 2, 1, 0
+
+
+def compile_condition(condition: Any) -> Callable[[Any], bool]:
+    """将 ">= 8" 形式的条件预编译为谓词，其他值按相等比较"""
+    if isinstance(condition, str):
+        for prefix, op in CONDITION_OPERATORS:
+            if condition.startswith(prefix):
+                threshold = float(condition[len(prefix):])
+                return lambda value: op(value, threshold)
+    return lambda value: value == condition
+
+
+@dataclass(eq=False)
+class CompiledRule:
+    """预编译的调度规则：任务侧谓词决定规则是否适用，节点侧谓词用于过滤节点"""
+    rule: SchedulingRule
+    task_predicate: Callable[[TaskMessage], bool]
+    worker_predicate: Optional[Callable[["WorkerInfo"], bool]]
+
+    @classmethod
+    def compile(cls, rule: SchedulingRule) -> 'CompiledRule':
+        task_checks = []
+        worker_checks = []
+        for key, condition in rule.conditions.items():
+            if key == "node_type_required":
+                # 节点类型由索引分桶处理
+                continue
+            check = compile_condition(condition)
+            if key in TASK_CONDITION_FIELDS:
+                task_checks.append((TASK_CONDITION_FIELDS[key], check))
+            else:
+                worker_checks.append((operator.attrgetter(key), check))
+
+        def task_predicate(task: TaskMessage) -> bool:
+            return all(check(getter(task)) for getter, check in task_checks)
+
+        worker_predicate = None
+        if worker_checks:
+            def worker_predicate(worker: WorkerInfo) -> bool:
+                return all(check(getter(worker)) for getter, check in worker_checks)
+
+        return cls(rule=rule, task_predicate=task_predicate, worker_predicate=worker_predicate)
+
+
+@dataclass(frozen=True)
+class WorkerFilter:
+    """
+    节点过滤条件：(规则, 模式) 元组，模式为 skip / demote / require
+
+    相同的过滤条件在不同任务类别之间共享，索引按它维护已评级的堆。
+    """
+    rules: tuple = ()
+
+    def grade(self, worker: WorkerInfo) -> int:
+        """按规则给节点评级"""
+        grade = GRADE_OK
+        for compiled, mode in self.rules:
+            matched = compiled.worker_predicate(worker)
+            if (mode == "skip" and matched) or (mode == "require" and not matched):
+                return GRADE_REJECTED
+            if mode == "demote" and matched:
+                grade = GRADE_DEMOTED
+        return grade
+
+
+@dataclass
+class SelectionPlan:
+    """一类任务（优先级、爬虫类型、节点类型相同）的节点选择方案"""
+    node_type: Optional[str]
+    strategy: SchedulingStrategy
+    worker_filter: WorkerFilter = WorkerFilter()
+
+
+def resource_score(worker: WorkerInfo) -> float:
+    """资源感知策略的分数（越低越好）"""
+    return (worker.cpu_usage + worker.memory_usage) / 2 * 0.7 + worker.active_tasks * 0.3
+
+
+class WorkerIndex:
+    """
+    工作节点索引
+
+    按节点类型分桶（None 桶包含全部节点）。每个 (分数, 节点类型, 过滤条件) 组合在第一次
+    使用时建立一个最小堆，条目按 (评级, 分数) 排序，评级在节点状态变化时计算一次。
+    节点更新时向已建立的堆压入新条目，旧条目按版本号惰性失效；选择时只需跳过堆顶的
+    失效和不健康条目，O(log W)。
+
+    每个桶另有一个按最近心跳时间排序的堆，判断某类型是否有在线节点时只看堆顶。
+    """
+
+    SCORES = {
+        "load": lambda worker: worker.load_score,
+        "resource": resource_score
+    }
+
+    def __init__(self):
+        self.workers: Dict[str, WorkerInfo] = {}
+        self._versions: Dict[str, int] = {}
+        self._buckets: Dict[str, Optional[str]] = {}
+        self._heaps: Dict[tuple, list] = {}
+        self._views: Dict[Optional[str], List[tuple]] = {}
+        self._members: Dict[Optional[str], List[str]] = {}
+        self._positions: Dict[Optional[str], Dict[str, int]] = {}
+        self._cursors: Dict[Optional[str], int] = {}
+        self._alive: Dict[Optional[str], list] = {}
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.workers)
+
+    def update(self, worker: WorkerInfo):
+        """新增节点或在其状态变化后重新索引"""
+        worker_id = worker.worker_id
+        previous_type = self._buckets.get(worker_id, worker.node_type)
+        if worker_id in self._buckets and previous_type != worker.node_type:
+            self._remove_member(previous_type, worker_id)
+
+        self.workers[worker_id] = worker
+        self._buckets[worker_id] = worker.node_type
+        version = next(self._counter)
+        self._versions[worker_id] = version
+
+        for bucket in (None, worker.node_type):
+            self._add_member(bucket, worker_id)
+            for key in self._views.get(bucket, []):
+                heap = self._heaps[key]
+                heapq.heappush(heap, self._entry(key, worker, version))
+                # 失效条目过多时重建
+                if len(heap) > 2 * len(self._members[bucket]) + 64:
+                    self._build(key)
+            if worker.status in ALIVE_STATUSES:
+                alive = self._alive.setdefault(bucket, [])
+                heapq.heappush(alive, (-worker.last_heartbeat.timestamp(), version, worker_id))
+                if len(alive) > 2 * len(self._members[bucket]) + 64:
+                    self._build_alive(bucket)
+
+    def remove(self, worker_id: str):
+        """移除节点（堆中的条目惰性失效）"""
+        self.workers.pop(worker_id, None)
+        self._versions.pop(worker_id, None)
+        node_type = self._buckets.pop(worker_id, None)
+        self._remove_member(None, worker_id)
+        self._remove_member(node_type, worker_id)
+
+    def clear_views(self):
+        """丢弃所有堆（调度规则变化后调用）"""
+        self._heaps.clear()
+        self._views.clear()
+
+    def best(self, score: str, node_type: Optional[str],
+             worker_filter: WorkerFilter = WorkerFilter()) -> Optional[WorkerInfo]:
+        """
+        按 (评级, 分数) 选择最优的健康节点
+
+        没有评级为可选的节点时返回降级或被排除的节点（与规则过滤掉全部候选时忽略该规则一致）
+
+        Returns:
+            WorkerInfo: 没有健康节点时返回None
+        """
+        key = (score, node_type, worker_filter)
+        heap = self._heaps.get(key)
+        if heap is None:
+            if node_type not in self._members:
+                return None
+            heap = self._build(key)
+            self._views.setdefault(node_type, []).append(key)
+
+        while heap:
+            _, _, version, worker_id = heap[0]
+            if self._versions.get(worker_id) != version:
+                heapq.heappop(heap)
+                continue
+            worker = self.workers[worker_id]
+            if not worker.is_healthy:
+                # 丢弃，节点下次心跳时重新压入
+                heapq.heappop(heap)
+                continue
+            return worker
+        return None
+
+    def has_healthy(self, node_type: Optional[str] = None) -> bool:
+        """某类型（None 为全部）是否有健康节点"""
+        return self.best("load", node_type) is not None
+
+    def has_alive(self, node_type: Optional[str] = None) -> bool:
+        """某类型是否有在线节点（不考虑负载），只检查心跳最近的节点"""
+        heap = self._alive.get(node_type)
+        while heap:
+            _, version, worker_id = heap[0]
+            if self._versions.get(worker_id) != version:
+                heapq.heappop(heap)
+                continue
+            return self.workers[worker_id].is_alive
+        return False
+
+    def members(self, node_type: Optional[str] = None) -> List[WorkerInfo]:
+        """某类型（None 为全部）的节点"""
+        return [self.workers[worker_id] for worker_id in self._members.get(node_type, ())]
+
+    def round_robin(self, node_type: Optional[str],
+                    worker_filter: WorkerFilter = WorkerFilter()) -> Optional[WorkerInfo]:
+        """从桶内游标位置开始轮询选择"""
+        members = self._members.get(node_type)
+        if not members:
+            return None
+
+        cursor = self._cursors.get(node_type, 0)
+        fallback, fallback_grade = None, -1
+        for offset in range(len(members)):
+            worker = self.workers[members[(cursor + offset) % len(members)]]
+            if not worker.is_healthy:
+                continue
+            worker_grade = worker_filter.grade(worker)
+            if worker_grade == GRADE_OK:
+                self._cursors[node_type] = cursor + offset + 1
+                return worker
+            if worker_grade > fallback_grade:
+                fallback, fallback_grade = worker, worker_grade
+        return fallback
+
+    def random_choice(self, node_type: Optional[str],
+                      worker_filter: WorkerFilter = WorkerFilter(), attempts: int = 8) -> Optional[WorkerInfo]:
+        """随机选择，多次抽中不可选节点时退化为轮询"""
+        members = self._members.get(node_type)
+        if not members:
+            return None
+
+        for _ in range(attempts):
+            worker = self.workers[random.choice(members)]
+            if worker.is_healthy and worker_filter.grade(worker) == GRADE_OK:
+                return worker
+        return self.round_robin(node_type, worker_filter)
+
+    def _entry(self, key: tuple, worker: WorkerInfo, version: int) -> tuple:
+        score, _, worker_filter = key
+        return (-worker_filter.grade(worker), self.SCORES[score](worker), version, worker.worker_id)
+
+    def _build(self, key: tuple) -> list:
+        heap = [
+            self._entry(key, self.workers[worker_id], self._versions[worker_id])
+            for worker_id in self._members.get(key[1], [])
+        ]
+        heapq.heapify(heap)
+        self._heaps[key] = heap
+        return heap
+
+    def _build_alive(self, bucket: Optional[str]):
+        heap = [
+            (-worker.last_heartbeat.timestamp(), self._versions[worker.worker_id], worker.worker_id)
+            for worker in self.members(bucket) if worker.status in ALIVE_STATUSES
+        ]
+        heapq.heapify(heap)
+        self._alive[bucket] = heap
+
+    def _add_member(self, bucket: Optional[str], worker_id: str):
+        positions = self._positions.setdefault(bucket, {})
+        if worker_id not in positions:
+            members = self._members.setdefault(bucket, [])
+            positions[worker_id] = len(members)
+            members.append(worker_id)
+
+    def _remove_member(self, bucket: Optional[str], worker_id: str):
+        positions = self._positions.get(bucket, {})
+        index = positions.pop(worker_id, None)
+        if index is None:
+            return
+        members = self._members[bucket]
+        last = members.pop()
+        if last != worker_id:
+            members[index] = last
+            positions[last] = index
+
+
+def task_domain(url: str) -> str:
+    """任务URL的域名（与 AccessController 的域名键一致）"""
+    return urlparse(url).netloc.lower()
+
+
+class ConsistentHashRing:
+    """
+    一致性哈希环（不可变，成员变化时重建）
+
+    每个节点在环上放置 replicas 个虚拟节点，键顺时针归属遇到的第一个虚拟节点。
+    节点加入或离开时只有相邻区间的键改变归属，约占 1/N。
+    """
+
+    def __init__(self, nodes=(), replicas: int = 64):
+        self.replicas = replicas
+        self.nodes = frozenset(nodes)
+        points = sorted((self._hash(f"{node}#{i}"), node) for node in self.nodes for i in range(replicas))
+        self._points = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+    def lookup(self, key: str, count: int = 1) -> List[str]:
+        """顺时针返回键归属的前 count 个不同节点"""
+        if not self._points:
+            return []
+        count = min(count, len(self.nodes))
+        start = bisect.bisect(self._points, self._hash(key))
+        owners = []
+        for offset in range(len(self._owners)):
+            node = self._owners[(start + offset) % len(self._owners)]
+            if node not in owners:
+                owners.append(node)
+                if len(owners) == count:
+                    break
+        return owners
+
+
+class DomainAffinity:
+    """
+    按域名亲和的分片路由
+
+    每种节点类型一个一致性哈希环（None 环包含全部节点），成员为在线节点。任务按域名
+    哈希到某个节点独占的分片路由，同一域名的任务由同一节点执行，连接池、Cookie、
+    代理会话和访问频率控制都集中在该节点。
+
+    热点域名（当前和上一个统计窗口内的任务数超过 hot_threshold）轮流分给环上的前
+    hot_spread 个节点。节点离开环后其分片记入 retired，等待中的任务由调度器重新路由。
+    """
+
+    def __init__(self,
+                 replicas: int = 64,
+                 hot_threshold: int = 500,
+                 hot_spread: int = 4,
+                 hot_window: float = 60.0):
+        self.replicas = replicas
+        self.hot_threshold = hot_threshold
+        self.hot_spread = hot_spread
+        self.hot_window = hot_window
+        self.rings: Dict[Optional[str], ConsistentHashRing] = {}
+        self.retired: Dict[str, float] = {}  # 工作节点ID -> 离开时间
+        self._counts: Dict[str, int] = {}
+        self._previous_counts: Dict[str, int] = {}
+        self._window_start = time.monotonic()
+
+    def rebuild(self, workers) -> bool:
+        """
+        按在线节点重建成员变化的哈希环
+
+        Returns:
+            bool: 成员是否变化
+        """
+        members: Dict[Optional[str], Set[str]] = {None: set()}
+        for worker in workers:
+            if worker.is_alive:
+                members[None].add(worker.worker_id)
+                members.setdefault(worker.node_type, set()).add(worker.worker_id)
+
+        previous = self.rings.get(None)
+        departed = (previous.nodes if previous else frozenset()) - members[None]
+        changed = False
+        for node_type, nodes in members.items():
+            ring = self.rings.get(node_type)
+            if ring is None or ring.nodes != nodes:
+                self.rings[node_type] = ConsistentHashRing(nodes, self.replicas)
+                changed = True
+        for node_type in [node_type for node_type in self.rings if node_type not in members]:
+            del self.rings[node_type]
+            changed = True
+
+        now = time.time()
+        for worker_id in departed:
+            self.retired[worker_id] = now
+        for worker_id in members[None]:
+            self.retired.pop(worker_id, None)
+        return changed
+
+    def shard(self, task: TaskMessage, node_type: Optional[str] = None) -> Optional[str]:
+        """
+        选择任务所属分片的节点
+
+        Returns:
+            str: 工作节点ID，环为空时返回None
+        """
+        ring = self.rings.get(node_type)
+        if not ring:
+            return None
+        domain = task_domain(task.url)
+        hits = self._hit(domain)
+        if hits > self.hot_threshold and self.hot_spread > 1:
+            owners = ring.lookup(domain, self.hot_spread)
+            return owners[hits % len(owners)]
+        return ring.lookup(domain)[0]
+
+    def _hit(self, domain: str) -> int:
+        """计入一次域名任务，返回当前和上一个窗口的任务数"""
+        now = time.monotonic()
+        if now - self._window_start >= self.hot_window:
+            # 超过两个窗口没有任务时上一个窗口的计数也已过期
+            self._previous_counts = self._counts if now - self._window_start < 2 * self.hot_window else {}
+            self._counts = {}
+            self._window_start = now
+        count = self._counts.get(domain, 0) + 1
+        self._counts[domain] = count
+        return count + self._previous_counts.get(domain, 0)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """分片统计"""
+        hits = {domain: count + self._previous_counts.get(domain, 0) for domain, count in self._counts.items()}
+        hot_domains = [domain for domain, count in hits.items() if count > self.hot_threshold]
+        ring = self.rings.get(None)
+        return {
+            "shards": len(ring) if ring else 0,
+            "retired_shards": len(self.retired),
+            "tracked_domains": len(hits),
+            "hot_domains": sorted(hot_domains, key=hits.get, reverse=True)[:10]
+        }
+
+
 class TaskScheduler:
     """分布式任务调度器"""
     
-    def __init__(self, task_queue: TaskQueue):
+    # 启动后等待节点上报状态的时间（秒），之前不按在线节点迁移路由队列中的任务
+    STARTUP_GRACE = 60
+    
+    def __init__(self,
+                 task_queue: TaskQueue,
+                 domain_affinity: bool = False,
+                 hot_domain_threshold: int = 500,
+                 hot_domain_spread: int = 4):
         """
         初始化任务调度器
         
         Args:
             task_queue: 任务队列实例
+            domain_affinity: 是否按域名把任务路由到节点分片
+            hot_domain_threshold: 每分钟任务数超过该值的域名视为热点
+            hot_domain_spread: 热点域名分散到的节点数
         """
         self.task_queue = task_queue
-        self.workers: Dict[str, WorkerInfo] = {}
+        self.index = WorkerIndex()
+        self.workers: Dict[str, WorkerInfo] = self.index.workers
         self.scheduling_rules: List[SchedulingRule] = []
+        self._compiled_rules: List[CompiledRule] = []
+        self._plan_cache: Dict[tuple, SelectionPlan] = {}
+        self._lock = threading.RLock()
         self.is_running = False
         self.current_strategy = SchedulingStrategy.LEAST_LOADED
+        self._route_cursors: Dict[tuple, int] = {}
         self.monitoring_thread = None
-        self.scheduling_thread = None
+        self.route_counts: Dict[str, int] = {}
+        self.affinity = DomainAffinity(
+            hot_threshold=hot_domain_threshold,
+            hot_spread=hot_domain_spread
+        ) if domain_affinity else None
+        self._affinity_dirty = True
+        self._started_at = time.monotonic()
+        self._shards_scanned = False
         
         # 设置日志
         self._setup_logging()
@@ -103,6 +578,7 @@ class TaskScheduler:
     
     def _setup_logging(self):
         """设置日志"""
+        os.makedirs('logs', exist_ok=True)
         logging.basicConfig(
             level=logging.INFO,
             format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -139,208 +615,349 @@ class TaskScheduler:
                 priority=70,
                 conditions={"node_type_required": True},
                 action="match_node_type"
+            ),
+            SchedulingRule(
+                name="browser_tasks",
+                priority=60,
+                conditions={"crawler_type": "browser"},
+                action="route:browser"
             )
         ]
         
         self.scheduling_rules.extend(default_rules)
+        self.refresh_rules()
     
     def add_scheduling_rule(self, rule: SchedulingRule):
         """添加调度规则"""
         self.scheduling_rules.append(rule)
-        self.scheduling_rules.sort(key=lambda x: x.priority, reverse=True)
+        self.refresh_rules()
         self.logger.info(f"添加调度规则: {rule.name}")
     
+    def refresh_rules(self):
+        """重新排序并预编译调度规则（直接修改 scheduling_rules 后需要调用）"""
+        with self._lock:
+            self.scheduling_rules.sort(key=lambda x: x.priority, reverse=True)
+            self._compiled_rules = [CompiledRule.compile(rule) for rule in self.scheduling_rules]
+            self._plan_cache.clear()
+            self.index.clear_views()
+    
     def update_worker_status(self, status: StatusMessage):
-        """更新工作节点状态"""
+        """更新工作节点状态并重新索引"""
         worker_id = status.worker_id
         
-        if worker_id not in self.workers:
-            self.workers[worker_id] = WorkerInfo(
-                worker_id=worker_id,
-                node_type=status.node_type,
-                status=status.status,
-                cpu_usage=status.cpu_usage,
-                memory_usage=status.memory_usage,
-                active_tasks=status.active_tasks,
-                completed_tasks=status.completed_tasks,
-                failed_tasks=status.failed_tasks,
-                last_heartbeat=datetime.now()
-            )
-        else:
-            worker = self.workers[worker_id]
-            worker.status = status.status
-            worker.cpu_usage = status.cpu_usage
-            worker.memory_usage = status.memory_usage
-            worker.active_tasks = status.active_tasks
-            worker.completed_tasks = status.completed_tasks
-            worker.failed_tasks = status.failed_tasks
-            worker.last_heartbeat = datetime.now()
+        with self._lock:
+            worker = self.workers.get(worker_id)
+            previous = (worker.is_alive, worker.node_type) if worker else None
+            if worker is None:
+                worker = WorkerInfo(
+                    worker_id=worker_id,
+                    node_type=status.node_type,
+                    status=status.status,
+                    cpu_usage=status.cpu_usage,
+                    memory_usage=status.memory_usage,
+                    active_tasks=status.active_tasks,
+                    completed_tasks=status.completed_tasks,
+                    failed_tasks=status.failed_tasks,
+                    last_heartbeat=datetime.now()
+                )
+            else:
+                worker.node_type = status.node_type
+                worker.status = status.status
+                worker.cpu_usage = status.cpu_usage
+                worker.memory_usage = status.memory_usage
+                worker.active_tasks = status.active_tasks
+                worker.completed_tasks = status.completed_tasks
+                worker.failed_tasks = status.failed_tasks
+                worker.last_heartbeat = datetime.now()
+            if previous != (worker.is_alive, worker.node_type):
+                # 在线状态或节点类型变化时哈希环成员随之变化
+                self._affinity_dirty = True
+            self.index.update(worker)
+    
+    def remove_worker(self, worker_id: str):
+        """移除工作节点"""
+        with self._lock:
+            self.index.remove(worker_id)
+            self._affinity_dirty = True
     
     def get_healthy_workers(self, node_type: Optional[str] = None) -> List[WorkerInfo]:
         """获取健康的工作节点"""
-        healthy_workers = [
-            worker for worker in self.workers.values()
-            if worker.is_healthy
-        ]
-        
-        if node_type:
-            healthy_workers = [
-                worker for worker in healthy_workers
-                if worker.node_type == node_type
-            ]
-        
-        return healthy_workers
+        with self._lock:
+            return [worker for worker in self.index.members(node_type or None) if worker.is_healthy]
     
     def select_worker(self, task: TaskMessage) -> Optional[str]:
-        """选择合适的工作节点"""
-        # 获取健康的工作节点
-        healthy_workers = self.get_healthy_workers(task.node_type)
+        """
+        选择合适的工作节点
         
-        if not healthy_workers:
-            self.logger.warning("没有可用的健康工作节点")
-            return None
+        规则按任务类别预编译为选择方案并缓存，节点从索引中按策略选取。选中后先在本地
+        计入一个活跃任务，直到该节点下次心跳以上报的数值为准。
+        """
+        with self._lock:
+            plan = self._selection_plan(task)
+            worker = self._select_by_strategy(plan, task)
+            
+            if worker is None:
+                self.logger.warning("没有可用的健康工作节点")
+                return None
+            
+            worker.active_tasks += 1
+            self.index.update(worker)
+            return worker.worker_id
+    
+    def _selection_plan(self, task: TaskMessage) -> SelectionPlan:
+        """获取任务类别对应的选择方案（规则只依赖优先级、爬虫类型和节点类型）"""
+        key = (task.priority, task.crawler_type, task.node_type, self.current_strategy)
+        plan = self._plan_cache.get(key)
+        if plan is None:
+            plan = self._build_plan(task)
+            if len(self._plan_cache) >= 4096:
+                self._plan_cache.clear()
+            self._plan_cache[key] = plan
+        return plan
+    
+    def _build_plan(self, task: TaskMessage) -> SelectionPlan:
+        """
+        按规则生成选择方案
         
-        # 应用调度规则
-        candidate_workers = healthy_workers[:]
+        - skip_worker: 排除满足节点条件的节点
+        - deprioritize_worker: 满足节点条件的节点只在没有其他节点时使用
+        - prefer_least_loaded: 改用负载最低策略
+        - match_node_type / route:*: 由节点类型分桶和入队路由处理
+        - 其他动作: 只保留满足节点条件的节点
         
-        for rule in self.scheduling_rules:
-            if not rule.enabled:
+        所有节点都被排除时退回评级最高的节点，与规则过滤掉全部候选时忽略该规则一致。
+        """
+        plan = SelectionPlan(node_type=task.node_type, strategy=self.current_strategy)
+        filters = []
+        
+        for compiled in self._compiled_rules:
+            rule = compiled.rule
+            if not rule.enabled or not compiled.task_predicate(task):
                 continue
+            if rule.action == "prefer_least_loaded":
+                plan.strategy = SchedulingStrategy.LEAST_LOADED
             
-            filtered_workers = []
-            for worker in candidate_workers:
-                if self._apply_rule(rule, worker, task):
-                    filtered_workers.append(worker)
-            
-            if filtered_workers:
-                candidate_workers = filtered_workers
+            if compiled.worker_predicate is None or rule.action.startswith("route:"):
+                continue
+            if rule.action in ("match_node_type", "prefer_least_loaded"):
+                continue
+            if rule.action == "skip_worker":
+                filters.append((compiled, "skip"))
+            elif rule.action == "deprioritize_worker":
+                filters.append((compiled, "demote"))
             else:
-                self.logger.debug(f"规则 {rule.name} 过滤了所有候选节点")
-        
-        if not candidate_workers:
-            self.logger.warning("所有工作节点都被调度规则过滤")
-            return None
+                filters.append((compiled, "require"))
         
-        # 根据当前策略选择节点
-        return self._select_by_strategy(candidate_workers, task)
+        plan.worker_filter = WorkerFilter(tuple(filters))
+        return plan
     
-    def _apply_rule(self, rule: SchedulingRule, worker: WorkerInfo, task: TaskMessage) -> bool:
-        """应用调度规则"""
-        try:
-            for key, condition in rule.conditions.items():
-                if key == "priority":
-                    if not self._compare_value(task.priority, condition):
-                        return False
-                elif key == "cpu_usage":
-                    if not self._compare_value(worker.cpu_usage, condition):
-                        return False
-                elif key == "memory_usage":
-                    if not self._compare_value(worker.memory_usage, condition):
-                        return False
-                elif key == "failed_tasks":
-                    if not self._compare_value(worker.failed_tasks, condition):
-                        return False
-                elif key == "node_type_required":
-                    if condition and task.node_type and task.node_type != worker.node_type:
-                        return False
-            
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"应用规则失败: {e}")
-            return True  # 默认通过
-    
-    def _compare_value(self, value: float, condition: str) -> bool:
-        """比较值"""
-        if isinstance(condition, str):
-            if condition.startswith(">= "):
-                return value >= float(condition[3:])
-            elif condition.startswith("> "):
-                return value > float(condition[2:])
-            elif condition.startswith("<= "):
-                return value <= float(condition[3:])
-            elif condition.startswith("< "):
-                return value < float(condition[2:])
-            elif condition.startswith("== "):
-                return value == float(condition[3:])
+    def route_task(self, task: TaskMessage) -> Optional[str]:
+        """
+        决定任务的入队路由
+
+        要求了节点类型的任务进入该类型的路由队列；否则匹配 "route:<节点类型>" 规则
+        （只检查任务字段），目标类型当前有健康节点时进入其路由队列，多个目标类型
+        都可用时按调度策略选择。其余任务进入共享队列，由空闲的节点拉取。
+
+        开启域名亲和时，任务再按域名在对应节点类型（未确定类型时为全部节点）的
+        哈希环上选择一个在线节点，进入该节点的分片队列。
+
+        Returns:
+            str: 路由（节点类型或分片），None 表示共享队列
+        """
+        node_type = task.node_type or self._rule_route(task)
+        if self.affinity is None:
+            return node_type
+
+        with self._lock:
+            if self._affinity_dirty:
+                self._rebuild_affinity()
+            worker_id = self.affinity.shard(task, node_type)
+        return shard_route(worker_id) if worker_id else node_type
+
+    def _rule_route(self, task: TaskMessage) -> Optional[str]:
+        """
+        按 route: 规则决定任务的节点类型
+
+        匹配的规则中目标类型有健康节点的都是候选路由，多个候选时按调度策略选择
+        （见 _choose_route）；没有候选时返回None。
+        """
+        routes = []
+        for compiled in self._compiled_rules:
+            rule = compiled.rule
+            if not rule.enabled or not rule.action.startswith("route:"):
+                continue
+            route = rule.action[len("route:"):]
+            if route not in routes and compiled.task_predicate(task):
+                routes.append(route)
+        if not routes:
+            return None
+
+        with self._lock:
+            eligible = [route for route in routes if self.index.has_healthy(route)]
+            if not eligible:
+                self.logger.debug(f"路由规则的目标节点类型 {routes} 没有健康节点，进入共享队列")
+                return None
+            if len(eligible) == 1:
+                return eligible[0]
+            return self._choose_route(eligible, task)
+
+    def _choose_route(self, routes: List[str], task: TaskMessage) -> str:
+        """
+        按调度策略在多个候选路由中选择（调用方持有锁）
+
+        负载最低 / 资源感知策略比较各路由最优节点的分数，分数相同时取规则优先级高的路由；
+        轮询策略依次轮换；随机策略随机选择。与 select_worker 相同，优先级策略对高优先级
+        任务按负载最低选择，其余随机。
+        """
+        plan = self._selection_plan(task)
+        strategy = plan.strategy
+        if strategy == SchedulingStrategy.PRIORITY_BASED:
+            strategy = SchedulingStrategy.LEAST_LOADED if task.priority >= 8 else SchedulingStrategy.RANDOM
+
+        if strategy == SchedulingStrategy.ROUND_ROBIN:
+            key = tuple(routes)
+            cursor = self._route_cursors.get(key, 0)
+            self._route_cursors[key] = cursor + 1
+            return routes[cursor % len(routes)]
+        elif strategy == SchedulingStrategy.RANDOM:
+            return random.choice(routes)
+
+        score = "resource" if strategy == SchedulingStrategy.RESOURCE_AWARE else "load"
+        grade = plan.worker_filter.grade
+
+        def route_score(route: str) -> tuple:
+            worker = self.index.best(score, route, plan.worker_filter)
+            return (-grade(worker), WorkerIndex.SCORES[score](worker))
+
+        return min(routes, key=route_score)
+
+    def submit_task(self, task: TaskMessage, check_duplicate: bool = True) -> bool:
+        """
+        提交任务：入队时确定路由，工作节点从对应队列拉取
+
+        Args:
+            task: 任务消息
+            check_duplicate: 是否检查重复任务
+
+        Returns:
+            bool: 是否成功入队
+        """
+        task.route = self.route_task(task)
+        if not self.task_queue.add_task(task, check_duplicate=check_duplicate):
+            return False
+
+        route = task.route or "shared"
+        self.logger.debug(f"任务 {task.task_id} 进入路由队列: {route}")
+        if route.startswith("shard:"):
+            route = "shard"
+        self.route_counts[route] = self.route_counts.get(route, 0) + 1
+        return True
+
+    def _rebuild_affinity(self):
+        """按当前在线节点重建域名亲和的哈希环（调用方持有锁）"""
+        if self.affinity.rebuild(self.workers.values()):
+            ring = self.affinity.rings.get(None)
+            self.logger.info(f"域名分片成员变化，当前 {len(ring) if ring else 0} 个分片")
+        self._affinity_dirty = False
+
+    def _rebalance_routes(self):
+        """
+        将没有在线节点的路由队列中等待的任务重新路由
+
+        按 route: 规则进入某节点类型队列的任务，在该类型没有在线节点时按当前规则重新路由
+        （通常回到共享队列）；任务自身要求了该节点类型的继续等待。开启域名亲和时同时
+        迁移离开节点的分片。
+        """
+        if self.affinity is not None:
+            self._rebalance_shards()
         
-        return value == condition
-    
-    def _select_by_strategy(self, workers: List[WorkerInfo], task: TaskMessage) -> str:
-        """根据策略选择工作节点"""
-        if self.current_strategy == SchedulingStrategy.ROUND_ROBIN:
-            return self._round_robin_selection(workers)
-        elif self.current_strategy == SchedulingStrategy.LEAST_LOADED:
-            return self._least_loaded_selection(workers)
-        elif self.current_strategy == SchedulingStrategy.RANDOM:
-            return self._random_selection(workers)
-        elif self.current_strategy == SchedulingStrategy.PRIORITY_BASED:
-            return self._priority_based_selection(workers, task)
-        elif self.current_strategy == SchedulingStrategy.RESOURCE_AWARE:
-            return self._resource_aware_selection(workers)
-        else:
-            return workers[0].worker_id
-    
-    def _round_robin_selection(self, workers: List[WorkerInfo]) -> str:
-        """轮询选择"""
-        if not hasattr(self, '_round_robin_index'):
-            self._round_robin_index = 0
+        if time.monotonic() - self._started_at <= self.STARTUP_GRACE:
+            return
+        for route in self.task_queue.list_routes():
+            if route.startswith("shard:"):
+                continue
+            with self._lock:
+                if self.index.has_alive(route):
+                    continue
+            moved = self.task_queue.reroute_tasks(route, self.route_task)
+            if moved:
+                self.logger.info(f"节点类型 {route} 没有在线节点，重新路由 {moved} 个任务")
+
+    def _rebalance_shards(self):
+        """
+        将离开哈希环的节点分片中等待的任务重新路由
+
+        租约过期的任务会被放回原分片队列，因此离开的分片在两个可见性超时内
+        每轮都会检查一次。调度器启动一段时间后还会扫描一次已有的分片队列，
+        接管上次运行遗留的分片。
+        """
+        with self._lock:
+            self._rebuild_affinity()
+            if not self._shards_scanned and time.monotonic() - self._started_at > self.STARTUP_GRACE:
+                self._shards_scanned = True
+                known = self.affinity.rings.get(None)
+                for route in self.task_queue.list_routes():
+                    if not route.startswith("shard:"):
+                        continue
+                    worker_id = route[len("shard:"):]
+                    if known is None or worker_id not in known.nodes:
+                        self.affinity.retired.setdefault(worker_id, time.time())
+            retired = list(self.affinity.retired.items())
+
+        horizon = 2 * getattr(self.task_queue, "visibility_timeout", 300)
+        for worker_id, departed_at in retired:
+            moved = self.task_queue.reroute_tasks(shard_route(worker_id), self.route_task)
+            if moved:
+                self.logger.info(f"节点 {worker_id} 的分片已离开，重新路由 {moved} 个任务")
+            if time.time() - departed_at > horizon:
+                with self._lock:
+                    self.affinity.retired.pop(worker_id, None)
+
+    def _select_by_strategy(self, plan: SelectionPlan, task: TaskMessage) -> Optional[WorkerInfo]:
+        """根据策略从索引中选择工作节点"""
+        strategy = plan.strategy
+        if strategy == SchedulingStrategy.PRIORITY_BASED:
+            # 高优先级任务选择负载最低的节点
+            strategy = SchedulingStrategy.LEAST_LOADED if task.priority >= 8 else SchedulingStrategy.RANDOM
         
-        worker = workers[self._round_robin_index % len(workers)]
-        self._round_robin_index += 1
-        return worker.worker_id
-    
-    def _least_loaded_selection(self, workers: List[WorkerInfo]) -> str:
-        """选择负载最低的节点"""
-        return min(workers, key=lambda w: w.load_score).worker_id
-    
-    def _random_selection(self, workers: List[WorkerInfo]) -> str:
-        """随机选择"""
-        return random.choice(workers).worker_id
-    
-    def _priority_based_selection(self, workers: List[WorkerInfo], task: TaskMessage) -> str:
-        """基于优先级选择"""
-        # 高优先级任务选择负载最低的节点
-        if task.priority >= 8:
-            return self._least_loaded_selection(workers)
+        if strategy == SchedulingStrategy.ROUND_ROBIN:
+            return self.index.round_robin(plan.node_type, plan.worker_filter)
+        elif strategy == SchedulingStrategy.RANDOM:
+            return self.index.random_choice(plan.node_type, plan.worker_filter)
+        elif strategy == SchedulingStrategy.RESOURCE_AWARE:
+            # 综合考虑CPU、内存和当前任务数
+            return self.index.best("resource", plan.node_type, plan.worker_filter)
         else:
-            return self._random_selection(workers)
-    
-    def _resource_aware_selection(self, workers: List[WorkerInfo]) -> str:
-        """资源感知选择"""
-        # 综合考虑CPU、内存和当前任务数
-        best_worker = None
-        best_score = float('inf')
-        
-        for worker in workers:
-            # 计算资源使用率
-            resource_usage = (worker.cpu_usage + worker.memory_usage) / 2
-            
-            # 计算综合分数
-            score = resource_usage * 0.7 + worker.active_tasks * 0.3
-            
-            if score < best_score:
-                best_score = score
-                best_worker = worker
-        
-        return best_worker.worker_id if best_worker else workers[0].worker_id
+            return self.index.best("load", plan.node_type, plan.worker_filter)
     
     def _monitor_workers(self):
         """监控工作节点"""
         while self.is_running:
             try:
+                # 消费工作节点发布的状态消息
+                for status in self.task_queue.read_status_updates(count=1000):
+                    self.update_worker_status(status)
+                
                 # 清理超时节点
                 current_time = datetime.now()
                 timeout_workers = []
                 
-                for worker_id, worker in self.workers.items():
+                for worker_id, worker in list(self.workers.items()):
                     if current_time - worker.last_heartbeat > timedelta(minutes=5):
                         timeout_workers.append(worker_id)
                 
                 for worker_id in timeout_workers:
-                    del self.workers[worker_id]
+                    self.remove_worker(worker_id)
                     self.logger.warning(f"移除超时工作节点: {worker_id}")
                 
+                # 回收崩溃节点遗留的过期租约
+                if self.task_queue.reliable:
+                    self.task_queue.reap_expired_leases()
+                
+                # 重新路由没有在线节点的节点类型队列和离开节点的域名分片
+                self._rebalance_routes()
+                
                 # 更新节点统计
                 self._update_worker_statistics()
                 
@@ -355,48 +972,19 @@ class TaskScheduler:
         # 这里可以添加更详细的统计逻辑
         pass
     
-    def _schedule_tasks(self):
-        """调度任务"""
-        while self.is_running:
-            try:
-                # 获取待调度任务
-                pending_tasks = self.task_queue.get_pending_tasks(limit=100)
-                
-                for task in pending_tasks:
-                    # 选择合适的工作节点
-                    selected_worker = self.select_worker(task)
-                    
-                    if selected_worker:
-                        # 分配任务
-                        success = self.task_queue.assign_task(task.task_id, selected_worker)
-                        
-                        if success:
-                            self.logger.info(f"任务 {task.task_id} 分配给工作节点 {selected_worker}")
-                        else:
-                            self.logger.warning(f"任务分配失败: {task.task_id}")
-                    else:
-                        self.logger.debug(f"无可用工作节点，任务等待: {task.task_id}")
-                
-                time.sleep(1)
-                
-            except Exception as e:
-                self.logger.error(f"任务调度失败: {e}")
-                time.sleep(5)
-    
     def start(self):
         """启动调度器"""
         self.logger.info("启动任务调度器...")
         
         self.is_running = True
         
-        # 启动监控线程
+        # 放回上次路由迁移中断时暂存的任务
+        self.task_queue.restore_rerouting()
+        
+        # 启动监控线程（任务由工作节点直接从队列拉取，无需调度线程）
         self.monitoring_thread = threading.Thread(target=self._monitor_workers, daemon=True)
         self.monitoring_thread.start()
         
-        # 启动调度线程
-        self.scheduling_thread = threading.Thread(target=self._schedule_tasks, daemon=True)
-        self.scheduling_thread.start()
-        
         self.logger.info("任务调度器已启动")
     
     def stop(self):
@@ -408,9 +996,6 @@ class TaskScheduler:
         if self.monitoring_thread:
             self.monitoring_thread.join(timeout=5)
         
-        if self.scheduling_thread:
-            self.scheduling_thread.join(timeout=5)
-        
         self.logger.info("任务调度器已停止")
     
     def get_statistics(self) -> Dict[str, Any]:
@@ -420,7 +1005,9 @@ class TaskScheduler:
             "healthy_workers": len(self.get_healthy_workers()),
             "current_strategy": self.current_strategy.value,
             "active_rules": len([r for r in self.scheduling_rules if r.enabled]),
-            "workers_by_type": self._get_workers_by_type()
+            "workers_by_type": self._get_workers_by_type(),
+            "routed_tasks": dict(self.route_counts),
+            "domain_affinity": self.affinity.get_statistics() if self.affinity else None
         }
     
     def _get_workers_by_type(self) -> Dict[str, int]:
@@ -437,17 +1024,19 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="分布式任务调度器")
     parser.add_argument("--redis-host", default="localhost", help="Redis主机")
     parser.add_argument("--redis-port", type=int, default=6379, help="Redis端口")
+    parser.add_argument("--domain-affinity", action="store_true", help="按域名把任务路由到节点分片")
     
     args = parser.parse_args()
     
     # 创建任务队列
-    task_queue = TaskQueue(
+    task_queue = create_task_queue(
+        get_config(),
         redis_host=args.redis_host,
         redis_port=args.redis_port
     )
     
     # 创建调度器
-    scheduler = TaskScheduler(task_queue)
+    scheduler = TaskScheduler(task_queue, domain_affinity=args.domain_affinity)
     
     try:
         scheduler.start()
@@ -63,6 +63,7 @@ def validate_classes():
         assert hasattr(TaskScheduler, 'start')
         assert hasattr(TaskScheduler, 'stop')
         assert hasattr(TaskScheduler, 'select_worker')
+        assert hasattr(TaskScheduler, 'route_task')
         print("✅ TaskScheduler 类验证成功")
         
         # 验证ResultCollector类
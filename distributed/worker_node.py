@@ -10,6 +10,7 @@ import sys
 import os
 import json
 import time
+from urllib.parse import urlparse
 from typing import Dict, Any, Optional, List
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
@@ -21,17 +22,34 @@ import psutil
 import redis.asyncio as redis
 from pydantic import BaseModel, Field
 
-from .task_queue import TaskQueue, TaskStatus
+from utils.metrics import (
+    REDIS_RTT_SECONDS, WORKER_SLOTS, WORKER_SLOT_UTILIZATION, observe_task, start_metrics_server
+)
+
+from .task_queue import (
+    TaskMessage, ResultMessage, StatusMessage, TaskStatus, NON_RETRYABLE_ERRORS, classify_error, shard_route
+)
+from .async_task_queue import AsyncTaskQueue, create_async_task_queue
 from .config import get_config
-from .access_controller import AccessController, GentleCrawlerMixin
+from .access_controller import AccessController, mark_reserved
+from .frontier import DomainFrontier
+from .rate_limiter import RedisRateLimiter
+from .worker_status import WorkerStatusReporter
 
 
 @dataclass
 class WorkerConfig:
     """工作节点配置"""
     node_id: str
+    node_type: str = "general"
     max_concurrent_tasks: int = 10
     heartbeat_interval: int = 30
+    status_flush_interval: float = 1.0
+    resource_sample_interval: float = 5.0
+    shared_rate_limit: bool = True  # 同一域名的请求间隔在所有节点间共享
+    frontier_size: Optional[int] = None  # 域名前沿最多持有的任务数，默认为任务槽数的2倍
+    metrics_port: Optional[int] = None  # 指标HTTP服务端口，为空时不启动
+    redis_rtt_interval: float = 10.0  # Redis往返时间采样间隔（秒）
     task_timeout: int = 300
     retry_times: int = 3
     redis_host: str = "localhost"
@@ -53,11 +71,194 @@ class WorkerStatus(BaseModel):
     capabilities: List[str] = Field(default_factory=list)
 
 
+class CrawlError(Exception):
+    """爬取失败（带HTTP状态码，用于选择重试策略）"""
+    
+    def __init__(self, message: str, status_code: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CrawlEngine:
+    """
+    工作节点共享的爬取引擎
+    
+    普通请求走连接池复用的 EnhancedHttpClient；检测到反爬机制时升级到
+    utils.stealth_crawler.StealthCrawler（Playwright 浏览器）。浏览器在第一次
+    需要时启动，之后由该工作节点的所有任务复用，节点关闭时才退出。
+    """
+    
+    # 超过该大小的正常响应不做反爬检测（挑战页通常很小，大页面关键字误判率高）
+    CHALLENGE_PAGE_MAX_BYTES = 32 * 1024
+    
+    def __init__(self, http_config: Dict[str, Any] = None, stealth_config: Dict[str, Any] = None,
+                 access_controller: AccessController = None, browser_domain_ttl: int = 600):
+        """
+        Args:
+            http_config: EnhancedHttpClient 配置（重试由任务队列负责，默认不在客户端内重试）
+            stealth_config: utils.stealth_crawler.StealthCrawler 配置
+            access_controller: 人性化访问控制器
+            browser_domain_ttl: 某域名需要浏览器后，在该时长内直接使用浏览器（秒）
+        """
+        self.http_config = {"max_retries": 0, "timeout": 30, **(http_config or {})}
+        self.stealth_config = {"use_fallback": False, "max_retries": 1, **(stealth_config or {})}
+        self.access_controller = access_controller or AccessController()
+        self.browser_domain_ttl = browser_domain_ttl
+        self.logger = logging.getLogger("worker.crawl_engine")
+        
+        self.http_client = None
+        self.browser = None
+        self._browser_lock = asyncio.Lock()
+        self._anti_detection = None
+        self._browser_domains: Dict[str, float] = {}
+        self.stats = {"http_fetches": 0, "browser_fetches": 0, "escalations": 0}
+    
+    async def start(self):
+        """创建共享HTTP客户端"""
+        from utils.enhanced_http_client import EnhancedHttpClient
+        
+        self.http_client = EnhancedHttpClient(self.http_config)
+    
+    async def close(self):
+        """关闭HTTP连接池和浏览器"""
+        if self.http_client:
+            await self.http_client.close()
+        if self.browser:
+            await self.browser.close()
+            self.browser = None
+    
+    async def fetch(self, task: Dict[str, Any], mode: str = "auto") -> Dict[str, Any]:
+        """
+        抓取任务URL
+        
+        Args:
+            task: 任务字典（TaskMessage.to_dict()）
+            mode: http 只用HTTP客户端；browser 只用浏览器；auto 先HTTP，被拦截时升级到浏览器
+            
+        Returns:
+            Dict: url, status_code, content, headers, fetched_with, anti_bot
+        """
+        url = task["url"]
+        domain = urlparse(url).netloc
+        
+        await self.access_controller.wait_before_request(url)
+        start_time = time.time()
+        try:
+            if mode == "browser" or (mode == "auto" and self._needs_browser(domain)):
+                result = await self._fetch_browser(task)
+            else:
+                result = await self._fetch_http(task)
+                detection = self._detect_anti_bot(result)
+                if detection and mode == "auto":
+                    self.logger.info(f"检测到反爬机制({detection})，升级到浏览器: {url}")
+                    self.stats["escalations"] += 1
+                    try:
+                        browser_result = await self._fetch_browser(task)
+                    except ImportError as e:
+                        # 未安装Playwright时保留HTTP结果，由状态码决定重试策略
+                        self.logger.warning(f"浏览器不可用: {e}")
+                    else:
+                        self._browser_domains[domain] = time.time() + self.browser_domain_ttl
+                        result = browser_result
+                result["anti_bot"] = detection
+        finally:
+            self.access_controller.record_access(url, time.time() - start_time)
+        
+        if result["status_code"] and result["status_code"] >= 400:
+            raise CrawlError(f"HTTP {result['status_code']}: {url}", result["status_code"])
+        return result
+    
+    def _needs_browser(self, domain: str) -> bool:
+        """该域名最近是否被判定需要浏览器"""
+        expires_at = self._browser_domains.get(domain)
+        if expires_at is None:
+            return False
+        if expires_at < time.time():
+            del self._browser_domains[domain]
+            return False
+        return True
+    
+    async def _fetch_http(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """通过连接池HTTP客户端抓取（4xx/5xx 也返回响应，供反爬检测使用）"""
+        import httpx
+        
+        kwargs = {"headers": task.get("headers") or {}, "timeout": task.get("timeout") or 30}
+        if task.get("params"):
+            kwargs["params"] = task["params"]
+        if task.get("data"):
+            kwargs["data"] = task["data"]
+        
+        request = self.http_client.post if (task.get("method") or "GET").upper() == "POST" else self.http_client.get
+        self.stats["http_fetches"] += 1
+        try:
+            response = await request(task["url"], **kwargs)
+        except httpx.HTTPStatusError as e:
+            response = e.response
+        
+        return {
+            "url": str(response.url),
+            "status_code": response.status_code,
+            "content": response.text,
+            "headers": dict(response.headers),
+            "fetched_with": "http"
+        }
+    
+    async def _fetch_browser(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """通过该工作节点唯一的浏览器实例抓取"""
+        browser = await self._get_browser()
+        self.stats["browser_fetches"] += 1
+        
+        result = await browser.crawl_url(task["url"], timeout=(task.get("timeout") or 30) * 1000)
+        if not result.success and result.status_code is None:
+            raise CrawlError(f"浏览器抓取失败: {result.error}")
+        
+        return {
+            "url": result.url,
+            "status_code": result.status_code,
+            "content": result.content,
+            "headers": result.headers or {},
+            "fetched_with": "browser"
+        }
+    
+    async def _get_browser(self):
+        """懒启动浏览器，并发任务共享同一个实例"""
+        if self.browser is None:
+            async with self._browser_lock:
+                if self.browser is None:
+                    from utils.stealth_crawler import StealthCrawler as BrowserCrawler
+                    
+                    browser = BrowserCrawler(self.stealth_config)
+                    await browser.start()
+                    self.browser = browser
+                    self.logger.info("浏览器已启动")
+        return self.browser
+    
+    def _detect_anti_bot(self, result: Dict[str, Any]) -> Optional[str]:
+        """对可疑响应（错误状态码或很小的页面）做反爬检测"""
+        content = result["content"] or ""
+        if result["status_code"] < 400 and len(content) > self.CHALLENGE_PAGE_MAX_BYTES:
+            return None
+        
+        if self._anti_detection is None:
+            try:
+                from utils.stealth_crawler import AntiDetectionStrategy
+            except ImportError as e:
+                self.logger.warning(f"反爬检测不可用，不会升级到浏览器: {e}")
+                self._anti_detection = False
+            else:
+                self._anti_detection = AntiDetectionStrategy()
+        if not self._anti_detection:
+            return None
+        
+        return self._anti_detection.detect_anti_crawler(content, result["status_code"], result["headers"])
+
+
 class BaseCrawler:
     """基础爬虫类"""
     
-    def __init__(self, task_id: str):
+    def __init__(self, task_id: str, engine: CrawlEngine = None):
         self.task_id = task_id
+        self.engine = engine
         self.logger = logging.getLogger(f"crawler.{task_id}")
     
     async def crawl(self, task: Dict[str, Any]) -> Dict[str, Any]:
@@ -65,59 +266,88 @@ class BaseCrawler:
         raise NotImplementedError("子类必须实现crawl方法")
 
 
-class StealthCrawler(BaseCrawler, GentleCrawlerMixin):
-    """Stealth爬虫实现 - 带人性化访问控制"""
+class HttpCrawler(BaseCrawler):
+    """HTTP爬虫 - 只使用连接池HTTP客户端"""
+    
+    mode = "http"
     
     async def crawl(self, task: Dict[str, Any]) -> Dict[str, Any]:
-        """执行Stealth爬虫任务"""
+        """执行爬取任务"""
         url = task.get("url")
         if not url:
             raise ValueError("URL不能为空")
         
-        # 使用人性化访问控制
-        await self.gentle_request(url)
-        
-        # 模拟爬虫逻辑
         self.logger.info(f"开始爬取: {url}")
-        
-        # 这里可以集成实际的Stealth爬虫
-        result = {
-            "url": url,
-            "title": f"爬取结果 - {url}",
-            "content": f"这是从 {url} 爬取的内容",
-            "status_code": 200,
+        result = await self.engine.fetch(task, mode=self.mode)
+        result.update({
             "timestamp": datetime.now().isoformat(),
             "task_id": self.task_id
-        }
-        
-        self.logger.info(f"完成爬取: {url}")
+        })
+        self.logger.info(f"完成爬取: {url} ({result['fetched_with']}, {result['status_code']})")
         return result
 
 
+class StealthCrawler(HttpCrawler):
+    """Stealth爬虫 - 先用HTTP客户端，检测到反爬机制时升级到浏览器"""
+    
+    mode = "auto"
+
+
+class BrowserCrawler(HttpCrawler):
+    """浏览器爬虫 - 始终使用浏览器"""
+    
+    mode = "browser"
+
+
 class WorkerNode:
     """工作节点主类"""
     
     def __init__(self, config: WorkerConfig):
         self.config = config
         self.logger = logging.getLogger(f"worker.{config.node_id}")
-        self.task_queue = None
+        self.task_queue: Optional[AsyncTaskQueue] = None
         self.redis_client = None
         self.running = False
         self.tasks: Dict[str, asyncio.Task] = {}
+        self._slots = asyncio.Semaphore(config.max_concurrent_tasks)
         self.status = WorkerStatus(node_id=config.node_id)
+        self.reporter = WorkerStatusReporter(
+            self.status,
+            flush_interval=config.status_flush_interval,
+            heartbeat_interval=config.heartbeat_interval,
+            sample_interval=config.resource_sample_interval
+        )
+        self._published_status: Optional[str] = None
+        self._last_published = 0.0
         self._shutdown_event = asyncio.Event()
         self.access_controller = AccessController()
+        self.frontier = DomainFrontier(self.access_controller)
         
         # 注册爬虫类型
         self.crawlers = {
+            "http": HttpCrawler,
             "stealth": StealthCrawler,
+            "browser": BrowserCrawler,
             "default": StealthCrawler
         }
+        self.engine = CrawlEngine(access_controller=self.access_controller)
+        self._last_rtt_sample = 0.0
+        self._redis_rtt = REDIS_RTT_SECONDS.labels(component="worker")
+        
+        # 槽位占用在抓取时读取
+        WORKER_SLOTS.labels(state="total").set_function(lambda: self.config.max_concurrent_tasks)
+        WORKER_SLOTS.labels(state="busy").set_function(lambda: self.status.active_tasks)
+        WORKER_SLOT_UTILIZATION.set_function(
+            lambda: self.status.active_tasks / max(1, self.config.max_concurrent_tasks)
+        )
     
     async def initialize(self):
         """初始化工作节点"""
         self.logger.info(f"初始化工作节点: {self.config.node_id}")
         
+        # 先加载并校验分布式配置（如不支持的队列后端），配置无效时在建立任何连接前失败
+        distributed_config = get_config()
+        
         # 初始化Redis连接
         self.redis_client = redis.Redis(
             host=self.config.redis_host,
@@ -134,43 +364,61 @@ class WorkerNode:
             self.logger.error(f"Redis连接失败: {e}")
             raise
         
-        # 初始化任务队列
-        self.task_queue = TaskQueue()
+        # 初始化任务队列（连接池至少覆盖所有任务槽和心跳），依次拉取本节点的域名分片、
+        # 本节点类型的路由队列和共享队列
+        self.task_queue = create_async_task_queue(
+            distributed_config,
+            redis_host=self.config.redis_host,
+            redis_port=self.config.redis_port,
+            redis_db=self.config.redis_db,
+            routes=[shard_route(self.config.node_id), self.config.node_type],
+            max_connections=self.config.max_concurrent_tasks + 4
+        )
         await self.task_queue.initialize()
+        await self.task_queue.register_worker(self.config.node_id, self.config.node_type)
+        
+        # 域名请求间隔通过Redis预约，对所有工作节点生效
+        if self.config.shared_rate_limit:
+            self.access_controller.rate_limiter = RedisRateLimiter(
+                self.task_queue.redis_client,
+                key_prefix=f"{self.task_queue.queue_prefix}:ratelimit",
+                burst=self.access_controller.config.burst_size
+            )
+        
+        # 状态增量随队列流水线一起发送
+        self.reporter.key = self.task_queue.worker_status_key(self.config.node_id)
+        self.task_queue.status_reporter = self.reporter
         
         # 设置节点状态
-        self.status.capabilities = list(self.crawlers.keys())
+        await self.engine.start()
+        self.reporter.set("capabilities", list(self.crawlers.keys()))
         await self.update_status()
         
         self.logger.info("工作节点初始化完成")
     
     async def update_status(self):
-        """更新节点状态到Redis"""
+        """
+        发布完整状态消息（调度器据此维护节点列表，可靠模式下同时续约），
+        待发送的状态增量在同一次往返中写入节点哈希
+        """
         try:
-            # 获取系统资源使用情况
-            cpu_usage = psutil.cpu_percent()
-            memory_usage = psutil.virtual_memory().percent
+            await self.reporter.sample_resources_async()
             
-            self.status.cpu_usage = cpu_usage
-            self.status.memory_usage = memory_usage
-            self.status.last_heartbeat = datetime.now()
+            if self.task_queue:
+                await self.task_queue.update_worker_status(StatusMessage(
+                    worker_id=self.config.node_id,
+                    node_type=self.config.node_type,
+                    status=self.status.status,
+                    cpu_usage=self.status.cpu_usage,
+                    memory_usage=self.status.memory_usage,
+                    active_tasks=self.status.active_tasks,
+                    completed_tasks=self.status.success_tasks,
+                    failed_tasks=self.status.failed_tasks,
+                    last_heartbeat=datetime.now().isoformat()
+                ))
             
-            # 保存到Redis
-            key = f"worker:{self.config.node_id}"
-            await self.redis_client.hset(key, mapping={
-                "status": self.status.status,
-                "active_tasks": self.status.active_tasks,
-                "total_tasks": self.status.total_tasks,
-                "success_tasks": self.status.success_tasks,
-                "failed_tasks": self.status.failed_tasks,
-                "cpu_usage": cpu_usage,
-                "memory_usage": memory_usage,
-                "last_heartbeat": self.status.last_heartbeat.isoformat(),
-                "capabilities": json.dumps(self.status.capabilities)
-            })
-            
-            # 设置过期时间
-            await self.redis_client.expire(key, self.config.heartbeat_interval * 3)
+            self._published_status = self.status.status
+            self._last_published = time.monotonic()
             
         except Exception as e:
             self.logger.error(f"更新状态失败: {e}")
@@ -184,23 +432,46 @@ class WorkerNode:
         )
     
     async def heartbeat_loop(self):
-        """心跳循环"""
+        """
+        心跳循环
+        
+        每隔 status_flush_interval 检查一次：节点状态（ready/busy等）变化或到达心跳间隔时
+        发布状态消息；否则只发送到期且未随队列流水线发出的状态增量。
+        """
         while self.running:
             try:
-                await self.update_status()
-                await asyncio.sleep(self.config.heartbeat_interval)
+                await self.reporter.sample_resources_async()
+                await self.sample_redis_rtt()
+                
+                if (self.status.status != self._published_status or
+                        time.monotonic() - self._last_published >= self.config.heartbeat_interval):
+                    await self.update_status()
+                else:
+                    await self.reporter.flush(self.task_queue.redis_client)
+                
+                await asyncio.sleep(self.config.status_flush_interval)
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 self.logger.error(f"心跳循环错误: {e}")
                 await asyncio.sleep(5)
     
+    async def sample_redis_rtt(self):
+        """按 redis_rtt_interval 采样一次Redis往返时间"""
+        now = time.monotonic()
+        if now - self._last_rtt_sample < self.config.redis_rtt_interval:
+            return
+        self._last_rtt_sample = now
+        await self.task_queue.redis_client.ping()
+        self._redis_rtt.observe(time.monotonic() - now)
+    
     async def execute_task(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
         """执行任务"""
         task_id = task_data.get("task_id")
         crawler_type = task_data.get("crawler_type", "default")
         
         self.logger.info(f"开始执行任务: {task_id}, 类型: {crawler_type}")
+        start_time = time.time()
         
         try:
             # 获取爬虫实例
@@ -208,7 +479,7 @@ class WorkerNode:
             if not crawler_class:
                 raise ValueError(f"不支持的爬虫类型: {crawler_type}")
             
-            crawler = crawler_class(task_id)
+            crawler = crawler_class(task_id, self.engine)
             
             # 执行爬取
             result = await asyncio.wait_for(
@@ -217,76 +488,161 @@ class WorkerNode:
             )
             
             # 更新统计
-            self.status.success_tasks += 1
+            self.reporter.incr("success_tasks")
             
             return {
                 "task_id": task_id,
                 "status": "success",
                 "result": result,
                 "worker_id": self.config.node_id,
+                "response_time": time.time() - start_time,
                 "timestamp": datetime.now().isoformat()
             }
             
         except asyncio.TimeoutError:
             self.logger.error(f"任务超时: {task_id}")
-            self.status.failed_tasks += 1
+            self.reporter.incr("failed_tasks")
             return {
                 "task_id": task_id,
                 "status": "timeout",
                 "error": f"任务超时 ({self.config.task_timeout}s)",
                 "worker_id": self.config.node_id,
+                "response_time": time.time() - start_time,
                 "timestamp": datetime.now().isoformat()
             }
             
         except Exception as e:
             self.logger.error(f"任务执行失败: {task_id}, 错误: {e}")
-            self.status.failed_tasks += 1
+            self.reporter.incr("failed_tasks")
             return {
                 "task_id": task_id,
                 "status": "failed",
                 "error": str(e),
+                "status_code": getattr(e, "status_code", None),
                 "worker_id": self.config.node_id,
+                "response_time": time.time() - start_time,
                 "timestamp": datetime.now().isoformat()
             }
     
+    async def report_result(self, task: TaskMessage, outcome: Dict[str, Any]):
+        """将执行结果提交到队列，失败且可重试的任务进入延迟重试，不可重试的错误（如404）直接提交失败结果"""
+        data = outcome.get("result") or {}
+        status_code = data.get("status_code") or outcome.get("status_code")
+        error = outcome.get("error")
+        error_class = classify_error(status_code, error)
+        
+        if (outcome["status"] != TaskStatus.SUCCESS.value and error_class not in NON_RETRYABLE_ERRORS
+                and task.retry_count < task.max_retries):
+            await self.task_queue.retry_task(task.task_id, error_class=error_class, worker_id=self.config.node_id)
+            return
+        
+        await self.task_queue.complete_task(task.task_id, ResultMessage(
+            task_id=task.task_id,
+            worker_id=self.config.node_id,
+            status=outcome["status"],
+            status_code=status_code,
+            content=data.get("content"),
+            headers=data.get("headers"),
+            response_time=outcome.get("response_time", 0.0),
+            error_message=error,
+            url=task.url
+        ))
+    
+    def _refresh_load_status(self) -> bool:
+        """根据空闲槽位切换 ready/busy，返回状态是否变化"""
+        if self.status.status not in ("ready", "busy"):
+            return False
+        
+        status = "busy" if self.status.active_tasks >= self.config.max_concurrent_tasks else "ready"
+        return self.reporter.set("status", status)
+    
+    async def _run_task(self, task: TaskMessage):
+        """在任务槽中执行任务并提交结果"""
+        # 前沿已为该任务预约了请求时刻
+        mark_reserved(task.url)
+        try:
+            result = await self.execute_task(task.to_dict())
+            observe_task(urlparse(task.url).netloc, result["status"], result["response_time"])
+            await self.report_result(task, result)
+        except asyncio.CancelledError:
+            # 关闭时被取消的任务放回队列，由其他节点重新执行
+            await self.task_queue.requeue_tasks([task])
+            raise
+        except Exception as e:
+            self.logger.error(f"提交任务结果失败: {task.task_id}, 错误: {e}")
+        finally:
+            self.reporter.incr("active_tasks", -1)
+            self.tasks.pop(task.task_id, None)
+            self._slots.release()
+            # 状态变化由心跳循环按固定节奏发布
+            self._refresh_load_status()
+    
     async def task_worker_loop(self):
-        """任务工作循环"""
+        """
+        任务工作循环
+        
+        取任务协程从队列批量拉取任务放入域名前沿，本循环按域名可执行时刻依次取出
+        任务，每个任务在独立的协程中执行，并发数由 max_concurrent_tasks 个槽位限制。
+        访问间隔在前沿中等待，不占用任务槽。退出时前沿中未执行的任务归还队列。
+        """
+        fetcher = asyncio.create_task(self._fill_frontier())
+        try:
+            while self.running:
+                try:
+                    # 先取出最早可执行的任务，再等待空闲槽位：等待域名访问间隔时不占用槽位
+                    task = await self.frontier.pop()
+                    if task is None:
+                        break
+                    
+                    try:
+                        await self._slots.acquire()
+                    except BaseException:
+                        # 未执行的任务放回前沿，退出时随前沿一起归还队列
+                        self.frontier.add(task)
+                        raise
+                    if not self.running:
+                        self._slots.release()
+                        self.frontier.add(task)
+                        break
+                    
+                    # 更新状态
+                    self.reporter.incr("active_tasks")
+                    self.reporter.incr("total_tasks")
+                    self.tasks[task.task_id] = asyncio.create_task(self._run_task(task))
+                    self._refresh_load_status()
+                    
+                except asyncio.CancelledError:
+                    break
+                except Exception as e:
+                    self.logger.error(f"任务循环错误: {e}")
+                    await asyncio.sleep(5)
+        finally:
+            # 停止时让取任务协程结束本轮拉取，避免丢失已弹出但尚未放入前沿的任务
+            self.frontier.close()
+            if self.running:
+                fetcher.cancel()
+            await asyncio.gather(fetcher, return_exceptions=True)
+            pending = self.frontier.drain()
+            if pending:
+                await self.task_queue.requeue_tasks(pending)
+    
+    async def _fill_frontier(self):
+        """从队列批量拉取任务补充域名前沿（一次往返取回前沿的空余容量，阻塞等待由Redis完成）"""
+        limit = self.config.frontier_size or 2 * self.config.max_concurrent_tasks
         while self.running:
             try:
-                # 检查是否可以接受任务
-                if not await self.can_accept_task():
-                    await asyncio.sleep(1)
-                    continue
-                
-                # 获取任务
-                task = await self.task_queue.dequeue()
-                if not task:
-                    await asyncio.sleep(1)
-                    continue
-                
-                # 更新状态
-                self.status.active_tasks += 1
-                self.status.total_tasks += 1
-                self.status.status = "busy"
-                await self.update_status()
-                
-                # 执行任务
-                result = await self.execute_task(task)
-                
-                # 发送结果
-                await self.task_queue.complete_task(task["task_id"], result)
-                
-                # 恢复状态
-                self.status.active_tasks -= 1
-                if self.status.active_tasks == 0:
-                    self.status.status = "ready"
-                
-                await self.update_status()
-                
+                await self.frontier.wait_for_space(limit)
+                if not self.running:
+                    break
+                tasks = await self.task_queue.get_tasks(
+                    self.config.node_id, limit - len(self.frontier), timeout=1
+                )
+                for task in tasks:
+                    self.frontier.add(task)
             except asyncio.CancelledError:
-                break
+                raise
             except Exception as e:
-                self.logger.error(f"任务循环错误: {e}")
+                self.logger.error(f"拉取任务失败: {e}")
                 await asyncio.sleep(5)
     
     async def start(self):
@@ -304,6 +660,9 @@ class WorkerNode:
         # 初始化
         await self.initialize()
         
+        if self.config.metrics_port and start_metrics_server(self.config.metrics_port):
+            self.logger.info(f"指标服务: http://0.0.0.0:{self.config.metrics_port}/metrics")
+        
         self.running = True
         
         # 启动任务循环
@@ -325,9 +684,10 @@ class WorkerNode:
         """停止工作节点"""
         self.logger.info("停止工作节点...")
         self.running = False
+        self.frontier.close()
         
         # 更新状态为停止
-        self.status.status = "stopped"
+        self.reporter.set("status", "stopped")
         await self.update_status()
         
         # 取消所有运行中的任务
@@ -341,6 +701,8 @@ class WorkerNode:
     
     async def cleanup(self):
         """清理资源"""
+        await self.engine.close()
+        
         if self.redis_client:
             await self.redis_client.close()
         
@@ -357,6 +719,7 @@ async def main():
     parser.add_argument("--max-tasks", type=int, default=10, help="最大并发任务数")
     parser.add_argument("--redis-host", default="localhost", help="Redis主机")
     parser.add_argument("--redis-port", type=int, default=6379, help="Redis端口")
+    parser.add_argument("--metrics-port", type=int, help="指标HTTP服务端口（OpenMetrics）")
     
     args = parser.parse_args()
     
@@ -371,7 +734,8 @@ async def main():
         node_id=args.node_id,
         max_concurrent_tasks=args.max_tasks,
         redis_host=args.redis_host,
-        redis_port=args.redis_port
+        redis_port=args.redis_port,
+        metrics_port=args.metrics_port
     )
     
     # 启动工作节点
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+工作节点状态增量上报
+Worker Status Reporter
+
+工作节点不再在每个任务前后整体写一次状态，而是在本地累计计数器变化，按固定节奏
+用 HINCRBY 只发送增量，仪表类字段（状态、CPU、内存）只在变化时写入。
+待发送的增量优先附加到任务队列已有的流水线（取任务、提交结果）中一起执行，
+空闲时才由心跳循环单独发送；资源读数取自进程内共享的 ResourceSampler 缓存。
+节点哈希过期（节点长时间未能上报）后，增量不再叠加到残缺的哈希上，而是重写完整快照。
+
+节点哈希: {queue_prefix}:worker:{node_id}
+    status / active_tasks / total_tasks / success_tasks / failed_tasks /
+    cpu_usage / memory_usage / last_heartbeat / capabilities
+"""
+
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from .resource_sampler import ResourceSampler, ResourceSnapshot, get_resource_sampler
+
+# 以增量方式上报的计数器字段
+COUNTER_FIELDS = ("active_tasks", "total_tasks", "success_tasks", "failed_tasks")
+
+# 全量写入时的仪表类字段
+GAUGE_FIELDS = ("status", "cpu_usage", "memory_usage", "capabilities")
+
+# 写入节点哈希：哈希存在时叠加增量并写入变化的字段，已过期时写入完整快照
+# KEYS[1]: 节点哈希
+# ARGV[1]: 过期时间（秒）  ARGV[2]: 增量字段数n，随后n对 字段/增量
+# 接着: 变化字段数m，随后m对 字段/值；其余参数为完整快照的 字段/值 对
+WRITE_STATUS_SCRIPT = """
+local exists = redis.call('EXISTS', KEYS[1]) == 1
+local i = 3
+local n = tonumber(ARGV[2])
+if exists then
+    for _ = 1, n do
+        redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+        i = i + 2
+    end
+else
+    i = i + 2 * n
+end
+local m = tonumber(ARGV[i])
+i = i + 1
+if exists then
+    for _ = 1, m do
+        redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+        i = i + 2
+    end
+else
+    for j = i + 2 * m, #ARGV, 2 do
+        redis.call('HSET', KEYS[1], ARGV[j], ARGV[j + 1])
+    end
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return exists and 1 or 0
+"""
+
+
+class WorkerStatusReporter:
+    """节点状态增量上报器"""
+
+    def __init__(self,
+                 status: Any,
+                 key: str = None,
+                 flush_interval: float = 1.0,
+                 heartbeat_interval: float = 30,
+                 sample_interval: float = 5.0,
+                 resource_epsilon: float = 1.0,
+                 sampler: ResourceSampler = None):
+        """
+        初始化上报器
+
+        Args:
+            status: 本地状态对象（WorkerStatus），上报器负责修改其字段
+            key: Redis中的节点哈希键，为空时只维护本地状态
+            flush_interval: 增量的最长累计时间（秒）
+            heartbeat_interval: 无变化时刷新心跳的间隔（秒），哈希过期时间为其3倍
+            sample_interval: 资源读数的最大年龄（秒），不小于采样器的最小间隔
+            resource_epsilon: CPU/内存变化超过该百分点才上报
+            sampler: 资源采样器，默认为进程内共享的采样器
+        """
+        self.status = status
+        self.key = key
+        self.flush_interval = flush_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.sample_interval = sample_interval
+        self.resource_epsilon = resource_epsilon
+        self.sampler = sampler or get_resource_sampler()
+
+        self._deltas: Dict[str, int] = {}
+        self._dirty: Dict[str, Any] = {}
+        # 首次上报写入完整快照，覆盖同名节点上次运行遗留的计数
+        self._full = True
+        self._last_flush = 0.0
+        self._last_sample = 0.0
+
+    def incr(self, field: str, amount: int = 1):
+        """修改计数器字段并累计增量"""
+        setattr(self.status, field, getattr(self.status, field) + amount)
+        self._deltas[field] = self._deltas.get(field, 0) + amount
+
+    def set(self, field: str, value: Any) -> bool:
+        """修改仪表类字段，返回值是否变化"""
+        if getattr(self.status, field) == value:
+            return False
+        setattr(self.status, field, value)
+        self._dirty[field] = value
+        return True
+
+    def sample_resources(self, force: bool = False) -> bool:
+        """
+        从共享采样器读取CPU和内存使用率（距上次读取不足 sample_interval 时跳过）
+
+        Args:
+            force: 忽略 sample_interval 立即读取（采样器仍按自身的最小间隔返回缓存）
+
+        Returns:
+            bool: 是否读取了新的快照
+        """
+        if not self._sample_due(force):
+            return False
+        self._apply_sample(self.sampler.sample(self.sample_interval))
+        return True
+
+    async def sample_resources_async(self, force: bool = False) -> bool:
+        """与 sample_resources 相同，采样（读取 /proc）在线程中执行，不阻塞事件循环"""
+        if not self._sample_due(force):
+            return False
+        self._apply_sample(await asyncio.to_thread(self.sampler.sample, self.sample_interval))
+        return True
+
+    def _sample_due(self, force: bool) -> bool:
+        """是否到了读取时间（到了时记为已读取）"""
+        now = time.monotonic()
+        if not force and now - self._last_sample < self.sample_interval:
+            return False
+        self._last_sample = now
+        return True
+
+    def _apply_sample(self, snapshot: ResourceSnapshot):
+        """写入变化超过 resource_epsilon 的读数"""
+        readings = (
+            ("cpu_usage", snapshot.cpu_usage),
+            ("memory_usage", snapshot.memory_usage)
+        )
+        for field, value in readings:
+            if abs(getattr(self.status, field) - value) >= self.resource_epsilon:
+                self.set(field, value)
+
+    @property
+    def pending(self) -> bool:
+        """是否有未发送的变化"""
+        return self._full or bool(self._dirty) or any(self._deltas.values())
+
+    def due(self) -> bool:
+        """是否到了发送时间：有变化且超过累计时间，或需要刷新心跳"""
+        if self.key is None:
+            return False
+        elapsed = time.monotonic() - self._last_flush
+        return (self.pending and elapsed >= self.flush_interval) or elapsed >= self.heartbeat_interval
+
+    def drain(self, pipe) -> Optional[Tuple[Dict[str, int], Dict[str, Any], bool]]:
+        """
+        将待发送的变化追加到流水线（不执行），并清空本地累计
+
+        Args:
+            pipe: 同步或异步Redis流水线
+
+        Returns:
+            本批变化，流水线执行失败时交给 restore() 放回
+        """
+        if self.key is None:
+            return None
+
+        batch = (self._deltas, self._dirty, self._full)
+        self._deltas, self._dirty, self._full = {}, {}, False
+        self._last_flush = time.monotonic()
+        self.status.last_heartbeat = datetime.now()
+
+        snapshot = self._encode({field: getattr(self.status, field) for field in COUNTER_FIELDS + GAUGE_FIELDS})
+        if batch[2]:
+            deltas, mapping = {}, snapshot
+        else:
+            deltas = {field: delta for field, delta in batch[0].items() if delta}
+            mapping = self._encode(dict(batch[1]))
+
+        args = [int(self.heartbeat_interval * 3), len(deltas)]
+        for field, delta in deltas.items():
+            args += [field, delta]
+        args.append(len(mapping))
+        for field, value in list(mapping.items()) + list(snapshot.items()):
+            args += [field, value]
+        # 用 EVAL 而不是 EVALSHA：脚本很短，且在流水线中无需先检查脚本缓存
+        pipe.eval(WRITE_STATUS_SCRIPT, 1, self.key, *args)
+        return batch
+
+    def _encode(self, mapping: Dict[str, Any]) -> Dict[str, Any]:
+        """转换为哈希字段值，并附上本次心跳时间"""
+        if "capabilities" in mapping:
+            mapping["capabilities"] = json.dumps(mapping["capabilities"])
+        mapping["last_heartbeat"] = self.status.last_heartbeat.isoformat()
+        return mapping
+
+    def restore(self, batch: Optional[Tuple[Dict[str, int], Dict[str, Any], bool]]):
+        """流水线执行失败时放回本批变化，下次一起发送"""
+        if batch is None:
+            return
+        deltas, dirty, full = batch
+        for field, delta in deltas.items():
+            self._deltas[field] = self._deltas.get(field, 0) + delta
+        for field, value in dirty.items():
+            self._dirty.setdefault(field, value)
+        self._full = self._full or full
+        self._last_flush = 0.0
+
+    async def flush(self, client, force: bool = False) -> bool:
+        """
+        单独发送一次（异步客户端），未到发送时间且非强制时跳过
+
+        Returns:
+            bool: 是否发送
+        """
+        if self.key is None or not (force or self.due()):
+            return False
+
+        pipe = client.pipeline(transaction=False)
+        batch = self.drain(pipe)
+        try:
+            await pipe.execute()
+        except Exception:
+            self.restore(batch)
+            raise
+        return True
@@ -31,6 +31,7 @@ for name in logging.Logger.manager.loggerDict:
 from scripts.format_processor import FormatProcessor
 from utils.web_deduplication import get_deduplication_instance, check_and_cache, clean_cache, get_stats
 from utils.webpage_storage import get_storage_instance
+from utils.metrics import instrument_tool, start_metrics_server
 try:
     from httpx_socks import AsyncProxyTransport
     SOCKS_AVAILABLE = True
@@ -63,6 +64,15 @@ model = os.getenv("MODEL")
 
 mcp = FastMCP("WebScrapingServer")
 
+# 指标HTTP服务端口（OpenMetrics），为空时不启动
+METRICS_PORT = int(os.getenv("MCP_METRICS_PORT", "0"))
+
+def tool():
+    """注册MCP工具，同时记录调用次数和耗时"""
+    def decorator(fn):
+        return mcp.tool()(instrument_tool(fn))
+    return decorator
+
 # 初始化格式处理器
 format_processor = FormatProcessor()
 
@@ -464,7 +474,7 @@ def search_web(keyword: str, max_results=12):
         logger.error(f"搜索失败: {str(e)}")
         return []
 
-@mcp.tool()
+@tool()
 def fetch_raw_data(engine: str, keyword: str, max_results: int = 10) -> str:
     """
     从指定搜索引擎获取原始数据
@@ -489,7 +499,7 @@ def fetch_raw_data(engine: str, keyword: str, max_results: int = 10) -> str:
         }
         return json.dumps(error_result, ensure_ascii=False, indent=2)
 
-@mcp.tool()
+@tool()
 def parse_search_results(raw_response_json: str, engine: str = None, custom_rules: str = None) -> str:
     """
     根据配置规则解析原始搜索数据
@@ -524,7 +534,7 @@ def parse_search_results(raw_response_json: str, engine: str = None, custom_rule
         }
         return json.dumps(error_result, ensure_ascii=False, indent=2)
 
-@mcp.tool()
+@tool()
 def search_and_parse_universal(engine: str, keyword: str, max_results: int = 10, custom_rules: str = None) -> str:
     """
     通用搜索和解析工具 - 一站式搜索和解析
@@ -561,7 +571,7 @@ def search_and_parse_universal(engine: str, keyword: str, max_results: int = 10,
         }
         return json.dumps(error_result, ensure_ascii=False, indent=2)
 
-@mcp.tool()
+@tool()
 def get_available_search_engines() -> str:
     """
     获取可用的搜索引擎列表及其配置信息
@@ -596,7 +606,7 @@ def get_available_search_engines() -> str:
         }
         return json.dumps(error_result, ensure_ascii=False, indent=2)
 
-@mcp.tool()
+@tool()
 def configure_search_engine(engine: str, config_json: str) -> str:
     """
     动态配置搜索引擎解析规则（运行时配置）
@@ -649,7 +659,7 @@ def configure_search_engine(engine: str, config_json: str) -> str:
         }
         return json.dumps(error_result, ensure_ascii=False, indent=2)
 
-@mcp.tool()
+@tool()
 async def check_tor_ip() -> str:
     """Check current IP address through Tor proxy"""
     if not USE_TOR or not tor_manager:
@@ -684,7 +694,7 @@ async def check_tor_ip() -> str:
         return f"[ERROR] Failed to check Tor IP: {str(e)}"
 
 
-@mcp.tool()
+@tool()
 async def test_tor_connection() -> str:
     """Test Tor proxy connection with multiple endpoints"""
     if not USE_TOR or not tor_manager:
@@ -726,7 +736,7 @@ async def test_tor_connection() -> str:
     return f"{status} Tor connection test completed ({success_count}/{total_count} passed)\n" + "\n".join(results)
 
 
-@mcp.tool()
+@tool()
 def validate_tor_config() -> str:
     """Validate Tor configuration settings"""
     issues = []
@@ -772,7 +782,7 @@ def validate_tor_config() -> str:
         return "[SUCCESS] Tor configuration is valid"
 
 
-@mcp.tool()
+@tool()
 def get_tor_bootstrap_status() -> str:
     """Get detailed Tor bootstrap status and progress"""
     if not USE_TOR or not tor_manager:
@@ -871,7 +881,7 @@ def get_tor_bootstrap_status() -> str:
         return f"[ERROR] Failed to get bootstrap status: {str(e)}"
 
 
-@mcp.tool()
+@tool()
 async def auto_rotate_tor_identity(interval_seconds: int = 300, max_rotations: int = 10) -> str:
     """Automatically rotate Tor identity at specified intervals"""
     if not USE_TOR or not tor_manager:
@@ -938,7 +948,7 @@ async def auto_rotate_tor_identity(interval_seconds: int = 300, max_rotations: i
         return f"[ERROR] Auto rotation failed: {str(e)}"
 
 
-@mcp.tool()
+@tool()
 def get_tor_circuit_info() -> str:
     """Get information about current Tor circuit"""
     if not USE_TOR or not tor_manager:
@@ -991,7 +1001,7 @@ def get_tor_circuit_info() -> str:
         return f"[ERROR] Failed to get circuit info: {str(e)}"
 
 
-@mcp.tool()
+@tool()
 async def scrape_webpage(url: str, headers=None, cookies=None) -> str:
     """
     抓取网页文本 + 图片分析（通过视觉模型）+ 使用主模型总结。
@@ -1422,7 +1432,7 @@ async def scrape_webpage(url: str, headers=None, cookies=None) -> str:
     except Exception as e:
         return f"[ERROR] 图文提取失败 {str(e)}"
 
-@mcp.tool()
+@tool()
 def save_to_knowledge_base(json_data: str, base_filename: str = None, format_type: str = "dfd") -> str:
     """
     使用通用格式处理器保存知识库数据到独立文件中，支持多种格式类型
@@ -1462,7 +1472,7 @@ def save_to_knowledge_base(json_data: str, base_filename: str = None, format_typ
     except Exception as e:
         return f"[ERROR] 保存知识库数据失败: {str(e)}"
 
-@mcp.tool()
+@tool()
 async def search_and_scrape(keyword: str, top_k: int = 12) -> str:
     """
     根据关键词搜索网页，并抓取前几个网页的图文信息。
@@ -1513,7 +1523,7 @@ async def search_and_scrape(keyword: str, top_k: int = 12) -> str:
         logger.error(f"搜索或抓取过程中出错: {str(e)}")
         return f"[ERROR] 搜索或抓取失败 {str(e)}"
 
-@mcp.tool()
+@tool()
 def manage_web_deduplication(action: str = "stats", days: int = 7) -> str:
     """
     管理网页去重系统
@@ -1586,6 +1596,9 @@ if __name__ == "__main__":
             # ERROR: Tor proxy auto-start failed, using normal network connection
             pass
     
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+    
     try:
         mcp.run(transport='stdio')
     finally:
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分布式组件测试的公共夹具
+
+队列测试使用 fakeredis（含Lua脚本支持），无需本地Redis服务
+"""
+
+import pytest
+
+
+@pytest.fixture
+def redis_server(monkeypatch):
+    """进程内的 fakeredis 服务，同步和异步客户端共享同一份数据"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    import redis
+    import redis.asyncio
+
+    server = fakeredis.FakeServer()
+
+    def sync_client(**kwargs):
+        return fakeredis.FakeRedis(server=server, decode_responses=kwargs.get("decode_responses", False))
+
+    def async_client(connection_pool=None, **kwargs):
+        options = connection_pool or kwargs
+        return fakeredis.FakeAsyncRedis(server=server, decode_responses=options.get("decode_responses", False))
+
+    monkeypatch.setattr(redis, "Redis", sync_client)
+    monkeypatch.setattr(redis.asyncio, "Redis", async_client)
+    monkeypatch.setattr(redis.asyncio, "BlockingConnectionPool", lambda **kwargs: kwargs)
+    return server
+
+
+@pytest.fixture
+def make_queue(redis_server):
+    """创建连接到 fakeredis 的同步任务队列"""
+    from distributed.task_queue import TaskQueue
+
+    queues = []
+
+    def factory(**kwargs):
+        kwargs.setdefault("queue_prefix", "test")
+        queue = TaskQueue(**kwargs)
+        queues.append(queue)
+        return queue
+
+    yield factory
+    for queue in queues:
+        queue.close()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+访问控制器测试：域名状态的LRU淘汰、近期请求数的衰减、reserve() 预约和 mark_reserved
+"""
+
+import asyncio
+import math
+
+import pytest
+
+from distributed import access_controller
+from distributed.access_controller import AccessConfig, AccessController, DomainState, mark_reserved
+
+
+def _fixed(**kwargs):
+    """固定间隔的访问控制器（不含随机延迟）"""
+    return AccessController(AccessConfig(min_delay=1.0, max_delay=1.0, adaptive_delay=False, **kwargs))
+
+
+def test_least_recently_used_domain_is_evicted_at_capacity():
+    controller = AccessController(AccessConfig(max_tracked_domains=2))
+    for url in ["https://a.example/", "https://b.example/", "https://a.example/x", "https://c.example/"]:
+        controller.record_access(url)
+
+    assert list(controller.domain_stats) == ["a.example", "c.example"]
+    assert controller.get_domain_stats("a.example")["total_requests"] == 2
+    assert controller.get_domain_stats("b.example") == {}
+
+
+def test_rate_limiter_state_is_bounded_by_the_same_capacity():
+    controller = _fixed(max_tracked_domains=2)
+
+    async def run():
+        for domain in ["a.example", "b.example", "c.example"]:
+            await controller.reserve(f"https://{domain}/")
+
+    asyncio.run(run())
+    assert list(controller.rate_limiter._tat) == ["b.example", "c.example"]
+
+
+def test_recent_requests_decay_over_the_window():
+    state = DomainState()
+    assert state.recent(0.0, 100.0) == 0.0
+
+    for _ in range(3):
+        state.record(1000.0, 100.0, response_time=0.5)
+    assert state.recent(1000.0, 100.0) == pytest.approx(3.0)
+    assert state.recent(1100.0, 100.0) == pytest.approx(3.0 / math.e)
+
+    # 新的请求在衰减后的计数上加一，总数不衰减
+    state.record(1100.0, 100.0, response_time=1.5)
+    assert state.recent(1100.0, 100.0) == pytest.approx(3.0 / math.e + 1)
+    assert state.total_requests == 4
+    assert state.avg_response_time == pytest.approx(0.75)
+
+
+def test_domain_stats_report_decayed_counts(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(access_controller.time, "time", lambda: now[0])
+    controller = AccessController(AccessConfig(stats_window=60.0))
+    for _ in range(5):
+        controller.record_access("https://a.example/")
+
+    now[0] += 600
+    stats = controller.get_domain_stats("a.example")
+    assert stats["total_requests"] == 5
+    assert stats["recent_requests"] == pytest.approx(5 * math.exp(-10))
+
+
+def test_reserve_books_consecutive_slots_and_respects_max_wait():
+    controller = _fixed()
+    url = "https://a.example/"
+
+    async def run():
+        first = await controller.reserve(url)
+        second = await controller.reserve(url)
+        refused = await controller.reserve(url, max_wait=0.5)
+        third = await controller.reserve(url)
+        return first, second, refused, third
+
+    first, second, refused, third = asyncio.run(run())
+    assert first == 0.0
+    assert second == pytest.approx(1.0, abs=0.05)
+    # 超过 max_wait 时不预约，不占用后续时刻
+    assert refused is None
+    assert third == pytest.approx(2.0, abs=0.05)
+
+
+def test_mark_reserved_skips_only_the_first_request_in_its_task():
+    controller = _fixed()
+    url = "https://a.example/"
+
+    async def two_requests():
+        mark_reserved(url)
+        skipped = await controller.wait_before_request(url)
+        booked_after_first = "a.example" in controller.rate_limiter._tat
+        await controller.wait_before_request(url)
+        return skipped, booked_after_first, "a.example" in controller.rate_limiter._tat
+
+    # 第一次请求使用前沿的预约，同一任务的第二次请求照常预约
+    assert asyncio.run(two_requests()) == (0.0, False, True)
+
+
+def test_mark_reserved_does_not_leak_into_other_tasks():
+    controller = _fixed()
+    url = "https://a.example/"
+
+    async def marking_task():
+        mark_reserved(url)
+
+    async def other_task():
+        await controller.wait_before_request(url)
+        return "a.example" in controller.rate_limiter._tat
+
+    async def run():
+        await asyncio.create_task(marking_task())
+        return await asyncio.create_task(other_task())
+
+    assert asyncio.run(run())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Blob存储测试：内容寻址写入、按写入时间清理，以及结果收集器读取转存内容和清理过期内容
+"""
+
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from distributed.blob_store import LocalBlobStore, content_ref
+from distributed.task_queue import ResultMessage, TaskStatus
+
+DAY = 86400
+
+
+def _age(store, ref, seconds):
+    path = store._path(ref)
+    timestamp = time.time() - seconds
+    os.utime(path, (timestamp, timestamp))
+
+
+def test_put_is_content_addressed(tmp_path):
+    store = LocalBlobStore(tmp_path)
+    ref = store.put(b"page")
+    assert ref == content_ref(b"page")
+    assert store.put(b"page") == ref
+    assert store.get(ref) == b"page"
+    assert store.exists(ref)
+    assert store.get(content_ref(b"missing")) is None
+
+
+def test_put_refreshes_existing_content(tmp_path):
+    store = LocalBlobStore(tmp_path)
+    ref = store.put(b"page")
+    _age(store, ref, 10 * DAY)
+
+    store.put(b"page")
+    assert store.remove_older_than(time.time() - DAY) == 0
+    assert store.exists(ref)
+
+
+def test_remove_older_than(tmp_path):
+    store = LocalBlobStore(tmp_path)
+    old = store.put(b"old")
+    new = store.put(b"new")
+    _age(store, old, 10 * DAY)
+
+    assert store.remove_older_than(time.time() - DAY) == 1
+    assert not store.exists(old)
+    assert store.exists(new)
+
+
+@pytest.fixture
+def collector_factory(tmp_path, monkeypatch, make_queue):
+    from distributed.result_collector import ResultCollector, StorageConfig
+
+    # 收集器日志写到当前目录的 logs/ 下
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "logs").mkdir()
+    blobs = LocalBlobStore(tmp_path / "blobs")
+
+    def factory(**kwargs):
+        queue = make_queue(blob_store=blobs)
+        return ResultCollector(queue, StorageConfig(base_path=str(tmp_path / "results"), **kwargs))
+
+    return factory
+
+
+def _offloaded_result(collector, content="<html>large page</html>"):
+    result = ResultMessage(task_id="t1", worker_id="w1", status=TaskStatus.SUCCESS.value,
+                           status_code=200, content=content)
+    assert result.offload_content(collector.blob_store)
+    assert result.content is None
+    return result
+
+
+def _stored_records(collector):
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return list(collector.iter_data_in_range(today, today + timedelta(days=1)))
+
+
+def test_collector_dereferences_content_when_configured(collector_factory):
+    collector = collector_factory(include_content=True)
+    result = _offloaded_result(collector)
+
+    collector._batch_store([result])
+    record, = _stored_records(collector)
+    assert record["content"] == "<html>large page</html>"
+    assert record["content_ref"] == result.content_ref
+
+
+def test_collector_stores_only_reference_by_default(collector_factory):
+    collector = collector_factory()
+    result = _offloaded_result(collector)
+
+    collector._batch_store([result])
+    record, = _stored_records(collector)
+    assert "content" not in record
+    assert record["content_ref"] == result.content_ref
+
+
+def test_cleanup_removes_blobs_past_retention(collector_factory):
+    collector = collector_factory(retention_days=7)
+    expired = _offloaded_result(collector, "expired page").content_ref
+    kept = _offloaded_result(collector, "recent page").content_ref
+
+    # 默认比结果多保留一天
+    _age(collector.blob_store, expired, 8 * DAY + 60)
+    _age(collector.blob_store, kept, 8 * DAY - 60)
+
+    collector.cleanup_old_data()
+    assert not collector.blob_store.exists(expired)
+    assert collector.blob_store.exists(kept)
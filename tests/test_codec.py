@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+消息编解码测试：msgpack / orjson 往返、压缩阈值、未知版本和编码的拒绝、旧版JSON负载
+"""
+
+import json
+
+import pytest
+
+from distributed.codec import (
+    MAGIC, FORMAT_VERSION, FLAG_ZSTD, FLAG_ZLIB, CodecError, get_codec, decode_payload
+)
+from distributed.task_queue import TaskMessage, ResultMessage, StatusMessage
+
+MESSAGES = [
+    TaskMessage(task_id="t1", url="https://example.com/路径", priority=3, params={"depth": 2}, route="render"),
+    ResultMessage(task_id="t1", worker_id="w1", status="success", content="<html>内容</html>",
+                  headers={"Content-Type": "text/html"}, status_code=200),
+    StatusMessage(worker_id="w1", node_type="general", status="busy", cpu_usage=12.5, active_tasks=3),
+]
+
+
+@pytest.mark.parametrize("name", ["msgpack", "orjson"])
+@pytest.mark.parametrize("message", MESSAGES, ids=lambda message: type(message).__name__)
+def test_binary_round_trip(name, message):
+    pytest.importorskip(name)
+    payload = get_codec(name).encode(message.to_dict())
+
+    assert isinstance(payload, bytes)
+    assert payload[:3] == bytes((MAGIC, FORMAT_VERSION, get_codec(name).codec_id))
+    assert type(message).from_dict(decode_payload(payload)) == message
+
+
+@pytest.mark.parametrize("name", ["json", "msgpack", "orjson"])
+@pytest.mark.parametrize("compression, flag", [("zlib", FLAG_ZLIB), ("zstd", FLAG_ZSTD)])
+def test_compression_only_above_threshold(name, compression, flag):
+    if name != "json":
+        pytest.importorskip(name)
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    codec = get_codec(name, compress_threshold=1024, compression=compression)
+
+    small = ResultMessage(task_id="t1", worker_id="w1", status="success", content="x" * 100)
+    large = ResultMessage(task_id="t2", worker_id="w1", status="success", content="x" * 10000)
+    small_payload = codec.encode(small.to_dict())
+    large_payload = codec.encode(large.to_dict())
+
+    if name == "json":
+        # 未超过阈值时保持旧版本的JSON文本
+        assert small_payload == json.dumps(small.to_dict(), ensure_ascii=False)
+    else:
+        assert small_payload[3] == 0
+    assert large_payload[0] == MAGIC and large_payload[3] == flag
+    assert len(large_payload) < 10000
+    assert ResultMessage.from_dict(decode_payload(small_payload)) == small
+    assert ResultMessage.from_dict(decode_payload(large_payload)) == large
+
+
+def test_zero_threshold_disables_compression():
+    codec = get_codec("json", compress_threshold=0)
+    data = {"content": "x" * 100000}
+    assert codec.encode(data) == json.dumps(data)
+
+
+@pytest.mark.parametrize("payload, error", [
+    (bytes((MAGIC, FORMAT_VERSION + 1, 1, 0)) + b"\x80", "版本"),
+    (bytes((MAGIC, FORMAT_VERSION, 99, 0)) + b"{}", "编码ID"),
+    (bytes((MAGIC, FORMAT_VERSION)), "头部"),
+])
+def test_unknown_header_is_rejected(payload, error):
+    with pytest.raises(CodecError, match=error):
+        decode_payload(payload)
+
+
+@pytest.mark.parametrize("message", MESSAGES, ids=lambda message: type(message).__name__)
+def test_legacy_json_payloads_decode(message):
+    legacy = message.to_json()
+    assert type(message).from_dict(decode_payload(legacy)) == message
+    assert type(message).from_dict(decode_payload(legacy.encode("utf-8"))) == message
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分布式配置测试：队列后端校验和按配置创建队列
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("yaml")
+pytest.importorskip("toml")
+
+from distributed.config import ConfigValidator, DistributedConfig
+
+
+def test_list_backend_is_valid():
+    assert ConfigValidator.validate_config(DistributedConfig()) == []
+
+
+def test_stream_backend_is_valid():
+    config = DistributedConfig()
+    config.queue.backend = "stream"
+    assert ConfigValidator.validate_config(config) == []
+
+
+def test_unknown_backend_is_rejected():
+    config = DistributedConfig()
+    config.queue.backend = "kafka"
+    assert ConfigValidator.validate_config(config) == ["队列后端必须是 list 或 stream"]
+
+
+def test_negative_compress_threshold_is_rejected():
+    config = DistributedConfig()
+    config.queue.compress_threshold = -1
+    assert ConfigValidator.validate_config(config) == ["消息压缩阈值不能小于0"]
+
+
+def test_create_task_queue_uses_config(redis_server):
+    from distributed.task_queue import TaskQueue, create_task_queue
+
+    config = DistributedConfig()
+    config.queue.prefix = "configured"
+    config.queue.reliable = True
+    config.queue.visibility_timeout = 42
+    queue = create_task_queue(config, redis_host="redis.internal")
+
+    assert type(queue) is TaskQueue
+    assert (queue.queue_prefix, queue.reliable, queue.visibility_timeout) == ("configured", True, 42)
+    assert queue.redis_host == "redis.internal"
+    queue.close()
+
+
+def test_worker_fails_on_invalid_config_before_connecting(monkeypatch):
+    from distributed import worker_node
+
+    def invalid_config():
+        raise ValueError("配置验证失败: 队列后端必须是 list 或 stream")
+
+    def no_redis(**kwargs):
+        raise AssertionError("不应在配置校验失败后连接Redis")
+
+    monkeypatch.setattr(worker_node, "get_config", invalid_config)
+    monkeypatch.setattr(worker_node.redis, "Redis", no_redis)
+    worker = worker_node.WorkerNode(worker_node.WorkerConfig(node_id="w1"))
+
+    with pytest.raises(ValueError, match="stream"):
+        asyncio.run(worker.initialize())
+
+
+def test_queue_factories_select_stream_backend(redis_server):
+    from distributed.async_task_queue import create_async_task_queue
+    from distributed.stream_queue import StreamTaskQueue, AsyncStreamTaskQueue
+    from distributed.task_queue import create_task_queue
+
+    config = DistributedConfig()
+    config.queue.backend = "stream"
+    config.queue.result_maxlen = 500
+    queue = create_task_queue(config)
+    async_queue = create_async_task_queue(config, routes=["render"])
+
+    assert type(queue) is StreamTaskQueue and queue.result_maxlen == 500
+    assert type(async_queue) is AsyncStreamTaskQueue and async_queue.reliable
+    assert async_queue._stream_order[0] == "crawler:stream:tasks:route:render:urgent"
+    queue.close()
+
+
+def test_async_queue_factory_rejects_unknown_backend():
+    from distributed.async_task_queue import create_async_task_queue
+
+    config = DistributedConfig()
+    config.queue.backend = "kafka"
+    with pytest.raises(ValueError, match="kafka"):
+        create_async_task_queue(config)
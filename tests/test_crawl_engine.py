@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬取引擎测试：本地HTTP夹具服务器上的连接池复用、404不重试、503挑战页升级到浏览器（桩）
+"""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from distributed.access_controller import AccessConfig, AccessController
+from distributed.task_queue import NON_RETRYABLE_ERRORS, TaskMessage, TaskStatus, classify_error
+from distributed.worker_node import CrawlEngine, CrawlError, WorkerConfig, WorkerNode
+
+PAGES = {
+    "/ok": (200, "<html><body>hello</body></html>"),
+    "/missing": (404, "<html><body>not found</body></html>"),
+    "/challenge": (503, "<html><title>Just a moment...</title></html>"),
+}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 支持keep-alive
+
+    def do_GET(self):
+        status, body = PAGES.get(self.path, (404, ""))
+        data = body.encode("utf-8")
+        self.server.client_ports.append(self.client_address[1])
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    server.client_ports = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+class StubBrowser:
+    """代替 StealthCrawler 的浏览器桩"""
+
+    def __init__(self):
+        self.urls = []
+
+    async def crawl_url(self, url, timeout=None):
+        self.urls.append(url)
+        return SimpleNamespace(success=True, url=url, status_code=200, content="<html>rendered</html>",
+                               headers={}, error=None)
+
+    async def close(self):
+        pass
+
+
+async def _with_engine(callback):
+    engine = CrawlEngine(access_controller=AccessController(AccessConfig(min_delay=0, max_delay=0)))
+    await engine.start()
+    try:
+        return await callback(engine)
+    finally:
+        await engine.close()
+
+
+def test_pooled_client_reuses_connection(server):
+    async def fetch_three(engine):
+        return [await engine.fetch({"url": _url(server, "/ok")}, mode="http") for _ in range(3)]
+
+    results = asyncio.run(_with_engine(fetch_three))
+    assert [result["status_code"] for result in results] == [200, 200, 200]
+    assert results[0]["content"] == PAGES["/ok"][1]
+    # 三个请求走同一个keep-alive连接
+    assert len(server.client_ports) == 3
+    assert len(set(server.client_ports)) == 1
+
+
+def test_not_found_raises_non_retryable_error(server):
+    async def fetch_missing(engine):
+        with pytest.raises(CrawlError) as info:
+            await engine.fetch({"url": _url(server, "/missing")}, mode="http")
+        return info.value
+
+    error = asyncio.run(_with_engine(fetch_missing))
+    assert error.status_code == 404
+    assert classify_error(error.status_code, str(error)) in NON_RETRYABLE_ERRORS
+
+
+def test_challenge_page_escalates_to_browser(server):
+    pytest.importorskip("utils.stealth_crawler")
+    browser = StubBrowser()
+
+    async def fetch_challenge(engine):
+        engine.browser = browser
+        first = await engine.fetch({"url": _url(server, "/challenge")})
+        # 该域名之后直接使用浏览器
+        second = await engine.fetch({"url": _url(server, "/ok")})
+        return engine, first, second
+
+    engine, first, second = asyncio.run(_with_engine(fetch_challenge))
+    assert (first["fetched_with"], first["status_code"], first["anti_bot"]) == ("browser", 200, "cloudflare")
+    assert second["fetched_with"] == "browser"
+    assert browser.urls == [_url(server, "/challenge"), _url(server, "/ok")]
+    assert len(server.client_ports) == 1
+    assert engine.stats == {"http_fetches": 1, "browser_fetches": 2, "escalations": 1}
+
+
+@pytest.mark.parametrize("status_code, error_class", [
+    (400, "client_error"), (404, "client_error"), (410, "client_error"), (408, "timeout"),
+    (401, "blocked"), (403, "blocked"), (429, "rate_limited"), (503, "server_error"),
+])
+def test_classify_status_codes(status_code, error_class):
+    assert classify_error(status_code) == error_class
+
+
+class RecordingQueue:
+    def __init__(self):
+        self.calls = []
+
+    async def retry_task(self, task_id, **kwargs):
+        self.calls.append(("retry", task_id, kwargs["error_class"]))
+
+    async def complete_task(self, task_id, result):
+        self.calls.append(("complete", task_id, result.status, result.status_code))
+
+
+@pytest.mark.parametrize("status_code, expected", [
+    (404, ("complete", "t1", TaskStatus.FAILED.value, 404)),
+    (503, ("retry", "t1", "server_error")),
+])
+def test_report_result_skips_retry_for_client_errors(status_code, expected):
+    worker = WorkerNode(WorkerConfig(node_id="w1"))
+    worker.task_queue = RecordingQueue()
+    task = TaskMessage(task_id="t1", url="https://example.com/a")
+    outcome = {"status": TaskStatus.FAILED.value, "status_code": status_code,
+               "error": f"HTTP {status_code}", "response_time": 0.1}
+
+    asyncio.run(worker.report_result(task, outcome))
+    assert worker.task_queue.calls == [expected]
+
+
+def test_retry_task_sends_client_errors_to_dead_letter(make_queue):
+    queue = make_queue(reliable=True)
+    queue.add_task(TaskMessage(task_id="t1", url="https://example.com/a"))
+    assert queue.get_task("w1", timeout=1).task_id == "t1"
+
+    queue.retry_task("t1", error_class="client_error", worker_id="w1")
+    assert queue.redis_client.lrange(queue.dead_letter_queue, 0, -1) == ["t1"]
+    assert queue.redis_client.zcard(queue.delayed_queue) == 0
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+域名亲和测试：域名稳定映射到同一分片、节点加入或离开时只有少量键改变归属、
+热点域名分散到多个节点
+"""
+
+from types import SimpleNamespace
+
+from distributed import task_scheduler
+from distributed.task_queue import TaskMessage
+from distributed.task_scheduler import ConsistentHashRing, DomainAffinity
+
+KEYS = [f"site{i}.example" for i in range(5000)]
+
+
+def _owners(ring):
+    return {key: ring.lookup(key)[0] for key in KEYS}
+
+
+def _workers(*ids, node_type="general"):
+    return [SimpleNamespace(worker_id=worker_id, node_type=node_type, is_alive=True) for worker_id in ids]
+
+
+def _task(url):
+    return TaskMessage(task_id=url, url=url)
+
+
+def test_domain_maps_to_the_same_shard():
+    nodes = [f"w{i}" for i in range(8)]
+    # 同一成员重建的环（包括不同的加入顺序）得到相同的归属
+    assert _owners(ConsistentHashRing(nodes)) == _owners(ConsistentHashRing(reversed(nodes)))
+
+    affinity = DomainAffinity()
+    affinity.rebuild(_workers(*nodes))
+    shards = {affinity.shard(_task(f"https://Shop.Example/item/{i}")) for i in range(20)}
+    assert len(shards) == 1
+
+
+def test_only_a_small_share_of_keys_moves_when_a_worker_joins():
+    nodes = [f"w{i}" for i in range(10)]
+    before = _owners(ConsistentHashRing(nodes))
+    after = _owners(ConsistentHashRing(nodes + ["w10"]))
+
+    moved = [key for key in KEYS if before[key] != after[key]]
+    # 期望约 1/11 的键移到新节点，其余键的归属不变
+    assert 0.03 < len(moved) / len(KEYS) < 0.2
+    assert all(after[key] == "w10" for key in moved)
+
+
+def test_only_the_departed_workers_keys_move_when_it_leaves():
+    nodes = [f"w{i}" for i in range(10)]
+    before = _owners(ConsistentHashRing(nodes))
+    after = _owners(ConsistentHashRing([node for node in nodes if node != "w3"]))
+
+    moved = {key for key in KEYS if before[key] != after[key]}
+    assert moved == {key for key in KEYS if before[key] == "w3"}
+    assert len(moved) / len(KEYS) < 0.2
+
+
+def test_rebuild_tracks_departed_workers_and_node_type_rings():
+    affinity = DomainAffinity()
+    assert affinity.rebuild(_workers("w1", "w2") + _workers("b1", node_type="browser"))
+    assert not affinity.rebuild(_workers("w1", "w2") + _workers("b1", node_type="browser"))
+    assert affinity.shard(_task("https://a.example/"), "browser") == "b1"
+
+    assert affinity.rebuild(_workers("w1") + _workers("b1", node_type="browser"))
+    assert set(affinity.retired) == {"w2"}
+    assert affinity.shard(_task("https://a.example/"), "general") == "w1"
+    assert affinity.shard(_task("https://a.example/"), "render") is None
+
+
+def test_hot_domain_falls_back_to_spreading_over_several_workers():
+    affinity = DomainAffinity(hot_threshold=5, hot_spread=3)
+    affinity.rebuild(_workers(*[f"w{i}" for i in range(8)]))
+    ring = affinity.rings[None]
+    owner = ring.lookup("hot.example")[0]
+
+    shards = [affinity.shard(_task(f"https://hot.example/{i}")) for i in range(30)]
+    assert set(shards[:5]) == {owner}
+    assert set(shards[5:]) == set(ring.lookup("hot.example", 3))
+    assert affinity.get_statistics()["hot_domains"] == ["hot.example"]
+
+
+def test_hot_domain_cools_down_after_two_quiet_windows(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(task_scheduler.time, "monotonic", lambda: now[0])
+    affinity = DomainAffinity(hot_threshold=5, hot_spread=3, hot_window=60.0)
+    affinity.rebuild(_workers(*[f"w{i}" for i in range(8)]))
+    ring = affinity.rings[None]
+    owner = ring.lookup("hot.example")[0]
+
+    for i in range(10):
+        affinity.shard(_task(f"https://hot.example/{i}"))
+    # 下一个窗口仍计入上一个窗口的任务数
+    now[0] += 61
+    assert affinity.shard(_task("https://hot.example/carry")) in ring.lookup("hot.example", 3)
+    assert affinity.get_statistics()["hot_domains"] == ["hot.example"]
+
+    now[0] += 200
+    assert affinity.shard(_task("https://hot.example/next")) == owner
+    assert affinity.get_statistics()["hot_domains"] == []
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+域名前沿测试：最早可执行的域名先出队、pop 只等待到最早的可执行时刻、
+就绪域名不被延迟域名阻塞，以及工作节点在取出任务后才占用任务槽
+"""
+
+import asyncio
+import time
+from urllib.parse import urlparse
+
+from distributed.frontier import DomainFrontier
+from distributed.task_queue import TaskMessage
+
+
+class ScriptedAccess:
+    """按域名返回固定预约等待时间的访问控制器"""
+
+    def __init__(self, waits):
+        self.waits = waits
+        self.reserved = []
+
+    async def reserve(self, url, max_wait=None):
+        domain = urlparse(url).netloc
+        self.reserved.append(domain)
+        return self.waits.get(domain, 0.0)
+
+
+def _task(task_id, domain):
+    return TaskMessage(task_id=task_id, url=f"https://{domain}/{task_id}")
+
+
+def test_ready_soonest_domain_is_dispatched_first():
+    frontier = DomainFrontier(ScriptedAccess({"a.example": 0.3, "b.example": 0.1, "c.example": 0.2}))
+    for task_id, domain in [("a1", "a.example"), ("b1", "b.example"), ("c1", "c.example")]:
+        frontier.add(_task(task_id, domain))
+
+    async def run():
+        return [(await frontier.pop()).task_id for _ in range(3)]
+
+    assert asyncio.run(run()) == ["b1", "c1", "a1"]
+    assert len(frontier) == 0 and frontier.domains == 0
+
+
+def test_pop_waits_only_until_earliest_ready_time():
+    frontier = DomainFrontier(ScriptedAccess({"slow.example": 2.0, "soon.example": 0.2}))
+    frontier.add(_task("slow", "slow.example"))
+    frontier.add(_task("soon", "soon.example"))
+
+    async def run():
+        started = time.monotonic()
+        task = await frontier.pop()
+        return task.task_id, time.monotonic() - started
+
+    task_id, elapsed = asyncio.run(run())
+    assert task_id == "soon"
+    assert 0.15 < elapsed < 1.0
+
+
+def test_ready_domain_is_not_blocked_behind_delayed_one():
+    access = ScriptedAccess({"slow.example": 2.0})
+    frontier = DomainFrontier(access)
+    frontier.add(_task("slow1", "slow.example"))
+    frontier.add(_task("slow2", "slow.example"))
+
+    async def run():
+        async def add_ready():
+            await asyncio.sleep(0.1)
+            frontier.add(_task("fast", "fast.example"))
+
+        adder = asyncio.create_task(add_ready())
+        started = time.monotonic()
+        task = await frontier.pop()
+        await adder
+        return task.task_id, time.monotonic() - started
+
+    task_id, elapsed = asyncio.run(run())
+    assert task_id == "fast"
+    assert elapsed < 1.0
+    # 每个域名同时只有一个预约，排在后面的同域名任务尚未预约
+    assert access.reserved == ["slow.example", "fast.example"]
+    assert [task.task_id for task in frontier.drain()] == ["slow1", "slow2"]
+
+
+def _worker(monkeypatch, waits):
+    from distributed import worker_node
+
+    worker = worker_node.WorkerNode(worker_node.WorkerConfig(node_id="w1", max_concurrent_tasks=1))
+    worker.frontier = DomainFrontier(ScriptedAccess(waits))
+
+    async def no_fetch():
+        pass
+
+    monkeypatch.setattr(worker, "_fill_frontier", no_fetch)
+    return worker
+
+
+def test_worker_takes_slot_only_after_pop(monkeypatch):
+    worker = _worker(monkeypatch, {"slow.example": 0.3})
+    started = []
+
+    async def run_task(task):
+        started.append(task.task_id)
+        worker._slots.release()
+
+    monkeypatch.setattr(worker, "_run_task", run_task)
+
+    async def run():
+        worker.running = True
+        worker.frontier.add(_task("slow", "slow.example"))
+        loop = asyncio.create_task(worker.task_worker_loop())
+        await asyncio.sleep(0.1)
+        # 等待域名访问间隔时任务槽保持空闲
+        slot_free_while_waiting = not worker._slots.locked()
+        await asyncio.sleep(0.4)
+        worker.running = False
+        worker.frontier.close()
+        await loop
+        return slot_free_while_waiting
+
+    assert asyncio.run(run())
+    assert started == ["slow"]
+
+
+def test_popped_task_waiting_for_slot_is_requeued_on_shutdown(monkeypatch):
+    worker = _worker(monkeypatch, {})
+    requeued = []
+
+    class Queue:
+        async def requeue_tasks(self, tasks):
+            requeued.extend(task.task_id for task in tasks)
+
+    worker.task_queue = Queue()
+
+    async def run():
+        worker.running = True
+        await worker._slots.acquire()
+        worker.frontier.add(_task("t1", "a.example"))
+        loop = asyncio.create_task(worker.task_worker_loop())
+        await asyncio.sleep(0.1)
+        assert len(worker.frontier) == 0
+        loop.cancel()
+        await loop
+
+    asyncio.run(run())
+    assert requeued == ["t1"]
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监控指标环形缓冲区测试：MetricSeries 的容量覆盖和窗口淘汰，MetricsCollector 的标签匹配与聚合
+"""
+
+import types
+
+import pytest
+
+from distributed import monitoring
+from distributed.monitoring import MetricSeries, MetricsCollector, MetricType, summarize, queue_depths
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(monitoring, "time", types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+def _series(capacity=4, window=100.0):
+    return MetricSeries("m", {}, MetricType.GAUGE, capacity, window)
+
+
+def test_series_overwrites_oldest_points_when_full():
+    series = _series(capacity=4)
+    for i in range(6):
+        series.append(float(i), i * 10.0)
+
+    assert len(series) == 4
+    timestamps, values = series.window_arrays(-1)
+    assert list(timestamps) == [2.0, 3.0, 4.0, 5.0]
+    assert list(values) == [20.0, 30.0, 40.0, 50.0]
+    assert series.latest() == (5.0, 50.0)
+
+
+def test_series_drops_points_outside_window():
+    series = _series(capacity=8, window=10.0)
+    for timestamp in (0.0, 5.0, 9.0, 12.0):
+        series.append(timestamp, timestamp)
+    assert list(series.window_arrays(-1)[0]) == [5.0, 9.0, 12.0]
+
+    series.append(30.0, 30.0)
+    assert len(series) == 1
+    assert series.latest() == (30.0, 30.0)
+
+
+def test_window_arrays_across_wraparound():
+    series = _series(capacity=4)
+    for i in range(7):
+        series.append(float(i), float(i))
+
+    # 环形缓冲区此时分为两段 [3] 和 [4, 5, 6]
+    assert list(series.window_arrays(3.5)[1]) == [4.0, 5.0, 6.0]
+    assert list(series.window_arrays(2.0)[1]) == [3.0, 4.0, 5.0, 6.0]
+    assert list(series.window_arrays(6.0)[1]) == []
+
+
+def test_empty_series():
+    series = _series()
+    assert len(series) == 0
+    assert series.latest() is None
+    timestamps, values = series.window_arrays(0)
+    assert (len(timestamps), len(values)) == (0, 0)
+
+
+def test_collector_keeps_one_series_per_label_set(clock):
+    collector = MetricsCollector(capacity=16, metrics_window=3600)
+    collector.record_metric("latency", 1.0, labels={"domain": "a.com", "worker": "w1"})
+    collector.record_metric("latency", 3.0, labels={"worker": "w1", "domain": "a.com"})
+    collector.record_metric("latency", 5.0, labels={"domain": "b.com", "worker": "w1"})
+
+    assert len(collector.series["latency"]) == 2
+    assert sorted(labels["domain"] for labels in collector.get_series("latency")) == ["a.com", "b.com"]
+
+    # 标签子集匹配多个序列
+    assert sorted(collector.get_window("latency", labels={"worker": "w1"})) == [1.0, 3.0, 5.0]
+    assert list(collector.get_window("latency", labels={"domain": "a.com"})) == [1.0, 3.0]
+    assert list(collector.get_window("latency", labels={"domain": "c.com"})) == []
+    assert collector.get_average("latency", labels={"domain": "a.com"}) == 2.0
+
+
+def test_collector_window_and_current_value(clock):
+    collector = MetricsCollector(capacity=16, metrics_window=3600)
+    collector.record_metric("cpu", 10.0)
+    clock.now += 240
+    collector.record_metric("cpu", 20.0)
+
+    assert list(collector.get_window("cpu", duration_minutes=5)) == [10.0, 20.0]
+    assert list(collector.get_window("cpu", duration_minutes=2)) == [20.0]
+    assert [point.value for point in collector.get_metric("cpu", duration_minutes=5)] == [10.0, 20.0]
+    assert collector.get_current("cpu") == 20.0
+
+    # 超过1分钟没有新点时没有当前值
+    clock.now += 120
+    assert collector.get_current("cpu") is None
+    assert collector.get_current("missing") is None
+
+
+def test_aggregate_by_series(clock):
+    collector = MetricsCollector()
+    for value in range(1, 101):
+        collector.record_metric("rt", float(value), labels={"domain": "a.com"})
+    collector.record_metric("rt", 7.0, labels={"domain": "b.com"})
+
+    overall = collector.aggregate("rt")
+    assert overall["count"] == 101
+    assert overall["max"] == 100.0
+
+    per_series = {item["labels"]["domain"]: item for item in collector.aggregate("rt", by_series=True)}
+    assert per_series["a.com"]["p50"] == pytest.approx(50.5)
+    assert per_series["b.com"] == {"labels": {"domain": "b.com"}, "count": 1, "mean": 7.0, "min": 7.0,
+                                   "max": 7.0, "p50": 7.0, "p95": 7.0, "p99": 7.0}
+
+
+def test_summarize_with_and_without_numpy(monkeypatch):
+    values = [float(value) for value in range(1, 11)]
+    with_numpy = summarize(values)
+    monkeypatch.setattr(monitoring, "numpy", None)
+    without_numpy = summarize(values)
+
+    assert without_numpy == pytest.approx(with_numpy)
+    assert without_numpy["p50"] == pytest.approx(5.5)
+    assert summarize([]) == {"count": 0, "mean": 0.0, "min": 0.0, "max": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+
+
+def test_queue_depths():
+    stats = {
+        "queue_1_length": 1, "queue_2_length": 2, "retry_queue_length": 3, "delayed_queue_length": 4,
+        "leased_tasks": 5, "dead_letter_queue_length": 6, "result_queue_length": 7,
+    }
+    assert queue_depths(stats) == {"pending": 10, "leased": 5, "dead": 6, "results": 7}
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按域名GCRA限速测试：请求间隔、突发、最长预约等待、跨节点共享和Redis不可用时的回退
+"""
+
+import asyncio
+import types
+
+import pytest
+
+from distributed import rate_limiter
+from distributed.rate_limiter import LocalRateLimiter, RedisRateLimiter
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+@pytest.fixture
+def fake_async_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer(), decode_responses=True)
+
+
+@pytest.fixture(params=["local", "redis"])
+def make_limiter(request, clock):
+    if request.param == "local":
+        return lambda burst=1: LocalRateLimiter(burst)
+    client = request.getfixturevalue("fake_async_redis")
+    return lambda burst=1: RedisRateLimiter(client, key_prefix="test:ratelimit", burst=burst)
+
+
+def reserve_all(limiter, count, domain="example.com", interval=2.0, max_wait=None):
+    async def run():
+        return [await limiter.reserve(domain, interval, max_wait) for _ in range(count)]
+    return asyncio.run(run())
+
+
+def test_reservations_are_spaced_by_interval(make_limiter):
+    limiter = make_limiter()
+    assert reserve_all(limiter, 4) == pytest.approx([0.0, 2.0, 4.0, 6.0])
+
+
+def test_domains_are_independent(make_limiter):
+    limiter = make_limiter()
+    assert reserve_all(limiter, 2, domain="a.com") == pytest.approx([0.0, 2.0])
+    assert reserve_all(limiter, 2, domain="b.com") == pytest.approx([0.0, 2.0])
+
+
+def test_burst_allows_back_to_back_requests(make_limiter):
+    limiter = make_limiter(burst=3)
+    assert reserve_all(limiter, 5) == pytest.approx([0.0, 0.0, 0.0, 2.0, 4.0])
+
+
+def test_idle_domain_starts_fresh(make_limiter, clock):
+    limiter = make_limiter()
+    reserve_all(limiter, 3)
+    clock.now += 60
+    assert reserve_all(limiter, 2) == pytest.approx([0.0, 2.0])
+
+
+def test_partial_elapsed_interval_shortens_wait(make_limiter, clock):
+    limiter = make_limiter()
+    reserve_all(limiter, 1)
+    clock.now += 1.5
+    assert reserve_all(limiter, 1) == pytest.approx([0.5])
+
+
+def test_max_wait_rejects_without_reserving(make_limiter):
+    limiter = make_limiter()
+    assert reserve_all(limiter, 3, max_wait=3.0) == pytest.approx([0.0, 2.0, None])
+    # 被拒绝的预约不推迟后续请求
+    assert reserve_all(limiter, 1) == pytest.approx([4.0])
+
+
+def test_redis_limiter_is_shared_between_workers(fake_async_redis, clock):
+    first = RedisRateLimiter(fake_async_redis, key_prefix="test:ratelimit")
+    second = RedisRateLimiter(fake_async_redis, key_prefix="test:ratelimit")
+
+    assert reserve_all(first, 1) == pytest.approx([0.0])
+    assert reserve_all(second, 1) == pytest.approx([2.0])
+    assert reserve_all(first, 1) == pytest.approx([4.0])
+
+
+def test_redis_state_expires_after_tat(fake_async_redis, clock):
+    limiter = RedisRateLimiter(fake_async_redis, key_prefix="test:ratelimit")
+    reserve_all(limiter, 3)
+
+    async def ttl():
+        return await fake_async_redis.pttl("test:ratelimit:example.com")
+
+    # TAT 在 6 秒后，键再保留 1 秒
+    assert 0 < asyncio.run(ttl()) <= 7000
+
+
+def test_redis_errors_fall_back_to_local_limiter(clock):
+    class BrokenClient:
+        def register_script(self, script):
+            async def call(keys, args):
+                raise ConnectionError("redis down")
+            return call
+
+    limiter = RedisRateLimiter(BrokenClient())
+    assert reserve_all(limiter, 3) == pytest.approx([0.0, 2.0, 4.0])
+
+
+def test_local_limiter_evicts_least_recent_domains(clock):
+    limiter = LocalRateLimiter(max_domains=2)
+    reserve_all(limiter, 1, domain="a.com")
+    reserve_all(limiter, 1, domain="b.com")
+    reserve_all(limiter, 1, domain="c.com")
+
+    assert list(limiter._tat) == ["b.com", "c.com"]
+    assert reserve_all(limiter, 1, domain="a.com") == pytest.approx([0.0])
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结果收集器实时统计测试：24小时环形槽的复用与过期、对数分桶直方图的分位数误差
+"""
+
+import random
+from datetime import datetime
+
+import pytest
+
+from distributed.result_collector import LatencyHistogram, RealtimeStats
+from distributed.task_queue import ResultMessage, TaskStatus
+
+HOUR = 3600
+START = 1_767_225_600.0  # 整点
+
+
+def _result(status=TaskStatus.SUCCESS.value, response_time=0.5):
+    return ResultMessage(task_id="t", worker_id="w1", status=status, response_time=response_time)
+
+
+def _hour_key(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y%m%d%H")
+
+
+def test_results_are_counted_per_hour():
+    stats = RealtimeStats()
+    stats.add(_result(response_time=1.0), now=START)
+    stats.add(_result(status=TaskStatus.FAILED.value, response_time=3.0), now=START + 10)
+    stats.add(_result(response_time=None), now=START + HOUR)
+
+    snapshot = stats.snapshot(now=START + HOUR)
+    assert list(snapshot) == [_hour_key(START), _hour_key(START + HOUR)]
+    first = snapshot[_hour_key(START)]
+    assert (first["tasks"], first["success"], first["failed"]) == (2, 1, 1)
+    assert first["avg_response_time"] == 2.0
+    assert first["max_response_time"] == 3.0
+    assert snapshot[_hour_key(START + HOUR)]["avg_response_time"] == 0
+
+
+def test_slot_is_reset_when_reused_a_day_later():
+    stats = RealtimeStats()
+    stats.add(_result(), now=START)
+    stats.add(_result(), now=START + 24 * HOUR)
+
+    snapshot = stats.snapshot(now=START + 24 * HOUR)
+    assert snapshot == {_hour_key(START + 24 * HOUR): snapshot[_hour_key(START + 24 * HOUR)]}
+    assert snapshot[_hour_key(START + 24 * HOUR)]["tasks"] == 1
+
+
+def test_hours_older_than_window_are_not_reported():
+    stats = RealtimeStats()
+    for hour in range(3):
+        stats.add(_result(response_time=float(hour + 1)), now=START + hour * HOUR)
+
+    assert len(stats.snapshot(now=START + 2 * HOUR)) == 3
+    assert len(stats.snapshot(now=START + 24 * HOUR)) == 2
+    assert stats.snapshot(now=START + 30 * HOUR) == {}
+    assert stats.latency_summary(now=START + 25 * HOUR)["max"] == 3.0
+    assert stats.latency_summary(now=START + 30 * HOUR)["max"] == 0.0
+
+
+@pytest.mark.parametrize("p", [50, 95, 99])
+def test_histogram_percentile_error_is_bounded(p):
+    rng = random.Random(7)
+    values = [rng.lognormvariate(0, 1.5) for _ in range(20000)]
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+
+    ordered = sorted(values)
+    exact = ordered[max(0, -(-p * len(values) // 100) - 1)]
+    assert histogram.percentile(p) == pytest.approx(exact, rel=LatencyHistogram.GROWTH - 1)
+
+
+def test_histogram_extremes_and_merge():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) == 0.0
+
+    histogram.record(0.0)
+    histogram.record(10 ** 6)
+    assert histogram.counts[0] == 1
+    assert histogram.counts[-1] == 1
+    assert histogram.percentile(100) == 10 ** 6
+
+    other = LatencyHistogram()
+    other.record(0.2)
+    histogram.merge(other)
+    assert histogram.count == 3
+    assert histogram.max_value == 10 ** 6
+    assert histogram.percentile(50) == pytest.approx(0.2, rel=0.1)
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+资源采样器测试：快照缓存、按 connections_interval 统计连接数
+"""
+
+import socket
+
+import pytest
+
+pytest.importorskip("psutil")
+
+from distributed.resource_sampler import ResourceSampler
+
+
+def test_sample_is_cached_within_min_interval():
+    sampler = ResourceSampler(min_interval=60)
+    first = sampler.sample()
+    assert sampler.sample() is first
+    assert sampler.samples == 1
+    assert 0 <= first.cpu_usage <= 100
+
+
+def test_connections_are_counted_on_their_own_interval(monkeypatch):
+    sampler = ResourceSampler(min_interval=0, connections_interval=60)
+    counts = iter([3, 7])
+    monkeypatch.setattr(sampler, "_count_sockets", lambda: next(counts))
+
+    assert sampler.sample(0).connections == 3
+    # 间隔内的采样沿用上次的连接数
+    assert sampler.sample(0).connections == 3
+    assert sampler.samples == 2
+
+    sampler.connections_interval = 0
+    assert sampler.sample(0).connections == 7
+
+
+def test_count_sockets_sees_own_sockets():
+    sampler = ResourceSampler()
+    before = sampler._count_sockets()
+    with socket.socket(), socket.socket():
+        assert sampler._count_sockets() == before + 2
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结果收集器写入测试：批次写入失败时的退避重试，重试用尽后放回结果队列
+"""
+
+import pytest
+
+from distributed.task_queue import ResultMessage, TaskStatus
+
+
+@pytest.fixture
+def queue(make_queue):
+    return make_queue()
+
+
+@pytest.fixture
+def collector(queue, tmp_path, monkeypatch):
+    from distributed.result_collector import ResultCollector, StorageConfig
+
+    # 收集器日志写到当前目录的 logs/ 下
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "logs").mkdir()
+    config = StorageConfig(base_path=str(tmp_path / "results"), write_retries=2, write_retry_delay=0)
+    return ResultCollector(queue, config)
+
+
+def _results(count):
+    return [
+        ResultMessage(task_id=f"t{i}", worker_id="w1", status=TaskStatus.SUCCESS.value, status_code=200)
+        for i in range(count)
+    ]
+
+
+def _failing(func, failures):
+    """前 failures 次调用抛出异常"""
+    calls = []
+
+    def wrapper(*args, **kwargs):
+        calls.append(args)
+        if len(calls) <= failures:
+            raise OSError("disk full")
+        return func(*args, **kwargs)
+
+    wrapper.calls = calls
+    return wrapper
+
+
+def test_transient_failure_is_retried(collector, monkeypatch):
+    append = _failing(collector.segment_store.append, failures=2)
+    monkeypatch.setattr(collector.segment_store, "append", append)
+
+    collector._write_batch(_results(3))
+    stats = collector.get_pipeline_stats()
+    assert (stats["write_retries"], stats["failed_batches"], stats["results_written"]) == (2, 0, 3)
+    assert len(append.calls) == 3
+    assert collector.result_index.count() == 3
+
+
+def test_ack_failure_does_not_rewrite_batch(collector, monkeypatch):
+    append = _failing(collector.segment_store.append, failures=0)
+    monkeypatch.setattr(collector.segment_store, "append", append)
+    monkeypatch.setattr(collector.task_queue, "ack_results", _failing(lambda results: None, failures=1))
+
+    collector._write_batch(_results(2))
+    assert len(append.calls) == 1
+    assert collector.get_pipeline_stats()["results_written"] == 2
+
+
+def test_exhausted_batch_returns_to_result_queue(collector, queue, monkeypatch):
+    append = _failing(collector.segment_store.append, failures=10)
+    monkeypatch.setattr(collector.segment_store, "append", append)
+
+    collector._write_batch(_results(3))
+    stats = collector.get_pipeline_stats()
+    assert (stats["write_retries"], stats["failed_batches"], stats["results_written"]) == (2, 1, 0)
+    assert len(append.calls) == 3
+
+    # 放回出队端，按原顺序重新读取
+    assert [queue.get_result(timeout=1).task_id for _ in range(3)] == ["t0", "t1", "t2"]
+    assert queue.get_result(timeout=1) is None
+
+
+def test_returned_results_keep_only_blob_reference(queue):
+    result = _results(1)[0]
+    result.content = "<html>page</html>"
+    result.content_ref = "sha256:abc"
+
+    queue.return_results([result])
+    returned = queue.get_result(timeout=1)
+    assert (returned.content, returned.content_ref) == (None, "sha256:abc")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结果导出测试：JSON / JSONL / CSV 输出、CSV固定表头、字段类型转换、
+Parquet/Arrow 导出（需要 pyarrow）以及空导出
+"""
+
+import csv
+import json
+import math
+from datetime import datetime
+
+import pytest
+
+from distributed.result_export import FIELD_NAMES, _coerce, export_records
+
+RECORDS = [
+    {"task_id": "t1", "worker_id": "w1", "status": "success", "status_code": 200, "url": "https://a.example/",
+     "response_time": 0.25, "completed_at": "2024-05-01T12:00:00", "content": "内容, \"引号\"\n换行"},
+    # 缺少字段、带有表头之外的字段
+    {"task_id": "t2", "status": "failed", "error_message": "timeout", "headers": {"Server": "x"}, "extra": 1},
+]
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def _csv_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def test_json_output_is_an_array_of_records(tmp_path):
+    path = tmp_path / "out.json"
+    assert export_records(iter(RECORDS), str(path), "json") == 2
+    assert json.loads(_read(path)) == RECORDS
+
+
+def test_jsonl_output_has_one_record_per_line(tmp_path):
+    path = tmp_path / "out.jsonl"
+    assert export_records(iter(RECORDS), str(path), "jsonl") == 2
+    assert [json.loads(line) for line in _read(path).splitlines()] == RECORDS
+
+
+def test_non_json_values_are_written_as_strings(tmp_path):
+    path = tmp_path / "out.jsonl"
+    export_records([{"task_id": "t1", "timestamp": datetime(2024, 5, 1, 12, 0)}], str(path), "jsonl")
+    assert json.loads(_read(path))["timestamp"] == "2024-05-01 12:00:00"
+
+
+def test_csv_uses_fixed_header_for_missing_and_extra_fields(tmp_path):
+    path = tmp_path / "out.csv"
+    assert export_records(iter(RECORDS), str(path), "csv") == 2
+
+    header, first, second = _csv_rows(path)
+    assert header == FIELD_NAMES
+    first, second = dict(zip(header, first)), dict(zip(header, second))
+    assert (first["status_code"], first["content"]) == ("200", RECORDS[0]["content"])
+    assert (second["task_id"], second["error_message"], second["status_code"]) == ("t2", "timeout", "")
+    assert "headers" not in header and "extra" not in header
+
+
+@pytest.mark.parametrize("value, kind, expected", [
+    ("200", "int32", 200),
+    (2 ** 31, "int32", None),
+    (2 ** 40, "int64", 2 ** 40),
+    ("abc", "int64", None),
+    (math.inf, "int64", None),
+    ({"a": 1}, "int32", None),
+    ("0.5", "float64", 0.5),
+    ("fast", "float64", None),
+    ("2024-05-01T12:00:00", "timestamp", datetime(2024, 5, 1, 12, 0)),
+    ("yesterday", "timestamp", None),
+    (1714564800, "timestamp", None),
+    (404, "string", "404"),
+    ("", "string", None),
+    (None, "float64", None),
+])
+def test_coerce_converts_or_drops_bad_values(value, kind, expected):
+    assert _coerce(value, kind) == expected
+
+
+@pytest.mark.parametrize("format", ["json", "jsonl", "csv"])
+def test_empty_export_writes_a_valid_file(tmp_path, format):
+    path = tmp_path / f"empty.{format}"
+    assert export_records(iter([]), str(path), format) == 0
+
+    if format == "json":
+        assert json.loads(_read(path)) == []
+    elif format == "jsonl":
+        assert _read(path) == ""
+    else:
+        assert _csv_rows(path) == [FIELD_NAMES]
+
+
+def _read_table(path, format):
+    pyarrow = pytest.importorskip("pyarrow")
+    if format == "parquet":
+        import pyarrow.parquet
+        return pyarrow.parquet.read_table(path)
+    import pyarrow.ipc
+    with pyarrow.ipc.open_file(path) as reader:
+        return reader.read_all()
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_arrow_formats_write_typed_columns_in_batches(tmp_path, format):
+    pytest.importorskip("pyarrow")
+    from distributed.result_export import arrow_schema
+
+    bad = {"task_id": "t3", "status_code": "oops", "response_time": "slow", "completed_at": "never"}
+    path = tmp_path / f"out.{format}"
+    assert export_records(iter(RECORDS + [bad]), str(path), format, batch_size=2) == 3
+
+    table = _read_table(str(path), format)
+    assert table.schema == arrow_schema()
+    rows = table.to_pylist()
+    assert [row["task_id"] for row in rows] == ["t1", "t2", "t3"]
+    assert rows[0]["status_code"] == 200
+    assert rows[0]["completed_at"] == datetime(2024, 5, 1, 12, 0)
+    assert (rows[2]["status_code"], rows[2]["response_time"], rows[2]["completed_at"]) == (None, None, None)
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_empty_arrow_export_is_readable(tmp_path, format):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / f"empty.{format}"
+    assert export_records(iter([]), str(path), format) == 0
+
+    table = _read_table(str(path), format)
+    assert table.num_rows == 0
+    assert table.column_names == FIELD_NAMES
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="xml"):
+        export_records([], str(tmp_path / "out.xml"), "xml")
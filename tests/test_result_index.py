@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结果索引测试：条件查询、分组计数、响应时间分位数、按时间删除和从分段重建
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from distributed.result_index import ResultIndex, _epoch
+from distributed.segment_store import SegmentStore
+
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def _record(i, domain="a.com", status_code=200, worker="w1", response_time=None, minutes_ago=0):
+    return {
+        "task_id": f"t{i}",
+        "url": f"https://{domain}/{i}",
+        "status": "success" if status_code < 400 else "failed",
+        "status_code": status_code,
+        "worker_id": worker,
+        "response_time": response_time if response_time is not None else float(i),
+        "timestamp": (NOW - timedelta(minutes=minutes_ago)).isoformat(),
+    }
+
+
+@pytest.fixture
+def index():
+    index = ResultIndex(":memory:")
+    yield index
+    index.close()
+
+
+def test_query_filters_and_orders_by_stored_at(index):
+    index.add_records([
+        _record(1, status_code=200, minutes_ago=3),
+        _record(2, status_code=429, minutes_ago=2),
+        _record(3, domain="B.com", status_code=429, worker="w2", minutes_ago=1),
+    ])
+
+    assert [row["task_id"] for row in index.query(status_code=429)] == ["t3", "t2"]
+    assert [row["task_id"] for row in index.query(domain="b.com")] == ["t3"]
+    assert [row["task_id"] for row in index.query(worker_id="w1", status="success")] == ["t1"]
+    assert [row["task_id"] for row in index.query(since=NOW - timedelta(minutes=2))] == ["t3", "t2"]
+    assert [row["task_id"] for row in index.query(until=NOW - timedelta(minutes=2))] == ["t1"]
+    assert len(index.query(limit=2)) == 2
+
+
+def test_new_result_replaces_old_one(index):
+    index.add_records([_record(1, status_code=503)])
+    index.add_records([_record(1, status_code=200)])
+    assert index.count() == 1
+    assert index.get("t1")["status_code"] == 200
+
+
+def test_records_without_task_id_are_skipped(index):
+    assert index.add_records([{"url": "https://a.com/"}]) == 0
+    assert index.count() == 0
+
+
+def test_count_by(index):
+    index.add_records([_record(1), _record(2, status_code=404), _record(3, status_code=404)])
+    assert index.count_by("status_code") == {404: 2, 200: 1}
+    with pytest.raises(ValueError):
+        index.count_by("url")
+
+
+def test_response_time_percentiles(index):
+    index.add_records([_record(i, response_time=float(i)) for i in range(1, 101)])
+    index.add_records([_record(1000 + i, domain="b.com", response_time=5.0) for i in range(10)])
+
+    rows = {row["domain"]: row for row in index.response_time_percentiles("domain")}
+    assert rows["a.com"]["count"] == 100
+    assert (rows["a.com"]["p50"], rows["a.com"]["p95"], rows["a.com"]["p99"]) == (50.0, 95.0, 99.0)
+    assert (rows["b.com"]["count"], rows["b.com"]["p99"]) == (10, 5.0)
+    with pytest.raises(ValueError):
+        index.response_time_percentiles("url")
+
+
+def test_remove_before(index):
+    index.add_records([_record(1, minutes_ago=120), _record(2, minutes_ago=1)])
+    assert index.remove_before(NOW - timedelta(hours=1)) == 1
+    assert [row["task_id"] for row in index.query()] == ["t2"]
+
+
+def test_rebuild_from_segments(tmp_path, index):
+    store = SegmentStore(tmp_path, writer_id="w1")
+    store.append("20260101", [_record(i) for i in range(5)])
+    store.append("20260102", [_record(i) for i in range(5, 8)])
+    index.add_records([_record(99)])
+
+    assert index.rebuild(store, batch_size=2) == 8
+    assert index.count() == 8
+    assert index.get("t99") is None
+
+
+def test_epoch_parses_relative_and_absolute_times():
+    assert _epoch(None) is None
+    assert _epoch(12.5) == 12.5
+    assert _epoch(NOW) == NOW.timestamp()
+    assert _epoch(NOW.isoformat()) == NOW.timestamp()
+    assert abs(_epoch("2h") - (datetime.now() - timedelta(hours=2)).timestamp()) < 5
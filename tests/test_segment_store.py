@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+追加写入分段存储测试：读写往返、分段滚动、崩溃尾部截断、多写入者和按天删除
+"""
+
+import pytest
+
+from distributed.segment_store import SegmentStore, MANIFEST_SUFFIX
+
+DAY = "20260101"
+
+
+def _records(start, count):
+    return [{"task_id": f"t{i}", "url": f"https://example.com/{i}", "status": "success"}
+            for i in range(start, start + count)]
+
+
+@pytest.mark.parametrize("format", ["jsonl", "msgpack"])
+@pytest.mark.parametrize("compression", [True, False])
+def test_append_and_read_round_trip(tmp_path, format, compression):
+    if format == "msgpack":
+        pytest.importorskip("msgpack")
+    store = SegmentStore(tmp_path, compression=compression, format=format, writer_id="w1")
+
+    store.append(DAY, _records(0, 3))
+    store.append(DAY, _records(3, 2))
+
+    assert list(store.read_day(DAY)) == _records(0, 5)
+    info = store.day_info(DAY)
+    assert (info["segments"], info["records"]) == (1, 5)
+    assert info["bytes"] == (tmp_path / DAY / store.segments(DAY)[0]["name"]).stat().st_size
+
+
+def test_segments_roll_over_at_size_limit(tmp_path):
+    store = SegmentStore(tmp_path, max_segment_size=200, compression=False, writer_id="w1")
+    for batch in range(5):
+        store.append(DAY, _records(batch * 2, 2))
+
+    segments = store.segments(DAY)
+    assert len(segments) > 1
+    assert [segment["name"] for segment in segments] == [f"w1-{i:05d}.jsonl" for i in range(1, len(segments) + 1)]
+    # 只有超过上限后才滚动，每个分段至多多出最后一批
+    assert all(segment["bytes"] >= 200 for segment in segments[:-1])
+    assert list(store.read_day(DAY)) == _records(0, 10)
+
+
+def test_uncommitted_tail_is_ignored_and_truncated(tmp_path):
+    store = SegmentStore(tmp_path, writer_id="w1")
+    store.append(DAY, _records(0, 2))
+    segment_path = tmp_path / DAY / store.segments(DAY)[0]["name"]
+    committed = segment_path.stat().st_size
+
+    # 模拟写入数据后、提交清单前进程崩溃
+    with open(segment_path, "ab") as f:
+        f.write(b"\x1f\x8b partial gzip member")
+
+    assert list(store.read_day(DAY)) == _records(0, 2)
+
+    # 重启后同一写入者的下一次追加先截断尾部
+    restarted = SegmentStore(tmp_path, writer_id="w1")
+    written = restarted.append(DAY, _records(2, 1))
+    assert segment_path.stat().st_size == committed + written
+    assert list(restarted.read_day(DAY)) == _records(0, 3)
+
+
+def test_writers_keep_separate_segments_and_manifests(tmp_path):
+    first = SegmentStore(tmp_path, writer_id="w1")
+    second = SegmentStore(tmp_path, writer_id="w2")
+    first.append(DAY, _records(0, 2))
+    second.append(DAY, _records(2, 2))
+    first.append(DAY, _records(4, 1))
+
+    assert sorted(p.name for p in (tmp_path / DAY).glob(f"*{MANIFEST_SUFFIX}")) == [
+        f"w1{MANIFEST_SUFFIX}", f"w2{MANIFEST_SUFFIX}"
+    ]
+    # 任意写入者都能读到全部写入者的已提交记录
+    for store in (first, second, SegmentStore(tmp_path, writer_id="reader")):
+        assert sorted(record["task_id"] for record in store.read_day(DAY)) == [f"t{i}" for i in range(5)]
+        assert store.day_info(DAY)["records"] == 5
+
+
+def test_days_and_remove_day(tmp_path):
+    store = SegmentStore(tmp_path, writer_id="w1")
+    store.append("20260101", _records(0, 1))
+    store.append("20260102", _records(1, 1))
+    (tmp_path / "not-a-day").mkdir()
+
+    assert store.days() == ["20260101", "20260102"]
+    assert store.remove_day("20260101") == 2
+    assert store.days() == ["20260102"]
+    assert list(store.read_day("20260101")) == []
+    assert store.remove_day("20260101") == 0
+
+    # 删除后再次写入同一天从新分段开始
+    store.append("20260101", _records(5, 1))
+    assert [segment["name"] for segment in store.segments("20260101")] == ["w1-00001.jsonl.gz"]
+
+
+def test_empty_append_writes_nothing(tmp_path):
+    store = SegmentStore(tmp_path, writer_id="w1")
+    assert store.append(DAY, []) == 0
+    assert store.days() == []
+
+
+def test_rejects_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        SegmentStore(tmp_path, format="csv")
+
+
+def test_accounting_tracks_segments_and_manifest(tmp_path):
+    from utils.storage_manifest import StorageManifest
+
+    manifest = StorageManifest(tmp_path / "storage.db", root=tmp_path)
+    store = SegmentStore(tmp_path / "raw", writer_id="w1", accounting=manifest)
+    store.append(DAY, _records(0, 3))
+
+    day_dir = tmp_path / "raw" / DAY
+    expected = sum(path.stat().st_size for path in day_dir.iterdir())
+    assert manifest.totals()["raw"] == {"entries": 2, "files": 2, "bytes": expected}
+
+    store.remove_day(DAY)
+    assert manifest.totals() == {}
+    manifest.close()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+存储清单测试：触发器维护的总量、按文件登记、按目录删除、按时间列出和校正
+"""
+
+import pytest
+
+from utils.storage_manifest import StorageManifest
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    manifest = StorageManifest(tmp_path / "manifest.db")
+    yield manifest
+    manifest.close()
+
+
+def test_totals_follow_upsert_and_remove(manifest):
+    manifest.upsert("a", 100, files=3, area="pages", created=1.0)
+    manifest.upsert("b", 50, area="pages", created=2.0)
+    manifest.upsert("c", 7, area="raw", created=3.0)
+    assert manifest.totals() == {
+        "pages": {"entries": 2, "files": 4, "bytes": 150},
+        "raw": {"entries": 1, "files": 1, "bytes": 7},
+    }
+
+    # 更新条目替换其大小，不重复计数
+    manifest.upsert("a", 10, files=1, area="pages")
+    assert manifest.totals()["pages"] == {"entries": 2, "files": 2, "bytes": 60}
+
+    # 条目换区域时两个区域都更新
+    manifest.upsert("c", 7, area="pages")
+    assert manifest.totals() == {"pages": {"entries": 3, "files": 3, "bytes": 67}}
+
+    assert manifest.remove("b")
+    assert not manifest.remove("b")
+    assert manifest.totals()["pages"] == {"entries": 2, "files": 2, "bytes": 17}
+
+
+def test_created_and_meta_are_kept_on_update(manifest):
+    manifest.upsert("a", 1, created=10.0, meta={"title": "old"})
+    manifest.upsert("a", 2, created=20.0)
+    entry = manifest.get("a")
+    assert (entry["size"], entry["created"], entry["meta"]) == (2, 10.0, {"title": "old"})
+
+    manifest.upsert("a", 2, meta={"title": "new"})
+    assert manifest.get("a")["meta"] == {"title": "new"}
+    assert manifest.get("missing") is None
+
+
+def test_list_by_area_and_time(manifest):
+    for i in range(5):
+        manifest.upsert(f"k{i}", 1, area="even" if i % 2 == 0 else "odd", created=float(i))
+
+    assert [entry["key"] for entry in manifest.list()] == ["k4", "k3", "k2", "k1", "k0"]
+    assert [entry["key"] for entry in manifest.list(area="even", newest_first=False)] == ["k0", "k2", "k4"]
+    assert [entry["key"] for entry in manifest.list(before=2.0, newest_first=False)] == ["k0", "k1"]
+    assert [entry["key"] for entry in manifest.list(limit=2)] == ["k4", "k3"]
+
+
+def test_file_registration_uses_relative_keys(tmp_path, manifest):
+    (tmp_path / "raw" / "20260101").mkdir(parents=True)
+    segment = tmp_path / "raw" / "20260101" / "w1-00001.jsonl"
+    segment.write_bytes(b"x" * 10)
+
+    assert manifest.upsert_file(segment)
+    assert manifest.get("raw/20260101/w1-00001.jsonl")["size"] == 10
+    assert manifest.totals()["raw"]["bytes"] == 10
+
+    segment.write_bytes(b"x" * 25)
+    manifest.upsert_file(segment)
+    assert manifest.totals()["raw"]["bytes"] == 25
+
+    # 根目录之外的文件不登记
+    assert not manifest.upsert_file(tmp_path.parent / "elsewhere.txt")
+
+    # 已删除的文件在登记时移除
+    segment.unlink()
+    assert not manifest.upsert_file(segment)
+    assert manifest.totals() == {}
+
+
+def test_remove_prefix_only_matches_directory(manifest):
+    manifest.upsert("raw/20260101/a", 1, area="raw")
+    manifest.upsert("raw/20260101/b", 1, area="raw")
+    manifest.upsert("raw/202601010/c", 1, area="raw")
+    manifest.upsert("raw/20260102/d", 1, area="raw")
+
+    assert manifest.remove_prefix(manifest.root / "raw" / "20260101") == 2
+    assert sorted(entry["key"] for entry in manifest.list()) == ["raw/202601010/c", "raw/20260102/d"]
+
+
+def test_reconcile_adds_updates_and_removes(manifest):
+    manifest.upsert("same", 1, area="a")
+    manifest.upsert("changed", 1, area="a")
+    manifest.upsert("gone", 1, area="a")
+    manifest.upsert("other-area", 1, area="b")
+
+    changes = manifest.reconcile([
+        {"key": "same", "size": 1},
+        {"key": "changed", "size": 5},
+        {"key": "new", "size": 2, "files": 2},
+    ], area="a")
+
+    assert changes == {"added": 1, "updated": 1, "removed": 1}
+    assert sorted(entry["key"] for entry in manifest.list()) == ["changed", "new", "other-area", "same"]
+    assert manifest.totals()["a"] == {"entries": 3, "files": 4, "bytes": 8}
+    assert manifest.totals()["b"]["entries"] == 1
+
+
+def test_reconcile_files_skips_database(tmp_path, manifest):
+    (tmp_path / "raw").mkdir()
+    (tmp_path / "raw" / "a.jsonl").write_bytes(b"abc")
+    (tmp_path / "top.txt").write_bytes(b"12345")
+    manifest.upsert("raw/stale.jsonl", 99, area="raw")
+
+    assert manifest.reconcile_files() == {"added": 2, "updated": 0, "removed": 1}
+    assert manifest.totals() == {
+        "": {"entries": 1, "files": 1, "bytes": 5},
+        "raw": {"entries": 1, "files": 1, "bytes": 3},
+    }
+
+
+def test_manifest_persists_across_reopen(tmp_path):
+    path = tmp_path / "manifest.db"
+    first = StorageManifest(path)
+    assert first.created
+    first.upsert("a", 42)
+    first.close()
+
+    second = StorageManifest(path)
+    assert not second.created
+    assert second.totals() == {"": {"entries": 1, "files": 1, "bytes": 42}}
+    second.close()
+
+
+def test_webpage_storage_uses_manifest(tmp_path):
+    pytest.importorskip("httpx")
+    pytest.importorskip("PIL")
+    from utils.webpage_storage import WebpageStorage
+
+    storage = WebpageStorage(str(tmp_path / "webpages"))
+    folder = storage.base_dir / "page_1"
+    folder.mkdir()
+    (folder / "content.html").write_text("<html></html>")
+    (folder / "metadata.json").write_text(
+        '{"url": "https://a.com/", "title": "A", "save_time": "2020-01-01T00:00:00"}'
+    )
+
+    assert storage.reconcile_manifest() == {"added": 1, "updated": 0, "removed": 0}
+    assert storage.list_saved_webpages()[0]["folder_name"] == "page_1"
+    assert storage.get_storage_stats()["webpages"] == 1
+
+    assert storage.cleanup_old_webpages(days=30) == 1
+    assert not folder.exists()
+    assert storage.get_storage_stats()["webpages"] == 0
+    storage.manifest.close()
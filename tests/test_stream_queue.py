@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Stream后端测试：XACK 确认、XAUTOCLAIM 回收与重新投递上限、结果/状态Stream的 MAXLEN 裁剪、
+路由Stream、路由迁移，以及工作节点使用的异步队列
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from distributed.task_queue import TaskMessage, ResultMessage, StatusMessage, TaskStatus, Priority
+
+
+@pytest.fixture
+def make_stream_queue(redis_server):
+    """创建连接到 fakeredis 的Stream任务队列"""
+    from distributed.stream_queue import StreamTaskQueue
+
+    queues = []
+
+    def factory(**kwargs):
+        kwargs.setdefault("queue_prefix", "test")
+        queue = StreamTaskQueue(**kwargs)
+        queues.append(queue)
+        return queue
+
+    yield factory
+    for queue in queues:
+        queue.close()
+
+
+def _expire(queue):
+    """让已投递的条目立即满足回收条件"""
+    queue.visibility_timeout = 0
+
+
+def _crash(queue, worker_id):
+    """节点读取任务后崩溃，条目超时被回收"""
+    task = queue.get_task(worker_id, timeout=1)
+    queue._inflight.clear()
+    return task, queue.reap_expired_leases()
+
+
+def _task_status(queue, task_id):
+    return json.loads(queue.redis_client.hget(f"{queue.queue_prefix}:task_status", task_id))["status"]
+
+
+def test_ack_removes_entry_from_stream_and_pending_list(make_stream_queue):
+    queue = make_stream_queue()
+    queue.add_task(TaskMessage(task_id="t1", url="https://example.com/a"))
+    stream = queue.task_streams[Priority.NORMAL.value]
+
+    assert queue.get_task("w1", timeout=1).task_id == "t1"
+    assert queue.redis_client.xpending(stream, queue.WORKER_GROUP)["pending"] == 1
+
+    queue.complete_task("t1", ResultMessage(task_id="t1", worker_id="w1", status=TaskStatus.SUCCESS.value))
+    assert queue.redis_client.xpending(stream, queue.WORKER_GROUP)["pending"] == 0
+    assert queue.redis_client.xlen(stream) == 0
+    assert queue.redis_client.xlen(queue.result_stream) == 1
+    assert not queue.redis_client.hexists(queue.lease_limits, "t1")
+
+
+def test_autoclaim_redelivers_and_late_ack_is_ignored(make_stream_queue):
+    queue = make_stream_queue()
+    queue.add_task(TaskMessage(task_id="t1", url="https://example.com/a"))
+    assert queue.get_task("w1", timeout=1).task_id == "t1"
+    stale_entry = queue._inflight["t1"]
+
+    _expire(queue)
+    assert queue.reap_expired_leases() == ["t1"]
+    assert queue.get_task("w2", timeout=1).task_id == "t1"
+
+    # w1 迟到的确认指向已被回收的旧条目，不影响 w2 持有的新条目
+    new_entry = queue._inflight["t1"]
+    queue._inflight["t1"] = stale_entry
+    assert not queue.ack_task("t1", "w1")
+    queue._inflight["t1"] = new_entry
+    assert queue.ack_task("t1", "w2", finished=True)
+    assert queue.get_queue_stats()["stale_acks"] == 1
+
+
+def test_redelivery_stops_at_max_retries(make_stream_queue):
+    queue = make_stream_queue()
+    _expire(queue)
+    queue.add_task(TaskMessage(task_id="t1", url="https://example.com/a", max_retries=1))
+
+    assert _crash(queue, "w1")[1] == ["t1"]
+    assert _crash(queue, "w2")[1] == []
+
+    assert queue.redis_client.lrange(queue.dead_letter_queue, 0, -1) == ["t1"]
+    assert queue.get_task("w3", timeout=0.2) is None
+    assert _task_status(queue, "t1") == TaskStatus.FAILED.value
+    stats = queue.get_queue_stats()
+    assert (stats["tasks_redelivered"], stats["tasks_dead"]) == (1, 1)
+
+
+def test_result_and_status_streams_are_trimmed(make_stream_queue):
+    queue = make_stream_queue(result_maxlen=10, status_maxlen=10)
+    for i in range(300):
+        queue._publish_result(ResultMessage(task_id=f"t{i}", worker_id="w1", status=TaskStatus.SUCCESS.value))
+        queue._publish_status(StatusMessage(worker_id="w1", node_type="general", status="busy"))
+
+    # 近似裁剪按整块删除，长度有上界但不一定恰好等于 MAXLEN
+    assert 10 <= queue.redis_client.xlen(queue.result_stream) < 300
+    assert 10 <= queue.redis_client.xlen(queue.status_stream) < 300
+    assert queue.read_status_updates(count=1000)[-1].worker_id == "w1"
+
+
+def test_results_are_acked_after_persisting_and_returned_on_failure(make_stream_queue):
+    queue = make_stream_queue()
+    for i in range(2):
+        queue._publish_result(ResultMessage(task_id=f"t{i}", worker_id="w1", status=TaskStatus.SUCCESS.value))
+
+    batch = [queue.get_result(timeout=1), queue.get_result(timeout=1)]
+    queue.return_results(batch)
+    assert [queue.get_result(timeout=1).task_id for _ in range(2)] == ["t0", "t1"]
+    assert queue.redis_client.xpending(queue.result_stream, queue.COLLECTOR_GROUP)["pending"] == 2
+
+    queue.ack_results(batch)
+    assert queue.redis_client.xpending(queue.result_stream, queue.COLLECTOR_GROUP)["pending"] == 0
+
+
+def test_routed_tasks_go_to_route_streams(make_stream_queue):
+    producer = make_stream_queue()
+    producer.add_task(TaskMessage(task_id="shared", url="https://example.com/a"))
+    producer.add_task(TaskMessage(task_id="routed", url="https://example.com/b", route="render"))
+    assert producer.redis_client.xlen(producer._task_stream(Priority.NORMAL.value, "render")) == 1
+
+    other = make_stream_queue(routes=["api"])
+    assert other.get_task("w1", timeout=1).task_id == "shared"
+    assert other.get_task("w1", timeout=0.2) is None
+
+    render = make_stream_queue(routes=["render"])
+    assert render.get_task("w2", timeout=1).task_id == "routed"
+    assert producer.list_routes() == ["render"]
+
+
+def test_delayed_retry_returns_to_route_retry_stream(make_stream_queue):
+    queue = make_stream_queue(routes=["render"])
+    queue.add_task(TaskMessage(task_id="t1", url="https://example.com/a", route="render"))
+    queue.get_task("w1", timeout=1)
+    queue.retry_task("t1", delay_seconds=0, worker_id="w1")
+
+    queue.promote_due_tasks()
+    assert queue.redis_client.xlen(queue._retry_target("render")) == 1
+    assert queue.get_task("w1", timeout=1).task_id == "t1"
+
+
+def test_reroute_moves_undelivered_tasks_and_keeps_order(make_stream_queue):
+    queue = make_stream_queue()
+    for i in range(5):
+        queue.add_task(TaskMessage(task_id=f"t{i}", url=f"https://example.com/{i}", route="shard:w1"))
+    delivered = make_stream_queue(routes=["shard:w1"]).get_task("w1", timeout=1)
+    assert delivered.task_id == "t0"
+
+    moved = queue.reroute_tasks("shard:w1", lambda task: None if task.task_id in ("t1", "t3") else task.route,
+                                batch_size=2)
+    assert moved == 2
+
+    source = queue._task_stream(Priority.NORMAL.value, "shard:w1")
+    remaining = [fields["task_id"] for _, fields in queue.redis_client.xrange(source)]
+    assert remaining == ["t0", "t2", "t4"]
+    shared = [fields["task_id"] for _, fields in queue.redis_client.xrange(queue.task_streams[Priority.NORMAL.value])]
+    assert shared == ["t1", "t3"]
+    assert TaskMessage.from_json(queue.redis_client.hget(queue.task_storage, "t1")).route is None
+
+
+def test_async_worker_reads_routes_and_acks(make_stream_queue):
+    from distributed.stream_queue import AsyncStreamTaskQueue
+
+    scheduler = make_stream_queue()
+
+    async def run():
+        queue = AsyncStreamTaskQueue(queue_prefix="test", routes=["render"])
+        await queue.initialize()
+        try:
+            async def produce():
+                await asyncio.sleep(0.2)
+                scheduler.add_task(TaskMessage(task_id="low", url="https://example.com/a", priority=Priority.LOW.value))
+                scheduler.add_task(TaskMessage(task_id="routed", url="https://example.com/b", route="render"))
+
+            producer = asyncio.create_task(produce())
+            first = await queue.get_tasks("w1", 1, timeout=3)
+            await producer
+            rest = await queue.get_tasks("w1", 4, timeout=1)
+
+            await queue.complete_task("low", ResultMessage(task_id="low", worker_id="w1",
+                                                           status=TaskStatus.SUCCESS.value))
+            await queue.retry_task("routed", delay_seconds=60, worker_id="w1")
+            return first + rest
+        finally:
+            await queue.close()
+
+    tasks = asyncio.run(run())
+    assert sorted(task.task_id for task in tasks) == ["low", "routed"]
+    assert scheduler.redis_client.xlen(scheduler.result_stream) == 1
+    assert scheduler.redis_client.hget(scheduler.retry_routes, "routed") == scheduler._retry_target("render")
+    assert scheduler.get_queue_stats()["leased_tasks"] == 0
+
+
+def test_async_close_releases_buffered_entries(make_stream_queue):
+    from distributed.stream_queue import AsyncStreamTaskQueue
+
+    scheduler = make_stream_queue()
+    for i in range(3):
+        scheduler.add_task(TaskMessage(task_id=f"t{i}", url=f"https://example.com/{i}"))
+
+    async def run():
+        queue = AsyncStreamTaskQueue(queue_prefix="test")
+        await queue.initialize()
+        try:
+            taken = await queue.get_tasks("w1", 3, timeout=1)
+            await queue.requeue_tasks(taken[1:])
+            return taken
+        finally:
+            await queue.close()
+
+    taken = asyncio.run(run())
+    assert len(taken) == 3
+    stream = scheduler.task_streams[Priority.NORMAL.value]
+    assert [fields["task_id"] for _, fields in scheduler.redis_client.xrange(stream)] == ["t0", "t1", "t2"]
+    assert scheduler.redis_client.xpending(stream, scheduler.WORKER_GROUP)["pending"] == 1
+
+
+def test_async_reap_caps_redelivery(make_stream_queue):
+    from distributed.stream_queue import AsyncStreamTaskQueue
+
+    scheduler = make_stream_queue()
+    scheduler.add_task(TaskMessage(task_id="t1", url="https://example.com/a", max_retries=0))
+
+    async def run():
+        queue = AsyncStreamTaskQueue(queue_prefix="test", visibility_timeout=0)
+        await queue.initialize()
+        try:
+            await queue.get_tasks("w1", 1, timeout=1)
+            queue._inflight.clear()
+            return await queue.reap_expired_leases()
+        finally:
+            await queue.close()
+
+    assert asyncio.run(run()) == []
+    assert scheduler.redis_client.lrange(scheduler.dead_letter_queue, 0, -1) == ["t1"]
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可靠出队租约测试：登记、延长、过期回收，以及回收后原节点迟到的确认、
+重新投递上限、空队列时阻塞等待
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+from distributed.task_queue import TaskMessage, ResultMessage, TaskStatus
+
+
+def _expire(queue, task_id):
+    """让租约立即过期"""
+    queue.redis_client.zadd(queue.lease_zset, {task_id: 0})
+
+
+def _lease_state(queue, task_id, worker_id):
+    return (
+        queue.redis_client.zscore(queue.lease_zset, task_id) is not None,
+        queue.redis_client.hget(queue.lease_owners, task_id),
+        queue.redis_client.sismember(f"{queue.worker_lease_prefix}{worker_id}", task_id),
+    )
+
+
+def _lease_to_second_worker(queue):
+    """任务被 w1 取出，租约过期回收后重新分配给 w2"""
+    queue.add_task(TaskMessage(task_id="t1", url="https://example.com/a"))
+    assert queue.get_task("w1", timeout=1).task_id == "t1"
+
+    _expire(queue, "t1")
+    assert queue.reap_expired_leases() == ["t1"]
+
+    task = queue.get_task("w2", timeout=1)
+    assert task.task_id == "t1"
+    assert task.worker_id == "w2"
+    return task
+
+
+def test_lease_is_registered_and_released_by_owner(make_queue):
+    queue = make_queue(reliable=True)
+    queue.add_task(TaskMessage(task_id="t1", url="https://example.com/a"))
+    queue.get_task("w1", timeout=1)
+
+    assert _lease_state(queue, "t1", "w1") == (True, "w1", True)
+    assert queue.ack_task("t1", "w1")
+    assert _lease_state(queue, "t1", "w1") == (False, None, False)
+
+
+def test_stale_ack_does_not_release_new_lease(make_queue):
+    queue = make_queue(reliable=True)
+    _lease_to_second_worker(queue)
+
+    assert not queue.ack_task("t1", "w1")
+    assert _lease_state(queue, "t1", "w2") == (True, "w2", True)
+    assert queue.get_queue_stats()["stale_acks"] == 1
+
+
+def test_stale_complete_and_retry_leave_task_untouched(make_queue):
+    queue = make_queue(reliable=True)
+    _lease_to_second_worker(queue)
+
+    queue.complete_task("t1", ResultMessage(task_id="t1", worker_id="w1", status=TaskStatus.SUCCESS.value))
+    queue.retry_task("t1", worker_id="w1")
+
+    assert _lease_state(queue, "t1", "w2") == (True, "w2", True)
+    assert queue.redis_client.llen(queue.result_queue) == 0
+    assert queue.redis_client.zcard(queue.delayed_queue) == 0
+    stats = queue.get_queue_stats()
+    assert "tasks_completed" not in stats
+    assert "tasks_retried" not in stats
+
+    # 新的持有者正常完成
+    queue.complete_task("t1", ResultMessage(task_id="t1", worker_id="w2", status=TaskStatus.SUCCESS.value))
+    assert _lease_state(queue, "t1", "w2") == (False, None, False)
+    assert queue.redis_client.llen(queue.result_queue) == 1
+
+
+def test_extend_only_touches_owned_leases(make_queue):
+    queue = make_queue(reliable=True, visibility_timeout=60)
+    _lease_to_second_worker(queue)
+
+    assert queue.extend_leases("w1") == 0
+    assert queue.extend_leases("w2") == 1
+
+    # 集合中残留的旧租约在延长时被清理
+    queue.redis_client.sadd(f"{queue.worker_lease_prefix}w1", "t1")
+    assert queue.extend_leases("w1") == 0
+    assert not queue.redis_client.sismember(f"{queue.worker_lease_prefix}w1", "t1")
+
+
+def test_async_stale_requeue_and_complete_are_ignored(make_queue):
+    from distributed.async_task_queue import AsyncTaskQueue
+
+    queue = make_queue(reliable=True)
+    _lease_to_second_worker(queue)
+
+    async def run():
+        async_queue = AsyncTaskQueue(queue_prefix=queue.queue_prefix, reliable=True)
+        await async_queue.initialize()
+        try:
+            stale = TaskMessage(task_id="t1", url="https://example.com/a", worker_id="w1")
+            await async_queue.requeue_tasks([stale])
+            await async_queue.complete_task(
+                "t1", ResultMessage(task_id="t1", worker_id="w1", status=TaskStatus.SUCCESS.value)
+            )
+            await async_queue.retry_task("t1", worker_id="w1")
+        finally:
+            await async_queue.close()
+
+    asyncio.run(run())
+
+    assert _lease_state(queue, "t1", "w2") == (True, "w2", True)
+    assert sum(queue.get_queue_stats()[f"queue_{p}_length"] for p in queue.task_queues) == 0
+    assert queue.redis_client.llen(queue.result_queue) == 0
+    assert queue.redis_client.zcard(queue.delayed_queue) == 0
+
+
+def _crash(queue, worker_id):
+    """节点取出任务后崩溃，租约过期被回收"""
+    task = queue.get_task(worker_id, timeout=1)
+    _expire(queue, task.task_id)
+    return queue.reap_expired_leases()
+
+
+def test_redelivery_stops_at_max_retries(make_queue):
+    queue = make_queue(reliable=True)
+    queue.add_task(TaskMessage(task_id="t1", url="https://example.com/a", max_retries=2))
+
+    assert _crash(queue, "w1") == ["t1"]
+    assert _crash(queue, "w2") == ["t1"]
+    assert _crash(queue, "w3") == []
+
+    assert queue.redis_client.lrange(queue.dead_letter_queue, 0, -1) == ["t1"]
+    assert queue.get_task("w4", timeout=0.2) is None
+    status = json.loads(queue.redis_client.hget(f"{queue.queue_prefix}:task_status", "t1"))
+    assert status["status"] == TaskStatus.FAILED.value
+    stats = queue.get_queue_stats()
+    assert (stats["tasks_redelivered"], stats["tasks_dead"]) == (2, 1)
+    assert not queue.redis_client.hexists(queue.lease_deliveries, "t1")
+
+
+def test_completion_clears_delivery_count(make_queue):
+    queue = make_queue(reliable=True)
+    queue.add_task(TaskMessage(task_id="t1", url="https://example.com/a"))
+    assert _crash(queue, "w1") == ["t1"]
+    assert queue.redis_client.hget(queue.lease_deliveries, "t1") == "1"
+
+    queue.get_task("w2", timeout=1)
+    queue.complete_task("t1", ResultMessage(task_id="t1", worker_id="w2", status=TaskStatus.SUCCESS.value))
+    assert not queue.redis_client.hexists(queue.lease_deliveries, "t1")
+    assert not queue.redis_client.hexists(queue.lease_limits, "t1")
+
+
+def test_reliable_get_task_blocks_until_a_task_arrives(make_queue):
+    queue = make_queue(reliable=True)
+    producer = make_queue()
+    timer = threading.Timer(0.3, producer.add_task, [TaskMessage(task_id="t1", url="https://example.com/a")])
+    timer.start()
+
+    started = time.monotonic()
+    task = queue.get_task("w1", timeout=3)
+    timer.join()
+    assert task.task_id == "t1"
+    assert 0.2 < time.monotonic() - started < 2
+    assert _lease_state(queue, "t1", "w1") == (True, "w1", True)
+    assert queue.redis_client.hget(queue.lease_sources, "t1") == queue.task_queues[2]
+
+
+def test_async_reliable_dequeue_blocks_and_caps_redelivery(make_queue):
+    from distributed.async_task_queue import AsyncTaskQueue
+
+    queue = make_queue(reliable=True)
+
+    async def run():
+        async_queue = AsyncTaskQueue(queue_prefix=queue.queue_prefix, reliable=True)
+        await async_queue.initialize()
+        try:
+            async def produce():
+                await asyncio.sleep(0.2)
+                await async_queue.add_task(TaskMessage(task_id="t1", url="https://example.com/a", max_retries=0))
+
+            producer = asyncio.create_task(produce())
+            tasks = await async_queue.get_tasks("w1", 4, timeout=3)
+            await producer
+            _expire(queue, "t1")
+            return tasks, await async_queue.reap_expired_leases()
+        finally:
+            await async_queue.close()
+
+    tasks, requeued = asyncio.run(run())
+    assert [task.task_id for task in tasks] == ["t1"]
+    assert requeued == []
+    assert queue.redis_client.lrange(queue.dead_letter_queue, 0, -1) == ["t1"]
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+延迟重试测试：RetryPolicy 退避与抖动、PROMOTE_DELAYED_SCRIPT 到期迁移和路由重试队列
+"""
+
+import random
+import time
+
+import pytest
+
+from distributed.task_queue import TaskMessage, RetryPolicy, route_retry_queue
+
+
+@pytest.fixture(params=[False, True], ids=["plain", "reliable"])
+def queue(request, make_queue):
+    return make_queue(reliable=request.param)
+
+
+def _make_due(queue, task_id):
+    """把延迟任务的到期时间提前到现在"""
+    queue.redis_client.zadd(queue.delayed_queue, {task_id: time.time() - 1})
+
+
+@pytest.mark.parametrize("policy", [
+    RetryPolicy(),
+    RetryPolicy(base_delay=5.0, max_delay=300.0, jitter=0.25),
+    RetryPolicy(base_delay=60.0, max_delay=3600.0, multiplier=3.0, jitter=1.0),
+])
+def test_jitter_stays_within_bounds(policy):
+    random.seed(42)
+    for retry_count in range(12):
+        ceiling = min(policy.max_delay, policy.base_delay * policy.multiplier ** retry_count)
+        floor = ceiling * (1 - policy.jitter)
+        delays = [policy.compute_delay(retry_count) for _ in range(500)]
+        assert all(floor <= delay <= ceiling for delay in delays)
+        # 抖动确实分散了延迟
+        assert max(delays) - min(delays) > (ceiling - floor) * 0.5
+
+
+def test_jitter_is_clamped_and_optional():
+    assert RetryPolicy(base_delay=10.0, jitter=0).compute_delay(2) == 40.0
+    assert all(0 <= RetryPolicy(base_delay=10.0, jitter=3.0).compute_delay(0) <= 10.0 for _ in range(200))
+    # 负的重试次数按0处理
+    assert RetryPolicy(base_delay=10.0, jitter=0).compute_delay(-1) == 10.0
+
+
+def test_delayed_task_is_not_delivered_before_due(queue):
+    queue.add_task(TaskMessage(task_id="t1", url="https://example.com/a"))
+    assert queue.get_task("w1", timeout=1).task_id == "t1"
+
+    queue.retry_task("t1", delay_seconds=30, worker_id="w1")
+    assert queue.redis_client.zscore(queue.delayed_queue, "t1") > time.time() + 25
+
+    assert queue.get_task("w1", timeout=0.3) is None
+    assert queue.promote_due_tasks() == pytest.approx(time.time() + 30, abs=2)
+    assert queue.redis_client.llen(queue.retry_queue) == 0
+
+    _make_due(queue, "t1")
+    task = queue.get_task("w1", timeout=1)
+    assert task.task_id == "t1"
+    assert task.retry_count == 1
+    assert queue.redis_client.zcard(queue.delayed_queue) == 0
+    assert queue.promote_due_tasks() is None
+
+
+def test_retry_delay_follows_error_class_policy(queue):
+    queue.retry_policies["rate_limited"] = RetryPolicy(base_delay=100.0, jitter=0)
+    queue.add_task(TaskMessage(task_id="t1", url="https://example.com/a"))
+    queue.get_task("w1", timeout=1)
+
+    before = time.time()
+    queue.retry_task("t1", error_class="rate_limited", worker_id="w1")
+    due_at = queue.redis_client.zscore(queue.delayed_queue, "t1")
+    assert before + 100 <= due_at <= time.time() + 100
+
+
+def test_routed_retry_returns_to_route_queue(queue):
+    queue.add_task(TaskMessage(task_id="t1", url="https://example.com/a", route="browser"))
+    queue.routes = ["browser"]
+    assert queue.get_task("w1", timeout=1).task_id == "t1"
+
+    queue.retry_task("t1", delay_seconds=30, worker_id="w1")
+    browser_retry = route_retry_queue(queue.queue_prefix, "browser")
+    assert queue.redis_client.hget(queue.retry_routes, "t1") == browser_retry
+
+    _make_due(queue, "t1")
+    queue.promote_due_tasks()
+    assert queue.redis_client.lrange(browser_retry, 0, -1) == ["t1"]
+    assert queue.redis_client.llen(queue.retry_queue) == 0
+    assert not queue.redis_client.hexists(queue.retry_routes, "t1")
+
+    # 不拉取该路由的节点取不到，browser 节点可以取到
+    queue.routes = []
+    assert queue.get_task("w2", timeout=0.2) is None
+    queue.routes = ["browser"]
+    task = queue.get_task("w1", timeout=1)
+    assert task.task_id == "t1"
+    assert task.route == "browser"
+
+
+def test_unrouted_retry_uses_shared_retry_queue(queue):
+    queue.add_task(TaskMessage(task_id="t1", url="https://example.com/a"))
+    queue.get_task("w1", timeout=1)
+    queue.retry_task("t1", delay_seconds=30, worker_id="w1")
+
+    _make_due(queue, "t1")
+    queue.promote_due_tasks()
+    assert queue.redis_client.lrange(queue.retry_queue, 0, -1) == ["t1"]
+
+
+def test_promote_moves_at_most_batch_size(queue):
+    queue.promote_batch_size = 2
+    now = time.time()
+    queue.redis_client.zadd(queue.delayed_queue, {"a": now - 3, "b": now - 2, "c": now - 1, "d": now + 60})
+
+    assert queue.promote_due_tasks() == pytest.approx(now - 1)
+    assert queue.redis_client.lrange(queue.retry_queue, 0, -1) == ["b", "a"]
+    assert queue.promote_due_tasks() == pytest.approx(now + 60)
+    assert queue.redis_client.llen(queue.retry_queue) == 3
+    assert queue.get_queue_stats()["tasks_promoted"] == 3
+
+
+def test_exhausted_retries_go_to_dead_letter(queue):
+    queue.add_task(TaskMessage(task_id="t1", url="https://example.com/a", max_retries=0))
+    queue.get_task("w1", timeout=1)
+    queue.retry_task("t1", worker_id="w1")
+
+    assert queue.redis_client.lrange(queue.dead_letter_queue, 0, -1) == ["t1"]
+    assert queue.redis_client.zcard(queue.delayed_queue) == 0
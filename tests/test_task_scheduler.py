@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+调度器测试：route: 规则路由、节点类型没有在线节点时迁移等待的任务、索引节点选择
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from distributed.task_queue import StatusMessage, TaskMessage, route_queue_names
+
+
+@pytest.fixture
+def queue(make_queue):
+    return make_queue()
+
+
+@pytest.fixture
+def scheduler(queue, tmp_path, monkeypatch):
+    from distributed.task_scheduler import TaskScheduler
+
+    # 调度器日志写到当前目录的 logs/ 下
+    monkeypatch.chdir(tmp_path)
+    scheduler = TaskScheduler(queue)
+    scheduler._started_at -= TaskScheduler.STARTUP_GRACE + 1
+    return scheduler
+
+
+def _heartbeat(scheduler, worker_id, node_type):
+    scheduler.update_worker_status(StatusMessage(worker_id=worker_id, node_type=node_type, status="ready"))
+
+
+def _waiting(queue, route=None):
+    return sum(queue.redis_client.llen(name) for name in route_queue_names(queue.queue_prefix, route).values())
+
+
+def _stored_route(queue, task_id):
+    return queue._decode(TaskMessage, queue.payload_client.hget(queue.task_storage, task_id)).route
+
+
+def _submit_browser_tasks(scheduler, count):
+    for i in range(count):
+        assert scheduler.submit_task(TaskMessage(task_id=f"t{i}", url=f"https://a.com/{i}", crawler_type="browser"))
+
+
+def _batched(reroute, batch_size):
+    """用小批次迁移，覆盖多批和放回原队列的任务"""
+    def wrapper(route, resolve):
+        return reroute(route, resolve, batch_size=batch_size)
+    return wrapper
+
+
+def test_rule_route_requires_a_healthy_worker(scheduler, queue):
+    _submit_browser_tasks(scheduler, 1)
+    assert _waiting(queue) == 1
+
+    _heartbeat(scheduler, "b1", "browser")
+    scheduler.submit_task(TaskMessage(task_id="t9", url="https://a.com/9", crawler_type="browser"))
+    assert _waiting(queue, "browser") == 1
+
+
+def test_rule_routed_tasks_return_to_shared_queue_when_type_is_gone(scheduler, queue):
+    _heartbeat(scheduler, "b1", "browser")
+    _submit_browser_tasks(scheduler, 5)
+    scheduler.submit_task(TaskMessage(task_id="pinned", url="https://a.com/p", node_type="browser"))
+    assert _waiting(queue, "browser") == 6
+
+    # 节点在线时不迁移
+    scheduler._rebalance_routes()
+    assert _waiting(queue, "browser") == 6
+
+    scheduler.workers["b1"].last_heartbeat = datetime.now() - timedelta(minutes=2)
+    queue.reroute_tasks = _batched(queue.reroute_tasks, batch_size=2)
+    scheduler._rebalance_routes()
+
+    assert _waiting(queue) == 5
+    assert _stored_route(queue, "t0") is None
+    # 要求了节点类型的任务继续等待该类型的节点
+    assert _waiting(queue, "browser") == 1
+    assert _stored_route(queue, "pinned") == "browser"
+
+
+def test_routes_are_kept_during_startup_grace(scheduler, queue):
+    _heartbeat(scheduler, "b1", "browser")
+    _submit_browser_tasks(scheduler, 2)
+    scheduler.remove_worker("b1")
+
+    scheduler._started_at = float("inf")
+    scheduler._rebalance_routes()
+    assert _waiting(queue, "browser") == 2
+
+
+def test_index_buckets_follow_node_type_changes(scheduler):
+    _heartbeat(scheduler, "w1", "general")
+    _heartbeat(scheduler, "w2", "browser")
+    assert scheduler.index.has_alive("browser")
+
+    _heartbeat(scheduler, "w2", "general")
+    assert not scheduler.index.has_alive("browser")
+    assert sorted(worker.worker_id for worker in scheduler.get_healthy_workers("general")) == ["w1", "w2"]
+
+    scheduler.workers["w1"].cpu_usage = 95
+    assert scheduler.index.has_alive("general")
+    assert [worker.worker_id for worker in scheduler.get_healthy_workers()] == ["w2"]
+
+    scheduler.remove_worker("w2")
+    assert not scheduler.index.has_healthy("general")
+    assert len(scheduler.index) == 1
+
+
+def _status(worker_id, node_type="general", cpu=10.0, memory=10.0, active=0):
+    return StatusMessage(worker_id=worker_id, node_type=node_type, status="ready",
+                         cpu_usage=cpu, memory_usage=memory, active_tasks=active)
+
+
+def test_select_worker_picks_least_loaded_in_node_type(scheduler):
+    scheduler.update_worker_status(_status("g1", active=3))
+    scheduler.update_worker_status(_status("g2", active=1))
+    scheduler.update_worker_status(_status("b1", node_type="browser", active=5))
+
+    assert scheduler.select_worker(TaskMessage(task_id="t1", url="https://a.com/1")) == "g2"
+    assert scheduler.select_worker(TaskMessage(task_id="t2", url="https://a.com/2", node_type="browser")) == "b1"
+    assert scheduler.select_worker(TaskMessage(task_id="t3", url="https://a.com/3", node_type="gpu")) is None
+
+    # 选中后本地计入活跃任务，下一次选择看到新的负载
+    assert scheduler.workers["g2"].active_tasks == 2
+    scheduler.update_worker_status(_status("g2", active=6))
+    assert scheduler.select_worker(TaskMessage(task_id="t4", url="https://a.com/4")) == "g1"
+
+
+def test_select_worker_applies_compiled_rules(scheduler):
+    from distributed.task_scheduler import SchedulingRule
+
+    scheduler.add_scheduling_rule(SchedulingRule(
+        name="skip_busy", priority=200, conditions={"active_tasks": ">= 5"}, action="skip_worker"))
+    scheduler.update_worker_status(_status("busy", active=5, cpu=0, memory=0))
+    scheduler.update_worker_status(_status("idle", active=2, cpu=60, memory=60))
+
+    assert scheduler.select_worker(TaskMessage(task_id="t1", url="https://a.com/1")) == "idle"
+    # 所有节点都被排除时忽略该规则
+    scheduler.update_worker_status(_status("idle", active=9))
+    assert scheduler.select_worker(TaskMessage(task_id="t2", url="https://a.com/2")) == "busy"
+
+
+def test_select_worker_matches_linear_scan(scheduler):
+    import random
+
+    rng = random.Random(3)
+    for i in range(50):
+        scheduler.update_worker_status(_status(f"w{i}", cpu=rng.uniform(5, 95), memory=rng.uniform(5, 95),
+                                               active=rng.randint(0, 10)))
+
+    for i in range(200):
+        if i % 7 == 0:
+            worker_id = f"w{rng.randrange(50)}"
+            scheduler.update_worker_status(_status(worker_id, cpu=rng.uniform(5, 95),
+                                                   memory=rng.uniform(5, 95), active=rng.randint(0, 10)))
+        task = TaskMessage(task_id=str(i), url=f"https://a.com/{i}")
+        grade = scheduler._selection_plan(task).worker_filter.grade
+        expected = min(scheduler.get_healthy_workers(), key=lambda worker: (-grade(worker), worker.load_score))
+        expected_score = expected.load_score
+        selected = scheduler.select_worker(task)
+        # 选中的节点已计入一个活跃任务（负载分数 +10）
+        assert scheduler.workers[selected].load_score - 10 == pytest.approx(expected_score)
+
+
+def test_has_alive_follows_latest_heartbeat(scheduler):
+    _heartbeat(scheduler, "b1", "browser")
+    _heartbeat(scheduler, "b2", "browser")
+    assert scheduler.index.has_alive("browser")
+
+    for worker_id in ("b1", "b2"):
+        scheduler.workers[worker_id].last_heartbeat = datetime.now() - timedelta(minutes=2)
+    assert not scheduler.index.has_alive("browser")
+
+    _heartbeat(scheduler, "b1", "browser")
+    assert scheduler.index.has_alive("browser")
+    scheduler.update_worker_status(StatusMessage(worker_id="b1", node_type="browser", status="offline"))
+    assert not scheduler.index.has_alive("browser")
+
+
+def _add_route_rules(scheduler):
+    from distributed.task_scheduler import SchedulingRule
+
+    for name, route in (("to_gpu", "gpu"), ("to_render", "render")):
+        scheduler.add_scheduling_rule(SchedulingRule(
+            name=name, priority=50, conditions={"crawler_type": "browser"}, action=f"route:{route}"))
+
+
+def test_strategy_chooses_between_eligible_routes(scheduler):
+    from distributed.task_scheduler import SchedulingStrategy
+
+    _add_route_rules(scheduler)
+    scheduler.update_worker_status(_status("b1", node_type="browser", active=8))
+    scheduler.update_worker_status(_status("g1", node_type="gpu", active=1))
+    scheduler.update_worker_status(_status("r1", node_type="render", active=4))
+    task = TaskMessage(task_id="t1", url="https://a.com/1", crawler_type="browser")
+
+    # 负载最低：比较各路由最优节点的负载
+    assert scheduler.route_task(task) == "gpu"
+    scheduler.update_worker_status(_status("g1", node_type="gpu", cpu=95))
+    assert scheduler.route_task(task) == "render"
+
+    scheduler.current_strategy = SchedulingStrategy.ROUND_ROBIN
+    assert [scheduler.route_task(task) for _ in range(4)] == ["browser", "render", "browser", "render"]
+
+
+def test_reroute_keeps_order_of_unchanged_tasks(queue):
+    for i in range(6):
+        queue.add_task(TaskMessage(task_id=f"t{i}", url=f"https://a.com/{i}", route="browser"),
+                       check_duplicate=False)
+    names = route_queue_names(queue.queue_prefix, "browser")
+
+    moved = queue.reroute_tasks("browser", lambda task: None if int(task.task_id[1:]) % 2 else "browser",
+                                batch_size=2)
+    assert moved == 3
+    # 路由不变的任务仍按原顺序留在出队端
+    assert queue.redis_client.lrange(names[2], 0, -1) == ["t4", "t2", "t0"]
+    assert queue.redis_client.lrange(queue.task_queues[2], 0, -1) == ["t5", "t3", "t1"]
+    assert _stored_route(queue, "t1") is None
+
+
+def test_interrupted_reroute_keeps_task_ids(queue):
+    for i in range(4):
+        queue.add_task(TaskMessage(task_id=f"t{i}", url=f"https://a.com/{i}", route="browser"),
+                       check_duplicate=False)
+    names = route_queue_names(queue.queue_prefix, "browser")
+
+    def failing(task):
+        if task.task_id == "t2":
+            raise RuntimeError("resolve failed")
+        return None
+
+    with pytest.raises(RuntimeError):
+        queue.reroute_tasks("browser", failing, batch_size=2)
+    # 第一批已迁移，出错的一批按原顺序放回
+    assert queue.redis_client.lrange(queue.task_queues[2], 0, -1) == ["t1", "t0"]
+    assert queue.redis_client.lrange(names[2], 0, -1) == ["t3", "t2"]
+
+    # 进程在两步之间退出时，任务ID留在暂存列表中，启动时放回
+    staged = queue._stage_reroute_script(keys=[names[2], queue._rerouting_list(names[2])], args=[1])
+    assert staged == ["t2"] and queue.redis_client.llen(names[2]) == 1
+    assert queue.restore_rerouting() == 1
+    assert queue.redis_client.lrange(names[2], 0, -1) == ["t3", "t2"]
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+节点状态上报测试：首次全量写入、增量叠加、哈希过期后重写完整快照、失败放回
+"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from distributed.resource_sampler import ResourceSnapshot
+from distributed.worker_node import WorkerStatus
+from distributed.worker_status import WorkerStatusReporter
+
+KEY = "test:worker:w1"
+
+
+class StaticSampler:
+    def sample(self, max_age=None):
+        return ResourceSnapshot(cpu_usage=10.0, memory_usage=20.0)
+
+
+@pytest.fixture
+def client(redis_server):
+    import redis
+
+    return redis.Redis(decode_responses=True)
+
+
+@pytest.fixture
+def reporter():
+    status = WorkerStatus(node_id="w1", capabilities=["http"])
+    return WorkerStatusReporter(status, key=KEY, heartbeat_interval=10, sampler=StaticSampler())
+
+
+def _flush(reporter, client):
+    pipe = client.pipeline(transaction=False)
+    reporter.drain(pipe)
+    pipe.execute()
+    return client.hgetall(KEY)
+
+
+def test_first_flush_writes_full_snapshot(reporter, client):
+    client.hset(KEY, mapping={"total_tasks": 99, "failed_tasks": 7})
+    reporter.incr("total_tasks", 2)
+
+    stored = _flush(reporter, client)
+    assert (stored["total_tasks"], stored["failed_tasks"], stored["status"]) == ("2", "0", "ready")
+    assert json.loads(stored["capabilities"]) == ["http"]
+    assert 0 < client.ttl(KEY) <= 30
+
+
+def test_later_flushes_send_increments(reporter, client):
+    _flush(reporter, client)
+    reporter.incr("total_tasks")
+    reporter.incr("success_tasks")
+    reporter.set("status", "busy")
+    # 其他写入者的增量不会被覆盖
+    client.hincrby(KEY, "total_tasks", 5)
+
+    stored = _flush(reporter, client)
+    assert (stored["total_tasks"], stored["success_tasks"], stored["status"]) == ("6", "1", "busy")
+    assert not reporter.pending
+
+
+def test_expired_hash_is_rewritten_in_full(reporter, client):
+    reporter.incr("total_tasks", 3)
+    reporter.incr("success_tasks", 2)
+    _flush(reporter, client)
+
+    # 节点长时间未上报，哈希过期
+    client.delete(KEY)
+    reporter.incr("total_tasks")
+    stored = _flush(reporter, client)
+
+    assert stored["total_tasks"] == "4"
+    assert stored["success_tasks"] == "2"
+    assert (stored["status"], stored["cpu_usage"]) == ("ready", "0.0")
+    assert json.loads(stored["capabilities"]) == ["http"]
+    assert "last_heartbeat" in stored
+
+
+def test_restore_after_failed_pipeline(reporter, client):
+    _flush(reporter, client)
+    reporter.incr("total_tasks", 2)
+    batch = reporter.drain(client.pipeline(transaction=False))
+    reporter.restore(batch)
+    reporter.incr("total_tasks")
+
+    assert _flush(reporter, client)["total_tasks"] == "3"
+
+
+def test_async_flush(reporter, redis_server):
+    import redis.asyncio
+
+    async def run():
+        client = redis.asyncio.Redis(decode_responses=True)
+        assert await reporter.flush(client, force=True)
+        await client.delete(KEY)
+        reporter.incr("active_tasks")
+        assert await reporter.flush(client, force=True)
+        return await client.hgetall(KEY)
+
+    stored = asyncio.run(run())
+    assert (stored["active_tasks"], stored["status"]) == ("1", "ready")
+
+
+def test_async_sampling_runs_off_the_event_loop(reporter):
+    loop_thread = threading.get_ident()
+    threads = []
+
+    class RecordingSampler(StaticSampler):
+        def sample(self, max_age=None):
+            threads.append(threading.get_ident())
+            return super().sample(max_age)
+
+    reporter.sampler = RecordingSampler()
+    assert asyncio.run(reporter.sample_resources_async())
+    assert not asyncio.run(reporter.sample_resources_async())
+
+    assert len(threads) == 1 and threads[0] != loop_thread
+    assert (reporter.status.cpu_usage, reporter.status.memory_usage) == (10.0, 20.0)
+    assert reporter._dirty == {"cpu_usage": 10.0, "memory_usage": 20.0}
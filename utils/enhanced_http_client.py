@@ -21,6 +21,7 @@ from .proxy_pool import ProxyPool, ProxyInfo, ProxyStatus
 from .proxy_providers import create_proxy_provider
 from .proxy_validator import create_proxy_validator
 from .proxy_rotator import create_proxy_rotator
+from .metrics import PROXY_SUCCESS, PROXY_FAILURE
 
 logger = logging.getLogger(__name__)
 
@@ -54,6 +55,14 @@ class EnhancedHttpClient:
             "Upgrade-Insecure-Requests": "1"
         })
         
+        # 连接池配置：直连和Tor复用长连接客户端，代理池请求每次单独建连
+        self.pool_connections = self.config.get("pool_connections", True)
+        self.pool_limits = httpx.Limits(
+            max_connections=self.config.get("max_connections", 100),
+            max_keepalive_connections=self.config.get("max_keepalive_connections", 20)
+        )
+        self._pooled_clients: Dict[str, httpx.AsyncClient] = {}
+        
         # 统计信息
         self.stats = {
             "total_requests": 0,
@@ -145,35 +154,42 @@ class EnhancedHttpClient:
         last_exception = None
         
         for attempt in range(self.max_retries + 1):
+            client_config = None
             try:
                 # 选择连接方式
                 client_config = await self._get_client_config(url, attempt)
                 
-                async with httpx.AsyncClient(**client_config) as client:
-                    response = await client.request(method, url, **kwargs)
+                pooled_client = self._get_pooled_client(client_config)
+                if pooled_client is not None:
+                    response = await pooled_client.request(method, url, **kwargs)
+                else:
+                    async with httpx.AsyncClient(**client_config) as client:
+                        response = await client.request(method, url, **kwargs)
+                
+                # 检查响应状态
+                if response.status_code < 400:
+                    self.stats["successful_requests"] += 1
                     
-                    # 检查响应状态
-                    if response.status_code < 400:
-                        self.stats["successful_requests"] += 1
-                        
-                        # 记录代理使用成功
-                        if "proxy" in client_config:
-                            await self._record_proxy_success(client_config["proxy"], response)
-                        
-                        return response
-                    else:
-                        raise httpx.HTTPStatusError(
-                            f"HTTP {response.status_code}",
-                            request=response.request,
-                            response=response
-                        )
+                    # 记录代理使用成功
+                    if "proxy" in client_config:
+                        PROXY_SUCCESS.inc()
+                        await self._record_proxy_success(client_config["proxy"], response)
+                    
+                    return response
+                else:
+                    raise httpx.HTTPStatusError(
+                        f"HTTP {response.status_code}",
+                        request=response.request,
+                        response=response
+                    )
                         
             except Exception as e:
                 last_exception = e
                 
                 # 记录代理使用失败
-                if "proxy" in locals() and "client_config" in locals():
-                    await self._record_proxy_failure(client_config.get("proxy"), str(e))
+                if client_config and "proxy" in client_config:
+                    PROXY_FAILURE.inc()
+                    await self._record_proxy_failure(client_config["proxy"], str(e))
                 
                 if attempt < self.max_retries:
                     self.stats["retry_count"] += 1
@@ -212,6 +228,18 @@ class EnhancedHttpClient:
         self.stats["direct_requests"] += 1
         return config
     
+    def _get_pooled_client(self, client_config: Dict) -> Optional[httpx.AsyncClient]:
+        """获取直连/Tor的长连接客户端，代理池请求返回None"""
+        if not self.pool_connections or "proxy" in client_config:
+            return None
+        
+        route = "tor" if "transport" in client_config else "direct"
+        client = self._pooled_clients.get(route)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(limits=self.pool_limits, **client_config)
+            self._pooled_clients[route] = client
+        return client
+    
     async def _get_proxy_from_pool(self, url: str) -> Optional[ProxyInfo]:
         """从代理池获取代理"""
         if not self.proxy_pool_manager:
@@ -415,6 +443,9 @@ class EnhancedHttpClient:
     async def close(self):
         """关闭HTTP客户端"""
         try:
+            for client in self._pooled_clients.values():
+                await client.aclose()
+            self._pooled_clients.clear()
             if self.proxy_pool_manager:
                 await self.stop_proxy_pool()
             logger.info("HTTP客户端已关闭")
@@ -0,0 +1,222 @@
+"""运行指标模块
+工作节点、结果收集器、监控系统和MCP服务器共用的Prometheus指标定义，
+以OpenMetrics文本格式导出。
+
+热路径上只做一次已解析子指标的 observe/inc（标签在模块加载或首次使用时解析），
+槽位占用、待写批次等状态量由 set_function 在抓取时读取，不在热路径上更新。
+未安装 prometheus_client 时所有指标为空操作。
+"""
+
+import functools
+import inspect
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+try:
+    import prometheus_client
+    from prometheus_client.openmetrics import exposition as openmetrics
+except ImportError:
+    prometheus_client = None
+
+# 秒级延迟的桶边界
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+TASK_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+WAIT_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0, 4 * 3600.0, 24 * 3600.0)
+
+# 域名标签最多保留的取值数，超过后归入 other，避免时间序列数量随域名增长
+MAX_DOMAIN_LABELS = 200
+
+
+class _NoopMetric:
+    """未安装 prometheus_client 时的空指标"""
+
+    def labels(self, *args, **kwargs) -> "_NoopMetric":
+        return self
+
+    def inc(self, amount: float = 1):
+        pass
+
+    def dec(self, amount: float = 1):
+        pass
+
+    def set(self, value: float):
+        pass
+
+    def observe(self, value: float):
+        pass
+
+    def set_function(self, function: Callable[[], float]):
+        pass
+
+
+def _metric(kind: str, name: str, documentation: str, labelnames: Tuple[str, ...] = (), **kwargs):
+    if prometheus_client is None:
+        return _NoopMetric()
+    return getattr(prometheus_client, kind)(name, documentation, labelnames, **kwargs)
+
+
+# ---- 任务队列 ----
+
+QUEUE_OPERATION_SECONDS = _metric(
+    "Histogram", "crawler_queue_operation_seconds",
+    "任务队列操作耗时（enqueue: 入队；dequeue: 任务ID弹出后读取任务内容并登记运行状态）",
+    ("operation",), buckets=FAST_BUCKETS
+)
+ENQUEUE_SECONDS = QUEUE_OPERATION_SECONDS.labels(operation="enqueue")
+DEQUEUE_SECONDS = QUEUE_OPERATION_SECONDS.labels(operation="dequeue")
+
+QUEUE_WAIT_SECONDS = _metric(
+    "Histogram", "crawler_queue_wait_seconds",
+    "任务从创建到被工作节点取出的时间（含重试延迟）", buckets=WAIT_BUCKETS
+)
+
+QUEUE_DEPTH = _metric(
+    "Gauge", "crawler_queue_depth",
+    "队列长度（pending: 待执行；leased: 执行中；dead: 死信；results: 待收集结果）", ("queue",)
+)
+
+REDIS_RTT_SECONDS = _metric(
+    "Histogram", "crawler_redis_rtt_seconds", "Redis PING 往返时间", ("component",), buckets=FAST_BUCKETS
+)
+
+# ---- 工作节点 ----
+
+TASK_DURATION_SECONDS = _metric(
+    "Histogram", "crawler_task_duration_seconds", "任务执行耗时", ("domain", "status"), buckets=TASK_BUCKETS
+)
+
+WORKER_SLOTS = _metric("Gauge", "crawler_worker_slots", "工作节点任务槽（total: 总数；busy: 占用）", ("state",))
+WORKER_SLOT_UTILIZATION = _metric("Gauge", "crawler_worker_slot_utilization", "工作节点任务槽占用率")
+
+PROXY_REQUESTS = _metric("Counter", "crawler_proxy_requests", "经代理池代理发出的请求", ("result",))
+PROXY_SUCCESS = PROXY_REQUESTS.labels(result="success")
+PROXY_FAILURE = PROXY_REQUESTS.labels(result="failure")
+
+# ---- 结果收集器 ----
+
+COLLECTOR_RESULTS = _metric("Counter", "crawler_collector_results", "结果收集器写入的结果", ("outcome",))
+COLLECTOR_RESULTS_STORED = COLLECTOR_RESULTS.labels(outcome="stored")
+COLLECTOR_RESULTS_FAILED = COLLECTOR_RESULTS.labels(outcome="failed")
+COLLECTOR_FLUSH_SECONDS = _metric(
+    "Histogram", "crawler_collector_flush_seconds", "结果批次写入耗时",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+COLLECTOR_BACKPRESSURE_SECONDS = _metric(
+    "Counter", "crawler_collector_backpressure_seconds", "写入队列已满时收集线程的等待时间"
+)
+COLLECTOR_PENDING_BATCHES = _metric("Gauge", "crawler_collector_pending_batches", "等待写入线程处理的批次数")
+
+# ---- MCP服务器 ----
+
+MCP_TOOL_CALLS = _metric("Counter", "mcp_tool_calls", "MCP工具调用次数", ("tool", "status"))
+MCP_TOOL_SECONDS = _metric("Histogram", "mcp_tool_duration_seconds", "MCP工具调用耗时", ("tool",),
+                           buckets=TASK_BUCKETS)
+
+
+class LabelLimiter:
+    """限制标签的取值数，超出上限的新取值统一归入 overflow"""
+
+    def __init__(self, limit: int, overflow: str = "other"):
+        self.limit = limit
+        self.overflow = overflow
+        self._values = set()
+        self._lock = threading.Lock()
+
+    def __call__(self, value: str) -> str:
+        if value in self._values:
+            return value
+        if len(self._values) >= self.limit:
+            return self.overflow
+        with self._lock:
+            if len(self._values) < self.limit:
+                self._values.add(value)
+                return value
+        return self.overflow
+
+
+_domain_label = LabelLimiter(MAX_DOMAIN_LABELS)
+_task_children: Dict[Tuple[str, str], object] = {}
+
+
+def observe_task(domain: str, status: str, seconds: float):
+    """记录一个任务的执行耗时（按域名和状态）"""
+    key = (_domain_label(domain or "unknown"), status)
+    child = _task_children.get(key)
+    if child is None:
+        child = _task_children[key] = TASK_DURATION_SECONDS.labels(domain=key[0], status=status)
+    child.observe(seconds)
+
+
+def observe_queue_wait(created_at: Optional[str], now: float = None):
+    """记录任务在队列中等待的时间（created_at 为任务创建时的ISO时间）"""
+    if not created_at:
+        return
+    try:
+        waited = (now or time.time()) - datetime.fromisoformat(created_at).timestamp()
+    except (TypeError, ValueError):
+        return
+    QUEUE_WAIT_SECONDS.observe(max(0.0, waited))
+
+
+def instrument_tool(fn: Callable) -> Callable:
+    """包装MCP工具函数，记录调用次数、结果状态和耗时（同步和异步函数均可）"""
+    name = fn.__name__
+    duration = MCP_TOOL_SECONDS.labels(tool=name)
+    ok = MCP_TOOL_CALLS.labels(tool=name, status="ok")
+    error = MCP_TOOL_CALLS.labels(tool=name, status="error")
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+            except BaseException:
+                error.inc()
+                raise
+            finally:
+                duration.observe(time.perf_counter() - started)
+            ok.inc()
+            return result
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            error.inc()
+            raise
+        finally:
+            duration.observe(time.perf_counter() - started)
+        ok.inc()
+        return result
+    return wrapper
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    以OpenMetrics文本格式导出本进程的全部指标
+
+    Returns:
+        tuple: (内容, Content-Type)
+    """
+    if prometheus_client is None:
+        return b"# EOF\n", "application/openmetrics-text; version=1.0.0; charset=utf-8"
+    return openmetrics.generate_latest(prometheus_client.REGISTRY), openmetrics.CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port: int, addr: str = "0.0.0.0") -> bool:
+    """
+    在后台线程中启动指标HTTP服务（/metrics，按 Accept 头返回OpenMetrics或Prometheus文本）
+
+    Returns:
+        bool: 是否已启动（未安装 prometheus_client 时返回False）
+    """
+    if prometheus_client is None:
+        return False
+    prometheus_client.start_http_server(port, addr=addr)
+    return True
@@ -0,0 +1,261 @@
+"""存储清单模块
+在写入和删除时增量维护存储目录的文件数、字节数和条目列表，
+统计、列表和按时间清理不再需要遍历目录树
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    area TEXT NOT NULL DEFAULT '',
+    size INTEGER NOT NULL DEFAULT 0,
+    files INTEGER NOT NULL DEFAULT 1,
+    created REAL,
+    meta TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_entries_area_created ON entries (area, created);
+
+CREATE TABLE IF NOT EXISTS totals (
+    area TEXT PRIMARY KEY,
+    entries INTEGER NOT NULL DEFAULT 0,
+    files INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    INSERT INTO totals (area) SELECT NEW.area WHERE NOT EXISTS (SELECT 1 FROM totals WHERE area = NEW.area);
+    UPDATE totals SET entries = entries + 1, files = files + NEW.files, bytes = bytes + NEW.size
+    WHERE area = NEW.area;
+END;
+
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    UPDATE totals SET entries = entries - 1, files = files - OLD.files, bytes = bytes - OLD.size
+    WHERE area = OLD.area;
+END;
+
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE ON entries BEGIN
+    UPDATE totals SET entries = entries - 1, files = files - OLD.files, bytes = bytes - OLD.size
+    WHERE area = OLD.area;
+    INSERT INTO totals (area) SELECT NEW.area WHERE NOT EXISTS (SELECT 1 FROM totals WHERE area = NEW.area);
+    UPDATE totals SET entries = entries + 1, files = files + NEW.files, bytes = bytes + NEW.size
+    WHERE area = NEW.area;
+END;
+"""
+
+UPSERT_SQL = """
+INSERT INTO entries (key, area, size, files, created, meta) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    area = excluded.area,
+    size = excluded.size,
+    files = excluded.files,
+    created = COALESCE(entries.created, excluded.created),
+    meta = COALESCE(excluded.meta, entries.meta)
+"""
+
+
+class StorageManifest:
+    """存储清单（SQLite），总量由触发器随条目增删改同步更新"""
+
+    def __init__(self, db_path: Union[str, Path], root: Union[str, Path] = None):
+        """
+        Args:
+            db_path: 清单数据库路径
+            root: 存储根目录，按文件登记时键为相对该目录的路径（默认为数据库所在目录）
+        """
+        self.db_path = Path(db_path)
+        self.root = Path(root) if root is not None else self.db_path.parent
+        # 新建的清单为空，调用方应执行一次 reconcile 登记已有文件
+        self.created = not self.db_path.exists()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    @property
+    def db_files(self) -> List[Path]:
+        """清单数据库自身的文件（不登记在清单中）"""
+        return [self.db_path, Path(f"{self.db_path}-wal"), Path(f"{self.db_path}-shm")]
+
+    # ---- 条目 ----
+
+    def upsert(self, key: str, size: int, files: int = 1, area: str = "",
+               created: float = None, meta: Dict[str, Any] = None):
+        """登记或更新一个条目（created 只在首次登记时写入）"""
+        with self._lock, self._conn:
+            self._conn.execute(UPSERT_SQL, (
+                key, area, int(size), int(files), created,
+                json.dumps(meta, ensure_ascii=False) if meta is not None else None
+            ))
+
+    def remove(self, key: str) -> bool:
+        """删除一个条目，返回条目是否存在"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        return cursor.rowcount > 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """查询一个条目"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM entries WHERE key = ?", (key,)).fetchone()
+        return self._entry(row) if row else None
+
+    def list(self, area: str = None, before: float = None, newest_first: bool = True,
+             limit: int = None) -> List[Dict[str, Any]]:
+        """
+        按创建时间列出条目
+
+        Args:
+            area: 只列出该区域的条目
+            before: 只列出创建时间早于该时间戳的条目
+            newest_first: 是否按创建时间倒序
+            limit: 最多返回的条目数
+        """
+        clauses, params = [], []
+        if area is not None:
+            clauses.append("area = ?")
+            params.append(area)
+        if before is not None:
+            clauses.append("created < ?")
+            params.append(before)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        sql = f"SELECT * FROM entries{where} ORDER BY created {'DESC' if newest_first else 'ASC'}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def totals(self) -> Dict[str, Dict[str, int]]:
+        """各区域的条目数、文件数和字节数"""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM totals WHERE entries > 0 ORDER BY area").fetchall()
+        return {row["area"]: {"entries": row["entries"], "files": row["files"], "bytes": row["bytes"]}
+                for row in rows}
+
+    @staticmethod
+    def _entry(row: sqlite3.Row) -> Dict[str, Any]:
+        entry = dict(row)
+        entry["meta"] = json.loads(entry["meta"]) if entry["meta"] else {}
+        return entry
+
+    # ---- 按文件登记 ----
+
+    def file_key(self, path: Union[str, Path]) -> Optional[str]:
+        """文件相对存储根目录的键，不在根目录下时返回None"""
+        try:
+            relative = os.path.relpath(path, self.root)
+        except ValueError:
+            # Windows下不同盘符
+            return None
+        if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+            return None
+        return Path(relative).as_posix()
+
+    def upsert_file(self, path: Union[str, Path]) -> bool:
+        """按文件当前大小登记，区域为根目录下的第一级目录名"""
+        key = self.file_key(path)
+        if key is None:
+            return False
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.remove(key)
+            return False
+        area = key.split("/", 1)[0] if "/" in key else ""
+        self.upsert(key, stat.st_size, area=area, created=stat.st_mtime)
+        return True
+
+    def remove_file(self, path: Union[str, Path]) -> bool:
+        key = self.file_key(path)
+        return self.remove(key) if key is not None else False
+
+    def remove_prefix(self, directory: Union[str, Path]) -> int:
+        """删除目录下的全部文件条目"""
+        key = self.file_key(directory)
+        if key is None:
+            return 0
+        prefix = key.rstrip("/") + "/"
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM entries WHERE key >= ? AND key < ?", (prefix, prefix[:-1] + "0")
+            )
+        return cursor.rowcount
+
+    # ---- 校正 ----
+
+    def reconcile(self, actual: Iterable[Dict[str, Any]], area: str = None) -> Dict[str, int]:
+        """
+        用实际存在的条目校正清单
+
+        Args:
+            actual: 实际条目，字段同 upsert 的参数（key、size，可选 files、area、created、meta）
+            area: 只校正该区域，为空时校正全部条目
+
+        Returns:
+            Dict: added / updated / removed 数量
+        """
+        with self._lock:
+            sql = "SELECT key, size, files FROM entries"
+            params = ()
+            if area is not None:
+                sql += " WHERE area = ?"
+                params = (area,)
+            known = {row["key"]: (row["size"], row["files"]) for row in self._conn.execute(sql, params)}
+
+        added = updated = 0
+        rows = []
+        for entry in actual:
+            key = entry["key"]
+            size, files = int(entry["size"]), int(entry.get("files", 1))
+            current = known.pop(key, None)
+            if current is None:
+                added += 1
+            elif current != (size, files):
+                updated += 1
+            else:
+                continue
+            meta = entry.get("meta")
+            rows.append((key, entry.get("area", area or ""), size, files, entry.get("created"),
+                         json.dumps(meta, ensure_ascii=False) if meta is not None else None))
+
+        with self._lock, self._conn:
+            self._conn.executemany(UPSERT_SQL, rows)
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in known])
+        return {"added": added, "updated": updated, "removed": len(known)}
+
+    def reconcile_files(self, exclude: Iterable[Union[str, Path]] = ()) -> Dict[str, int]:
+        """遍历存储根目录，按文件校正清单（清单数据库和 exclude 中的文件除外）"""
+        skipped = {Path(path).resolve() for path in list(exclude) + self.db_files}
+
+        def scan():
+            for directory, _, filenames in os.walk(self.root):
+                for filename in filenames:
+                    path = Path(directory) / filename
+                    if path.resolve() in skipped:
+                        continue
+                    try:
+                        stat = path.stat()
+                    except FileNotFoundError:
+                        continue
+                    key = self.file_key(path)
+                    yield {
+                        "key": key,
+                        "area": key.split("/", 1)[0] if "/" in key else "",
+                        "size": stat.st_size,
+                        "created": stat.st_mtime,
+                    }
+
+        return self.reconcile(scan())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -11,11 +11,14 @@ from datetime import datetime
 from typing import Dict, List, Any, Optional, Tuple
 from urllib.parse import urlparse, urljoin
 import re
+import shutil
 import logging
 import httpx
 from PIL import Image
 from io import BytesIO
 
+from utils.storage_manifest import StorageManifest
+
 logger = logging.getLogger(__name__)
 
 class WebpageStorage:
@@ -30,6 +33,11 @@ class WebpageStorage:
         self.max_image_size = 5 * 1024 * 1024  # 5MB
         self.max_images_per_page = 10  # 每个网页最多保存10张图片
         
+        # 网页清单：保存和删除时更新，列表、统计和清理不再逐个读取 metadata.json
+        self.manifest = StorageManifest(self.base_dir / "manifest.db")
+        if self.manifest.created:
+            self.reconcile_manifest()
+        
     def _generate_folder_name(self, url: str, title: str = None) -> str:
         """为网页生成唯一的文件夹名称"""
         # 使用URL的hash作为唯一标识
@@ -256,6 +264,8 @@ class WebpageStorage:
             with open(metadata_file, 'w', encoding='utf-8') as f:
                 json.dump(webpage_metadata, f, ensure_ascii=False, indent=2)
             
+            self._register_webpage(webpage_dir, webpage_metadata)
+            
             logger.info(f"网页已保存到: {webpage_dir}")
             logger.info(f"成功下载图片: {len(downloaded_images)}/{webpage_metadata['total_images']}")
             
@@ -294,26 +304,51 @@ class WebpageStorage:
             logger.error(f"读取网页信息失败: {folder_name} - {e}")
             return None
     
-    def list_saved_webpages(self) -> List[Dict]:
-        """列出所有已保存的网页"""
-        webpages = []
+    def _register_webpage(self, webpage_dir: Path, metadata: Dict, size_bytes: int = None, files: int = None):
+        """登记网页到清单（默认按HTML、元数据和已下载图片计算大小）"""
+        if size_bytes is None:
+            size_bytes = (
+                (webpage_dir / metadata.get('html_file', 'content.html')).stat().st_size
+                + (webpage_dir / "metadata.json").stat().st_size
+                + sum(image.get('size_bytes', 0) for image in metadata.get('images', []))
+            )
+            files = 2 + len(metadata.get('images', []))
         
+        save_time = metadata.get('save_time')
+        self.manifest.upsert(
+            webpage_dir.name,
+            size_bytes,
+            files=files,
+            created=datetime.fromisoformat(save_time).timestamp() if save_time else None,
+            meta={
+                'url': metadata.get('url'),
+                'title': metadata.get('title'),
+                'save_time': save_time,
+                'images_count': metadata.get('downloaded_images', 0)
+            }
+        )
+    
+    def list_saved_webpages(self, limit: int = None) -> List[Dict]:
+        """列出所有已保存的网页（按保存时间倒序）"""
         try:
-            for folder in self.base_dir.iterdir():
-                if folder.is_dir():
-                    info = self.get_webpage_info(folder.name)
-                    if info:
-                        webpages.append({
-                            'folder_name': folder.name,
-                            'url': info.get('url'),
-                            'title': info.get('title'),
-                            'save_time': info.get('save_time'),
-                            'images_count': info.get('downloaded_images', 0)
-                        })
+            return [
+                {'folder_name': entry['key'], **entry['meta']}
+                for entry in self.manifest.list(limit=limit)
+            ]
         except Exception as e:
             logger.error(f"列出网页失败: {e}")
-        
-        return sorted(webpages, key=lambda x: x.get('save_time', ''), reverse=True)
+            return []
+    
+    def get_storage_stats(self) -> Dict[str, Any]:
+        """已保存网页的数量、文件数和总大小"""
+        totals = self.manifest.totals().get('', {'entries': 0, 'files': 0, 'bytes': 0})
+        return {
+            'webpages': totals['entries'],
+            'files': totals['files'],
+            'total_size_bytes': totals['bytes'],
+            'total_size_mb': round(totals['bytes'] / (1024 * 1024), 2),
+            'base_dir': str(self.base_dir)
+        }
     
     def cleanup_old_webpages(self, days: int = 30) -> int:
         """清理指定天数前的网页数据"""
@@ -321,21 +356,49 @@ class WebpageStorage:
         cutoff_time = datetime.now().timestamp() - (days * 24 * 3600)
         
         try:
-            for folder in self.base_dir.iterdir():
-                if folder.is_dir():
-                    info = self.get_webpage_info(folder.name)
-                    if info and info.get('save_time'):
-                        save_time = datetime.fromisoformat(info['save_time']).timestamp()
-                        if save_time < cutoff_time:
-                            # 删除整个文件夹
-                            import shutil
-                            shutil.rmtree(folder)
-                            cleaned_count += 1
-                            logger.info(f"已清理过期网页: {folder.name}")
+            for entry in self.manifest.list(before=cutoff_time, newest_first=False):
+                folder = self.base_dir / entry['key']
+                # 删除整个文件夹
+                shutil.rmtree(folder, ignore_errors=True)
+                self.manifest.remove(entry['key'])
+                cleaned_count += 1
+                logger.info(f"已清理过期网页: {folder.name}")
         except Exception as e:
             logger.error(f"清理网页失败: {e}")
         
         return cleaned_count
+    
+    def reconcile_manifest(self) -> Dict[str, int]:
+        """遍历网页目录校正清单（清单与磁盘不一致时使用）
+        
+        Returns:
+            added / updated / removed 数量
+        """
+        def scan():
+            for folder in self.base_dir.iterdir():
+                if not folder.is_dir():
+                    continue
+                info = self.get_webpage_info(folder.name)
+                if not info:
+                    continue
+                files = [path for path in folder.rglob("*") if path.is_file()]
+                save_time = info.get('save_time')
+                yield {
+                    'key': folder.name,
+                    'size': sum(path.stat().st_size for path in files),
+                    'files': len(files),
+                    'created': datetime.fromisoformat(save_time).timestamp() if save_time else None,
+                    'meta': {
+                        'url': info.get('url'),
+                        'title': info.get('title'),
+                        'save_time': save_time,
+                        'images_count': info.get('downloaded_images', 0)
+                    }
+                }
+        
+        changes = self.manifest.reconcile(scan())
+        logger.info(f"网页清单校正完成: {changes}")
+        return changes
 
 
 # 全局实例
@@ -346,4 +409,31 @@ def get_storage_instance(base_dir: str = "data/webpages") -> WebpageStorage:
     global _storage_instance
     if _storage_instance is None:
         _storage_instance = WebpageStorage(base_dir)
-    return _storage_instance
\ No newline at end of file
+    return _storage_instance
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="网页存储管理")
+    parser.add_argument("--base-dir", default="data/webpages", help="网页存储目录")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    list_parser = subparsers.add_parser("list", help="列出已保存的网页")
+    list_parser.add_argument("--limit", type=int, default=20)
+    subparsers.add_parser("stats", help="存储统计")
+    cleanup_parser = subparsers.add_parser("cleanup", help="清理过期网页")
+    cleanup_parser.add_argument("--days", type=int, default=30)
+    subparsers.add_parser("reconcile", help="遍历目录校正清单")
+    
+    args = parser.parse_args()
+    storage = WebpageStorage(args.base_dir)
+    
+    if args.command == "list":
+        for webpage in storage.list_saved_webpages(limit=args.limit):
+            print(json.dumps(webpage, ensure_ascii=False))
+    elif args.command == "stats":
+        print(json.dumps(storage.get_storage_stats(), ensure_ascii=False, indent=2))
+    elif args.command == "cleanup":
+        print(f"已清理 {storage.cleanup_old_webpages(args.days)} 个网页")
+    elif args.command == "reconcile":
+        print(storage.reconcile_manifest())